@@ -0,0 +1,34 @@
+"""
+Email login.
+
+login_user used to look the user up by email and then call
+authenticate(username=...), which loaded the same user a second time.
+EmailBackend finds the user with one query on the case-insensitive unique
+email index (user_email_ci_unique) and checks the password on that row:
+
+    user = authenticate(request, email='John@Email.com', password='pass123')
+
+check_password() also rehashes the password when PASSWORD_HASHER or its
+cost changed (see accounts/hashers.py), which costs one UPDATE on that login.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+
+class EmailBackend(ModelBackend):
+    """Authenticates with email + password; other credentials are left to ModelBackend"""
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+        User = get_user_model()
+        # Lower(email) = lower(...) is the expression the unique index is on
+        user = User.objects.alias(email_lower=Lower('email')).filter(email_lower=email.strip().lower()).first()
+        if user is None:
+            # Hash anyway, so unknown emails take as long as wrong passwords
+            User().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,56 @@
+"""
+Password hashers whose cost comes from settings.
+
+Django's own hashers hard-code their cost (iterations, rounds, memory) as
+class attributes, so raising it means subclassing. These read it from
+settings instead:
+
+    ARGON2_TIME_COST = 2          # passes over memory
+    ARGON2_MEMORY_COST = 19456    # KiB
+    ARGON2_PARALLELISM = 1
+    BCRYPT_ROUNDS = 12            # log2 of the work factor
+    PBKDF2_ITERATIONS = 1000000
+
+A stored hash made with another hasher, or with a lower cost, is upgraded
+the next time its user logs in (check_password() rehashes when the first
+entry of PASSWORD_HASHERS says must_update), so changing the cost or
+PASSWORD_HASHER in settings moves users over without a data migration.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    BCryptSHA256PasswordHasher,
+    PBKDF2PasswordHasher,
+)
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id (needs argon2-cffi), cost from ARGON2_* settings"""
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class TunableBCryptSHA256PasswordHasher(BCryptSHA256PasswordHasher):
+    """bcrypt over SHA-256 (needs bcrypt), cost from BCRYPT_ROUNDS"""
+
+    @property
+    def rounds(self):
+        return getattr(settings, 'BCRYPT_ROUNDS', BCryptSHA256PasswordHasher.rounds)
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 (no extra package), iterations from PBKDF2_ITERATIONS"""
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
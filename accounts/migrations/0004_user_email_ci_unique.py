@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:16
+
+import logging
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+logger = logging.getLogger(__name__)
+
+
+def placeholder_email(email, pk):
+    """Unique stand-in for a duplicate email, keeping the original visible to staff"""
+    local, _, domain = email.rpartition('@')
+    return f'{local}+duplicate-{pk}@{domain}'
+
+
+def resolve_duplicate_emails(apps, schema_editor):
+    # Empty emails become NULL, which the unique index allows many of.
+    # Where several users share an email (in any case), the one who logged
+    # in last keeps it (newest account if none did). The others get a
+    # placeholder ("name+duplicate-<id>@domain") so they aren't locked out
+    # silently: their ids are logged, and staff can find them in the admin
+    # by searching for "+duplicate-" and set the right email.
+    User = apps.get_model('accounts', 'User')
+    User.objects.filter(email='').update(email=None)
+    duplicated = (
+        User.objects.exclude(email=None).values(email_lower=Lower('email'))
+        .annotate(users=models.Count('pk')).filter(users__gt=1).values_list('email_lower', flat=True)
+    )
+    for email in list(duplicated):
+        users = User.objects.filter(email__iexact=email).order_by(
+            models.F('last_login').desc(nulls_last=True), '-date_joined', '-pk'
+        )
+        keep = users.values_list('pk', flat=True).first()
+        moved = []
+        for user in users.exclude(pk=keep):
+            user.email = placeholder_email(user.email, user.pk)
+            user.save(update_fields=['email'])
+            moved.append(user.pk)
+        logger.warning(
+            'Email %s is shared: user %s keeps it, users %s were given placeholder emails', email, keep, moved
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_profile_picture_variants'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, null=True, verbose_name='email address'),
+        ),
+        migrations.RunPython(resolve_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='user_email_ci_unique', violation_error_message='A user with this email already exists.'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 # Create your models here.
 
@@ -9,12 +10,37 @@ class User(AbstractUser):
         ('admin', 'Admin'),
     )
 
+    # Users log in with their email (see accounts.backends), so it is unique
+    # regardless of case; accounts without one store NULL, not ''
+    email = models.EmailField('email address', blank=True, null=True)
     user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default='student')
     phone = models.CharField(max_length=15, blank=True)
     profile_picture = models.ImageField(upload_to='profiles/', null=True, blank=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)  # see eduhyd_backend.images
     created_at  = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination (see eduhyd_backend.pagination)
+            models.Index(fields=['created_at', 'id'], name='user_created_id_idx'),
+        ]
+        constraints = [
+            # Also the index the email login looks users up with
+            models.UniqueConstraint(
+                Lower('email'), name='user_email_ci_unique',
+                violation_error_message='A user with this email already exists.',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.username} ({self.user_type})"
+
+    def clean(self):
+        super().clean()
+        self.email = self.email or None
+
+    def save(self, *args, **kwargs):
+        # Forms send '' for an empty email; NULLs don't collide in the unique index
+        self.email = self.email or None
+        super().save(*args, **kwargs)
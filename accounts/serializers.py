@@ -1,8 +1,22 @@
 from rest_framework import serializers
+from eduhyd_backend.images import ImageVariantsMixin
 from .models import User
 
-class UserSerializer(serializers.ModelSerializer):
+
+def validate_unique_email(value, instance=None):
+    """Emails are unique regardless of case (they are the login); '' means none"""
+    if not value:
+        return None
+    users = User.objects.filter(email__iexact=value)
+    if instance is not None:
+        users = users.exclude(pk=instance.pk)
+    if users.exists():
+        raise serializers.ValidationError('A user with this email already exists.')
+    return value
+
+class UserSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """User Serializer"""
+    image_variants = {'profile_picture': ('profile_picture_variants', 'small')}
     full_name = serializers.CharField(source='get_full_name', read_only=True)
     
     class Meta:
@@ -13,6 +27,9 @@ class UserSerializer(serializers.ModelSerializer):
             'is_active', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
+    
+    def validate_email(self, value):
+        return validate_unique_email(value, self.instance)
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     """User Registration Serializer"""
@@ -26,6 +43,9 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             'first_name', 'last_name', 'phone', 'user_type'
         ]
     
+    def validate_email(self, value):
+        return validate_unique_email(value)
+    
     def validate(self, attrs):
         """Check passwords match"""
         if attrs['password'] != attrs['password2']:
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from eduhyd_backend.images import schedule_variants
+from .models import User
+
+
+@receiver(post_save, sender=User)
+def process_profile_picture(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, 'profile_picture', 'profile_picture_variants')
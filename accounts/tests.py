@@ -1,3 +1,165 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from .models import User
+from .throttling import get_cache, record_login_failure, take_token
 
-# Create your tests here.
+FAST_HASHERS = dict(
+    PASSWORD_HASHERS=['accounts.hashers.TunablePBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher'],
+    PBKDF2_ITERATIONS=1000,
+)
+
+
+@override_settings(**FAST_HASHERS)
+class EmailLoginTests(TestCase):
+    """POST /api/auth/login/ finds the user by email in one query and upgrades old hashes"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='john', email='John@Example.com')
+        self.user.set_password('pass12345')
+        self.user.save()
+
+    def login(self, email, password='pass12345'):
+        return self.client.post('/api/auth/login/', {'email': email, 'password': password}, format='json')
+
+    def test_login_is_one_query_and_ignores_case(self):
+        with self.assertNumQueries(1):
+            response = self.login('john@EXAMPLE.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['username'], 'john')
+
+        self.assertEqual(self.login('john@example.com', 'wrong-password').status_code, 401)
+        self.assertEqual(self.login('nobody@example.com').status_code, 401)
+
+    def test_old_hash_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password('pass12345', hasher='md5'))
+        self.assertEqual(self.login('john@example.com').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+
+        with self.settings(PBKDF2_ITERATIONS=2000):
+            self.assertEqual(self.login('john@example.com').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_email_unique_regardless_of_case(self):
+        response = self.client.post('/api/auth/register/', {
+            'username': 'john2', 'email': 'JOHN@example.com', 'password': 'pass12345', 'password2': 'pass12345',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+
+        with self.assertRaises(IntegrityError):
+            User.objects.create(username='john3', email='john@example.COM')
+
+    def test_users_without_email(self):
+        User.objects.create(username='a', email='')
+        User.objects.create(username='b', email='')
+        self.assertEqual(User.objects.filter(email=None).count(), 2)
+
+
+@override_settings(LOGIN_THROTTLE_IP_BURST=3, LOGIN_THROTTLE_IP_RATE=1 / 60, LOGIN_THROTTLE_ACCOUNT_FAILURES=2, **FAST_HASHERS)
+class LoginThrottleTests(TestCase):
+    """Login attempts are refused with 429 + Retry-After before any query or hashing"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create(username='john', email='john@example.com')
+        self.user.set_password('pass12345')
+        self.user.save()
+
+    def login(self, email, password='pass12345', ip='203.0.113.7'):
+        return self.client.post(
+            '/api/auth/login/', {'email': email, 'password': password}, format='json', REMOTE_ADDR=ip,
+        )
+
+    def test_failed_logins_lock_the_account(self):
+        self.assertEqual(self.login('john@example.com', 'wrong').status_code, 401)
+        self.assertEqual(self.login('JOHN@example.com', 'wrong', ip='198.51.100.1').status_code, 401)
+        with self.assertNumQueries(0):
+            response = self.login('john@example.com', ip='198.51.100.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        # Other accounts are unaffected
+        self.assertEqual(self.login('jane@example.com', ip='198.51.100.3').status_code, 401)
+
+    def test_success_clears_failures(self):
+        self.assertEqual(self.login('john@example.com', 'wrong', ip='198.51.100.1').status_code, 401)
+        self.assertEqual(self.login('john@example.com', ip='198.51.100.2').status_code, 200)
+        self.assertEqual(self.login('john@example.com', 'wrong', ip='198.51.100.3').status_code, 401)
+        self.assertEqual(self.login('john@example.com', ip='198.51.100.4').status_code, 200)
+
+    def test_ip_bucket(self):
+        for email in ('a@example.com', 'b@example.com', 'c@example.com'):
+            self.assertEqual(self.login(email).status_code, 401)
+        response = self.login('john@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(self.login('john@example.com', ip='198.51.100.1').status_code, 200)
+
+        # The bucket refills at the configured rate
+        self.assertEqual(take_token('192.0.2.1', now=0), 0)
+        take_token('192.0.2.1', now=0)
+        take_token('192.0.2.1', now=0)
+        self.assertEqual(take_token('192.0.2.1', now=30), 30)
+        self.assertEqual(take_token('192.0.2.1', now=60), 0)
+
+    def test_lock_survives_many_other_keys(self):
+        self.login('john@example.com', 'wrong', ip='198.51.100.1')
+        self.login('john@example.com', 'wrong', ip='198.51.100.2')
+        self.assertEqual(self.login('john@example.com', ip='198.51.100.3').status_code, 429)
+        # A spray over many emails and IPs must not push the lock out of the cache
+        for n in range(1000):
+            record_login_failure(f'user{n}@example.com')
+            take_token(f'10.0.{n // 256}.{n % 256}')
+        self.assertEqual(self.login('john@example.com', ip='198.51.100.9').status_code, 429)
+
+    def test_metrics(self):
+        self.login('john@example.com', 'wrong')
+        self.login('john@example.com', 'wrong')
+        self.login('john@example.com')
+        self.client.force_authenticate(User.objects.create(username='admin', is_staff=True))
+        response = self.client.get('/api/auth/login/throttle/?ip=203.0.113.7&email=John@example.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data['counters'], {'attempts': 3, 'rejected_ip': 0, 'rejected_account': 1, 'failures': 2}
+        )
+        self.assertEqual(response.data['ip']['tokens'], 0)
+        self.assertEqual(response.data['account']['recent_failures'], 2)
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/auth/login/throttle/').status_code, 403)
+
+
+class DuplicateEmailMigrationTests(TransactionTestCase):
+    """Migration 0004 keeps one user per email and gives the others a placeholder"""
+
+    before = [('accounts', '0003_user_profile_picture_variants')]
+    after = [('accounts', '0004_user_email_ci_unique')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_get_placeholders(self):
+        OldUser = self.migrate(self.before).get_model('accounts', 'User')
+        old = OldUser.objects.create(username='old', email='Ravi@example.com')
+        recent = OldUser.objects.create(username='recent', email='ravi@example.com', last_login='2026-01-01T00:00Z')
+        OldUser.objects.create(username='blank', email='')
+
+        with self.assertLogs('accounts.migrations', 'WARNING'):
+            NewUser = self.migrate(self.after).get_model('accounts', 'User')
+        self.assertEqual(NewUser.objects.get(pk=recent.pk).email, 'ravi@example.com')
+        self.assertEqual(NewUser.objects.get(pk=old.pk).email, f'Ravi+duplicate-{old.pk}@example.com')
+        self.assertIsNone(NewUser.objects.get(username='blank').email)
@@ -0,0 +1,193 @@
+"""
+Login throttling.
+
+Every login attempt costs a full password hash (see accounts/hashers.py),
+so a credential-stuffing burst can keep every worker busy hashing. Two
+throttles on POST /api/auth/login/ turn attempts away before the user is
+looked up or any password is hashed:
+
+- LoginIPThrottle: a token bucket per client IP. Each attempt takes a
+  token; the bucket holds LOGIN_THROTTLE_IP_BURST tokens and refills at
+  LOGIN_THROTTLE_IP_RATE tokens per second, so a user mistyping a few
+  times is never stopped but a script is held to the refill rate.
+- LoginAccountThrottle: a sliding window per email. After
+  LOGIN_THROTTLE_ACCOUNT_FAILURES failed logins within
+  LOGIN_THROTTLE_ACCOUNT_WINDOW seconds, that email is refused until the
+  oldest failure leaves the window, whichever IPs the attempts come from.
+  login_user records failures (record_login_failure) and clears them on
+  success (reset_login_failures).
+
+Rejections are 429 responses with a Retry-After header (DRF's Throttled).
+State lives in the LOGIN_THROTTLE_CACHE cache (local memory by default,
+which is per process; use a shared cache when running several workers).
+Updates are atomic within a process; with a shared cache, workers racing
+on the same key may let an attempt or two extra through, which is fine
+for a throttle. Counters for GET /api/auth/login/throttle/ are kept in
+the same cache (login_throttle_metrics).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = 'login-throttle'
+METRICS = ['attempts', 'rejected_ip', 'rejected_account', 'failures']
+
+# Cache reads and writes of one key happen under this lock (see above)
+_lock = threading.Lock()
+
+
+def get_setting(name, default):
+    return getattr(settings, f'LOGIN_THROTTLE_{name}', default)
+
+
+def get_cache():
+    return caches[get_setting('CACHE', 'default')]
+
+
+def account_key(email):
+    return f'{KEY_PREFIX}:account:{email.strip().lower()}'
+
+
+def ip_key(ip):
+    return f'{KEY_PREFIX}:ip:{ip}'
+
+
+def count(metric):
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:metrics:{metric}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, 1, timeout=None)
+
+
+# ========================================
+# Per-IP token bucket
+# ========================================
+def take_token(ip, now=None):
+    """
+    Take a token from ip's bucket. Returns 0 when one was taken, else the
+    seconds until the next token.
+    """
+    burst = get_setting('IP_BURST', 20)
+    rate = get_setting('IP_RATE', 1 / 6)
+    now = time.time() if now is None else now
+    cache = get_cache()
+    key = ip_key(ip)
+    with _lock:
+        tokens, updated_at = cache.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        wait = 0 if tokens >= 1 else (1 - tokens) / rate
+        if not wait:
+            tokens -= 1
+        # Unused for as long as a refill takes, the bucket is full again
+        cache.set(key, (tokens, now), timeout=int(burst / rate) + 1)
+    return wait
+
+
+def ip_tokens(ip, now=None):
+    """Tokens left in ip's bucket"""
+    burst = get_setting('IP_BURST', 20)
+    now = time.time() if now is None else now
+    tokens, updated_at = get_cache().get(ip_key(ip), (burst, now))
+    return min(burst, tokens + (now - updated_at) * get_setting('IP_RATE', 1 / 6))
+
+
+# ========================================
+# Per-account sliding window
+# ========================================
+def recent_failures(email, now=None):
+    """Times of the email's failed logins within the window, oldest first"""
+    window = get_setting('ACCOUNT_WINDOW', 15 * 60)
+    now = time.time() if now is None else now
+    return [at for at in get_cache().get(account_key(email), []) if at > now - window]
+
+
+def account_wait(email, now=None):
+    """Seconds until email may try again; 0 when it may now"""
+    now = time.time() if now is None else now
+    failures = recent_failures(email, now)
+    limit = get_setting('ACCOUNT_FAILURES', 5)
+    if len(failures) < limit:
+        return 0
+    # Free again once enough failures have left the window
+    return failures[-limit] + get_setting('ACCOUNT_WINDOW', 15 * 60) - now
+
+
+def record_login_failure(email, now=None):
+    window = get_setting('ACCOUNT_WINDOW', 15 * 60)
+    now = time.time() if now is None else now
+    with _lock:
+        # Only the newest ones decide when the account is free again
+        failures = (recent_failures(email, now) + [now])[-get_setting('ACCOUNT_FAILURES', 5):]
+        get_cache().set(account_key(email), failures, timeout=int(window) + 1)
+    count('failures')
+
+
+def reset_login_failures(email):
+    get_cache().delete(account_key(email))
+
+
+# ========================================
+# DRF throttles
+# ========================================
+def get_login_email(request):
+    """The email a login request is for, or None (request.data may be a list)"""
+    email = request.data.get('email') if hasattr(request.data, 'get') else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+class LoginIPThrottle(BaseThrottle):
+    """Token bucket per client IP (see the module docstring)"""
+
+    def allow_request(self, request, view):
+        count('attempts')
+        self.wait_seconds = take_token(self.get_ident(request))
+        if self.wait_seconds:
+            count('rejected_ip')
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginAccountThrottle(BaseThrottle):
+    """Sliding window of failed logins per email (see the module docstring)"""
+
+    def allow_request(self, request, view):
+        email = get_login_email(request)
+        self.wait_seconds = account_wait(email) if email else 0
+        if self.wait_seconds:
+            count('rejected_account')
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def login_throttle_metrics(ip=None, email=None):
+    """Counters since the cache was last cleared, the limits, and optionally one IP's/email's state"""
+    values = get_cache().get_many([f'{KEY_PREFIX}:metrics:{metric}' for metric in METRICS])
+    metrics = {
+        'counters': {metric: values.get(f'{KEY_PREFIX}:metrics:{metric}', 0) for metric in METRICS},
+        'limits': {
+            'ip_burst': get_setting('IP_BURST', 20),
+            'ip_rate_per_minute': get_setting('IP_RATE', 1 / 6) * 60,
+            'account_failures': get_setting('ACCOUNT_FAILURES', 5),
+            'account_window_seconds': get_setting('ACCOUNT_WINDOW', 15 * 60),
+        },
+    }
+    if ip:
+        metrics['ip'] = {'ip': ip, 'tokens': round(ip_tokens(ip), 2)}
+    if email:
+        metrics['account'] = {
+            'email': email.strip().lower(),
+            'recent_failures': len(recent_failures(email)),
+            'retry_after': round(account_wait(email)),
+        }
+    return metrics
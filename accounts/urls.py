@@ -0,0 +1,14 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from . import views
+
+router = DefaultRouter()
+router.register('users', views.UserViewSet, basename='user')
+
+urlpatterns = [
+    path('auth/register/', views.register_user, name='register'),
+    path('auth/login/', views.login_user, name='login'),
+    path('auth/login/throttle/', views.login_throttle_status, name='login-throttle'),
+    path('auth/profile/', views.get_user_profile, name='profile'),
+    path('', include(router.urls)),
+]
@@ -1,15 +1,23 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from eduhyd_backend.pagination import CreatedAtCursorPagination
 from .models import User
 from .serializers import (
     UserSerializer, 
     UserRegistrationSerializer, 
     UserLoginSerializer
 )
+from .throttling import (
+    LoginAccountThrottle,
+    LoginIPThrottle,
+    login_throttle_metrics,
+    record_login_failure,
+    reset_login_failures,
+)
 
 # ========================================
 # USER REGISTRATION API
@@ -52,6 +60,7 @@ def register_user(request):
 # ========================================
 @api_view(['POST'])
 @permission_classes([AllowAny])  # Anyone can login
+@throttle_classes([LoginIPThrottle, LoginAccountThrottle])  # 429 before any hashing
 def login_user(request):
     """
     Login user and return JWT tokens
@@ -65,6 +74,9 @@ def login_user(request):
     JWT Token = Digital ID card that proves you're logged in
     - Access Token: Valid for 1 day (for API requests)
     - Refresh Token: Valid for 7 days (to get new access token)
+    
+    Too many attempts from one IP, or failed logins for one email, get
+    429 with a Retry-After header (see accounts/throttling.py)
     """
     
     serializer = UserLoginSerializer(data=request.data)
@@ -73,23 +85,18 @@ def login_user(request):
         email = serializer.validated_data['email']
         password = serializer.validated_data['password']
         
-        # Step 1: Find user by email
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return Response({
-                'error': 'Invalid credentials'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-        
-        # Step 2: Check password
+        # Step 1: Find user by email and check password (one query)
         # authenticate() returns user if password correct, None if wrong
-        user = authenticate(username=user.username, password=password)
+        # (see accounts/backends.py)
+        user = authenticate(request, email=email, password=password)
         
         if user is not None:
-            # Step 3: Generate JWT tokens
+            reset_login_failures(email)
+            
+            # Step 2: Generate JWT tokens
             refresh = RefreshToken.for_user(user)
             
-            # Step 4: Return tokens + user data
+            # Step 3: Return tokens + user data
             return Response({
                 'message': 'Login successful',
                 'tokens': {
@@ -99,6 +106,8 @@ def login_user(request):
                 'user': UserSerializer(user).data
             }, status=status.HTTP_200_OK)
         
+        # Counts towards this email's failed login limit
+        record_login_failure(email)
         return Response({
             'error': 'Invalid credentials'
         }, status=status.HTTP_401_UNAUTHORIZED)
@@ -106,6 +115,27 @@ def login_user(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ========================================
+# LOGIN THROTTLE METRICS API (For Admin)
+# ========================================
+@api_view(['GET'])
+@permission_classes([IsAdminUser])  # Staff only
+def login_throttle_status(request):
+    """
+    Login throttle counters and limits
+    
+    Example URLs:
+    - /api/auth/login/throttle/                        -> Counters and limits
+    - /api/auth/login/throttle/?ip=203.0.113.7         -> + tokens left for that IP
+    - /api/auth/login/throttle/?email=john@email.com   -> + that email's recent failures
+    """
+    metrics = login_throttle_metrics(
+        ip=request.query_params.get('ip'),
+        email=request.query_params.get('email'),
+    )
+    return Response(metrics, status=status.HTTP_200_OK)
+
+
 # ========================================
 # GET USER PROFILE API
 # ========================================
@@ -152,6 +182,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]  # Only logged-in users
+    pagination_class = CreatedAtCursorPagination  # Newest first, no deep OFFSETs
     
     # Custom filtering
     def get_queryset(self):
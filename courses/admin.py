@@ -1,7 +1,50 @@
+from django import forms
 from django.contrib import admin
-from .models import Course
+from .batches import DAY_LABELS
+from .models import Course, CourseBatch
 from institutes.models import Institute  # ← This import was missing!
 
+
+class CourseBatchForm(forms.ModelForm):
+    """Batch form with the weekday bitmask shown as checkboxes"""
+    days = forms.MultipleChoiceField(
+        choices=[(str(1 << day), label) for day, label in enumerate(DAY_LABELS)],
+        widget=forms.CheckboxSelectMultiple,
+        required=False,
+    )
+
+    class Meta:
+        model = CourseBatch
+        fields = ['days', 'start_time', 'end_time', 'seats']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['days'].initial = [
+            str(1 << day) for day in range(7) if self.instance.weekdays & (1 << day)
+        ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start_time'), cleaned_data.get('end_time')
+        if start and end and end <= start:
+            raise forms.ValidationError('The batch must end after it starts.')
+        return cleaned_data
+
+    def save(self, commit=True):
+        self.instance.weekdays = sum(int(day) for day in self.cleaned_data['days'])
+        # A parsed batch edited here is no longer replaced when batch_timings changes
+        self.instance.is_manual = True
+        return super().save(commit)
+
+
+# Inline for structured batches
+class CourseBatchInline(admin.TabularInline):
+    """Batches parsed from batch timings, editable inside the course page"""
+    model = CourseBatch
+    form = CourseBatchForm
+    extra = 1
+    readonly_fields = ['is_manual']
+
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     """Course Admin"""
@@ -30,12 +73,15 @@ class CourseAdmin(admin.ModelAdmin):
     
     readonly_fields = ['created_at', 'updated_at']
     
+    inlines = [CourseBatchInline]
+    
     fieldsets = (
         ('Basic Information', {
             'fields': ('institute', 'name', 'slug', 'description', 'category')
         }),
         ('Course Details', {
-            'fields': ('duration', 'fees', 'mode', 'batch_timings', 'syllabus')
+            'fields': ('duration', 'fees', 'mode', 'batch_timings', 'syllabus'),
+            'description': 'Batches below are filled in from the batch timings when they are saved.',
         }),
         ('Status', {
             'fields': ('is_active',)
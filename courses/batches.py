@@ -0,0 +1,214 @@
+"""
+Parse free-text batch timings into structured batches.
+
+Course.batch_timings is typed by institutes ("Mon-Fri 7-9 AM, Sat 10 AM -
+1 PM", "Weekend batch: 10am to 1pm (30 seats)"). This module turns each
+time range in it into a CourseBatch row with a weekday mask, start/end
+time and seats, so batches can be filtered in SQL.
+
+    >>> [str(batch) for batch in parse_batch_timings('Mon-Fri 7-9 AM, Sat 10 AM - 1 PM')]
+    ['Mon-Fri 07:00-09:00', 'Sat 10:00-13:00']
+    >>> [str(batch) for batch in parse_batch_timings('Weekends: 10am to 1pm (30 seats)')]
+    ['Sat-Sun 10:00-13:00 (30 seats)']
+    >>> [str(batch) for batch in parse_batch_timings('Morning 7-9, Evening 6:30-8:30')]
+    ['07:00-09:00', '18:30-20:30']
+    >>> [str(batch) for batch in parse_batch_timings('Tue, Thu & Sat 18:00-20:00')]
+    ['Tue,Thu,Sat 18:00-20:00']
+    >>> parse_batch_timings('Flexible timings')
+    []
+
+Days are a bitmask (Monday = 1 ... Sunday = 64); 0 means the text did not
+say. Hours without am/pm are read the way coaching batches usually run:
+1 to 6 o'clock as afternoon/evening, 7 to 11 as morning, unless the text
+says "evening", "night" or "afternoon".
+"""
+import re
+from collections import namedtuple
+from datetime import time
+
+MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY = (1 << day for day in range(7))
+WEEKDAYS = MONDAY | TUESDAY | WEDNESDAY | THURSDAY | FRIDAY
+WEEKENDS = SATURDAY | SUNDAY
+EVERY_DAY = WEEKDAYS | WEEKENDS
+
+DAY_LABELS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+DAY_WORDS = {
+    'mon': 0, 'monday': 0,
+    'tue': 1, 'tues': 1, 'tuesday': 1,
+    'wed': 2, 'weds': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3,
+    'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5,
+    'sun': 6, 'sunday': 6,
+}
+DAY_GROUPS = {
+    'weekday': WEEKDAYS, 'weekdays': WEEKDAYS,
+    'weekend': WEEKENDS, 'weekends': WEEKENDS,
+    'daily': EVERY_DAY, 'everyday': EVERY_DAY, 'all days': EVERY_DAY, 'every day': EVERY_DAY,
+}
+
+# Time-of-day filters: (from, until) on the batch start time
+TIMES_OF_DAY = {
+    'morning': (time(0, 0), time(12, 0)),
+    'afternoon': (time(12, 0), time(17, 0)),
+    'evening': (time(17, 0), time(23, 59, 59)),
+}
+
+DAY = '|'.join(sorted(DAY_WORDS, key=len, reverse=True))
+GROUP = '|'.join(sorted(DAY_GROUPS, key=len, reverse=True))
+DAY_RANGE_RE = re.compile(rf'\b({DAY})\b\.?\s*(?:-|–|to)\s*\b({DAY})\b')
+DAY_RE = re.compile(rf'\b(?:({GROUP})|({DAY}))\b')
+
+MERIDIEM = r'(?:\s*([ap])\.?\s*m\b\.?)?'
+CLOCK = rf'(\d{{1,2}})(?:[:.](\d{{2}}))?{MERIDIEM}'
+TIME_RANGE_RE = re.compile(rf'(?<![\d:.]){CLOCK}\s*(?:-|–|to)\s*{CLOCK}')
+SEATS_RE = re.compile(r'(\d+)\s*seats?\b|\bseats?\s*[:\-]?\s*(\d+)')
+AFTERNOON_RE = re.compile(r'\b(?:afternoon|evening|night|eve)\b')
+MORNING_RE = re.compile(r'\bmorning\b')
+
+SEGMENT_RE = re.compile(r'[\n;|]+')
+
+
+class ParsedBatch(namedtuple('ParsedBatch', 'weekdays start_time end_time seats')):
+    __slots__ = ()
+
+    def __str__(self):
+        text = f'{self.start_time:%H:%M}-{self.end_time:%H:%M}'
+        if self.weekdays:
+            text = f'{describe_weekdays(self.weekdays)} {text}'
+        if self.seats:
+            text += f' ({self.seats} seats)'
+        return text
+
+
+def describe_weekdays(mask):
+    """5 -> "Mon,Wed", 31 -> "Mon-Fri" (consecutive days as a range)"""
+    days = [day for day in range(7) if mask & (1 << day)]
+    if not days:
+        return ''
+    if len(days) > 1 and days == list(range(days[0], days[-1] + 1)):
+        return f'{DAY_LABELS[days[0]]}-{DAY_LABELS[days[-1]]}'
+    return ','.join(DAY_LABELS[day] for day in days)
+
+
+def masks_including(mask):
+    """
+    Every weekday mask sharing a day with mask.
+
+    "Runs on Saturday or Sunday" then becomes weekdays IN (...), which an
+    index on the weekdays column can answer, unlike weekdays & 96 != 0.
+    """
+    return [candidate for candidate in range(1, EVERY_DAY + 1) if candidate & mask]
+
+
+def _days_in(text):
+    """Weekday mask of the day names in a piece of text"""
+    mask = 0
+    for first, last in DAY_RANGE_RE.findall(text):
+        first, last = DAY_WORDS[first], DAY_WORDS[last]
+        day = first
+        while True:
+            mask |= 1 << day
+            if day == last:
+                break
+            day = (day + 1) % 7
+    for group, day in DAY_RE.findall(DAY_RANGE_RE.sub(' ', text)):
+        mask |= DAY_GROUPS[group] if group else 1 << DAY_WORDS[day]
+    return mask
+
+
+def _hour(hour, meridiem, afternoon):
+    if meridiem == 'p' and hour < 12:
+        return hour + 12
+    if meridiem == 'a' and hour == 12:
+        return 0
+    if meridiem is None and hour < 12 and (afternoon or 1 <= hour <= 6):
+        return hour + 12
+    return hour
+
+
+def _time_range(match, context):
+    start_hour, start_minute, start_meridiem, end_hour, end_minute, end_meridiem = match.groups()
+    start_hour, end_hour = int(start_hour), int(end_hour)
+    start_minute, end_minute = int(start_minute or 0), int(end_minute or 0)
+    if start_hour > 23 or end_hour > 23 or start_minute > 59 or end_minute > 59:
+        return None
+
+    afternoon = bool(AFTERNOON_RE.search(context)) and not MORNING_RE.search(context)
+    if start_meridiem is None and end_meridiem is not None:
+        # "6-8 pm" is evening, "11-1 pm" starts in the morning
+        start_meridiem = end_meridiem if start_hour <= end_hour or start_hour == 12 else (
+            'a' if end_meridiem == 'p' else 'p'
+        )
+    start = _hour(start_hour, start_meridiem and start_meridiem[0], afternoon)
+    end = _hour(end_hour, end_meridiem and end_meridiem[0], afternoon)
+    if end_meridiem is None and end < start and end + 12 < 24:
+        end += 12  # "10-1" -> 10:00-13:00
+    if end <= start:
+        return None
+    return time(start, start_minute), time(end, end_minute)
+
+
+def parse_batch_timings(text):
+    """The batches a batch_timings text describes, in the order written"""
+    batches = []
+    for segment in SEGMENT_RE.split((text or '').lower()):
+        matches = list(TIME_RANGE_RE.finditer(segment))
+        seats_match = SEATS_RE.search(segment)
+        seats = int(next(filter(None, seats_match.groups()))) if seats_match else None
+        # Days are written before their times ("Mon-Fri 7-9 am, Sat 10-1"),
+        # unless the first time comes before any day ("7-9 am (Mon-Fri)")
+        days_follow = bool(matches) and not _days_in(segment[:matches[0].start()])
+        previous_days = 0
+        for position, match in enumerate(matches):
+            before = segment[matches[position - 1].end() if position else 0:match.start()]
+            after = segment[match.end():matches[position + 1].start() if position + 1 < len(matches) else None]
+            days = _days_in(after if days_follow else before) or previous_days
+            times = _time_range(match, before)
+            if times is None:
+                continue
+            batches.append(ParsedBatch(days, times[0], times[1], seats if len(matches) == 1 else None))
+            previous_days = days
+    return batches
+
+
+def replace_parsed_batches(CourseBatch, courses):
+    """
+    Re-parse the batch_timings of courses into their parsed CourseBatch rows.
+
+    courses is an iterable of (course id, batch_timings) pairs. Rows added
+    or edited by hand (is_manual) are kept. Returns the number of rows
+    created. Takes the model as an argument so data migrations can pass
+    their historical version.
+    """
+    courses = list(courses)
+    if not courses:
+        return 0
+    CourseBatch.objects.filter(
+        course_id__in=[course_id for course_id, _ in courses], is_manual=False
+    ).delete()
+    created = [
+        CourseBatch(
+            course_id=course_id, weekdays=batch.weekdays, start_time=batch.start_time,
+            end_time=batch.end_time, seats=batch.seats, is_manual=False,
+        )
+        for course_id, text in courses
+        for batch in parse_batch_timings(text)
+    ]
+    CourseBatch.objects.bulk_create(created, batch_size=1000)
+    return len(created)
+
+
+def backfill_course_batches(Course, CourseBatch, batch_size=1000):
+    """Re-parse every course's batch_timings; returns (courses, batches created)"""
+    rows = Course.objects.order_by('pk').values_list('pk', 'batch_timings')
+    chunk, courses, created = [], 0, 0
+    for row in rows.iterator(chunk_size=batch_size):
+        chunk.append(row)
+        if len(chunk) >= batch_size:
+            created += replace_parsed_batches(CourseBatch, chunk)
+            courses += len(chunk)
+            chunk = []
+    created += replace_parsed_batches(CourseBatch, chunk)
+    return courses + len(chunk), created
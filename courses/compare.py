@@ -0,0 +1,94 @@
+"""
+Side-by-side course comparison.
+
+A comparison loads every requested course together with its institute in
+one query, serializes them with CourseCompareSerializer and marks, for each
+compared field, which courses hold the best value:
+
+    fees           lowest fees
+    duration_days  shortest course (courses with an unparsed duration are skipped)
+    rating         highest institute rating (unrated institutes are skipped)
+    reviews        institute with the most approved reviews
+
+The result is cached per sorted id set, so "1,2,3" and "3,1,2" share one
+entry; the caller gets the courses back in the order it asked for. The key
+holds the catalog version, so course and institute edits are picked up at
+once. Ratings move without bumping the version and may lag by up to
+COMPARE_CACHE_TIMEOUT.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from search.cache import get_catalog_version
+from .models import Course
+from .serializers import CourseCompareSerializer
+
+MAX_COMPARE_COURSES = 20
+
+# field -> (value in the serialized course, True when higher is better)
+BEST_VALUE_FIELDS = {
+    'fees': (lambda course: course['fees'], False),
+    'duration_days': (lambda course: course['duration_days'], False),
+    'rating': (lambda course: course['institute']['rating'] or None, True),
+    'reviews': (lambda course: course['institute']['total_reviews'] or None, True),
+}
+
+
+def compare_queryset(ids):
+    """Active courses with the given ids and their institutes, in one query"""
+    return (
+        Course.objects.filter(pk__in=ids, is_active=True)
+        .select_related('institute')
+        .only(
+            'id', 'name', 'slug', 'duration', 'duration_days', 'fees', 'mode', 'batch_timings',
+            'institute__id', 'institute__name', 'institute__slug', 'institute__area',
+            'institute__city', 'institute__pincode', 'institute__latitude',
+            'institute__longitude', 'institute__rating_avg', 'institute__rating_count',
+        )
+        .order_by()
+    )
+
+
+def best_values(courses):
+    """{field: ids of the courses holding the best value}; ties all win"""
+    best = {}
+    for field, (value_of, higher_is_better) in BEST_VALUE_FIELDS.items():
+        values = {course['id']: value_of(course) for course in courses}
+        values = {pk: float(value) for pk, value in values.items() if value is not None}
+        if not values:
+            best[field] = []
+            continue
+        target = max(values.values()) if higher_is_better else min(values.values())
+        best[field] = sorted(pk for pk, value in values.items() if value == target)
+    return best
+
+
+def build_comparison(ids):
+    """Uncached comparison of a set of course ids: {'courses': [...], 'best': {...}}"""
+    courses = CourseCompareSerializer(compare_queryset(ids), many=True).data
+    courses = sorted(courses, key=lambda course: course['id'])
+    best = best_values(courses)
+    for course in courses:
+        course['best_in'] = [field for field, pks in best.items() if course['id'] in pks]
+    return {'courses': courses, 'best': best}
+
+
+def compare_courses(ids):
+    """
+    Comparison of the given course ids, in the order given.
+
+    Returns {'courses': [...], 'best': {field: [ids]}, 'missing': [ids]},
+    where missing lists ids that do not exist or are no longer active.
+    """
+    ids = list(dict.fromkeys(ids))  # drop repeats, keep order
+    key = f'compare:{get_catalog_version()}:{",".join(str(pk) for pk in sorted(ids))}'
+    comparison = cache.get(key)
+    if comparison is None:
+        comparison = build_comparison(ids)
+        cache.set(key, comparison, getattr(settings, 'COMPARE_CACHE_TIMEOUT', 5 * 60))
+
+    by_id = {course['id']: course for course in comparison['courses']}
+    return {
+        'courses': [by_id[pk] for pk in ids if pk in by_id],
+        'best': comparison['best'],
+        'missing': [pk for pk in ids if pk not in by_id],
+    }
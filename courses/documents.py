@@ -0,0 +1,10 @@
+"""Cached course documents (see institutes.documents)"""
+from institutes.documents import DocumentCache
+from .models import Course
+from .serializers import CourseSerializer
+
+course_documents = DocumentCache(
+    'course', 3,
+    Course.objects.select_related('institute').prefetch_related('batches'),
+    CourseSerializer,
+)
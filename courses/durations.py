@@ -0,0 +1,113 @@
+"""
+Parse free-text course durations into a number of days.
+
+Course.duration is typed by institutes, so the same length shows up as
+"6 months", "6 mnths", "six months", "half a year" or "1/2 yr". This module
+turns those into Course.duration_days so durations can be filtered and
+sorted in SQL.
+
+    >>> parse_duration_days('3 months')
+    90
+    >>> parse_duration_days('1 year 6 months')
+    545
+    >>> parse_duration_days('3-6 months')      # ranges count as their upper end
+    180
+    >>> parse_duration_days('45 days / 2 months')  # alternatives: the longest
+    60
+    >>> parse_duration_days('3 months, 2 weeks')   # a list adds up
+    104
+    >>> parse_duration_days('6-month')
+    180
+    >>> parse_duration_days('Flexible') is None
+    True
+
+A month counts as 30 days and a year as 365. Hour-based durations
+("40 hours") say nothing about calendar length and are left unparsed.
+"""
+import re
+
+UNIT_DAYS = {
+    'day': 1, 'days': 1, 'd': 1,
+    'week': 7, 'weeks': 7, 'wk': 7, 'wks': 7, 'w': 7,
+    'fortnight': 14, 'fortnights': 14,
+    'month': 30, 'months': 30, 'mon': 30, 'mons': 30, 'mth': 30, 'mths': 30,
+    'mnth': 30, 'mnths': 30, 'mo': 30, 'mos': 30, 'm': 30,
+    'semester': 180, 'semesters': 180, 'sem': 180, 'sems': 180,
+    'year': 365, 'years': 365, 'yr': 365, 'yrs': 365, 'y': 365,
+}
+
+NUMBER_WORDS = {
+    'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6,
+    'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'fifteen': 15, 'eighteen': 18, 'twenty': 20, 'thirty': 30, 'forty': 40,
+    'forty-five': 45, 'sixty': 60, 'ninety': 90,
+}
+
+NUMBER = r'\d+(?:\.\d+)?'
+UNIT = '|'.join(sorted(UNIT_DAYS, key=len, reverse=True))
+
+# "3 months", "3-6 months", "3 to 6 months", "6months", "6-month"
+AMOUNT_RE = re.compile(
+    rf'({NUMBER})(?:\s*(?:-|–|to)\s*({NUMBER}))?[-–\s]*({UNIT})\b'
+)
+# Alternatives and ranges: "45 days / 2 months", "6 months or 1 year",
+# "6 months - 1 year", "12 weeks (3 months)". Commas are not among them:
+# "3 months, 2 weeks" is one duration
+ALTERNATIVES_RE = re.compile(r'/|\bor\b|\bto\b|\s[-–]\s|[;()]')
+
+
+def _normalize(text):
+    text = text.lower().replace('½', ' 1/2')
+    text = re.sub(r'\b(\d+)\s+1/2\b', r'\1.5', text)   # "1 1/2 years"
+    text = re.sub(r'\b1/2\b', '0.5', text)
+    for word, number in sorted(NUMBER_WORDS.items(), key=lambda item: -len(item[0])):
+        text = re.sub(rf'\b{word}\b', str(number), text)
+    # "1 and a half years" -> "1.5 years", "half a year" -> "0.5 year"
+    text = re.sub(rf'({NUMBER})\s+and\s+a\s+half\b', lambda match: str(float(match.group(1)) + 0.5), text)
+    text = re.sub(r'\bhalf\s+(?:an?\s+)?', '0.5 ', text)
+    # "a year", "an year"
+    text = re.sub(rf'\ban?\s+(?=(?:{UNIT})\b)', '1 ', text)
+    return text
+
+
+def parse_duration_days(text):
+    """Number of days a duration phrase describes, or None if it cannot tell"""
+    if not text:
+        return None
+    best = None
+    for alternative in ALTERNATIVES_RE.split(_normalize(text)):
+        days = 0.0
+        for low, high, unit in AMOUNT_RE.findall(alternative):
+            days += float(high or low) * UNIT_DAYS[unit]
+        if days and (best is None or days > best):
+            best = days
+    return round(best) if best else None
+
+
+def backfill_duration_days(Course, only_missing=False, batch_size=1000):
+    """
+    Recompute Course.duration_days from duration.
+
+    Returns (ids of the courses that changed, number of unparsed durations).
+
+    Takes the model as an argument so data migrations can pass their
+    historical version.
+    """
+    courses = Course.objects.order_by('pk')
+    if only_missing:
+        courses = courses.filter(duration_days__isnull=True)
+
+    changed, updated, unparsed = [], [], 0
+    rows = courses.values_list('pk', 'duration', 'duration_days')
+    for pk, duration, stored in rows.iterator(chunk_size=batch_size):
+        days = parse_duration_days(duration)
+        if days is None:
+            unparsed += 1
+        if days != stored:
+            changed.append(Course(pk=pk, duration_days=days))
+        if len(changed) >= batch_size:
+            Course.objects.bulk_update(changed, ['duration_days'])
+            updated += [course.pk for course in changed]
+            changed = []
+    Course.objects.bulk_update(changed, ['duration_days'])
+    return updated + [course.pk for course in changed], unparsed
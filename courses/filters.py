@@ -0,0 +1,81 @@
+import django_filters
+from .batches import DAY_LABELS, TIMES_OF_DAY, WEEKDAYS, WEEKENDS, masks_including
+from .models import Course, CourseBatch
+
+# ?batch_days= values and the weekday mask each one matches
+BATCH_DAYS = {'weekdays': WEEKDAYS, 'weekends': WEEKENDS}
+BATCH_DAYS.update({label.lower(): 1 << day for day, label in enumerate(DAY_LABELS)})
+
+
+class CourseFilter(django_filters.FilterSet):
+    """
+    Course filters, including fee and duration ranges and batch schedules
+
+    Example URLs:
+    - /api/courses/?max_fees=50000                      -> Courses up to ₹50,000
+    - /api/courses/?max_duration_days=180&max_fees=50000 -> Under 6 months and ₹50k
+    - /api/courses/?min_duration_days=365&ordering=fees  -> A year or longer, cheapest first
+    - /api/courses/?batch_days=weekends&batch_time=evening&area=Ameerpet
+                                                         -> Weekend evening batches in Ameerpet
+    - /api/courses/?batch_days=weekdays&starts_after=18:00&mode=offline
+                                                         -> Weekday batches from 6 PM, offline
+    """
+    min_fees = django_filters.NumberFilter(field_name='fees', lookup_expr='gte')
+    max_fees = django_filters.NumberFilter(field_name='fees', lookup_expr='lte')
+    min_duration_days = django_filters.NumberFilter(field_name='duration_days', lookup_expr='gte')
+    max_duration_days = django_filters.NumberFilter(field_name='duration_days', lookup_expr='lte')
+    area = django_filters.CharFilter(field_name='institute__area', lookup_expr='iexact')
+
+    # Batch filters are applied together in filter_queryset, so they all
+    # have to hold for the same batch
+    batch_days = django_filters.ChoiceFilter(
+        choices=[(name, name) for name in BATCH_DAYS], method='filter_batches'
+    )
+    batch_time = django_filters.ChoiceFilter(
+        choices=[(name, name) for name in TIMES_OF_DAY], method='filter_batches'
+    )
+    starts_after = django_filters.TimeFilter(method='filter_batches')
+    ends_before = django_filters.TimeFilter(method='filter_batches')
+
+    # Range filters and sorting read the (is_active, fees) and
+    # (is_active, duration_days) indexes, which need is_active in the query
+    RANGE_PARAMS = ['min_fees', 'max_fees', 'min_duration_days', 'max_duration_days', 'ordering']
+
+    class Meta:
+        model = Course
+        fields = ['mode', 'category', 'is_active', 'institute', 'institute__slug']
+
+    def filter_batches(self, queryset, name, value):
+        return queryset  # see batch_conditions
+
+    def batch_conditions(self):
+        """CourseBatch lookups for the batch filters in the request"""
+        data = self.form.cleaned_data
+        conditions = {}
+        if data.get('batch_days'):
+            # weekdays IN (...) keeps the (weekdays, start_time, course) index usable
+            conditions['weekdays__in'] = masks_including(BATCH_DAYS[data['batch_days']])
+        if data.get('batch_time'):
+            starts_from, starts_until = TIMES_OF_DAY[data['batch_time']]
+            conditions['start_time__gte'] = starts_from
+            conditions['start_time__lt'] = starts_until
+        if data.get('starts_after'):
+            starts_from = conditions.get('start_time__gte')
+            conditions['start_time__gte'] = max(starts_from, data['starts_after']) if starts_from else data['starts_after']
+        if data.get('ends_before'):
+            conditions['end_time__lte'] = data['ends_before']
+        return conditions
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        uses_range = any(self.data.get(param) for param in self.RANGE_PARAMS)
+        if uses_range and self.form.cleaned_data.get('is_active') is None:
+            queryset = queryset.filter(is_active=True)
+
+        conditions = self.batch_conditions()
+        if conditions:
+            # pk IN (batches...) lets the batch indexes drive the lookup
+            # instead of probing every course's batches in turn
+            batches = CourseBatch.objects.filter(**conditions).values('course_id')
+            queryset = queryset.filter(pk__in=batches)
+        return queryset
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from courses.durations import backfill_duration_days
+from courses.documents import course_documents
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Parse Course.duration text into duration_days (see courses/durations.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Only parse courses without duration_days')
+
+    def handle(self, *args, **options):
+        updated, unparsed = backfill_duration_days(Course, only_missing=options['missing_only'])
+        # Course documents include duration_days
+        course_documents.invalidate(updated)
+        self.stdout.write(self.style.SUCCESS(f'Updated duration_days of {len(updated)} course(s).'))
+
+        if unparsed:
+            self.stdout.write(self.style.WARNING(f'{unparsed} course(s) have a duration that could not be parsed, most common:'))
+            phrases = (
+                Course.objects.filter(duration_days__isnull=True)
+                .values('duration').annotate(courses=Count('id')).order_by('-courses')[:10]
+            )
+            for phrase in phrases:
+                self.stdout.write(f'  {phrase["duration"]!r}: {phrase["courses"]}')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from courses.batches import backfill_course_batches
+from courses.documents import course_documents
+from courses.models import Course, CourseBatch
+
+
+class Command(BaseCommand):
+    help = "Parse Course.batch_timings text into CourseBatch rows (see courses/batches.py)"
+
+    def handle(self, *args, **options):
+        courses, created = backfill_course_batches(Course, CourseBatch)
+        # Course documents include the batches
+        course_documents.invalidate(Course.objects.values_list('pk', flat=True))
+        self.stdout.write(self.style.SUCCESS(f'Parsed {created} batch(es) from {courses} course(s).'))
+
+        unparsed = (
+            Course.objects.exclude(batch_timings='').filter(batches__isnull=True)
+            .values('batch_timings').annotate(courses=Count('id')).order_by('-courses')
+        )
+        if unparsed:
+            self.stdout.write(self.style.WARNING('Batch timings that could not be parsed, most common:'))
+            for phrase in unparsed[:10]:
+                self.stdout.write(f'  {phrase["batch_timings"]!r}: {phrase["courses"]}')
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+from courses.durations import backfill_duration_days
+
+
+def populate_duration_days(apps, schema_editor):
+    backfill_duration_days(apps.get_model('courses', 'Course'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_course_course_created_id_idx'),
+        ('institutes', '0007_locality_institute_coordinates_estimated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='duration_days',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['is_active', 'fees'], name='course_active_fees_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['is_active', 'duration_days'], name='course_active_duration_idx'),
+        ),
+        migrations.RunPython(populate_duration_days, migrations.RunPython.noop),
+    ]
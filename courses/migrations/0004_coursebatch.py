@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from courses.batches import backfill_course_batches
+
+
+def populate_course_batches(apps, schema_editor):
+    backfill_course_batches(apps.get_model('courses', 'Course'), apps.get_model('courses', 'CourseBatch'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_duration_days'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.PositiveSmallIntegerField(default=0)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('seats', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_manual', models.BooleanField(default=True, help_text='Entered by hand, not parsed from batch timings')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='courses.course')),
+            ],
+            options={
+                'ordering': ['start_time'],
+                'indexes': [models.Index(fields=['weekdays', 'start_time', 'course'], name='batch_days_start_idx'), models.Index(fields=['start_time', 'course'], name='batch_start_idx')],
+            },
+        ),
+        migrations.RunPython(populate_course_batches, migrations.RunPython.noop),
+    ]
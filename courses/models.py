@@ -1,5 +1,7 @@
 from django.db import models
 from institutes.models import Institute
+from .batches import describe_weekdays
+from .durations import parse_duration_days
 
 class Course(models.Model):
     """Course model"""
@@ -17,6 +19,7 @@ class Course(models.Model):
     
     # Course Details
     duration = models.CharField(max_length=100)  # "3 months", "1 year"
+    duration_days = models.PositiveIntegerField(null=True, blank=True, editable=False)  # parsed from duration
     fees = models.DecimalField(max_digits=10, decimal_places=2)
     mode = models.CharField(max_length=20, choices=MODE_CHOICES)
     batch_timings = models.TextField(blank=True)
@@ -30,6 +33,63 @@ class Course(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['institute', 'slug']
+        indexes = [
+            # Keyset pagination (see eduhyd_backend.pagination)
+            models.Index(fields=['created_at', 'id'], name='course_created_id_idx'),
+            # Fee / duration range filters and sorting on active courses
+            models.Index(fields=['is_active', 'fees'], name='course_active_fees_idx'),
+            models.Index(fields=['is_active', 'duration_days'], name='course_active_duration_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.name} - {self.institute.name}"
\ No newline at end of file
+        return f"{self.name} - {self.institute.name}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # batch_timings as loaded, so saves only re-parse batches when it changed
+        instance._saved_batch_timings = instance.__dict__.get('batch_timings')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.duration_days = parse_duration_days(self.duration)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'duration' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'duration_days'}
+        super().save(*args, **kwargs)
+
+    def batch_timings_changed(self):
+        if 'batch_timings' not in self.__dict__:
+            return False  # deferred, so never assigned
+        return getattr(self, '_saved_batch_timings', None) != self.batch_timings
+
+
+class CourseBatch(models.Model):
+    """
+    One batch of a course: the days it meets, its hours and seats.
+
+    Rows are parsed from Course.batch_timings (see courses.batches) and
+    replaced whenever that text changes; rows added or edited in the admin
+    are marked manual and kept.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='batches')
+    # Bitmask: Monday = 1, Tuesday = 2, ... Sunday = 64; 0 = days not given
+    weekdays = models.PositiveSmallIntegerField(default=0)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    seats = models.PositiveIntegerField(null=True, blank=True)
+    is_manual = models.BooleanField(default=True, help_text='Entered by hand, not parsed from batch timings')
+
+    class Meta:
+        ordering = ['start_time']
+        indexes = [
+            # Weekday filters are weekdays IN (masks), time-of-day filters a
+            # start_time range; the course id makes both covering indexes
+            models.Index(fields=['weekdays', 'start_time', 'course'], name='batch_days_start_idx'),
+            models.Index(fields=['start_time', 'course'], name='batch_start_idx'),
+        ]
+
+    def __str__(self):
+        days = describe_weekdays(self.weekdays)
+        hours = f"{self.start_time:%H:%M}-{self.end_time:%H:%M}"
+        return f"{days} {hours}" if days else hours
\ No newline at end of file
@@ -1,15 +1,63 @@
 from rest_framework import serializers
-from .models import Course
+from institutes.models import Institute
+from .batches import DAY_LABELS
+from .models import Course, CourseBatch
+
+class CourseBatchSerializer(serializers.ModelSerializer):
+    """A structured batch; days are empty when the timings did not say"""
+    days = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CourseBatch
+        fields = ['days', 'start_time', 'end_time', 'seats']
+
+    def get_days(self, obj):
+        return [label for day, label in enumerate(DAY_LABELS) if obj.weekdays & (1 << day)]
+
 
 class CourseSerializer(serializers.ModelSerializer):
     """Course Serializer"""
+    institute = serializers.PrimaryKeyRelatedField(queryset=Institute.objects.all(), write_only=True)
     institute_name = serializers.CharField(source='institute.name', read_only=True)
+    batches = CourseBatchSerializer(many=True, read_only=True)
     
     class Meta:
         model = Course
         fields = [
             'id', 'name', 'slug', 'description', 'category',
-            'duration', 'fees', 'mode', 'batch_timings',
-            'syllabus', 'is_active', 'institute_name',
+            'duration', 'duration_days', 'fees', 'mode', 'batch_timings',
+            'batches', 'syllabus', 'is_active', 'institute', 'institute_name',
             'created_at'
-        ]
\ No newline at end of file
+        ]
+    
+    def validate_institute(self, value):
+        """Courses can only be added to (or moved to) your own institutes"""
+        request = self.context.get('request')
+        if request is not None and not request.user.is_staff and value.owner_id != request.user.pk:
+            raise serializers.ValidationError("You can only add courses to your own institutes")
+        return value
+
+class CompareInstituteSerializer(serializers.Serializer):
+    """The institute fields shown in a course comparison"""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    slug = serializers.CharField()
+    rating = serializers.FloatField(source='rating_avg')
+    total_reviews = serializers.IntegerField(source='rating_count')
+    area = serializers.CharField()
+    city = serializers.CharField()
+    pincode = serializers.CharField()
+    latitude = serializers.DecimalField(max_digits=9, decimal_places=6, allow_null=True)
+    longitude = serializers.DecimalField(max_digits=9, decimal_places=6, allow_null=True)
+
+
+class CourseCompareSerializer(serializers.ModelSerializer):
+    """One column of a course comparison (see courses.compare)"""
+    institute = CompareInstituteSerializer(read_only=True)
+
+    class Meta:
+        model = Course
+        fields = [
+            'id', 'name', 'slug', 'duration', 'duration_days', 'fees', 'mode',
+            'batch_timings', 'institute',
+        ]
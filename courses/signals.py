@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from institutes.models import Institute
+from .batches import replace_parsed_batches
+from .documents import course_documents
+from .models import Course, CourseBatch
+
+
+# ========================================
+# Batches parsed from batch_timings
+# ========================================
+# Registered before the document invalidation below, so the course's
+# cached document is dropped after its batches changed
+@receiver(post_save, sender=Course)
+def parse_course_batches(sender, instance, raw=False, **kwargs):
+    if raw or not instance.batch_timings_changed():
+        return
+    replace_parsed_batches(CourseBatch, [(instance.pk, instance.batch_timings)])
+    instance._saved_batch_timings = instance.batch_timings
+
+
+# ========================================
+# Cached document invalidation
+# ========================================
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    course_documents.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=CourseBatch)
+@receiver(post_delete, sender=CourseBatch)
+def batch_changed(sender, instance, **kwargs):
+    course_documents.invalidate([instance.course_id])
+
+
+@receiver(post_save, sender=Institute)
+def institute_changed(sender, instance, **kwargs):
+    # Course documents show the institute's name
+    course_documents.invalidate(instance.courses.values_list('pk', flat=True))
@@ -1,3 +1,321 @@
-from django.test import TestCase
+import doctest
+import io
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from accounts.models import User
+from institutes.models import Institute
+from institutes.testing import create_institute
+from . import batches, durations
+from .batches import SATURDAY, SUNDAY, WEEKDAYS
+from .models import Course, CourseBatch
 
-# Create your tests here.
+
+def load_tests(loader, tests, ignore):
+    """Run the examples in the parsers' docstrings as tests too"""
+    tests.addTests(doctest.DocTestSuite(batches))
+    tests.addTests(doctest.DocTestSuite(durations))
+    return tests
+
+
+class CourseCompareTests(TestCase):
+    """GET /api/courses/compare/ loads any number of courses in one query"""
+
+    # courses joined with their institutes
+    EXPECTED_QUERIES = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = []
+        for number in range(20):
+            institute = create_institute(f'Academy {number}')
+            Institute.objects.filter(pk=institute.pk).update(
+                rating_avg=4.5 if number in (3, 8) else 3.0, rating_count=number,
+            )
+            cls.courses.append(Course.objects.create(
+                institute=institute, name=f'Course {number}', slug=f'course-{number}',
+                description='-', category='IT', duration=f'{number % 6 + 1} months',
+                fees=10000 + number * 1000, mode='online', batch_timings='Mon-Fri 7-9 AM',
+            ))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def compare(self, ids):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get('/api/courses/compare/', {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_is_fixed(self):
+        self.compare([course.pk for course in self.courses[:2]])
+        cache.clear()
+        self.compare([course.pk for course in self.courses])
+
+    def test_courses_keep_requested_order(self):
+        ids = [self.courses[5].pk, self.courses[1].pk, self.courses[9].pk]
+        data = self.compare(ids)
+        self.assertEqual([course['id'] for course in data['courses']], ids)
+        first = data['courses'][0]
+        self.assertEqual(first['duration_days'], 180)
+        self.assertEqual(first['batch_timings'], 'Mon-Fri 7-9 AM')
+        self.assertEqual(first['institute']['slug'], 'academy-5')
+        self.assertEqual(first['institute']['area'], 'Ameerpet')
+        self.assertIsNotNone(first['institute']['latitude'])
+
+    def test_best_value_markers(self):
+        courses = [self.courses[number] for number in (2, 3, 6, 8)]
+        data = self.compare([course.pk for course in courses])
+        self.assertEqual(data['best'], {
+            'fees': [self.courses[2].pk],
+            'duration_days': [self.courses[6].pk],           # 1 month
+            'rating': [self.courses[3].pk, self.courses[8].pk],  # tie
+            'reviews': [self.courses[8].pk],
+        })
+        self.assertEqual(data['courses'][0]['best_in'], ['fees'])
+        self.assertEqual(data['courses'][3]['best_in'], ['rating', 'reviews'])
+
+    def test_cached_per_sorted_id_set(self):
+        ids = [self.courses[0].pk, self.courses[1].pk]
+        self.compare(ids)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/courses/compare/', {'ids': f'{ids[1]},{ids[0]}'})
+        self.assertEqual([course['id'] for course in response.json()['courses']], ids[::-1])
+
+    def test_course_changes_invalidate_the_comparison(self):
+        ids = [self.courses[0].pk, self.courses[1].pk]
+        self.compare(ids)
+        self.courses[1].fees = 1
+        self.courses[1].save()  # bumps the catalog version
+        self.assertEqual(self.compare(ids)['best']['fees'], [ids[1]])
+
+    def test_missing_and_inactive_courses(self):
+        Course.objects.filter(pk=self.courses[1].pk).update(is_active=False)
+        data = self.compare([self.courses[0].pk, self.courses[1].pk, 999999])
+        self.assertEqual([course['id'] for course in data['courses']], [self.courses[0].pk])
+        self.assertEqual(data['missing'], [self.courses[1].pk, 999999])
+
+    def test_invalid_ids(self):
+        for ids in ('', 'a,b', ','.join(str(number) for number in range(1, 22))):
+            response = self.client.get('/api/courses/compare/', {'ids': ids})
+            self.assertEqual(response.status_code, 400)
+
+
+class BatchParserTests(SimpleTestCase):
+    """Batch timings the examples in courses/batches.py do not cover"""
+
+    def test_days_written_after_the_times(self):
+        parsed = batches.parse_batch_timings('7-9 am (Mon-Fri), 6-8 pm (Sat, Sun)')
+        self.assertEqual([str(batch) for batch in parsed], ['Mon-Fri 07:00-09:00', 'Sat-Sun 18:00-20:00'])
+
+
+class CourseBatchTests(TestCase):
+    """Batches parsed from batch_timings and the batch filters"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institutes = {
+            area: create_institute(f'{area} Academy', slug=area.lower(), area=area) for area in ['Ameerpet', 'Madhapur']
+        }
+        cls.weekday_mornings = cls.course('Ameerpet', 'weekday', 'Mon-Fri 7-9 AM')
+        cls.weekend_evenings = cls.course('Ameerpet', 'weekend', 'Sat, Sun 6-8 PM')
+        cls.elsewhere = cls.course('Madhapur', 'elsewhere', 'Weekends 6-8 PM', mode='offline')
+        cls.mixed = cls.course('Ameerpet', 'mixed', 'Mon-Fri 7-9 AM, Sat 10 AM - 1 PM')
+
+    @classmethod
+    def course(cls, area, slug, batch_timings, mode='online'):
+        return Course.objects.create(
+            institute=cls.institutes[area], name=slug.title(), slug=slug, description='-',
+            category='IT', duration='3 months', fees=10000, mode=mode, batch_timings=batch_timings,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def filtered(self, **params):
+        response = self.client.get('/api/courses/', params)
+        self.assertEqual(response.status_code, 200)
+        return {course['slug'] for course in response.json()['results']}
+
+    def test_batches_parsed_on_save(self):
+        self.assertEqual(
+            [(batch.weekdays, str(batch.start_time)) for batch in self.mixed.batches.all()],
+            [(WEEKDAYS, '07:00:00'), (SATURDAY, '10:00:00')],
+        )
+        self.assertFalse(self.mixed.batches.filter(is_manual=True).exists())
+
+    def test_changed_timings_keep_manual_batches(self):
+        CourseBatch.objects.create(
+            course=self.weekday_mornings, weekdays=SUNDAY, start_time='08:00', end_time='10:00',
+        )
+        course = Course.objects.get(pk=self.weekday_mornings.pk)
+        course.batch_timings = 'Sat 4-6 PM'
+        course.save()
+        self.assertEqual(
+            sorted((batch.weekdays, batch.is_manual) for batch in course.batches.all()),
+            [(SATURDAY, False), (SUNDAY, True)],
+        )
+
+    def test_other_edits_do_not_reparse(self):
+        manual = self.weekday_mornings.batches.get()
+        CourseBatch.objects.filter(pk=manual.pk).update(seats=12)
+        course = Course.objects.get(pk=self.weekday_mornings.pk)
+        course.fees = 12000
+        course.save()
+        self.assertEqual(course.batches.get().seats, 12)
+
+    def test_batch_filters(self):
+        self.assertEqual(self.filtered(batch_days='weekends'), {'weekend', 'elsewhere', 'mixed'})
+        self.assertEqual(self.filtered(batch_days='weekends', batch_time='evening'), {'weekend', 'elsewhere'})
+        self.assertEqual(self.filtered(batch_time='morning'), {'weekday', 'mixed'})
+        self.assertEqual(self.filtered(starts_after='17:00', mode='offline'), {'elsewhere'})
+        self.assertEqual(self.filtered(batch_days='sat', ends_before='12:00'), set())
+
+    def test_batch_and_area_filters_combine(self):
+        self.assertEqual(
+            self.filtered(batch_days='weekends', batch_time='evening', area='ameerpet'), {'weekend'}
+        )
+
+    def test_course_shows_batches(self):
+        response = self.client.get(f'/api/courses/{self.mixed.pk}/')
+        self.assertEqual(response.json()['batches'], [
+            {'days': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri'], 'start_time': '07:00:00', 'end_time': '09:00:00', 'seats': None},
+            {'days': ['Sat'], 'start_time': '10:00:00', 'end_time': '13:00:00', 'seats': None},
+        ])
+
+
+class CourseWriteTests(TestCase):
+    """Courses are added and changed by their institute's owner or staff only"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', user_type='institute')
+        cls.other = User.objects.create(username='other', user_type='institute')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.institute, cls.other_institute = (
+            create_institute(f'Academy {owner.username}', owner=owner, category=None)
+            for owner in (cls.owner, cls.other)
+        )
+        cls.course = Course.objects.create(
+            institute=cls.institute, name='Python', slug='python', description='-',
+            category='IT', duration='3 months', fees=10000, mode='online',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f'/api/courses/{self.course.pk}/'
+
+    def new_course(self, institute):
+        return self.client.post('/api/courses/', {
+            'institute': institute.pk, 'name': 'Java', 'slug': 'java', 'description': '-',
+            'category': 'IT', 'duration': '2 months', 'fees': 8000, 'mode': 'offline',
+        }, format='json')
+
+    def test_create_for_own_institutes_only(self):
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.new_course(self.other_institute).status_code, 400)
+        response = self.new_course(self.institute)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Course.objects.get(slug='java').institute, self.institute)
+
+    def test_only_owner_or_staff_change(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.patch(self.url, {'fees': 1}, format='json').status_code, 403)
+        self.assertEqual(self.client.delete(self.url).status_code, 403)
+
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.patch(self.url, {'fees': 9000}, format='json').status_code, 200)
+        # ...but not hand it to someone else's institute
+        response = self.client.patch(self.url, {'institute': self.other_institute.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+
+
+class CourseRangeTests(TestCase):
+    """Fee and duration ranges, ?ordering= with cursor pages, and the duration backfill"""
+
+    # (name, fees, duration, is_active)
+    COURSES = [
+        ('Python', 10000, '3 months', True),
+        ('Java', 25000, '6 months', True),
+        ('Data Science', 60000, '1 year', True),
+        ('Spoken English', 5000, '6 weeks', True),
+        ('Tally', 10000, '2 months', True),
+        ('Self Paced', 3000, 'Flexible', True),
+        ('Old Python', 9000, '3 months', False),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        institute = create_institute('ABC Academy', category=None)
+        cls.courses = {
+            name: Course.objects.create(
+                institute=institute, name=name, slug=name.lower().replace(' ', '-'), description='-',
+                category='IT', duration=duration, fees=fees, mode='online', is_active=is_active,
+            )
+            for name, fees, duration, is_active in cls.COURSES
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def names(self, **params):
+        response = self.client.get('/api/courses/', {'page_size': 100, **params})
+        self.assertEqual(response.status_code, 200)
+        return [course['name'] for course in response.data['results']]
+
+    def all_pages(self, **params):
+        response = self.client.get('/api/courses/', {'page_size': 2, **params})
+        names = [course['name'] for course in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            names += [course['name'] for course in response.data['results']]
+        return names
+
+    def test_ranges_default_to_active_courses(self):
+        self.assertEqual(set(self.names(min_fees=9000, max_fees=25000)), {'Python', 'Java', 'Tally'})
+        self.assertEqual(set(self.names(max_duration_days=90)), {'Python', 'Spoken English', 'Tally'})
+        self.assertEqual(set(self.names(min_duration_days=180, max_fees=50000)), {'Java'})
+        # Asking for inactive courses overrides the default
+        self.assertEqual(self.names(max_fees=9000, is_active='false'), ['Old Python'])
+        # Without a range or ordering, inactive courses are listed as before
+        self.assertIn('Old Python', self.names())
+
+    def test_ordering_across_cursor_pages(self):
+        # Ties on fees are broken by id; courses without a parsed duration are left out
+        self.assertEqual(
+            self.all_pages(ordering='fees'),
+            ['Self Paced', 'Spoken English', 'Python', 'Tally', 'Java', 'Data Science'],
+        )
+        self.assertEqual(
+            self.all_pages(ordering='-duration_days'),
+            ['Data Science', 'Java', 'Python', 'Tally', 'Spoken English'],
+        )
+        self.assertEqual(
+            self.all_pages(ordering='-duration_days', max_fees=20000), ['Python', 'Tally', 'Spoken English'],
+        )
+
+    def test_backfill_command(self):
+        Course.objects.update(duration_days=None)
+        Course.objects.filter(pk=self.courses['Java'].pk).update(duration_days=1)
+
+        output = io.StringIO()
+        call_command('backfill_course_durations', '--missing-only', stdout=output)
+        # "Flexible" stays empty, so it is not counted as updated
+        self.assertIn('Updated duration_days of 5 course(s)', output.getvalue())
+        self.assertIn("'Flexible': 1", output.getvalue())
+        self.assertEqual(Course.objects.get(pk=self.courses['Java'].pk).duration_days, 1)
+
+        call_command('backfill_course_durations', stdout=io.StringIO())
+        self.assertEqual(
+            dict(Course.objects.values_list('name', 'duration_days')),
+            {'Python': 90, 'Java': 180, 'Data Science': 365, 'Spoken English': 42,
+             'Tally': 60, 'Self Paced': None, 'Old Python': 90},
+        )
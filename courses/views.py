@@ -1,3 +1,88 @@
-from django.shortcuts import render
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.shortcuts import get_object_or_404
+from eduhyd_backend.pagination import CreatedAtCursorPagination
+from eduhyd_backend.permissions import IsOwnerOrStaffOrReadOnly
+from .compare import MAX_COMPARE_COURSES, compare_courses
+from .documents import course_documents
+from .filters import CourseFilter
+from .models import Course
+from .serializers import CourseSerializer
 
-# Create your views here.
+
+# ========================================
+# COURSE VIEWSET
+# ========================================
+class CourseViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for Course CRUD operations
+
+    Automatic endpoints created:
+    - GET    /api/courses/          -> List courses
+    - POST   /api/courses/          -> Create course (for one of your institutes)
+    - GET    /api/courses/{id}/     -> Get single course
+    - PUT    /api/courses/{id}/     -> Update course (institute owner or staff)
+    - PATCH  /api/courses/{id}/     -> Partial update (institute owner or staff)
+    - DELETE /api/courses/{id}/     -> Delete course (institute owner or staff)
+    - GET    /api/courses/compare/  -> Compare courses side by side
+
+    Example URLs:
+    - /api/courses/?mode=online                 -> Only online courses
+    - /api/courses/?institute__slug=abc-academy -> Courses of one institute
+    - /api/courses/?max_fees=50000&max_duration_days=180
+                                                -> Under ₹50k and 6 months
+    - /api/courses/?ordering=fees               -> Cheapest first
+    - /api/courses/?ordering=-duration_days     -> Longest first
+
+    Fee/duration ranges and ordering only return active courses unless
+    is_active is given (see courses.filters.CourseFilter).
+    """
+
+    queryset = Course.objects.select_related('institute')
+    serializer_class = CourseSerializer
+    permission_classes = [IsOwnerOrStaffOrReadOnly]
+    owner_field = 'institute.owner_id'
+    pagination_class = CreatedAtCursorPagination
+    filterset_class = CourseFilter
+    ordering_fields = ['fees', 'duration_days', 'created_at']
+
+    def list(self, request, *args, **kwargs):
+        """List courses from cached documents (see institutes.documents)"""
+        rows = (
+            self.filter_queryset(self.get_queryset()).select_related(None)
+            .only('pk', 'created_at', 'fees', 'duration_days')  # any ordering field
+        )
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(course_documents.get_many([row.pk for row in page], request))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Single course from its cached document"""
+        pk = get_object_or_404(self.get_queryset().values_list('pk', flat=True), pk=kwargs['pk'])
+        return Response(course_documents.get(pk, request))
+
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        """
+        Compare up to MAX_COMPARE_COURSES courses side by side
+
+        Example URLs:
+        - /api/courses/compare/?ids=12,7,31
+
+        Returns the courses in the order asked for, each with its institute's
+        rating and location, plus "best" markers per field (lowest fees,
+        shortest duration, highest rating, most reviews). Ids that do not
+        exist or are inactive are listed under "missing".
+        """
+        raw_ids = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        try:
+            ids = [int(value) for value in raw_ids]
+        except ValueError:
+            return Response({'error': 'ids must be a comma-separated list of course ids'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({'error': 'ids is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(set(ids)) > MAX_COMPARE_COURSES:
+            return Response({'error': f'At most {MAX_COMPARE_COURSES} courses can be compared'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(compare_courses(ids))
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eduhyd_backend.settings')
 
 application = get_asgi_application()
+
+# Load the search box suggestions before the first request needs them
+from search.autocomplete import warm_autocomplete  # noqa: E402
+
+warm_autocomplete()
@@ -0,0 +1,257 @@
+"""
+Streaming CSV/XLSX exports of large tables (enquiries, reviews).
+
+An export must not hold the table in memory, on the server or in the
+database driver (MySQL drivers buffer whole result sets, so .iterator()
+alone doesn't help). Rows are therefore read in keyset chunks:
+
+    WHERE created_at > :created_at OR (created_at = :created_at AND id > :id)
+    ORDER BY created_at, id
+    LIMIT :chunk_size
+
+answered by the (created_at, id) index, with joined names (institute,
+course...) fetched as plain values in the same query. Each chunk is written
+out and handed to StreamingHttpResponse before the next one is read, so
+memory stays at one chunk however many rows are exported.
+
+Columns are (header, field) pairs, where field is a values_list() path
+such as 'institute__name':
+
+    ENQUIRY_COLUMNS = [('ID', 'id'), ('Institute', 'institute__name'), ...]
+    return export_response(queryset, ENQUIRY_COLUMNS, 'enquiries', 'xlsx')
+
+XLSX files are written as a zip stream by hand (a single sheet with inline
+strings), so no spreadsheet library is needed.
+"""
+import csv
+import datetime
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Characters XML 1.0 does not allow
+XML_ILLEGAL_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def get_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+# ========================================
+# Reading rows
+# ========================================
+def keyset_chunks(queryset, fields, chunk_size=None):
+    """
+    Lists of value tuples (one per row, in fields order), oldest row first,
+    read one keyset chunk at a time.
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    queryset = queryset.order_by('created_at', 'pk')
+    position = None
+    while True:
+        page = queryset
+        if position is not None:
+            created_at, pk = position
+            # The >= bound lets the index seek straight to the position
+            page = page.filter(Q(created_at__gt=created_at) | Q(pk__gt=pk), created_at__gte=created_at)
+        rows = list(page.values_list('created_at', 'pk', *fields)[:chunk_size])
+        if not rows:
+            return
+        yield [row[2:] for row in rows]
+        if len(rows) < chunk_size:
+            return
+        position = rows[-1][:2]
+
+
+def format_value(value, tz=None):
+    """Cell text for a value: local times, Yes/No, empty for None"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, datetime.datetime):
+        return value.astimezone(tz or timezone.get_current_timezone()).strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+# ========================================
+# Writers
+# ========================================
+def csv_stream(headers, chunks):
+    """CSV text, one piece per chunk of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    tz = timezone.get_current_timezone()
+    buffer.write('\ufeff')  # lets Excel detect UTF-8
+    writer.writerow(headers)
+    for rows in chunks:
+        for row in rows:
+            cells = []
+            for value in row:
+                text = format_value(value, tz)
+                if isinstance(value, str) and text.startswith(FORMULA_PREFIXES):
+                    text = "'" + text
+                cells.append(text)
+            writer.writerow(cells)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _StreamSink:
+    """Write-only, unseekable file: zipfile writes into it, the response drains it"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf xfId="0"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_END = '</sheetData></worksheet>'
+
+
+def _xlsx_cell(value, tz):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = XML_ILLEGAL_RE.sub('', format_value(value, tz))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values, tz):
+    return '<row>' + ''.join(_xlsx_cell(value, tz) for value in values) + '</row>'
+
+
+def xlsx_stream(headers, chunks):
+    """An .xlsx file, one piece per chunk of rows"""
+    tz = timezone.get_current_timezone()
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((SHEET_START + _xlsx_row(headers, tz)).encode())
+            for rows in chunks:
+                sheet.write(''.join(_xlsx_row(row, tz) for row in rows).encode())
+                yield sink.drain()
+            sheet.write(SHEET_END.encode())
+    yield sink.drain()
+
+
+# ========================================
+# Requests and responses
+# ========================================
+def filter_created_between(queryset, params):
+    """
+    Apply ?from=YYYY-MM-DD&to=YYYY-MM-DD (local days, both included) as a
+    created_at range the index can use. Raises ValueError for bad dates.
+    """
+    for param, lookup, day_offset in (('from', 'created_at__gte', 0), ('to', 'created_at__lt', 1)):
+        if params.get(param):
+            day = parse_date(params[param])
+            if day is None:
+                raise ValueError(f'{param} must be a date (YYYY-MM-DD)')
+            start = datetime.datetime.combine(day + datetime.timedelta(days=day_offset), datetime.time.min)
+            queryset = queryset.filter(**{lookup: timezone.make_aware(start)})
+    return queryset
+
+
+def get_export_format(params):
+    """?as=csv (default) or ?as=xlsx; ?format= is DRF's renderer switch"""
+    file_format = params.get('as', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f'as must be one of: {", ".join(EXPORT_FORMATS)}')
+    return file_format
+
+
+def export_response(queryset, columns, filename, file_format='csv'):
+    """StreamingHttpResponse with the queryset's rows as a CSV or XLSX download"""
+    headers = [header for header, _ in columns]
+    chunks = keyset_chunks(queryset, [field for _, field in columns])
+    stream = xlsx_stream(headers, chunks) if file_format == 'xlsx' else csv_stream(headers, chunks)
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[file_format])
+    stamp = timezone.localdate().isoformat()
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{file_format}"'
+    return response
@@ -0,0 +1,249 @@
+"""
+Pre-sized image variants for uploaded logos, photos and profile pictures.
+
+After an upload is committed, a small thread pool opens the original once
+and writes a WebP and a JPEG copy for every size in IMAGE_VARIANT_SIZES
+next to it (under a variants/ folder). The generated names are stored in
+the model's *_variants JSON field, e.g.
+
+    {"source": "institute_logos/abc.png",
+     "small": {"webp": "institute_logos/variants/abc_small.webp",
+               "jpeg": "institute_logos/variants/abc_small.jpg",
+               "width": 400, "height": 300},
+     ...}
+
+Serializers then hand out the variant that fits the page (see
+ImageVariantsMixin) and fall back to the original until processing is done.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = {'thumb': 150, 'small': 400, 'medium': 800, 'large': 1600}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+_executor = None
+
+# Sent from a worker thread once variants were stored (with queryset.update(),
+# so no post_save), with the model as sender and pk/field_name arguments
+variants_ready = Signal()
+
+
+def get_sizes():
+    """{variant name: max width/height in pixels}"""
+    return getattr(settings, 'IMAGE_VARIANT_SIZES', DEFAULT_SIZES)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+# ========================================
+# Generating variants
+# ========================================
+def variant_path(name, variant, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}_{variant}.{extension}')
+
+
+def generate_variants(field_file):
+    """Write every size/format of an image file and return the *_variants mapping"""
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as original:
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image)  # respect camera rotation
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    variants = {'source': field_file.name}
+    for variant, size in get_sizes().items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)  # never upscales
+
+        webp = BytesIO()
+        resized.save(webp, 'WEBP', quality=WEBP_QUALITY, method=4)
+
+        # JPEG has no alpha channel; flatten transparency onto white
+        flat = resized
+        if resized.mode == 'RGBA':
+            flat = Image.new('RGB', resized.size, (255, 255, 255))
+            flat.paste(resized, mask=resized.getchannel('A'))
+        jpeg = BytesIO()
+        flat.save(jpeg, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+        variants[variant] = {
+            'webp': _replace(storage, variant_path(field_file.name, variant, 'webp'), webp),
+            'jpeg': _replace(storage, variant_path(field_file.name, variant, 'jpg'), jpeg),
+            'width': resized.width,
+            'height': resized.height,
+        }
+    return variants
+
+
+def _replace(storage, name, buffer):
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def process_image(model_label, pk, field_name, variants_field):
+    """
+    Generate the variants of one stored image and record them.
+
+    The update is conditional on the file still being the one that was
+    processed, so a newer upload is never overwritten with stale variants.
+    Returns True when variants were recorded.
+    """
+    model = apps.get_model(model_label)
+    try:
+        instance = model.objects.only('pk', field_name).get(pk=pk)
+        field_file = getattr(instance, field_name)
+        if not field_file:
+            return False
+        variants = generate_variants(field_file)
+        updated = model.objects.filter(pk=pk, **{field_name: field_file.name}).update(
+            **{variants_field: variants}
+        )
+        if updated:
+            variants_ready.send(sender=model, pk=pk, field_name=field_name)
+        return bool(updated)
+    except Exception:
+        logger.exception('Generating %s variants failed for %s #%s', field_name, model_label, pk)
+        return False
+    finally:
+        close_old_connections()
+
+
+def variant_url(instance, field_name, variants_field, variant, image_format='jpeg'):
+    """URL of one stored variant, or of the original while variants are pending"""
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    variants = getattr(instance, variants_field) or {}
+    if variants.get('source') == field_file.name and variant in variants:
+        return default_storage.url(variants[variant][image_format])
+    return field_file.url
+
+
+def schedule_variants(instance, field_name, variants_field):
+    """
+    Queue variant generation for an image field if its file changed.
+
+    Runs on the worker pool once the surrounding transaction commits, so
+    the upload request itself never waits for resizing.
+    """
+    field_file = getattr(instance, field_name)
+    variants = getattr(instance, variants_field) or {}
+    if not field_file:
+        if variants:
+            type(instance).objects.filter(pk=instance.pk).update(**{variants_field: {}})
+        return
+    if variants.get('source') == field_file.name:
+        return
+
+    args = (instance._meta.label, instance.pk, field_name, variants_field)
+    transaction.on_commit(lambda: get_executor().submit(process_image, *args))
+
+
+# ========================================
+# Serializing variants
+# ========================================
+class ImageVariantsMixin:
+    """
+    Serializer mixin that points image fields at a pre-sized variant
+
+    image_variants maps an image field to (variants field, default variant):
+
+        image_variants = {'logo': ('logo_variants', 'small')}
+
+    The image field then returns that variant's WebP URL (or the original
+    until variants exist), and a "<field>_images" entry lists every size
+    in both formats for srcset use.
+    """
+
+    image_variants = {}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for field_name, (variants_field, default) in self.image_variants.items():
+            if field_name not in data:
+                continue
+            field_file = getattr(instance, field_name)
+            variants = getattr(instance, variants_field) or {}
+            if not field_file or variants.get('source') != field_file.name:
+                data[f'{field_name}_images'] = None
+                continue
+            images = {'original': data[field_name]}
+            for variant in get_sizes():
+                if variant in variants:
+                    images[variant] = {
+                        'webp': self._media_url(variants[variant]['webp']),
+                        'jpeg': self._media_url(variants[variant]['jpeg']),
+                        'width': variants[variant]['width'],
+                        'height': variants[variant]['height'],
+                    }
+            data[f'{field_name}_images'] = images
+            if default in images:
+                data[field_name] = images[default]['webp']
+        return data
+
+    def _media_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+def media_url_keys(serializer):
+    """
+    Keys whose values are media URLs in a serializer's output: its file and
+    image fields (nested serializers included) and the variant URLs
+    """
+    keys = {'original', 'webp', 'jpeg'}
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.FileField):
+            keys.add(name)
+        child = getattr(field, 'child', field)
+        if isinstance(child, serializers.BaseSerializer):
+            keys |= media_url_keys(child)
+    return keys
+
+
+def absolute_media_urls(data, request, keys):
+    """
+    Copy of serialized data with the relative media URLs under keys made
+    absolute for request, as serializing with the request would have
+    (cached documents are rendered without one)
+    """
+    if isinstance(data, list):
+        return [absolute_media_urls(item, request, keys) for item in data]
+    if not isinstance(data, dict):
+        return data
+    result = {}
+    for key, value in data.items():
+        if key in keys and isinstance(value, str) and value.startswith('/'):
+            result[key] = request.build_absolute_uri(value)
+        else:
+            result[key] = absolute_media_urls(value, request, keys)
+    return result
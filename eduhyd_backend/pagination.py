@@ -0,0 +1,211 @@
+"""
+Keyset (cursor) pagination on (created_at, id).
+
+PageNumberPagination runs a COUNT(*) and an OFFSET scan on every page, so
+page N costs more the deeper it is. Here each page remembers the
+(created_at, id) of its last row, and the next page starts with
+
+    WHERE created_at < :created_at OR (created_at = :created_at AND id < :id)
+    ORDER BY created_at DESC, id DESC
+    LIMIT :page_size
+
+which the composite (created_at, id) index answers directly, whatever the
+page. The id tie-breaker keeps pages stable when rows share a timestamp.
+
+Views that list ordering_fields for DRF's OrderingFilter are paginated
+the same way on the ?ordering= field instead, e.g. (fees, id)
+for /api/courses/?ordering=fees. Rows where that field is NULL are left
+out, since they have no position in the order.
+
+A total is only computed on request (?include_count=1) and is approximate:
+table statistics on MySQL for unfiltered lists, otherwise a count capped at
+MAX_COUNT rows.
+"""
+import base64
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class CreatedAtCursorPagination(BasePagination):
+    """Newest-first cursor pagination over (created_at, id), or (<ordering>, id)"""
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'include_count'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    # Beyond this many rows the count is reported as "at least MAX_COUNT"
+    MAX_COUNT = 10000
+
+    default_ordering = '-created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.field, descending = self.get_ordering(queryset, view)
+        cursor = self.decode_cursor(request)
+        if self.queryset_field().null:
+            queryset = queryset.filter(**{f'{self.field}__isnull': False})
+        self.count = self.get_count(queryset) if self.wants_count(request) else None
+
+        # Step 1: Seek to the cursor position
+        if cursor is None:
+            reverse = False
+        else:
+            value, pk, reverse = cursor
+            forward = 'lt' if descending else 'gt'
+            backward = 'gt' if descending else 'lt'
+            lookup = backward if reverse else forward
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value})
+                | Q(**{self.field: value, f'pk__{lookup}': pk})
+            )
+
+        # Step 2: Read one row more than needed to learn if there is a further page
+        ordering = (self.field, 'pk') if descending == reverse else (f'-{self.field}', '-pk')
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Step 3: Work out which directions can be followed
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'], response['count_is_exact'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'count_is_exact': {'type': 'boolean'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_ordering(self, queryset, view):
+        """
+        (field, descending) to paginate on: the ordering OrderingFilter
+        applied, if it is one of the view's ordering_fields, else newest first
+        """
+        ordering = self.default_ordering
+        allowed = getattr(view, 'ordering_fields', None) or []
+        if queryset.query.order_by:
+            requested = queryset.query.order_by[0]
+            if isinstance(requested, str) and requested.lstrip('-') in allowed:
+                ordering = requested
+        field = ordering.lstrip('-')
+        return ('pk' if field == 'id' else field), ordering.startswith('-')
+
+    def queryset_field(self):
+        return self.model._meta.pk if self.field == 'pk' else self.model._meta.get_field(self.field)
+
+    # ----------------------------------------
+    # Page size and links
+    # ----------------------------------------
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE or 10
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.link_for(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.link_for(self.page[0], reverse=True)
+
+    def link_for(self, row, reverse):
+        return replace_query_param(
+            self.base_url, self.cursor_query_param,
+            self.encode_cursor(getattr(row, self.field), row.pk, reverse),
+        )
+
+    # ----------------------------------------
+    # Cursor encoding: base64("<field>|<value>|<id>|<direction>")
+    # ----------------------------------------
+    def encode_cursor(self, value, pk, reverse):
+        value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        raw = f'{self.field}|{value}|{pk}|{"p" if reverse else "n"}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode()).decode()
+            field, value, pk, direction = raw.split('|')
+            # A cursor only makes sense for the ordering it was made for
+            if field != self.field or direction not in ('n', 'p'):
+                raise ValueError
+            value = self.queryset_field().to_python(value)
+            if value is None:
+                raise ValueError
+            return value, int(pk), direction == 'p'
+        except (TypeError, ValueError, UnicodeDecodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # ----------------------------------------
+    # Approximate count
+    # ----------------------------------------
+    def wants_count(self, request):
+        return request.query_params.get(self.count_query_param) in ('1', 'true', 'yes')
+
+    def get_count(self, queryset):
+        """(count, is_exact) for the queryset, never scanning more than MAX_COUNT rows"""
+        estimate = self.get_table_estimate(queryset)
+        if estimate is not None:
+            return estimate, False
+        count = queryset.order_by()[:self.MAX_COUNT + 1].count()
+        return min(count, self.MAX_COUNT), count <= self.MAX_COUNT
+
+    def get_table_estimate(self, queryset):
+        """MySQL's row estimate for an unfiltered queryset, else None"""
+        connection = connections[queryset.db]
+        if connection.vendor != 'mysql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] is not None else None
@@ -0,0 +1,49 @@
+"""
+Who may change what through the API.
+
+Catalog and review endpoints are readable by anyone, but an object may
+only be changed or deleted by the user it belongs to, or by staff. Views
+say where the owner is with owner_field, an attribute path ending in the
+owner's id:
+
+    class InstituteViewSet(viewsets.ModelViewSet):
+        permission_classes = [IsOwnerOrStaffOrReadOnly]
+        owner_field = 'owner_id'              # course: 'institute.owner_id'
+
+Some fields are for staff only (an institute's status, a review's
+is_approved); serializers list them in staff_only_fields and
+StaffOnlyFieldsMixin makes them read-only for everyone else.
+"""
+from operator import attrgetter
+
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+
+def is_staff(request):
+    return bool(request and request.user and request.user.is_staff)
+
+
+class IsOwnerOrStaffOrReadOnly(BasePermission):
+    """Anyone reads, logged-in users create, owners and staff change and delete"""
+
+    def has_permission(self, request, view):
+        return request.method in SAFE_METHODS or bool(request.user and request.user.is_authenticated)
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in SAFE_METHODS or is_staff(request):
+            return True
+        return attrgetter(view.owner_field)(obj) == request.user.pk
+
+
+class StaffOnlyFieldsMixin:
+    """Serializer mixin: staff_only_fields are read-only unless the request is by staff"""
+
+    staff_only_fields = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not is_staff(self.context.get('request')):
+            for name in self.staff_only_fields:
+                if name in fields:
+                    fields[name].read_only = True
+        return fields
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
     'courses',
     'reviews',
     'enquiries',
+    'search',
 ]
 
 MIDDLEWARE = [
@@ -103,6 +105,87 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory works for a single process; point this at a shared backend
+# (e.g. 'django.core.cache.backends.filebased.FileBasedCache') when running
+# several workers so they see the same cached data.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eduhyd',
+    },
+    # Login throttle state (see accounts/throttling.py), kept apart so
+    # clearing the data cache doesn't reset it. Local memory is per
+    # process: with several workers each one counts on its own, so in
+    # production point this at a shared backend such as Redis or
+    # Memcached. MAX_ENTRIES is raised from the default 300 so a burst of
+    # attempts from many IPs/emails can't cull a locked account's entry.
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eduhyd-throttle',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# How long rendered institute/course documents stay cached (seconds)
+DOCUMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# How long course comparisons stay cached (seconds); ratings may lag this long
+COMPARE_CACHE_TIMEOUT = 5 * 60
+
+# Reviews approved/hidden per transaction by the moderation actions
+REVIEW_MODERATION_CHUNK_SIZE = 500
+
+# Rows read per query by the CSV/XLSX exports (see eduhyd_backend/exports.py)
+EXPORT_CHUNK_SIZE = 2000
+
+# Repeat enquiries (same email or phone, institute and course) within this
+# many seconds are dropped; needs a shared cache to dedupe across workers
+ENQUIRY_DEDUPE_WINDOW = 10 * 60
+# Buffer new enquiries and insert them in batches (see enquiries/ingest.py).
+# Each is journaled to ENQUIRY_JOURNAL_DIR first, so a crash loses nothing;
+# run flush_enquiry_journal after a crash if no worker restarts (var/ is
+# ignored by git)
+ENQUIRY_BUFFER = False
+ENQUIRY_BUFFER_SIZE = 500
+ENQUIRY_FLUSH_INTERVAL = 1.0
+ENQUIRY_JOURNAL_DIR = BASE_DIR / 'var' / 'enquiry-journal'
+# Seconds a journal fsync waits for more enquiries to share it; adds up to
+# this much to each buffered response
+ENQUIRY_JOURNAL_SYNC_DELAY = 0.002
+
+# Owner notifications, sent by the send_enquiry_notifications worker (see
+# enquiries/notifications.py). Enquiries arriving within the delay of each
+# other reach an owner as one digest.
+ENQUIRY_NOTIFICATION_DELAY = 60
+ENQUIRY_NOTIFICATION_TRANSPORTS = [
+    'enquiries.notifications.EmailTransport',
+    'enquiries.notifications.ConsoleSMSTransport',
+]
+# Failed sends are retried after 1, 2, 4... minutes, at most this many times
+ENQUIRY_NOTIFICATION_RETRY = 60
+ENQUIRY_NOTIFICATION_MAX_ATTEMPTS = 6
+# How often the worker looks for due enquiries when run with --loop
+ENQUIRY_NOTIFICATION_INTERVAL = 10
+
+# Closed enquiries older than this move to monthly compressed files when
+# archive_enquiries runs (see enquiries/archive.py); keep it above the
+# ranking's 90-day enquiry window. The files are the only copy of those
+# enquiries: outside development, point ENQUIRY_ARCHIVE_DIR at backed-up
+# storage outside the checkout (var/ is ignored by git)
+ENQUIRY_ARCHIVE_AFTER_DAYS = 180
+ENQUIRY_ARCHIVE_CHUNK_SIZE = 500
+ENQUIRY_ARCHIVE_DIR = BASE_DIR / 'var' / 'enquiry-archive'
+
+# Email
+# Printed to the console in development; use the SMTP backend in production
+# or 'django.core.mail.backends.filebased.EmailBackend' with EMAIL_FILE_PATH
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'EduHyd <noreply@localhost>'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -121,6 +204,51 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Login by email (accounts/backends.py): one indexed query per login.
+# ModelBackend stays for the admin's username login.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Password hashing (see accounts/hashers.py). New passwords are hashed with
+# PASSWORD_HASHER; other hashes are upgraded when their user logs in.
+# 'argon2' needs `pip install argon2-cffi`, 'bcrypt' needs `pip install bcrypt`;
+# without the package we fall back to 'pbkdf2', which needs nothing.
+PASSWORD_HASHER = 'argon2'
+ARGON2_TIME_COST = 2
+ARGON2_MEMORY_COST = 19456  # KiB
+ARGON2_PARALLELISM = 1
+BCRYPT_ROUNDS = 12
+PBKDF2_ITERATIONS = 1000000
+
+_PASSWORD_HASHERS = {
+    'argon2': ('accounts.hashers.TunableArgon2PasswordHasher', 'argon2'),
+    'bcrypt': ('accounts.hashers.TunableBCryptSHA256PasswordHasher', 'bcrypt'),
+    'pbkdf2': ('accounts.hashers.TunablePBKDF2PasswordHasher', None),
+}
+if _PASSWORD_HASHERS[PASSWORD_HASHER][1] and not find_spec(_PASSWORD_HASHERS[PASSWORD_HASHER][1]):
+    PASSWORD_HASHER = 'pbkdf2'
+# The first entry hashes new passwords; the rest still verify old hashes
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER][0],
+    *(path for name, (path, _) in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+# Login throttling (see accounts/throttling.py), checked before any hashing.
+# Per client IP: bursts of LOGIN_THROTTLE_IP_BURST attempts, then
+# LOGIN_THROTTLE_IP_RATE attempts per second (behind a proxy, set
+# REST_FRAMEWORK['NUM_PROXIES'] so the client IP is read from X-Forwarded-For)
+LOGIN_THROTTLE_CACHE = 'throttle'
+LOGIN_THROTTLE_IP_BURST = 20
+LOGIN_THROTTLE_IP_RATE = 10 / 60
+# Per email: LOGIN_THROTTLE_ACCOUNT_FAILURES failed logins per
+# LOGIN_THROTTLE_ACCOUNT_WINDOW seconds
+LOGIN_THROTTLE_ACCOUNT_FAILURES = 5
+LOGIN_THROTTLE_ACCOUNT_WINDOW = 15 * 60
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -152,6 +280,18 @@ AUTH_USER_MODEL = 'accounts.User'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Pre-sized copies of uploaded images (see eduhyd_backend/images.py)
+# {variant name: max width/height in pixels}, each written as WebP and JPEG
+IMAGE_VARIANT_SIZES = {'thumb': 150, 'small': 400, 'medium': 800, 'large': 1600}
+# Background threads per process that generate them
+IMAGE_VARIANT_WORKERS = 2
+
+# Bulk catalog imports (see institutes/importer.py): uploaded files and
+# error reports are kept here, outside MEDIA_ROOT
+IMPORT_ROOT = BASE_DIR / 'imports'
+# Rows written per transaction
+IMPORT_BATCH_SIZE = 1000
+
 
 
 # Add REST Framework configuration
@@ -189,3 +329,13 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+
+# Catalog search
+# 'auto' = MySQL FULLTEXT on MySQL, the in-process index elsewhere
+SEARCH_BACKEND = 'auto'
+# How often each process rebuilds its in-process search index
+SEARCH_INDEX_REFRESH_SECONDS = 300
+# Snapshot each process loads its autocomplete index from at startup
+# (written whenever the index is rebuilt, or by build_autocomplete_snapshot)
+AUTOCOMPLETE_SNAPSHOT = BASE_DIR / 'var' / 'autocomplete.json.gz'
@@ -15,8 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/', include('accounts.urls')),
+    path('api/', include('institutes.urls')),
+    path('api/', include('courses.urls')),
+    path('api/', include('reviews.urls')),
+    path('api/', include('enquiries.urls')),
+    path('api/', include('search.urls')),
 ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eduhyd_backend.settings')
 
 application = get_wsgi_application()
+
+# Load the search box suggestions before the first request needs them
+from search.autocomplete import warm_autocomplete  # noqa: E402
+
+warm_autocomplete()
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Enquiry
+from .exports import export_enquiries
+from .models import ArchivedEnquiry, Enquiry
+from .rollups import set_enquiry_status
 
 @admin.register(Enquiry)
 class EnquiryAdmin(admin.ModelAdmin):
@@ -21,7 +23,7 @@ class EnquiryAdmin(admin.ModelAdmin):
     
     list_editable = ['status']
     
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'notified_at', 'notify_attempts']
     
     list_per_page = 50
     
@@ -38,12 +40,12 @@ class EnquiryAdmin(admin.ModelAdmin):
             'fields': ('status',)
         }),
         ('Timestamp', {
-            'fields': ('created_at',),
+            'fields': ('created_at', 'notified_at', 'notify_attempts'),
             'classes': ('collapse',)
         }),
     )
     
-    actions = ['mark_contacted', 'mark_closed']
+    actions = ['mark_contacted', 'mark_closed', 'export_csv', 'export_xlsx']
     
     def get_institute_name(self, obj):
         return obj.institute.name
@@ -55,11 +57,42 @@ class EnquiryAdmin(admin.ModelAdmin):
     get_course_name.short_description = 'Course'
     
     def mark_contacted(self, request, queryset):
-        updated = queryset.update(status='contacted')
+        updated = set_enquiry_status(queryset, 'contacted')
         self.message_user(request, f'{updated} enquirie(s) marked as contacted.', 'success')
     mark_contacted.short_description = "📞 Mark as contacted"
     
     def mark_closed(self, request, queryset):
-        updated = queryset.update(status='closed')
+        updated = set_enquiry_status(queryset, 'closed')
         self.message_user(request, f'{updated} enquirie(s) closed.', 'info')
-    mark_closed.short_description = "✅ Mark as closed"
\ No newline at end of file
+    mark_closed.short_description = "✅ Mark as closed"
+    
+    # Exports stream in chunks (see eduhyd_backend.exports), so selecting
+    # every enquiry is fine
+    def export_csv(self, request, queryset):
+        return export_enquiries(queryset, 'csv')
+    export_csv.short_description = "⬇️ Export selected as CSV"
+    
+    def export_xlsx(self, request, queryset):
+        return export_enquiries(queryset, 'xlsx')
+    export_xlsx.short_description = "⬇️ Export selected as Excel"
+
+
+@admin.register(ArchivedEnquiry)
+class ArchivedEnquiryAdmin(admin.ModelAdmin):
+    """Where archived enquiries are stored (read only; see enquiries.archive)"""
+    
+    list_display = ['id', 'email', 'institute_id', 'created_at', 'archive_file', 'archived_at']
+    
+    # Exact lookups only: the id and the (lowercased) email are indexed
+    search_fields = ['=id', '=email']
+    
+    list_per_page = 50
+    
+    show_full_result_count = False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
@@ -0,0 +1,198 @@
+"""
+Archival of old closed enquiries.
+
+The enquiry table only grows, and closed leads older than a few months
+are rarely read again, yet every admin page and owner query walks past
+them. archive_enquiries moves closed enquiries older than
+ENQUIRY_ARCHIVE_AFTER_DAYS out of the table, into one compressed JSONL file
+per month they were sent (ENQUIRY_ARCHIVE_DIR/enquiries-2026-03.jsonl.gz).
+
+Work happens in chunks of ENQUIRY_ARCHIVE_CHUNK_SIZE enquiries, each in
+its own short transaction:
+
+1. lock the chunk's rows (still closed, still old enough)
+2. append them to their month's file as one gzip member (gzip files may
+   hold several members back to back) and fsync it
+3. record an ArchivedEnquiry row per enquiry (id, email, institute, the
+   member's byte range) and delete the enquiries
+
+Only the rows being archived are locked, for the few milliseconds a chunk
+takes. If a chunk's transaction fails after its member was written, the
+member is left unreferenced and the enquiries are archived again by the
+next run.
+
+Archived enquiries are read back by id or email (find_archived_enquiries):
+the ArchivedEnquiry rows say which members to decompress. Their daily
+rollups are kept: archiving is not a status change, and
+rebuild_enquiry_rollups counts ArchivedEnquiry rows as closed enquiries.
+"""
+import fcntl
+import gzip
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import ArchivedEnquiry, Enquiry
+
+ARCHIVED_STATUS = 'closed'
+
+# Enquiry columns kept in the archive, besides the joined names
+ARCHIVE_FIELDS = [
+    'id', 'user_id', 'institute_id', 'course_id', 'student_name', 'email', 'phone',
+    'message', 'status', 'created_at', 'submission_id', 'notified_at',
+]
+
+
+def get_archive_dir():
+    return str(getattr(settings, 'ENQUIRY_ARCHIVE_DIR', settings.BASE_DIR / 'var' / 'enquiry-archive'))
+
+
+def archive_file_name(created_at):
+    return f'enquiries-{timezone.localtime(created_at):%Y-%m}.jsonl.gz'
+
+
+def _encode(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (int, str)):
+        return str(value)  # UUIDs
+    return value
+
+
+def _append_member(file_name, records):
+    """Append records as one gzip member; returns its (offset, length)"""
+    data = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records)
+    member = gzip.compress(data.encode(), mtime=0)
+    path = os.path.join(get_archive_dir(), file_name)
+    with open(path, 'ab') as archive:
+        fcntl.flock(archive, fcntl.LOCK_EX)  # other archivers append too
+        offset = archive.seek(0, os.SEEK_END)
+        archive.write(member)
+        archive.flush()
+        os.fsync(archive.fileno())
+    return offset, len(member)
+
+
+def _delete_enquiries(ids):
+    """
+    DELETE by id without Django's delete collector, whose signals would
+    take the enquiries out of the daily rollups. Nothing references
+    enquiries, so there is nothing to cascade.
+    """
+    table = connection.ops.quote_name(Enquiry._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+
+
+class ArchiveRun:
+    """Result of archive_enquiries"""
+
+    def __init__(self, cutoff):
+        self.cutoff = cutoff   # enquiries sent before this were eligible
+        self.archived = 0
+        self.chunks = 0
+        self.files = set()     # archive files appended to
+
+
+def archive_chunk(ids, cutoff):
+    """Archive the given enquiries that still qualify; returns (archived, files appended to)"""
+    with transaction.atomic():
+        rows = list(
+            # of=self: lock the enquiries, not the joined institutes/courses
+            Enquiry.objects.select_for_update(of=('self',))
+            .filter(pk__in=ids, status=ARCHIVED_STATUS, created_at__lt=cutoff)
+            .order_by('created_at', 'pk')
+            .values(*ARCHIVE_FIELDS, institute_name=F('institute__name'),
+                    course_name=F('course__name'))
+        )
+        if not rows:
+            return 0, set()
+
+        by_file = {}
+        for row in rows:
+            by_file.setdefault(archive_file_name(row['created_at']), []).append(row)
+
+        archived_at = timezone.now()
+        index = []
+        for file_name, records in by_file.items():
+            offset, length = _append_member(
+                file_name, [{key: _encode(value) for key, value in record.items()} for record in records]
+            )
+            index.extend(
+                ArchivedEnquiry(
+                    id=record['id'], email=record['email'].lower(), institute_id=record['institute_id'],
+                    course_id=record['course_id'], user_id=record['user_id'], created_at=record['created_at'],
+                    archived_at=archived_at, archive_file=file_name, offset=offset, length=length,
+                )
+                for record in records
+            )
+        # A re-archived enquiry (see the module docstring) points at its newest copy
+        ArchivedEnquiry.objects.filter(pk__in=[entry.pk for entry in index]).delete()
+        ArchivedEnquiry.objects.bulk_create(index)
+        _delete_enquiries([row['id'] for row in rows])
+    return len(rows), set(by_file)
+
+
+def archive_enquiries(older_than_days=None, chunk_size=None):
+    """Move old closed enquiries to the monthly archive files; returns an ArchiveRun"""
+    older_than_days = older_than_days or getattr(settings, 'ENQUIRY_ARCHIVE_AFTER_DAYS', 180)
+    chunk_size = chunk_size or getattr(settings, 'ENQUIRY_ARCHIVE_CHUNK_SIZE', 500)
+    run = ArchiveRun(timezone.now() - timedelta(days=older_than_days))
+    os.makedirs(get_archive_dir(), exist_ok=True)
+
+    # Candidates in (created_at, id) order, one keyset chunk at a time
+    candidates = Enquiry.objects.filter(status=ARCHIVED_STATUS, created_at__lt=run.cutoff).order_by('created_at', 'pk')
+    position = None
+    while True:
+        page = candidates
+        if position is not None:
+            created_at, pk = position
+            page = page.filter(created_at__gte=created_at).exclude(created_at=created_at, pk__lte=pk)
+        chunk = list(page.values_list('created_at', 'pk')[:chunk_size])
+        if not chunk:
+            return run
+        archived, files = archive_chunk([pk for _, pk in chunk], run.cutoff)
+        run.archived += archived
+        run.chunks += 1
+        run.files |= files
+        position = chunk[-1]
+
+
+# ========================================
+# Reading the archive
+# ========================================
+def _read_member(file_name, offset, length):
+    with open(os.path.join(get_archive_dir(), file_name), 'rb') as archive:
+        archive.seek(offset)
+        data = gzip.decompress(archive.read(length))
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+def read_archived(entries):
+    """The archived records of ArchivedEnquiry rows, each member read once"""
+    members = {}
+    for entry in entries:
+        members.setdefault((entry.archive_file, entry.offset, entry.length), set()).add(entry.pk)
+    records = []
+    for (file_name, offset, length), ids in members.items():
+        records.extend(record for record in _read_member(file_name, offset, length) if record['id'] in ids)
+    return sorted(records, key=lambda record: (record['created_at'], record['id']))
+
+
+def find_archived_enquiries(entries=None, enquiry_id=None, email=None, limit=100):
+    """
+    Archived enquiries by id and/or email (case-insensitive), oldest first.
+    entries narrows the ArchivedEnquiry rows searched, e.g. to an owner's
+    institutes.
+    """
+    entries = ArchivedEnquiry.objects.all() if entries is None else entries
+    if enquiry_id is not None:
+        entries = entries.filter(pk=enquiry_id)
+    if email:
+        entries = entries.filter(email=email.strip().lower())
+    return read_archived(entries.order_by('created_at', 'pk')[:limit])
@@ -0,0 +1,18 @@
+"""Enquiry exports for owners and staff (see eduhyd_backend.exports)"""
+from eduhyd_backend.exports import export_response
+
+ENQUIRY_EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Sent at', 'created_at'),
+    ('Status', 'status'),
+    ('Institute', 'institute__name'),
+    ('Course', 'course__name'),
+    ('Student', 'student_name'),
+    ('Email', 'email'),
+    ('Phone', 'phone'),
+    ('Message', 'message'),
+]
+
+
+def export_enquiries(queryset, file_format='csv'):
+    return export_response(queryset, ENQUIRY_EXPORT_COLUMNS, 'enquiries', file_format)
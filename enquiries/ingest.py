@@ -0,0 +1,343 @@
+"""
+Enquiry submission: cheap validation, dedupe and optional buffered writes.
+
+Campaigns send enquiries in bursts, so POST /api/enquiries/ avoids per
+request work where it can:
+
+1. Validation checks the institute (and course) against a cache keyed by
+   the catalog version, which also supplies the names for the response,
+   so neither costs a query once warm.
+2. Repeats are dropped: the first enquiry from an email, and the first
+   from a phone number, to an institute/course claims a cache key for
+   ENQUIRY_DEDUPE_WINDOW seconds (cache.add is atomic), and later ones
+   within the window are answered as duplicates without a write. Use a
+   shared cache backend when running several processes.
+3. With ENQUIRY_BUFFER on, accepted enquiries are appended to a journal
+   file and inserted in batches by bulk_create, every
+   ENQUIRY_FLUSH_INTERVAL seconds or ENQUIRY_BUFFER_SIZE enquiries. The
+   response (202) is sent once the journal line is on disk. Appends
+   share fsyncs (group commit): one request fsyncs everything appended
+   so far, after waiting ENQUIRY_JOURNAL_SYNC_DELAY seconds for others
+   to join, while the requests behind it wait for that fsync. A journal
+   segment is deleted only after its rows are committed. Segments left
+   by a crashed process are replayed when the next buffer starts, or by
+   the flush_enquiry_journal command. Every enquiry carries a
+   submission_id, so replaying a segment twice never duplicates rows.
+
+post_save is not sent for buffered enquiries; receivers that must see
+every new enquiry listen to enquiries_written as well.
+"""
+import atexit
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from courses.models import Course
+from institutes.models import Institute
+from search.cache import get_catalog_version
+from .models import Enquiry
+
+logger = logging.getLogger(__name__)
+
+# Sent with enquiries=[...] when buffered enquiries are inserted (inside the
+# inserting transaction, and only for rows not stored before)
+enquiries_written = Signal()
+
+TARGET_CACHE_TIMEOUT = 60 * 60
+
+# Enquiry fields kept in the journal, besides submission_id and created_at
+JOURNAL_FIELDS = ['user_id', 'institute_id', 'course_id', 'student_name', 'email', 'phone', 'message']
+
+
+# ========================================
+# Validation and dedupe
+# ========================================
+def enquiry_target(institute_id, course_id=None):
+    """
+    [institute name, course name or None] if enquiries can be sent there,
+    else None. Only active institutes and their active courses qualify.
+    """
+    key = f'enquiry-target:{get_catalog_version()}:{institute_id}:{course_id or 0}'
+    target = cache.get(key)
+    if target is None:
+        institute = Institute.objects.filter(pk=institute_id, status='active').values_list('name', flat=True).first()
+        course = None
+        if institute is not None and course_id:
+            course = Course.objects.filter(
+                pk=course_id, institute_id=institute_id, is_active=True
+            ).values_list('name', flat=True).first()
+        valid = institute is not None and (course is not None or not course_id)
+        target = [institute, course] if valid else []
+        cache.set(key, target, TARGET_CACHE_TIMEOUT)
+    return target or None
+
+
+def normalize_phone(phone):
+    """The last 10 digits, so "+91 98480 22338" and "9848022338" match"""
+    return re.sub(r'\D', '', phone or '')[-10:]
+
+
+def _dedupe_keys(email, phone, institute_id, course_id):
+    keys = []
+    for kind, value in (('email', (email or '').strip().lower()), ('phone', normalize_phone(phone))):
+        if value:
+            digest = hashlib.sha1(f'{value}|{institute_id}|{course_id or 0}'.encode()).hexdigest()
+            keys.append(f'enquiry-seen:{kind}:{digest}')
+    return keys
+
+
+def claim_submission(email, phone, institute_id, course_id=None):
+    """
+    Dedupe keys for a new enquiry, or None if the same email or phone sent
+    one to this institute/course within ENQUIRY_DEDUPE_WINDOW.
+    """
+    window = getattr(settings, 'ENQUIRY_DEDUPE_WINDOW', 10 * 60)
+    keys = _dedupe_keys(email, phone, institute_id, course_id)
+    claimed = [key for key in keys if cache.add(key, 1, window)]
+    if len(claimed) < len(keys):
+        release_submission(claimed)
+        return None
+    return keys
+
+
+def release_submission(keys):
+    """Forget dedupe keys of an enquiry that could not be stored"""
+    cache.delete_many(keys)
+
+
+# ========================================
+# Buffered writes
+# ========================================
+def _journal_line(enquiry):
+    record = {field: getattr(enquiry, field) for field in JOURNAL_FIELDS}
+    record['submission_id'] = str(enquiry.submission_id)
+    record['created_at'] = enquiry.created_at.isoformat()
+    return json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def _from_journal(line):
+    record = json.loads(line)
+    return Enquiry(
+        submission_id=uuid.UUID(record['submission_id']),
+        created_at=parse_datetime(record['created_at']),
+        **{field: record[field] for field in JOURNAL_FIELDS},
+    )
+
+
+def write_enquiries(enquiries):
+    """Insert enquiries, skipping submission ids already stored"""
+    if not enquiries:
+        return
+    with transaction.atomic():
+        stored = set(Enquiry.objects.filter(
+            submission_id__in=[enquiry.submission_id for enquiry in enquiries]
+        ).values_list('submission_id', flat=True))
+        new = [enquiry for enquiry in enquiries if enquiry.submission_id not in stored]
+        Enquiry.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+        # In the same transaction, so receivers' bookkeeping commits with the rows
+        enquiries_written.send(sender=Enquiry, enquiries=new)
+
+
+def replay_segment(path):
+    """Insert the enquiries of a journal segment and delete it; returns how many it held"""
+    try:
+        with open(path, 'r+', encoding='utf-8') as segment:
+            try:
+                fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0  # still being written by a live buffer
+            enquiries = []
+            for line in segment:
+                try:
+                    enquiries.append(_from_journal(line))
+                except (ValueError, KeyError, TypeError):
+                    # A torn last line from a crash mid-write; the client
+                    # never got a response for it
+                    logger.warning('Skipping unreadable enquiry journal line in %s', path)
+            write_enquiries(enquiries)
+            os.remove(path)
+            return len(enquiries)
+    except FileNotFoundError:
+        return 0  # replayed meanwhile by another process
+
+
+def replay_journal(directory=None):
+    """Replay every segment no live buffer is writing; returns the enquiries found"""
+    directory = directory or settings.ENQUIRY_JOURNAL_DIR
+    return sum(replay_segment(path) for path in sorted(glob.glob(os.path.join(directory, '*.jsonl'))))
+
+
+class EnquiryBuffer:
+    """Journaled in-process buffer of enquiries waiting for a bulk insert"""
+
+    def __init__(self, directory, size, interval, sync_delay=0):
+        self.directory = str(directory)
+        self.size = size
+        self.interval = interval
+        self.sync_delay = sync_delay
+        self.lock = threading.Lock()        # pending list, open segment and counters
+        self.flush_lock = threading.Lock()  # one flush at a time
+        self.sync_lock = threading.Lock()   # one fsync at a time
+        self.appended = 0                   # journal lines written so far
+        self.synced = 0                     # of those, how many are on disk
+        self.pending = []
+        self.closed_segments = []           # (path, enquiries) not yet inserted
+        self.segment = None
+        self.segment_path = None
+        self.sequence = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _open_segment(self):
+        self.sequence += 1
+        self.segment_path = os.path.join(
+            self.directory, f'{timezone.now():%Y%m%d%H%M%S}-{os.getpid()}-{self.sequence}.jsonl'
+        )
+        self.segment = open(self.segment_path, 'a', encoding='utf-8')
+        fcntl.flock(self.segment, fcntl.LOCK_EX)
+
+    def add(self, enquiry):
+        """Journal an enquiry; returns once it is on disk"""
+        with self.lock:
+            if self.segment is None:
+                self._open_segment()
+            self.segment.write(_journal_line(enquiry))
+            self.pending.append(enquiry)
+            self.appended += 1
+            number = self.appended
+            full = len(self.pending) >= self.size
+        self._sync(number)
+        if full:
+            self.flush()
+
+    def _sync(self, number):
+        """Wait until journal line number is on disk, fsyncing if nobody has"""
+        with self.sync_lock:
+            # Step 1: An fsync that ran while we waited for the lock may cover us
+            if self.synced >= number:
+                return
+            # Step 2: Give other requests a moment to append, so one fsync covers them too
+            if self.sync_delay:
+                time.sleep(self.sync_delay)
+            with self.lock:
+                if self.synced >= number:
+                    return  # flush() closed (and fsynced) the segment meanwhile
+                self.segment.flush()
+                target = self.appended
+                fd = os.dup(self.segment.fileno())
+            # Step 3: fsync outside self.lock, so appends carry on meanwhile
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            with self.lock:
+                self.synced = max(self.synced, target)
+
+    def flush(self):
+        """Insert everything journaled so far; returns how many rows were written"""
+        with self.flush_lock:
+            with self.lock:
+                if self.pending:
+                    self.segment.flush()
+                    os.fsync(self.segment.fileno())
+                    self.synced = self.appended
+                    self.segment.close()  # also releases its lock
+                    self.closed_segments.append((self.segment_path, self.pending))
+                    self.pending, self.segment, self.segment_path = [], None, None
+            written = 0
+            while self.closed_segments:
+                path, enquiries = self.closed_segments[0]
+                try:
+                    write_enquiries(enquiries)
+                except Exception:
+                    # Kept on disk and in memory; the next flush retries
+                    logger.exception('Could not write %d buffered enquiries', len(enquiries))
+                    break
+                self.closed_segments.pop(0)
+                written += len(enquiries)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            return written
+
+    def run(self):
+        """Flush loop of the background thread"""
+        stop = threading.Event()
+        while not stop.wait(self.interval):
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_enquiry_buffer():
+    """This process's buffer (started on first use), or None when buffering is off"""
+    global _buffer
+    if not getattr(settings, 'ENQUIRY_BUFFER', False):
+        return None
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = EnquiryBuffer(
+                settings.ENQUIRY_JOURNAL_DIR,
+                getattr(settings, 'ENQUIRY_BUFFER_SIZE', 500),
+                getattr(settings, 'ENQUIRY_FLUSH_INTERVAL', 1.0),
+                getattr(settings, 'ENQUIRY_JOURNAL_SYNC_DELAY', 0.002),
+            )
+            # Pick up what a crashed process left behind
+            replay_journal(_buffer.directory)
+            threading.Thread(target=_buffer.run, daemon=True).start()
+            atexit.register(_buffer.flush)
+        return _buffer
+
+
+# ========================================
+# Submission
+# ========================================
+def submit_enquiry(data, user=None):
+    """
+    Store a validated enquiry (see EnquirySubmitSerializer).
+
+    Returns (enquiry, outcome) where outcome is 'created', 'buffered'
+    (journaled, inserted with the next flush, no id yet) or 'duplicate'
+    (nothing stored).
+    """
+    institute_id = data['institute']
+    course_id = data.get('course')
+    enquiry = Enquiry(
+        submission_id=uuid.uuid4(),
+        user=user if user is not None and user.is_authenticated else None,
+        institute_id=institute_id, course_id=course_id,
+        student_name=data['student_name'], email=data['email'], phone=data['phone'],
+        message=data['message'], created_at=timezone.now(),
+    )
+    keys = claim_submission(enquiry.email, enquiry.phone, institute_id, course_id)
+    if keys is None:
+        return enquiry, 'duplicate'
+
+    try:
+        buffer = get_enquiry_buffer()
+        if buffer is None:
+            enquiry.save()
+            return enquiry, 'created'
+        buffer.add(enquiry)
+        return enquiry, 'buffered'
+    except Exception:
+        release_submission(keys)
+        raise
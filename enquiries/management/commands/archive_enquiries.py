@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from enquiries.archive import archive_enquiries
+
+
+class Command(BaseCommand):
+    help = "Move old closed enquiries to monthly archive files (see enquiries/archive.py); run nightly"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, help='Default: ENQUIRY_ARCHIVE_AFTER_DAYS')
+
+    def handle(self, *args, **options):
+        run = archive_enquiries(older_than_days=options['older_than_days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {run.archived} enquiry(s) closed and sent before {run.cutoff:%Y-%m-%d} '
+            f'in {run.chunks} chunk(s), into {len(run.files)} file(s).'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from enquiries.ingest import replay_journal
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert enquiries left in the buffer journal by stopped or crashed processes "
+        "(see enquiries/ingest.py); safe to run at any time"
+    )
+
+    def handle(self, *args, **options):
+        replayed = replay_journal()
+        self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} journaled enquiry(s).'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from enquiries.models import ArchivedEnquiry, Enquiry, EnquiryDailyRollup
+from enquiries.rollups import rebuild_enquiry_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily enquiry rollups behind the owner dashboard (see enquiries/rollups.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--institute', type=int, action='append', help='Only this institute id (repeatable)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_enquiry_rollups(Enquiry, EnquiryDailyRollup, options['institute'], ArchivedEnquiry)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} rollup row(s).'))
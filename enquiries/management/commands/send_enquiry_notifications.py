@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from enquiries.notifications import send_due_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Email/SMS institute owners about new enquiries (see enquiries/notifications.py); "
+        "run with --loop as a worker, or every minute from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running, checking every ENQUIRY_NOTIFICATION_INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        interval = getattr(settings, 'ENQUIRY_NOTIFICATION_INTERVAL', 10)
+        while True:
+            run = send_due_notifications()
+            if run.claimed or not options['loop']:
+                self.stdout.write(
+                    f'Notified {run.messages} owner(s) about {run.sent} enquiry(s); {run.failed} to retry.'
+                )
+            if not options['loop']:
+                break
+            close_old_connections()
+            if not run.claimed:
+                time.sleep(interval)
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_course_course_created_id_idx'),
+        ('enquiries', '0001_initial'),
+        ('institutes', '0004_institute_institute_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enquiry',
+            index=models.Index(fields=['created_at', 'id'], name='enquiry_created_id_idx'),
+        ),
+    ]
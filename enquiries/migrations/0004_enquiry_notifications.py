@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+import enquiries.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_existing_notified(apps, schema_editor):
+    # Owners already saw these in the dashboard; don't send them now
+    Enquiry = apps.get_model('enquiries', 'Enquiry')
+    Enquiry.objects.update(notified_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_coursebatch'),
+        ('enquiries', '0003_enquiry_submission_id'),
+        ('institutes', '0009_institute_rating_star_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enquiry',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='enquiry',
+            name='notify_after',
+            field=models.DateTimeField(blank=True, default=enquiries.models.notification_due, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='enquiry',
+            name='notify_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='enquiry',
+            index=models.Index(fields=['notified_at', 'notify_after'], name='enquiry_notify_idx'),
+        ),
+        migrations.RunPython(mark_existing_notified, migrations.RunPython.noop),
+    ]
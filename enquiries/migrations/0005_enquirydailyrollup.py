@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from enquiries.rollups import rebuild_enquiry_rollups
+
+
+def build_rollups(apps, schema_editor):
+    rebuild_enquiry_rollups(apps.get_model('enquiries', 'Enquiry'), apps.get_model('enquiries', 'EnquiryDailyRollup'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_coursebatch'),
+        ('enquiries', '0004_enquiry_notifications'),
+        ('institutes', '0009_institute_rating_star_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnquiryDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('contacted', 'Contacted'), ('closed', 'Closed')], max_length=20)),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.course')),
+                ('institute', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enquiry_rollups', to='institutes.institute')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('institute', 'day', 'status', 'course'), name='enquiry_rollup_key')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enquiries', '0005_enquirydailyrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEnquiry',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('email', models.EmailField(db_index=True, max_length=254)),
+                ('institute_id', models.BigIntegerField()),
+                ('course_id', models.BigIntegerField(blank=True, null=True)),
+                ('user_id', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('archive_file', models.CharField(max_length=100)),
+                ('offset', models.BigIntegerField()),
+                ('length', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name_plural': 'Archived enquiries',
+                'indexes': [models.Index(fields=['institute_id', 'created_at'], name='archived_enquiry_inst_idx')],
+            },
+        ),
+    ]
@@ -1,11 +1,19 @@
 from django.db import models
 
 # Create your models here.
+from datetime import timedelta
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
 from institutes.models import Institute
 from courses.models import Course
 
+def notification_due():
+    """When the owner is told about a new enquiry (see enquiries.notifications)"""
+    return timezone.now() + timedelta(seconds=getattr(settings, 'ENQUIRY_NOTIFICATION_DELAY', 60))
+
+
 class Enquiry(models.Model):
     """Student enquiry model"""
     STATUS_CHOICES = (
@@ -26,11 +34,83 @@ class Enquiry(models.Model):
     message = models.TextField()
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered enquiries (see enquiries.ingest) are
+    # inserted after they were sent and keep the time they were sent
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Set by the API; makes replaying buffered enquiries idempotent
+    submission_id = models.UUIDField(unique=True, null=True, blank=True, editable=False)
+
+    # Owner notification (see enquiries.notifications): sent once notified_at
+    # is set; until then retried from notify_after on
+    notified_at = models.DateTimeField(null=True, blank=True, editable=False)
+    notify_after = models.DateTimeField(null=True, blank=True, default=notification_due, editable=False)
+    notify_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
     
     class Meta:
         verbose_name_plural = "Enquiries"
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (see eduhyd_backend.pagination)
+            models.Index(fields=['created_at', 'id'], name='enquiry_created_id_idx'),
+            # Notifications waiting to be sent
+            models.Index(fields=['notified_at', 'notify_after'], name='enquiry_notify_idx'),
+        ]
     
     def __str__(self):
-        return f"Enquiry from {self.student_name} to {self.institute.name}"
\ No newline at end of file
+        return f"Enquiry from {self.student_name} to {self.institute.name}"
+
+
+class EnquiryDailyRollup(models.Model):
+    """
+    Enquiries per institute, course, status and day (see enquiries.rollups)
+
+    Kept up to date as enquiries are created, change status or are
+    deleted, so the owner dashboard never aggregates the enquiry table.
+    Rows are only ever summed: an enquiry's course being deleted can leave
+    two rows for the same key with course empty.
+    """
+    institute = models.ForeignKey(Institute, on_delete=models.CASCADE, related_name='enquiry_rollups')
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=Enquiry.STATUS_CHOICES)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['institute', 'day', 'status', 'course'], name='enquiry_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.institute_id} {self.day} {self.status}: {self.count}"
+
+
+class ArchivedEnquiry(models.Model):
+    """
+    Where an archived enquiry is stored (see enquiries.archive)
+
+    Closed enquiries past ENQUIRY_ARCHIVE_AFTER_DAYS leave the enquiry
+    table for monthly compressed files; this small row is all that stays in
+    the database. The ids are plain numbers, not foreign keys, so removing
+    an institute or user leaves the archive alone.
+    """
+    id = models.BigIntegerField(primary_key=True)  # the enquiry's id
+    email = models.EmailField(db_index=True)  # lowercased
+    institute_id = models.BigIntegerField()
+    course_id = models.BigIntegerField(null=True, blank=True)
+    user_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    # The gzip member holding the enquiry: a byte range of the archive file
+    archive_file = models.CharField(max_length=100)
+    offset = models.BigIntegerField()
+    length = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name_plural = "Archived enquiries"
+        indexes = [
+            models.Index(fields=['institute_id', 'created_at'], name='archived_enquiry_inst_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived enquiry {self.pk} ({self.archive_file})"
@@ -0,0 +1,214 @@
+"""
+Enquiry notifications to institute owners.
+
+Sending email/SMS inside POST /api/enquiries/ would make the response wait
+for SMTP, so the request only stores the enquiry, with notify_after set
+ENQUIRY_NOTIFICATION_DELAY seconds ahead. The send_enquiry_notifications
+command is the worker (run it with --loop, or every minute from cron):
+
+1. It claims due enquiries (notified_at empty, notify_after passed) by
+   moving their notify_after ENQUIRY_NOTIFICATION_LEASE seconds ahead, so
+   two workers never pick the same ones.
+2. It groups them by institute owner and sends each owner one message:
+   the enquiry itself, or a digest when a burst brought several within
+   the delay.
+3. It sets notified_at on success. On failure the owner's enquiries are
+   retried after ENQUIRY_NOTIFICATION_RETRY seconds, doubling per attempt,
+   and given up after ENQUIRY_NOTIFICATION_MAX_ATTEMPTS attempts.
+
+Delivery is at least once: if one transport fails after another
+succeeded, the retry goes through both again.
+
+Transports (ENQUIRY_NOTIFICATION_TRANSPORTS) are classes with a
+send(owner, subject, body) method. EmailTransport goes through Django's
+EMAIL_BACKEND, so the console and file backends stand in for SMTP locally
+and tests read django.core.mail.outbox. ConsoleSMSTransport logs the text
+it would send until an SMS gateway is wired in.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Enquiry
+
+logger = logging.getLogger(__name__)
+
+# Enquiries listed in one digest; the rest are counted
+DIGEST_MAX_LISTED = 50
+MESSAGE_PREVIEW_CHARS = 300
+SMS_MAX_CHARS = 160
+
+
+def get_setting(name, default):
+    return getattr(settings, f'ENQUIRY_NOTIFICATION_{name}', default)
+
+
+# ========================================
+# Transports
+# ========================================
+class Transport:
+    """Delivers one notification to an owner; raise to have it retried"""
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, owner, subject, body):
+        raise NotImplementedError
+
+
+class EmailTransport(Transport):
+    """Email through EMAIL_BACKEND, one connection per worker pass"""
+
+    connection = None
+
+    def open(self):
+        self.connection = get_connection()
+        self.connection.open()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def send(self, owner, subject, body):
+        if owner.email:
+            EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [owner.email], connection=self.connection).send()
+
+
+class ConsoleSMSTransport(Transport):
+    """Logs the SMS it would send (stand-in for an SMS gateway)"""
+
+    def send(self, owner, subject, body):
+        if owner.phone:
+            logger.info('SMS to %s: %s', owner.phone, subject[:SMS_MAX_CHARS])
+
+
+def get_transports():
+    paths = get_setting('TRANSPORTS', ['enquiries.notifications.EmailTransport'])
+    return [import_string(path)() for path in paths]
+
+
+# ========================================
+# Messages
+# ========================================
+def describe_enquiry(enquiry):
+    course = f' ({enquiry.course.name})' if enquiry.course else ''
+    message = enquiry.message
+    if len(message) > MESSAGE_PREVIEW_CHARS:
+        message = message[:MESSAGE_PREVIEW_CHARS].rstrip() + '...'
+    return (
+        f'{enquiry.student_name} about {enquiry.institute.name}{course}\n'
+        f'Phone: {enquiry.phone}  Email: {enquiry.email}\n'
+        f'Sent: {timezone.localtime(enquiry.created_at):%d %b %Y %H:%M}\n'
+        f'{message}\n'
+    )
+
+
+def render_notification(enquiries):
+    """(subject, body) telling an owner about their new enquiries"""
+    if len(enquiries) == 1:
+        enquiry = enquiries[0]
+        return f'New enquiry from {enquiry.student_name} for {enquiry.institute.name}', describe_enquiry(enquiry)
+
+    listed = enquiries[:DIGEST_MAX_LISTED]
+    body = '\n'.join(describe_enquiry(enquiry) for enquiry in listed)
+    if len(enquiries) > len(listed):
+        body += f'\n...and {len(enquiries) - len(listed)} more. See all enquiries in your dashboard.\n'
+    return f'{len(enquiries)} new enquiries for your institutes', body
+
+
+# ========================================
+# Worker
+# ========================================
+class NotificationRun:
+    """Result of send_due_notifications"""
+
+    def __init__(self):
+        self.claimed = 0    # enquiries picked up
+        self.messages = 0   # owners notified (one message per transport each)
+        self.sent = 0       # enquiries marked notified
+        self.failed = 0     # enquiries scheduled for a retry or given up
+
+
+def claim_due_enquiries(limit):
+    """Ids of up to limit due enquiries, leased to this worker"""
+    now = timezone.now()
+    lease = timedelta(seconds=get_setting('LEASE', 5 * 60))
+    with transaction.atomic():
+        due = (
+            Enquiry.objects.select_for_update(skip_locked=True)
+            .filter(notified_at__isnull=True, notify_after__lte=now, notify_attempts__lt=get_setting('MAX_ATTEMPTS', 6))
+            .order_by('notify_after').values_list('pk', flat=True)
+        )
+        ids = list(due[:limit])
+        Enquiry.objects.filter(pk__in=ids).update(notify_after=now + lease)
+    return ids
+
+
+def _schedule_retries(enquiries, now):
+    """Push failed enquiries back, doubling the wait per attempt"""
+    retry = get_setting('RETRY', 60)
+    by_attempts = {}
+    for enquiry in enquiries:
+        by_attempts.setdefault(enquiry.notify_attempts, []).append(enquiry.pk)
+    for attempts, ids in by_attempts.items():
+        Enquiry.objects.filter(pk__in=ids).update(
+            notify_attempts=F('notify_attempts') + 1,
+            notify_after=now + timedelta(seconds=retry * 2 ** attempts),
+        )
+
+
+def send_due_notifications(transports=None, limit=None):
+    """Notify owners about due enquiries; returns a NotificationRun"""
+    run = NotificationRun()
+    ids = claim_due_enquiries(limit or get_setting('BATCH_SIZE', 500))
+    run.claimed = len(ids)
+    if not ids:
+        return run
+
+    by_owner = {}
+    enquiries = Enquiry.objects.filter(pk__in=ids).select_related('institute__owner', 'course').order_by('created_at', 'pk')
+    for enquiry in enquiries:
+        by_owner.setdefault(enquiry.institute.owner_id, []).append(enquiry)
+
+    transports = get_transports() if transports is None else transports
+    sent, failed = [], []
+    try:
+        for transport in transports:
+            transport.open()
+    except Exception:
+        logger.exception('Could not open the notification transports')
+        failed = [enquiry for owner_enquiries in by_owner.values() for enquiry in owner_enquiries]
+        by_owner = {}
+    try:
+        for owner_enquiries in by_owner.values():
+            owner = owner_enquiries[0].institute.owner
+            subject, body = render_notification(owner_enquiries)
+            try:
+                for transport in transports:
+                    transport.send(owner, subject, body)
+            except Exception:
+                logger.exception('Could not notify %s about %d enquiries', owner, len(owner_enquiries))
+                failed.extend(owner_enquiries)
+            else:
+                sent.extend(enquiry.pk for enquiry in owner_enquiries)
+                run.messages += 1
+    finally:
+        for transport in transports:
+            try:
+                transport.close()
+            except Exception:
+                logger.exception('Could not close %s', transport)
+
+    now = timezone.now()
+    Enquiry.objects.filter(pk__in=sent).update(notified_at=now)
+    _schedule_retries(failed, now)
+    run.sent, run.failed = len(sent), len(failed)
+    return run
@@ -0,0 +1,152 @@
+"""
+Daily enquiry rollups for the owner dashboard.
+
+EnquiryDailyRollup holds the number of enquiries per (institute, course,
+status, day), where day is the local date the enquiry was sent. Every
+change to the enquiry table moves counts between keys:
+
+- saving or deleting an enquiry (signals), including status changes made
+  through the API or the admin form
+- buffered bulk inserts (enquiries_written, see enquiries.ingest)
+- bulk status changes, which must go through set_enquiry_status so the
+  rollups follow (the admin mark_contacted/mark_closed actions do)
+
+The dashboard sums a few hundred rollup rows instead of grouping the
+enquiry table. rebuild_enquiry_rollups recomputes them from scratch (run
+after backfills or imports that bypass the ORM), archived enquiries
+included.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def rollup_key(enquiry):
+    """(institute id, course id, status, day) an enquiry is counted under"""
+    return enquiry.institute_id, enquiry.course_id, enquiry.status, timezone.localdate(enquiry.created_at)
+
+
+def apply_rollup_changes(EnquiryDailyRollup, changes):
+    """
+    Add deltas to rollup rows. changes maps rollup keys to the number of
+    enquiries added (negative when removed). Takes the model as an argument
+    so data migrations can pass their historical version.
+    """
+    changes = {key: delta for key, delta in changes.items() if delta}
+    with transaction.atomic():
+        for (institute_id, course_id, status, day), delta in sorted(changes.items(), key=str):
+            rows = EnquiryDailyRollup.objects.filter(institute_id=institute_id, course_id=course_id, status=status, day=day)
+            if course_id is None:
+                # Deleting a course can leave two rows for a key; move one
+                rows = EnquiryDailyRollup.objects.filter(pk__in=list(rows.values_list('pk', flat=True)[:1]))
+            if rows.update(count=F('count') + delta) or delta < 0:
+                # A missing row for a removal: not built yet, or removed
+                # with its institute
+                continue
+            try:
+                with transaction.atomic():
+                    EnquiryDailyRollup.objects.create(
+                        institute_id=institute_id, course_id=course_id, status=status, day=day, count=delta,
+                    )
+            except IntegrityError:
+                # Created meanwhile by a concurrent request
+                rows.update(count=F('count') + delta)
+
+
+def count_enquiries(enquiries):
+    """{rollup key: number of enquiries} of a queryset, grouped in SQL"""
+    grouped = (
+        enquiries.order_by()
+        .values('institute_id', 'course_id', 'status', day=TruncDate('created_at'))
+        .annotate(total=Count('id'))
+    )
+    return {
+        (row['institute_id'], row['course_id'], row['status'], row['day']): row['total']
+        for row in grouped
+    }
+
+
+def update_rollups(changes):
+    """apply_rollup_changes with the current model"""
+    from .models import EnquiryDailyRollup
+
+    apply_rollup_changes(EnquiryDailyRollup, changes)
+
+
+def set_enquiry_status(enquiries, status):
+    """
+    queryset.update(status=...) that keeps the rollups in step; returns
+    the number of enquiries changed.
+    """
+    with transaction.atomic():
+        changing = enquiries.exclude(status=status).select_for_update()
+        ids = list(changing.values_list('pk', flat=True))
+        if not ids:
+            return 0
+        model = enquiries.model
+        before = count_enquiries(model.objects.filter(pk__in=ids))
+        model.objects.filter(pk__in=ids).update(status=status)
+
+        changes = Counter()
+        for (institute_id, course_id, old_status, day), total in before.items():
+            changes[institute_id, course_id, old_status, day] -= total
+            changes[institute_id, course_id, status, day] += total
+        update_rollups(changes)
+    return len(ids)
+
+
+def rebuild_enquiry_rollups(Enquiry, EnquiryDailyRollup, institute_ids=None, ArchivedEnquiry=None, batch_size=1000):
+    """
+    Recompute rollups from the enquiry table (all institutes, or some);
+    returns the number of rollup rows written. Archived enquiries (see
+    enquiries.archive) are counted as closed when ArchivedEnquiry is given.
+    Takes the models as arguments so data migrations can pass their
+    historical versions.
+    """
+    enquiries = Enquiry.objects.all()
+    rollups = EnquiryDailyRollup.objects.all()
+    archived = ArchivedEnquiry.objects.all() if ArchivedEnquiry is not None else None
+    if institute_ids is not None:
+        institute_ids = list(institute_ids)
+        enquiries = enquiries.filter(institute_id__in=institute_ids)
+        rollups = rollups.filter(institute_id__in=institute_ids)
+        if archived is not None:
+            archived = archived.filter(institute_id__in=institute_ids)
+
+    with transaction.atomic():
+        counts = Counter(count_enquiries(enquiries))
+        if archived is not None:
+            counts.update(_count_archived(EnquiryDailyRollup, archived))
+        rollups.delete()
+        EnquiryDailyRollup.objects.bulk_create(
+            [
+                EnquiryDailyRollup(institute_id=institute_id, course_id=course_id, status=status, day=day, count=total)
+                for (institute_id, course_id, status, day), total in counts.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(counts)
+
+
+def _count_archived(EnquiryDailyRollup, archived):
+    """Rollup counts of archived enquiries whose institute (and course) still exist"""
+    grouped = (
+        archived.order_by().values('institute_id', 'course_id', day=TruncDate('created_at'))
+        .annotate(total=Count('pk'))
+    )
+    rows = list(grouped)
+    Institute = EnquiryDailyRollup._meta.get_field('institute').related_model
+    Course = EnquiryDailyRollup._meta.get_field('course').related_model
+    institutes = set(Institute.objects.filter(pk__in={row['institute_id'] for row in rows}).values_list('pk', flat=True))
+    courses = set(Course.objects.filter(pk__in={row['course_id'] for row in rows}).values_list('pk', flat=True))
+
+    counts = Counter()
+    for row in rows:
+        if row['institute_id'] in institutes:
+            # Like the enquiry table, forget courses deleted since
+            course_id = row['course_id'] if row['course_id'] in courses else None
+            counts[row['institute_id'], course_id, 'closed', row['day']] += row['total']
+    return counts
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from .ingest import enquiry_target
 from .models import Enquiry
 
 class EnquirySerializer(serializers.ModelSerializer):
-    """Enquiry Serializer"""
+    """Enquiry Serializer; only the status can be changed (new enquiries use EnquirySubmitSerializer)"""
     institute_name = serializers.CharField(source='institute.name', read_only=True)
     course_name = serializers.CharField(source='course.name', read_only=True)
     
@@ -13,4 +14,29 @@ class EnquirySerializer(serializers.ModelSerializer):
             'institute', 'institute_name', 'course', 'course_name',
             'message', 'status', 'created_at'
         ]
-        read_only_fields = ['status', 'created_at']
\ No newline at end of file
+        read_only_fields = [
+            'student_name', 'email', 'phone', 'institute', 'course', 'message', 'created_at',
+        ]
+
+class EnquirySubmitSerializer(serializers.Serializer):
+    """
+    Input of POST /api/enquiries/ (see enquiries.ingest)
+
+    A plain Serializer: the institute and course are checked against the
+    cached enquiry targets instead of being fetched as model instances.
+    """
+    student_name = serializers.CharField(max_length=255)
+    email = serializers.EmailField()
+    phone = serializers.CharField(max_length=15)
+    institute = serializers.IntegerField()
+    course = serializers.IntegerField(required=False, allow_null=True)
+    message = serializers.CharField()
+
+    def validate(self, data):
+        target = enquiry_target(data['institute'], data.get('course'))
+        if target is None:
+            if data.get('course'):
+                raise serializers.ValidationError({'course': 'Not an active course of this institute.'})
+            raise serializers.ValidationError({'institute': 'Institute not found.'})
+        data['institute_name'], data['course_name'] = target
+        return data
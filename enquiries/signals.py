@@ -0,0 +1,63 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .ingest import enquiries_written
+from .models import Enquiry
+from .rollups import rollup_key, update_rollups
+
+# Fields an enquiry's rollup key depends on
+ROLLUP_FIELDS = {'institute_id', 'course_id', 'status', 'created_at'}
+
+# Marker for instances loaded with some of those fields deferred
+UNKNOWN = object()
+
+
+# ========================================
+# Daily rollups (see enquiries/rollups.py)
+# ========================================
+@receiver(post_init, sender=Enquiry)
+def remember_rollup_key(sender, instance, **kwargs):
+    """Snapshot the rollup row this enquiry is counted in, so saves can move it"""
+    if not instance.pk:
+        instance._rollup_key = None
+    elif ROLLUP_FIELDS & instance.get_deferred_fields():
+        # Reading deferred fields here would cost a query per row
+        instance._rollup_key = UNKNOWN
+    else:
+        instance._rollup_key = rollup_key(instance)
+
+
+@receiver(pre_save, sender=Enquiry)
+@receiver(pre_delete, sender=Enquiry)
+def load_deferred_rollup_key(sender, instance, **kwargs):
+    """Read the stored key of partially loaded enquiries before it changes"""
+    if instance._rollup_key is UNKNOWN:
+        stored = Enquiry.objects.filter(pk=instance.pk).only('institute', 'course', 'status', 'created_at').first()
+        instance._rollup_key = stored._rollup_key if stored else None
+
+
+@receiver(post_save, sender=Enquiry)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    """Move the enquiry from its old rollup row to its new one"""
+    if raw:
+        return
+    before = instance._rollup_key
+    after = rollup_key(instance)
+    if before != after:
+        changes = Counter({after: 1})
+        if before is not None:
+            changes[before] -= 1
+        update_rollups(changes)
+    instance._rollup_key = after
+
+
+@receiver(post_delete, sender=Enquiry)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    if instance._rollup_key is not None:
+        update_rollups({instance._rollup_key: -1})
+
+
+@receiver(enquiries_written)
+def update_rollups_on_bulk_insert(sender, enquiries, **kwargs):
+    update_rollups(Counter(rollup_key(enquiry) for enquiry in enquiries))
@@ -1,3 +1,438 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from courses.models import Course
+from institutes.testing import create_institute
+from .ingest import EnquiryBuffer, replay_journal, write_enquiries
+from .archive import archive_enquiries, find_archived_enquiries
+from .models import ArchivedEnquiry, Enquiry, EnquiryDailyRollup
+from .notifications import EmailTransport, send_due_notifications
+from .rollups import rebuild_enquiry_rollups, set_enquiry_status
 
-# Create your tests here.
+
+class EnquiryIngestTests(TestCase):
+    """POST /api/enquiries/ validates from cache, drops repeats and can buffer writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = create_institute()
+        cls.course = Course.objects.create(
+            institute=cls.institute, name='Python', slug='python', description='-',
+            duration='3 months', fees=10000,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def payload(self, **changes):
+        data = {
+            'student_name': 'Ravi', 'email': 'ravi@example.com', 'phone': '+91 98480 22338',
+            'institute': self.institute.pk, 'course': self.course.pk, 'message': 'Batch timings?',
+        }
+        data.update(changes)
+        return data
+
+    def test_create_and_drop_repeats(self):
+        response = self.client.post('/api/enquiries/', self.payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['institute_name'], 'Academy')
+        self.assertEqual(response.data['course_name'], 'Python')
+        self.assertIsNotNone(Enquiry.objects.get(pk=response.data['id']).submission_id)
+
+        # Same phone written differently, different email: still a repeat
+        response = self.client.post(
+            '/api/enquiries/', self.payload(email='other@example.com', phone='9848022338'), format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['duplicate'])
+
+        # Another course of the same institute is a new enquiry
+        response = self.client.post('/api/enquiries/', self.payload(course=None), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Enquiry.objects.count(), 2)
+
+    def test_validation_is_cached(self):
+        self.client.post('/api/enquiries/', self.payload(), format='json')
+        # The insert and the rollup update (in a savepoint): the institute
+        # and course come from the cache
+        with self.assertNumQueries(4):
+            response = self.client.post('/api/enquiries/', self.payload(email='x@example.com', phone='1234567890'), format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_rejects_unknown_targets(self):
+        other = Course.objects.create(
+            institute=create_institute('Other', owner=self.institute.owner),
+            name='Java', slug='java', description='-', duration='1 month', fees=1,
+        )
+        response = self.client.post('/api/enquiries/', self.payload(course=other.pk), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('course', response.data)
+        response = self.client.post('/api/enquiries/', self.payload(institute=0, course=None), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Enquiry.objects.exists())
+
+    def test_buffer_flushes_in_batches_and_replays_journal(self):
+        def enquiry(number):
+            return Enquiry(
+                submission_id=uuid.uuid4(), institute=self.institute, student_name=f'Student {number}',
+                email=f's{number}@example.com', phone='1', message='-', created_at=timezone.now(),
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            buffer = EnquiryBuffer(directory, size=3, interval=60)
+            for number in range(4):
+                buffer.add(enquiry(number))
+            # The third add filled the buffer; the fourth waits in the journal
+            self.assertEqual(Enquiry.objects.count(), 3)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+            # A crash: the open segment is replayed by the next process
+            buffer.segment.close()
+            self.assertEqual(replay_journal(directory), 1)
+            self.assertEqual(replay_journal(directory), 0)
+            self.assertEqual(Enquiry.objects.count(), 4)
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_buffer_shares_fsyncs_between_adds(self):
+        def add(number):
+            buffer.add(Enquiry(
+                submission_id=uuid.uuid4(), institute=self.institute, student_name=f'Student {number}',
+                email=f's{number}@example.com', phone='1', message='-', created_at=timezone.now(),
+            ))
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch('os.fsync', wraps=os.fsync) as fsync:
+            buffer = EnquiryBuffer(directory, size=100, interval=60, sync_delay=0.05)
+            threads = [threading.Thread(target=add, args=(number,)) for number in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # Every add returned after an fsync covering its line, but far fewer fsyncs ran
+            self.assertEqual(buffer.synced, 20)
+            self.assertLess(fsync.call_count, 20)
+            with open(buffer.segment_path, encoding='utf-8') as segment:
+                self.assertEqual(len(segment.readlines()), 20)
+            buffer.segment.close()
+
+
+class FailingTransport(EmailTransport):
+    def send(self, owner, subject, body):
+        raise ConnectionError('SMTP is down')
+
+
+class EnquiryNotificationTests(TestCase):
+    """Owners hear about new enquiries from the worker, one digest per burst"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owners = [
+            User.objects.create(username=f'owner-{number}', email=f'owner{number}@example.com', user_type='institute')
+            for number in range(2)
+        ]
+        cls.institutes = [create_institute(f'Academy {number}', owner=cls.owners[number // 2]) for number in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        # Owner 0 gets three enquiries over two institutes, owner 1 one
+        for number, institute in enumerate(self.institutes + self.institutes[:1]):
+            Enquiry.objects.create(
+                institute=institute, student_name=f'Student {number}', email=f's{number}@example.com',
+                phone='1', message='Fees?', notify_after=timezone.now() - timedelta(seconds=1),
+            )
+
+    def test_sends_one_message_per_owner(self):
+        run = send_due_notifications()
+        self.assertEqual((run.claimed, run.messages, run.sent, run.failed), (4, 2, 4, 0))
+        subjects = sorted((message.to[0], message.subject) for message in mail.outbox)
+        self.assertEqual(subjects, [
+            ('owner0@example.com', '3 new enquiries for your institutes'),
+            ('owner1@example.com', 'New enquiry from Student 2 for Academy 2'),
+        ])
+        self.assertFalse(Enquiry.objects.filter(notified_at__isnull=True).exists())
+        self.assertEqual(send_due_notifications().claimed, 0)
+
+    def test_failures_are_retried_later(self):
+        with self.assertLogs('enquiries.notifications', 'ERROR'):
+            run = send_due_notifications(transports=[FailingTransport()])
+        self.assertEqual((run.sent, run.failed), (0, 4))
+        self.assertEqual(set(Enquiry.objects.values_list('notify_attempts', flat=True)), {1})
+        # Not due again until the retry delay passed
+        self.assertEqual(send_due_notifications().claimed, 0)
+
+        Enquiry.objects.update(notify_after=timezone.now())
+        self.assertEqual(send_due_notifications().sent, 4)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_posting_does_not_send(self):
+        response = APIClient().post('/api/enquiries/', {
+            'student_name': 'Ravi', 'email': 'ravi@example.com', 'phone': '9848022338',
+            'institute': self.institutes[0].pk, 'message': 'Hi',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        # Due after ENQUIRY_NOTIFICATION_DELAY, batched with whatever else arrives
+        self.assertGreater(Enquiry.objects.get(pk=response.data['id']).notify_after, timezone.now())
+
+
+class EnquiryRollupTests(TestCase):
+    """Daily rollups follow every enquiry change and feed the owner dashboard"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', user_type='institute')
+        cls.other_owner = User.objects.create(username='other', user_type='institute')
+        cls.institutes = [
+            create_institute(f'Academy {number}', owner=owner)
+            for number, owner in enumerate([cls.owner, cls.owner, cls.other_owner])
+        ]
+        cls.course = Course.objects.create(
+            institute=cls.institutes[0], name='Python', slug='python', description='-',
+            duration='3 months', fees=10000,
+        )
+        yesterday = timezone.now() - timedelta(days=1)
+        for number in range(9):
+            Enquiry.objects.create(
+                institute=cls.institutes[number % 3], course=cls.course if number == 0 else None,
+                student_name=f'Student {number}', email=f's{number}@example.com', phone='1', message='-',
+                created_at=yesterday if number < 4 else timezone.now(),
+            )
+
+    def stored_rollups(self):
+        return sorted(
+            (row.institute_id, row.course_id or 0, row.status, row.day, row.count)
+            for row in EnquiryDailyRollup.objects.exclude(count=0)
+        )
+
+    def assert_rollups_match_enquiries(self):
+        stored = self.stored_rollups()
+        rebuild_enquiry_rollups(Enquiry, EnquiryDailyRollup)
+        self.assertEqual(stored, self.stored_rollups())
+
+    def test_rollups_follow_changes(self):
+        self.assert_rollups_match_enquiries()
+
+        enquiry = Enquiry.objects.defer('status').first()
+        enquiry.status = 'contacted'
+        enquiry.save()
+        self.assert_rollups_match_enquiries()
+
+        self.assertEqual(set_enquiry_status(Enquiry.objects.filter(institute=self.institutes[0]), 'closed'), 3)
+        self.assert_rollups_match_enquiries()
+
+        Enquiry.objects.filter(institute=self.institutes[1]).first().delete()
+        write_enquiries([
+            Enquiry(
+                submission_id=uuid.uuid4(), institute=self.institutes[2], student_name='Bulk',
+                email='bulk@example.com', phone='1', message='-', created_at=timezone.now(),
+            )
+        ])
+        self.assert_rollups_match_enquiries()
+
+    def test_dashboard_reads_only_the_owners_rollups(self):
+        set_enquiry_status(Enquiry.objects.filter(course=self.course), 'contacted')
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        # The user, then one query over the rollups
+        with self.assertNumQueries(1):
+            response = client.get('/api/enquiries/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totals'], {'pending': 5, 'contacted': 1, 'closed': 0, 'total': 6})
+        self.assertEqual([day['total'] for day in response.data['days']], [3, 3])
+        python = next(course for course in response.data['courses'] if course['course'] == self.course.pk)
+        self.assertEqual((python['course_name'], python['contacted']), ('Python', 1))
+
+        response = client.get('/api/enquiries/dashboard/', {'institute': self.institutes[2].pk})
+        self.assertEqual(response.data['totals']['total'], 0)
+        response = client.get('/api/enquiries/dashboard/', {'from': '2026-02-01', 'to': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+
+class EnquiryWriteTests(TestCase):
+    """Only the receiving institute's owner (or staff) changes an enquiry, and only its status"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', user_type='institute')
+        cls.other_owner = User.objects.create(username='other', user_type='institute')
+        cls.student = User.objects.create(username='student')
+        cls.institutes = [
+            create_institute(f'Academy {number}', owner=owner)
+            for number, owner in enumerate([cls.owner, cls.other_owner])
+        ]
+        cls.other_course = Course.objects.create(
+            institute=cls.institutes[1], name='Python', slug='python', description='-',
+            duration='3 months', fees=10000,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.enquiry = Enquiry.objects.create(
+            user=self.student, institute=self.institutes[0], student_name='Student',
+            email='student@example.com', phone='1', message='-',
+        )
+        self.url = f'/api/enquiries/{self.enquiry.pk}/'
+
+    def test_sender_and_other_owners_cannot_change_it(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.patch(self.url, {'status': 'closed'}, format='json').status_code, 403)
+        self.assertEqual(self.client.delete(self.url).status_code, 403)
+
+        # Another institute's owner does not even see it
+        self.client.force_authenticate(self.other_owner)
+        self.assertEqual(self.client.patch(self.url, {'status': 'closed'}, format='json').status_code, 404)
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+
+        self.enquiry.refresh_from_db()
+        self.assertEqual(self.enquiry.status, 'pending')
+
+    def test_owner_changes_only_the_status(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.patch(self.url, {
+            'status': 'contacted', 'institute': self.institutes[1].pk, 'course': self.other_course.pk,
+            'email': 'changed@example.com',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.enquiry.refresh_from_db()
+        self.assertEqual(
+            (self.enquiry.status, self.enquiry.institute_id, self.enquiry.course_id, self.enquiry.email),
+            ('contacted', self.institutes[0].pk, None, 'student@example.com'),
+        )
+        self.assertEqual(
+            list(EnquiryDailyRollup.objects.exclude(count=0).values_list('institute_id', 'status', 'count')),
+            [(self.institutes[0].pk, 'contacted', 1)],
+        )
+        self.assertEqual(self.client.patch(self.url, {'status': 'lost'}, format='json').status_code, 400)
+
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertFalse(EnquiryDailyRollup.objects.exclude(count=0).exists())
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class EnquiryExportTests(TestCase):
+    """Exports stream the user's enquiries in keyset chunks"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', user_type='institute')
+        other = User.objects.create(username='other', user_type='institute')
+        institutes = [
+            create_institute(f'Academy {number}', owner=owner) for number, owner in enumerate([cls.owner, other])
+        ]
+        sent_at = timezone.now()
+        for number in range(6):
+            # Shared timestamps: the id breaks ties between chunks
+            Enquiry.objects.create(
+                institute=institutes[number % 2], student_name=f'Student {number}', email=f's{number}@example.com',
+                phone='1', message='=HYPERLINK("x")' if number == 0 else 'Fees?', created_at=sent_at,
+                status='closed' if number == 4 else 'pending',
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def download(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_has_the_owners_rows_with_names(self):
+        response = self.client.get('/api/enquiries/export/')
+        self.assertEqual(response.status_code, 200)
+        # Three rows in chunks of two; reading starts with the download
+        with self.assertNumQueries(2):
+            rows = list(csv.reader(io.StringIO(self.download(response).decode('utf-8-sig'))))
+        self.assertEqual(rows[0][:5], ['ID', 'Sent at', 'Status', 'Institute', 'Course'])
+        self.assertEqual([row[5] for row in rows[1:]], ['Student 0', 'Student 2', 'Student 4'])
+        self.assertEqual(rows[1][3], 'Academy 0')
+        # Not run as a formula when opened in a spreadsheet
+        self.assertEqual(rows[1][8], "'=HYPERLINK(\"x\")")
+
+    def test_filters_and_xlsx(self):
+        response = self.client.get('/api/enquiries/export/', {'as': 'xlsx', 'status': 'pending', 'to': '2000-01-01'})
+        with zipfile.ZipFile(io.BytesIO(self.download(response))) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 1)  # only the header
+
+        response = self.client.get('/api/enquiries/export/', {'as': 'xlsx', 'status': 'pending'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        with zipfile.ZipFile(io.BytesIO(self.download(response))) as workbook:
+            self.assertIsNone(workbook.testzip())
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 3)
+        self.assertIn('Student 2', sheet)
+        self.assertNotIn('Student 4', sheet)
+
+        self.assertEqual(self.client.get('/api/enquiries/export/', {'from': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/enquiries/export/', {'as': 'pdf'}).status_code, 400)
+
+
+class EnquiryArchiveTests(TestCase):
+    """Old closed enquiries move to monthly files and stay retrievable"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = create_institute()
+        cls.owner = cls.institute.owner
+        now = timezone.now()
+        for number in range(8):
+            Enquiry.objects.create(
+                institute=cls.institute, student_name=f'Student {number}', phone='1', message='Fees?',
+                email='Ravi@Example.com' if number < 2 else f's{number}@example.com',
+                # Two months, 300+ days ago; the last two are recent or still open
+                created_at=now - timedelta(days=300 + 20 * number) if number < 6 else now,
+                status='pending' if number == 5 else 'closed',
+            )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(ENQUIRY_ARCHIVE_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.directory = directory.name
+
+    def test_archive_and_look_up(self):
+        rollups_before = sorted(EnquiryDailyRollup.objects.values_list('day', 'status', 'count'))
+        run = archive_enquiries(chunk_size=2)
+        self.assertEqual((run.archived, run.chunks), (5, 3))
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted(run.files))
+        self.assertEqual(Enquiry.objects.count(), 3)
+        self.assertEqual(ArchivedEnquiry.objects.count(), 5)
+        # Nothing left to archive
+        self.assertEqual(archive_enquiries().archived, 0)
+
+        records = find_archived_enquiries(email='ravi@example.com')
+        self.assertEqual([record['student_name'] for record in records], ['Student 1', 'Student 0'])
+        self.assertEqual(records[0]['institute_name'], 'Academy')
+        self.assertEqual(find_archived_enquiries(enquiry_id=records[0]['id'])[0]['id'], records[0]['id'])
+
+        # The dashboard keeps counting them, rebuilt or not
+        self.assertEqual(sorted(EnquiryDailyRollup.objects.values_list('day', 'status', 'count')), rollups_before)
+        rebuild_enquiry_rollups(Enquiry, EnquiryDailyRollup, ArchivedEnquiry=ArchivedEnquiry)
+        self.assertEqual(sorted(EnquiryDailyRollup.objects.values_list('day', 'status', 'count')), rollups_before)
+
+    def test_api_is_scoped_to_the_owner(self):
+        archive_enquiries()
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get('/api/enquiries/archived/', {'email': 'RAVI@example.com'})
+        self.assertEqual(response.data['count'], 2)
+
+        client.force_authenticate(User.objects.create(username='stranger'))
+        response = client.get('/api/enquiries/archived/', {'email': 'ravi@example.com'})
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(client.get('/api/enquiries/archived/').status_code, 400)
@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import EnquiryViewSet
+
+router = DefaultRouter()
+router.register('enquiries', EnquiryViewSet, basename='enquiry')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
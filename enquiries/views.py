@@ -1,3 +1,214 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+from eduhyd_backend.exports import filter_created_between, get_export_format
+from eduhyd_backend.pagination import CreatedAtCursorPagination
+from eduhyd_backend.permissions import IsOwnerOrStaffOrReadOnly
+from .archive import find_archived_enquiries
+from .exports import export_enquiries
+from .ingest import submit_enquiry
+from .models import ArchivedEnquiry, Enquiry, EnquiryDailyRollup
+from .serializers import EnquirySerializer, EnquirySubmitSerializer
+
+
+# ========================================
+# ENQUIRY VIEWSET
+# ========================================
+class EnquiryViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for Enquiry CRUD operations
+
+    Automatic endpoints created:
+    - GET    /api/enquiries/          -> List enquiries (newest first, cursor paginated)
+    - POST   /api/enquiries/          -> Send an enquiry (anyone, guests included)
+    - GET    /api/enquiries/{id}/     -> Get single enquiry
+    - PUT    /api/enquiries/{id}/     -> Change its status (institute owner, staff)
+    - PATCH  /api/enquiries/{id}/     -> Change its status (institute owner, staff)
+    - DELETE /api/enquiries/{id}/     -> Delete enquiry (institute owner, staff)
+    - GET    /api/enquiries/dashboard/ -> Enquiries per day/status/course (owners)
+    - GET    /api/enquiries/export/    -> Download enquiries as CSV/XLSX
+    - GET    /api/enquiries/archived/  -> Look up archived enquiries by id or email
+
+    Who sees what:
+    - Staff: every enquiry
+    - Institute owners: enquiries sent to their institutes
+    - Students: the enquiries they sent (read only)
+
+    Only the status of a stored enquiry can change; its institute and
+    course were checked when it was sent (see enquiries.ingest).
+
+    Sending an enquiry (see enquiries/ingest.py) answers:
+    - 201 with the stored enquiry
+    - 202 with its submission_id when writes are buffered (ENQUIRY_BUFFER);
+      it is stored within ENQUIRY_FLUSH_INTERVAL seconds
+    - 200 with duplicate=true when the same email or phone already sent one
+      to this institute/course within ENQUIRY_DEDUPE_WINDOW; nothing is stored
+    """
+
+    DASHBOARD_DEFAULT_DAYS = 30
+    DASHBOARD_MAX_DAYS = 366
+
+    serializer_class = EnquirySerializer
+    pagination_class = CreatedAtCursorPagination
+    filterset_fields = ['institute', 'course', 'status']
+    owner_field = 'institute.owner_id'
+
+    def get_permissions(self):
+        if self.action == 'create':
+            return [AllowAny()]
+        return [IsAuthenticated(), IsOwnerOrStaffOrReadOnly()]
+
+    def get_queryset(self):
+        queryset = Enquiry.objects.select_related('institute', 'course')
+        user = self.request.user
+        if user.is_staff:
+            return queryset
+        return queryset.filter(institute__owner=user) | queryset.filter(user=user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = EnquirySubmitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        enquiry, outcome = submit_enquiry(serializer.validated_data, request.user)
+        duplicate = outcome == 'duplicate'
+
+        data = {
+            'id': enquiry.pk,
+            'submission_id': None if duplicate else enquiry.submission_id,
+            'student_name': enquiry.student_name,
+            'email': enquiry.email,
+            'phone': enquiry.phone,
+            'institute': enquiry.institute_id,
+            'institute_name': serializer.validated_data['institute_name'],
+            'course': enquiry.course_id,
+            'course_name': serializer.validated_data['course_name'],
+            'message': enquiry.message,
+            'status': enquiry.status,
+            'created_at': enquiry.created_at,
+            'duplicate': duplicate,
+        }
+        codes = {'created': status.HTTP_201_CREATED, 'buffered': status.HTTP_202_ACCEPTED, 'duplicate': status.HTTP_200_OK}
+        return Response(data, status=codes[outcome])
+
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """
+        Enquiries per day, status and course across the owner's institutes
+
+        Example URLs:
+        - /api/enquiries/dashboard/                       -> Last 30 days
+        - /api/enquiries/dashboard/?from=2026-01-01&to=2026-03-31
+        - /api/enquiries/dashboard/?institute=12          -> One institute
+
+        Staff see every institute. Reads only the daily rollups (see
+        enquiries.rollups), never the enquiry table.
+        """
+        # Step 1: Read the date range
+        today = timezone.localdate()
+        try:
+            end = parse_date(request.query_params['to']) if 'to' in request.query_params else today
+            start = (
+                parse_date(request.query_params['from']) if 'from' in request.query_params
+                else end - timedelta(days=self.DASHBOARD_DEFAULT_DAYS - 1)
+            )
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({'error': 'from and to must be dates (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= (end - start).days < self.DASHBOARD_MAX_DAYS:
+            return Response({
+                'error': f'from must be before to, at most {self.DASHBOARD_MAX_DAYS} days apart'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Step 2: Pick the rollup rows the user may see
+        rollups = EnquiryDailyRollup.objects.filter(day__gte=start, day__lte=end)
+        if not request.user.is_staff:
+            rollups = rollups.filter(institute__owner=request.user)
+        institute = request.query_params.get('institute')
+        if institute:
+            if not institute.isdigit():
+                return Response({'error': 'institute must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+            rollups = rollups.filter(institute_id=institute)
+
+        # Step 3: Sum them per day and per course
+        statuses = [value for value, _ in Enquiry.STATUS_CHOICES]
+
+        def empty_counts():
+            return {**{value: 0 for value in statuses}, 'total': 0}
+
+        totals, days, courses = empty_counts(), {}, {}
+        rows = rollups.values(
+            'day', 'status', 'institute_id', 'institute__name', 'course_id', 'course__name'
+        ).annotate(total=Sum('count'))
+        for row in rows:
+            day = days.setdefault(row['day'], {'day': row['day'], **empty_counts()})
+            course = courses.setdefault((row['institute_id'], row['course_id']), {
+                'institute': row['institute_id'], 'institute_name': row['institute__name'],
+                'course': row['course_id'], 'course_name': row['course__name'], **empty_counts(),
+            })
+            for counts in (totals, day, course):
+                counts[row['status']] += row['total']
+                counts['total'] += row['total']
+
+        return Response({
+            'from': start,
+            'to': end,
+            'totals': totals,
+            'days': [days[day] for day in sorted(days)],
+            'courses': sorted(courses.values(), key=lambda course: -course['total']),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Download the enquiries the user can see, oldest first
+
+        Example URLs:
+        - /api/enquiries/export/                                  -> Everything, as CSV
+        - /api/enquiries/export/?as=xlsx&status=pending           -> Open leads, as Excel
+        - /api/enquiries/export/?institute=12&from=2026-01-01&to=2026-03-31
+
+        Streamed in chunks straight from the database (see
+        eduhyd_backend.exports), however many rows there are.
+        """
+        try:
+            file_format = get_export_format(request.query_params)
+            queryset = filter_created_between(self.filter_queryset(self.get_queryset()), request.query_params)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return export_enquiries(queryset, file_format)
+
+    @action(detail=False, methods=['get'])
+    def archived(self, request):
+        """
+        Old closed enquiries moved out of the enquiry table (see enquiries.archive)
+
+        Example URLs:
+        - /api/enquiries/archived/?id=1234
+        - /api/enquiries/archived/?email=ravi@example.com
+
+        Staff see every archived enquiry, owners those sent to their
+        institutes, students their own.
+        """
+        enquiry_id = request.query_params.get('id')
+        email = request.query_params.get('email')
+        if not enquiry_id and not email:
+            return Response({'error': 'id or email is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if enquiry_id and not enquiry_id.isdigit():
+            return Response({'error': 'id must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        entries = ArchivedEnquiry.objects.all()
+        user = request.user
+        if not user.is_staff:
+            owned = list(user.institues.values_list('pk', flat=True))
+            entries = entries.filter(institute_id__in=owned) | entries.filter(user_id=user.pk)
+        results = find_archived_enquiries(entries, enquiry_id=enquiry_id and int(enquiry_id), email=email)
+        return Response({
+            'count': len(results),
+            'results': results,
+        }, status=status.HTTP_200_OK)
@@ -11,24 +11,137 @@ searchTabs.forEach(tab => {
 });
 
 // Search Form Submission
+const API_BASE_URL = 'http://127.0.0.1:8000/api';
 const searchForm = document.querySelector('.search-form');
+const searchResults = document.querySelector('.search-results');
+
+function escapeHtml(text) {
+  const div = document.createElement('div');
+  div.textContent = text == null ? '' : String(text);
+  return div.innerHTML;
+}
+
+function renderSearchResults(data) {
+  if (!searchResults) return;
+  if (data.results.length === 0) {
+    searchResults.innerHTML = '<p class="search-empty">No institutes or courses found.</p>';
+    return;
+  }
+  searchResults.innerHTML = data.results.map(result => {
+    const subtitle = result.type === 'course'
+      ? `${escapeHtml(result.institute_name)} &middot; ${escapeHtml(result.mode)} &middot; &#8377;${escapeHtml(result.fees)}`
+      : `${escapeHtml(result.area)} &middot; ${escapeHtml(result.category_name || '')}`;
+    return `
+      <div class="search-result">
+        <span class="search-result-type">${result.type === 'course' ? 'Course' : 'Institute'}</span>
+        <strong>${escapeHtml(result.name)}</strong>
+        <small>${subtitle}</small>
+      </div>`;
+  }).join('');
+}
+
 if (searchForm) {
   searchForm.addEventListener('submit', function(e) {
     e.preventDefault();
     
-    const searchQuery = this.querySelector('input[type="text"]').value;
-    const location = this.querySelector('select:nth-of-type(1)').value;
-    const mode = this.querySelector('select:nth-of-type(2)').value;
+    const searchQuery = this.elements.q.value.trim();
+    const location = this.elements.location.value;
+    const mode = this.elements.mode.value;
+    const activeTab = document.querySelector('.search-tab.active');
+    const category = activeTab ? (activeTab.dataset.label || activeTab.textContent.trim()) : '';
     
-    console.log('Search Query:', searchQuery);
-    console.log('Location:', location);
-    console.log('Mode:', mode);
+    if (searchQuery === '') return;
     
-    // Here you would typically send this data to your backend
-    alert(`Searching for: ${searchQuery}\nLocation: ${location}\nMode: ${mode}`);
+    const params = new URLSearchParams({ q: searchQuery, location, mode, category });
+    fetch(`${API_BASE_URL}/search/?${params}`)
+      .then(response => response.json())
+      .then(renderSearchResults)
+      .catch(error => console.error('Search failed:', error));
+  });
+}
+
+// Autocomplete suggestions while typing in the search box
+const searchSuggestions = document.getElementById('search-suggestions');
+let suggestionTimer = null;
+let suggestionRequest = null;
+
+function showSuggestions(data) {
+  searchSuggestions.innerHTML = data.suggestions.map(suggestion =>
+    `<option value="${escapeHtml(suggestion.text)}">${escapeHtml(suggestion.subtitle || suggestion.type)}</option>`
+  ).join('');
+}
+
+if (searchForm && searchSuggestions) {
+  searchForm.elements.q.addEventListener('input', function() {
+    const query = this.value.trim();
+    clearTimeout(suggestionTimer);
+    if (suggestionRequest) suggestionRequest.abort();
+    if (query === '') {
+      searchSuggestions.innerHTML = '';
+      return;
+    }
+    // Wait for a short pause in typing, and drop answers to older keystrokes
+    suggestionTimer = setTimeout(() => {
+      suggestionRequest = new AbortController();
+      const params = new URLSearchParams({ q: query, limit: 8 });
+      fetch(`${API_BASE_URL}/search/autocomplete/?${params}`, { signal: suggestionRequest.signal })
+        .then(response => response.json())
+        .then(showSuggestions)
+        .catch(error => {
+          if (error.name !== 'AbortError') console.error('Loading suggestions failed:', error);
+        });
+    }, 120);
   });
 }
 
+// Facet Counts next to search tabs and dropdown options
+function facetCountMap(options) {
+  const counts = {};
+  options.forEach(option => { counts[option.value.toLowerCase()] = option.count; });
+  return counts;
+}
+
+function showFacetCount(element, counts, anyValue, total) {
+  if (!element.dataset.label) element.dataset.label = element.textContent.trim();
+  const label = element.dataset.label;
+  const count = label === anyValue ? total : (counts[label.toLowerCase()] || 0);
+  element.textContent = `${label} (${count})`;
+}
+
+function refreshFacetCounts() {
+  if (!searchForm) return;
+  const activeTab = document.querySelector('.search-tab.active');
+  const params = new URLSearchParams({
+    location: searchForm.elements.location.value,
+    mode: searchForm.elements.mode.value,
+    category: activeTab ? (activeTab.dataset.label || activeTab.textContent.trim()) : '',
+  });
+  fetch(`${API_BASE_URL}/search/facets/?${params}`)
+    .then(response => response.json())
+    .then(data => {
+      const categories = facetCountMap(data.category);
+      const areas = facetCountMap(data.area);
+      const modes = facetCountMap(data.mode);
+      searchTabs.forEach(tab => showFacetCount(tab, categories, 'All Courses', data.total));
+      Array.from(searchForm.elements.location.options).forEach(option => {
+        option.value = option.dataset.label || option.textContent.trim();
+        showFacetCount(option, areas, 'All Hyderabad', data.total);
+      });
+      Array.from(searchForm.elements.mode.options).forEach(option => {
+        option.value = option.dataset.label || option.textContent.trim();
+        showFacetCount(option, modes, 'All', data.total);
+      });
+    })
+    .catch(error => console.error('Loading facet counts failed:', error));
+}
+
+if (searchForm) {
+  searchForm.elements.location.addEventListener('change', refreshFacetCounts);
+  searchForm.elements.mode.addEventListener('change', refreshFacetCounts);
+  searchTabs.forEach(tab => tab.addEventListener('click', refreshFacetCounts));
+  refreshFacetCounts();
+}
+
 // Smooth Scroll for Navigation Links
 document.querySelectorAll('a[href^="#"]').forEach(anchor => {
   anchor.addEventListener('click', function (e) {
@@ -1,6 +1,15 @@
+from django import forms
 from django.contrib import admin
+from django.db import transaction
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
 from django.utils.html import format_html
-from .models import Category, Institute, InstitutePhoto
+from eduhyd_backend.images import variant_url
+from search.signals import refresh_institutes
+from .documents import invalidate_institute_documents
+from .importer import detect_format, is_running, start_import
+from .models import CatalogImport, Category, Institute, InstitutePhoto, Locality
+from .ranking import update_ranking_scores
 
 # Inline for Institute Photos
 class InstitutePhotoInline(admin.TabularInline):
@@ -18,6 +27,14 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('name',)}
     list_per_page = 20
 
+@admin.register(Locality)
+class LocalityAdmin(admin.ModelAdmin):
+    """Gazetteer of locality centroids used to estimate institute coordinates"""
+    list_display = ['area', 'city', 'pincode', 'latitude', 'longitude']
+    list_filter = ['city']
+    search_fields = ['area', 'pincode']
+    list_per_page = 50
+
 @admin.register(Institute)
 class InstituteAdmin(admin.ModelAdmin):
     """Institute Admin"""
@@ -45,7 +62,7 @@ class InstituteAdmin(admin.ModelAdmin):
     
     ordering = ['-created_at']
     
-    readonly_fields = ['created_at', 'updated_at', 'get_average_rating', 'get_total_reviews']
+    readonly_fields = ['created_at', 'updated_at', 'coordinates_estimated', 'get_average_rating', 'get_total_reviews']
     
     inlines = [InstitutePhotoInline]
     
@@ -57,7 +74,8 @@ class InstituteAdmin(admin.ModelAdmin):
             'fields': ('email', 'phone', 'website')
         }),
         ('Location', {
-            'fields': ('address', 'area', 'city', 'pincode', 'latitude', 'longitude')
+            'fields': ('address', 'area', 'city', 'pincode', 'latitude', 'longitude', 'coordinates_estimated'),
+            'description': 'Leave latitude/longitude empty to estimate them from the pincode and area.'
         }),
         ('Other Info', {
             'fields': ('established_year', 'status', 'is_featured')
@@ -80,7 +98,7 @@ class InstituteAdmin(admin.ModelAdmin):
     get_owner_name.admin_order_field = 'owner__username'
     
     def get_average_rating(self, obj):
-        avg = obj.average_rating()
+        avg = obj.rating_avg
         if avg > 0:
             stars = '⭐' * int(avg)
             return f"{stars} {avg:.1f}"
@@ -88,27 +106,36 @@ class InstituteAdmin(admin.ModelAdmin):
     get_average_rating.short_description = 'Average Rating'
     
     def get_total_reviews(self, obj):
-        count = obj.total_reviews()
+        count = obj.rating_count
         return f"{count} review{'s' if count != 1 else ''}"
     get_total_reviews.short_description = 'Total Reviews'
     
+    def _bulk_update(self, queryset, **changes):
+        """queryset.update() sends no signals, so refresh caches and search here"""
+        institute_ids = list(queryset.values_list('pk', flat=True))
+        updated = queryset.update(**changes)
+        invalidate_institute_documents(institute_ids)
+        refresh_institutes(institute_ids)
+        update_ranking_scores(institute_ids)
+        return updated
+    
     def approve_institutes(self, request, queryset):
-        updated = queryset.update(status='active')
+        updated = self._bulk_update(queryset, status='active')
         self.message_user(request, f'{updated} institute(s) approved successfully.', 'success')
     approve_institutes.short_description = "✅ Approve selected institutes"
     
     def block_institutes(self, request, queryset):
-        updated = queryset.update(status='blocked')
+        updated = self._bulk_update(queryset, status='blocked')
         self.message_user(request, f'{updated} institute(s) blocked.', 'warning')
     block_institutes.short_description = "🚫 Block selected institutes"
     
     def make_featured(self, request, queryset):
-        updated = queryset.update(is_featured=True)
+        updated = self._bulk_update(queryset, is_featured=True)
         self.message_user(request, f'{updated} institute(s) marked as featured.', 'success')
     make_featured.short_description = "⭐ Mark as featured"
     
     def remove_featured(self, request, queryset):
-        updated = queryset.update(is_featured=False)
+        updated = self._bulk_update(queryset, is_featured=False)
         self.message_user(request, f'{updated} institute(s) removed from featured.', 'info')
     remove_featured.short_description = "Remove from featured"
 
@@ -120,36 +147,133 @@ class InstitutePhotoAdmin(admin.ModelAdmin):
     
     list_filter = ['uploaded_at']
     
-    search_fields = ['institute__name', 'caption']
+    search_fields = ['Institute__name', 'caption']
     
     readonly_fields = ['uploaded_at', 'get_photo_preview']
     
     list_per_page = 30
     
+    list_select_related = ['Institute']
+    
     ordering = ['-uploaded_at']
     
     def get_institute_name(self, obj):
         """Display institute name"""
-        return obj.institute.name
+        return obj.Institute.name
     get_institute_name.short_description = 'Institute'
-    get_institute_name.admin_order_field = 'institute__name'
+    get_institute_name.admin_order_field = 'Institute__name'
     
     def get_photo_thumbnail(self, obj):
-        """Show small image thumbnail in list view"""
+        """Show small image thumbnail in list view (pre-sized, not the full upload)"""
         if obj.photo:
             return format_html(
                 '<img src="{}" width="50" height="50" style="object-fit: cover; border-radius: 5px; border: 1px solid #ddd;" />',
-                obj.photo.url
+                variant_url(obj, 'photo', 'photo_variants', 'thumb')
             )
         return "No Image"
     get_photo_thumbnail.short_description = 'Preview'
     
     def get_photo_preview(self, obj):
-        """Show full size image preview in detail view"""
+        """Show a large image preview in detail view"""
         if obj.photo:
             return format_html(
                 '<div style="margin: 10px 0;"><img src="{}" style="max-width: 500px; max-height: 500px; border-radius: 10px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);" /></div>',
-                obj.photo.url
+                variant_url(obj, 'photo', 'photo_variants', 'medium')
             )
         return "No Image"
-    get_photo_preview.short_description = 'Photo Preview'
\ No newline at end of file
+    get_photo_preview.short_description = 'Photo Preview'
+
+
+class CatalogImportForm(forms.ModelForm):
+    """Upload form: a CSV or JSONL file is required"""
+
+    class Meta:
+        model = CatalogImport
+        fields = ['kind', 'file', 'default_owner']
+
+    def clean_file(self):
+        upload = self.cleaned_data.get('file')
+        if not upload:
+            raise forms.ValidationError('Choose a CSV or JSONL file to import.')
+        try:
+            detect_format(upload.name)
+        except ValueError as error:
+            raise forms.ValidationError(str(error))
+        return upload
+
+@admin.register(CatalogImport)
+class CatalogImportAdmin(admin.ModelAdmin):
+    """Bulk imports: upload a file here and it is imported in the background"""
+    
+    form = CatalogImportForm
+    
+    list_display = [
+        'id', 'kind', 'file_name', 'status', 'rows_processed',
+        'created_count', 'updated_count', 'error_count', 'get_error_report', 'created_at'
+    ]
+    
+    list_filter = ['kind', 'status', 'created_at']
+    
+    list_select_related = ['created_by']
+    
+    readonly_fields = [
+        'status', 'rows_processed', 'created_count', 'updated_count', 'error_count',
+        'get_error_report', 'message', 'created_by', 'created_at', 'finished_at'
+    ]
+    
+    ordering = ['-created_at']
+    
+    actions = ['resume_imports']
+    
+    def get_fields(self, request, obj=None):
+        if obj is None:
+            return ['kind', 'file', 'default_owner']
+        return ['kind', 'file_name', *self.readonly_fields]
+    
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return []
+        return ['kind', 'file_name', *self.readonly_fields]
+    
+    def save_model(self, request, obj, form, change):
+        if not change:
+            obj.created_by = request.user
+        super().save_model(request, obj, form, change)
+        if not change:
+            transaction.on_commit(lambda: start_import(obj.pk))
+            self.message_user(request, f'{obj} started. Refresh this page to follow its progress.', 'success')
+    
+    def get_error_report(self, obj):
+        if not obj.error_report:
+            return "-"
+        url = reverse('admin:institutes_catalogimport_error_report', args=[obj.pk])
+        return format_html('<a href="{}">Download ({} errors)</a>', url, obj.error_count)
+    get_error_report.short_description = 'Error Report'
+    
+    def get_urls(self):
+        urls = [
+            path(
+                '<int:pk>/error-report/',
+                self.admin_site.admin_view(self.error_report_view),
+                name='institutes_catalogimport_error_report',
+            ),
+        ]
+        return urls + super().get_urls()
+    
+    def error_report_view(self, request, pk):
+        """Error reports are outside MEDIA_ROOT, so they are served through the admin"""
+        job = CatalogImport.objects.filter(pk=pk).first()
+        if job is None or not job.error_report or not self.has_view_permission(request, job):
+            raise Http404
+        return FileResponse(
+            job.error_report.open('rb'), as_attachment=True,
+            filename=f'import-{job.pk}-errors.csv',
+        )
+    
+    def resume_imports(self, request, queryset):
+        started = 0
+        for job in queryset.exclude(status='done'):
+            if not is_running(job.pk) and start_import(job.pk):
+                started += 1
+        self.message_user(request, f'{started} import(s) resumed.', 'success')
+    resume_imports.short_description = "▶️ Resume selected imports"
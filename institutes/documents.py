@@ -0,0 +1,109 @@
+"""
+Cache of rendered API documents for institutes (and, via courses.documents,
+courses).
+
+Each object's serialized JSON is cached under a key made of the document
+type, its version and the object id, so a list page is assembled from one
+cache multi-get plus a single query for whatever is missing. Bump a
+document's version whenever its serializer output changes shape.
+
+Entries are deleted precisely by the signals in institutes.signals and
+courses.signals when the object, its photos, its category, its owner or
+its review aggregates change. Those run inside the writing transaction,
+where a concurrent reader could still render and cache the old row, so
+every invalidation is repeated once the transaction commits.
+
+Only plain JSON values are stored, so any cache backend (local memory,
+file based, ...) works. Documents are rendered without a request, so
+media URLs are stored as paths and made absolute for each request
+(pass it to get/get_many).
+"""
+import json
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+from eduhyd_backend.images import absolute_media_urls, media_url_keys
+from .models import Institute
+from .serializers import InstituteDetailSerializer, InstituteListSerializer
+
+
+class DocumentCache:
+    """Rendered documents of one type, keyed by object id and version"""
+
+    def __init__(self, name, version, queryset, serializer_class):
+        self.name = name
+        self.version = version
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+
+    def key(self, pk):
+        return f'doc:{self.name}:v{self.version}:{pk}'
+
+    def get_many(self, pks, request=None):
+        """
+        Documents for pks, in the same order; ids that no longer exist are
+        skipped. Media URLs are absolute when the request is given.
+        """
+        keys = {self.key(pk): pk for pk in pks}
+        documents = {keys[key]: document for key, document in cache.get_many(keys).items()}
+
+        missing = [pk for pk in pks if pk not in documents]
+        if missing:
+            rendered = self.render(missing)
+            cache.set_many(
+                {self.key(pk): document for pk, document in rendered.items()},
+                getattr(settings, 'DOCUMENT_CACHE_TIMEOUT', 24 * 60 * 60),
+            )
+            documents.update(rendered)
+
+        documents = [documents[pk] for pk in pks if pk in documents]
+        if request is not None:
+            documents = absolute_media_urls(documents, request, self.media_keys)
+        return documents
+
+    def get(self, pk, request=None):
+        documents = self.get_many([pk], request)
+        return documents[0] if documents else None
+
+    @cached_property
+    def media_keys(self):
+        return media_url_keys(self.serializer_class())
+
+    def render(self, pks):
+        """{pk: document} serialized fresh from the database"""
+        objects = self.queryset.all().filter(pk__in=pks)
+        serializer = self.serializer_class(objects, many=True)
+        # Round-trip through JSON so only plain values reach the cache
+        return {
+            document['id']: document
+            for document in json.loads(json.dumps(serializer.data, cls=JSONEncoder))
+        }
+
+    def invalidate(self, pks):
+        """Drop the documents now and again after commit (see the module docstring)"""
+        keys = [self.key(pk) for pk in pks]
+        if not keys:
+            return
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+institute_list_documents = DocumentCache(
+    'institute-list', 2,
+    Institute.objects.select_related('category', 'owner'),
+    InstituteListSerializer,
+)
+institute_detail_documents = DocumentCache(
+    'institute-detail', 3,
+    Institute.objects.select_related('category', 'owner').prefetch_related('photos'),
+    InstituteDetailSerializer,
+)
+
+
+def invalidate_institute_documents(institute_ids):
+    institute_ids = list(institute_ids)
+    institute_list_documents.invalidate(institute_ids)
+    institute_detail_documents.invalidate(institute_ids)
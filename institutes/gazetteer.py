@@ -0,0 +1,156 @@
+"""
+Offline gazetteer: approximate coordinates for a pincode and area.
+
+The Locality table holds centroid coordinates of localities (Hyderabad
+first), loaded from the bundled data/localities.csv by a data migration
+and the load_localities command. Institutes without coordinates get an
+estimate from it when saved, and fill_institute_coordinates backfills the
+existing rows.
+
+Lookups never touch the network or the database: the table is read once
+per process into dictionaries, and reloaded after a Locality changes.
+An address is matched by, in order,
+
+  1. its pincode and area together,
+  2. its area within its city (or anywhere, if the name is unique),
+  3. its pincode alone (the centre of that pincode's localities).
+"""
+import csv
+import re
+import threading
+from collections import defaultdict
+from decimal import Decimal
+from pathlib import Path
+
+from django.apps import apps
+
+DATA_FILE = Path(__file__).resolve().parent / 'data' / 'localities.csv'
+
+COORDINATE_PLACES = Decimal('0.000001')
+
+
+def normalize(name):
+    """Comparison key for area and city names: "S.R. Nagar" -> "srnagar" """
+    return re.sub(r'[^a-z0-9]', '', (name or '').lower())
+
+
+class Gazetteer:
+    """In-memory pincode/area -> (latitude, longitude) lookup"""
+
+    def __init__(self, rows):
+        """rows: (pincode, area, city, latitude, longitude) tuples"""
+        self.by_pincode_area = {}
+        self.by_city_area = {}
+        self.by_area = {}
+        area_cities = defaultdict(set)
+        pincode_points = defaultdict(list)
+
+        for pincode, area, city, latitude, longitude in rows:
+            point = (Decimal(latitude), Decimal(longitude))
+            pincode, area, city = (pincode or '').strip(), normalize(area), normalize(city)
+            if area:
+                self.by_pincode_area[(pincode, area)] = point
+                self.by_city_area[(city, area)] = point
+                self.by_area[area] = point
+                area_cities[area].add(city)
+            pincode_points[pincode].append((area, point))
+
+        # An area name found in several cities is only matched together with its city
+        for area, cities in area_cities.items():
+            if len(cities) > 1:
+                del self.by_area[area]
+
+        self.by_pincode = {}
+        for pincode, points in pincode_points.items():
+            whole = [point for area, point in points if not area]
+            if whole:
+                self.by_pincode[pincode] = whole[0]
+            else:
+                latitudes = [latitude for _, (latitude, longitude) in points]
+                longitudes = [longitude for _, (latitude, longitude) in points]
+                self.by_pincode[pincode] = (
+                    (sum(latitudes) / len(points)).quantize(COORDINATE_PLACES),
+                    (sum(longitudes) / len(points)).quantize(COORDINATE_PLACES),
+                )
+
+    def __len__(self):
+        return len(self.by_pincode_area) + len(self.by_pincode)
+
+    def locate(self, pincode=None, area=None, city=None):
+        """(latitude, longitude) as Decimals for an address, or None"""
+        pincode = (pincode or '').strip()
+        area = normalize(area)
+        if pincode and area and (pincode, area) in self.by_pincode_area:
+            return self.by_pincode_area[(pincode, area)]
+        if area:
+            point = self.by_city_area.get((normalize(city), area)) or self.by_area.get(area)
+            if point:
+                return point
+        if pincode:
+            return self.by_pincode.get(pincode)
+        return None
+
+
+_gazetteer = None
+_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """The process-wide gazetteer, read from the Locality table on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                Locality = apps.get_model('institutes', 'Locality')
+                _gazetteer = Gazetteer(Locality.objects.values_list(
+                    'pincode', 'area', 'city', 'latitude', 'longitude'
+                ))
+    return _gazetteer
+
+
+def reset_gazetteer():
+    """Forget the loaded gazetteer, so the next lookup reads the table again"""
+    global _gazetteer
+    _gazetteer = None
+
+
+def locate(pincode=None, area=None, city=None):
+    return get_gazetteer().locate(pincode, area, city)
+
+
+def read_data_file(path=DATA_FILE):
+    """Rows of a localities CSV (pincode, area, city, latitude, longitude)"""
+    with open(path, newline='', encoding='utf-8') as data:
+        for row in csv.DictReader(data):
+            yield {
+                'pincode': row['pincode'].strip(),
+                'area': row.get('area', '').strip(),
+                'city': row.get('city', '').strip() or 'Hyderabad',
+                'latitude': Decimal(row['latitude']),
+                'longitude': Decimal(row['longitude']),
+            }
+
+
+def load_localities(Locality, path=DATA_FILE):
+    """
+    Add or update Locality rows from a data file; returns (created, updated).
+
+    Takes the model as an argument so data migrations can pass their
+    historical version.
+    """
+    existing = {
+        (locality.pincode, locality.area, locality.city): locality
+        for locality in Locality.objects.all()
+    }
+    created, updated = [], []
+    for row in read_data_file(path):
+        locality = existing.get((row['pincode'], row['area'], row['city']))
+        if locality is None:
+            created.append(Locality(**row))
+        elif (locality.latitude, locality.longitude) != (row['latitude'], row['longitude']):
+            locality.latitude, locality.longitude = row['latitude'], row['longitude']
+            updated.append(locality)
+    Locality.objects.bulk_create(created, batch_size=500)
+    Locality.objects.bulk_update(updated, ['latitude', 'longitude'], batch_size=500)
+    reset_gazetteer()
+    return len(created), len(updated)
@@ -0,0 +1,176 @@
+"""
+Geohash helpers for the "institutes near me" search.
+
+Every institute with coordinates stores its geohash in an indexed column.
+A proximity query turns the search circle into a handful of geohash
+prefixes (the cells covering its bounding box), so the database only
+returns rows from a small area via index range scans. The exact distance
+check is then done in Python with the haversine formula.
+"""
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+# Precision of the geohash stored on Institute (cells of roughly 5m x 5m)
+STORED_PRECISION = 9
+
+# Upper bound on the number of prefix ranges a single search may use
+MAX_COVERING_CELLS = 24
+
+# Radius the k-nearest search starts from before widening
+INITIAL_NEAREST_RADIUS_KM = 0.5
+MAX_EARTH_DISTANCE_KM = 20040
+
+
+def encode(latitude, longitude, precision=STORED_PRECISION):
+    """Encode a coordinate pair into a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash bits alternate, starting with longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = bits * 2 + 1
+                lon_range[0] = mid
+            else:
+                bits = bits * 2
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = bits * 2 + 1
+                lat_range[0] = mid
+            else:
+                bits = bits * 2
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def cell_size_degrees(precision):
+    """(height, width) of a geohash cell in degrees at a given precision"""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def covering_prefixes(latitude, longitude, radius_km):
+    """
+    Geohash prefixes whose cells together cover the search circle.
+
+    Picks the finest precision at which the circle's bounding box spans at
+    most MAX_COVERING_CELLS cells, then walks the box one cell at a time.
+    """
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+
+    for precision in range(STORED_PRECISION, 0, -1):
+        height, width = cell_size_degrees(precision)
+        rows = int(2 * d_lat / height) + 2
+        columns = int(2 * d_lon / width) + 2
+        if rows * columns <= MAX_COVERING_CELLS:
+            break
+
+    south, north = max(latitude - d_lat, -90.0), min(latitude + d_lat, 90.0)
+    west, east = longitude - d_lon, longitude + d_lon
+    if east - west >= 360:
+        west, east = -180.0, 180.0
+
+    cells = set()
+    for lat in _steps(south, north, height):
+        for lon in _steps(west, east, width):
+            lon = (lon + 180) % 360 - 180  # wrap around the antimeridian
+            cells.add(encode(min(lat, 90.0), min(lon, 180.0), precision))
+    return sorted(cells)
+
+
+def _steps(start, stop, step):
+    """start, start + step, ... and finally stop itself"""
+    value = start
+    while value < stop:
+        yield value
+        value += step
+    yield stop
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _candidates(queryset, prefixes):
+    """
+    (id, latitude, longitude) of rows whose geohash starts with any prefix.
+
+    Written as range conditions rather than startswith, because SQLite's
+    case-insensitive LIKE cannot use the index.
+    """
+    condition = Q()
+    for prefix in prefixes:
+        # '~' sorts after every base32 character
+        condition |= Q(geohash__gte=prefix, geohash__lt=prefix + '~')
+    return queryset.filter(condition).values_list('id', 'latitude', 'longitude')
+
+
+def _with_distances(rows, latitude, longitude):
+    return [
+        (haversine_km(latitude, longitude, float(lat), float(lon)), pk)
+        for pk, lat, lon in rows
+    ]
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """
+    Sorted [(distance_km, id)] of rows within radius_km of the point.
+
+    One indexed query over the cells covering the circle's bounding box (at
+    most MAX_COVERING_CELLS prefix ranges, see covering_prefixes), then an
+    exact haversine check on that (small) candidate set.
+    """
+    rows = _candidates(queryset, covering_prefixes(latitude, longitude, radius_km))
+    matches = [
+        match for match in _with_distances(rows, latitude, longitude)
+        if match[0] <= radius_km
+    ]
+    matches.sort()
+    return matches
+
+
+def nearest(queryset, latitude, longitude, k, max_radius_km=None):
+    """
+    Sorted [(distance_km, id)] of the k rows closest to the point.
+
+    Searches a small circle first and doubles the radius until it holds k
+    rows; every row within a searched radius is found, so those k are the
+    true nearest ones.
+    """
+    radius_km = INITIAL_NEAREST_RADIUS_KM
+    while True:
+        if max_radius_km is not None:
+            radius_km = min(radius_km, max_radius_km)
+        matches = within_radius(queryset, latitude, longitude, radius_km)
+        if len(matches) >= k or radius_km >= (max_radius_km or MAX_EARTH_DISTANCE_KM):
+            return matches[:k]
+        radius_km *= 2
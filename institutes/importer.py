@@ -0,0 +1,817 @@
+"""
+Bulk import of institutes, courses and photos from CSV or JSONL files.
+
+Files are read one line at a time and written in batches of
+IMPORT_BATCH_SIZE rows, so memory use stays flat whatever the file size.
+For every batch the importer
+
+  1. looks up everything the rows refer to (existing records, owners,
+     categories, institutes) with a few IN queries,
+  2. validates each row with the model's own field validators,
+  3. gives new records a unique slug (Institute slugs are unique overall,
+     Course slugs per institute),
+  4. writes the batch with bulk_create / bulk_update and saves the file
+     position on the CatalogImport in the same transaction.
+
+A row whose slug already exists updates that record with the values it
+has (empty cells leave a field unchanged); a row without a slug always
+creates a new record. Rows that fail go to a CSV error report with their
+row number and the reason, and the import carries on. A batch's failed
+rows are appended once the batch has committed, so a resumed import never
+reports a row twice.
+
+Columns
+    institutes: name, slug, description, email, phone, website, address,
+                area, city, pincode, latitude, longitude, category (slug or
+                name), owner (username or email), established_year, status,
+                is_featured, logo (path in media storage)
+    courses:    institute (slug), name, slug, description, category,
+                duration, fees, mode, batch_timings, syllabus, is_active
+    photos:     institute (slug), photo (path in media storage), caption
+
+bulk_create() and bulk_update() send no model signals, so the document
+cache, search index and image variants are refreshed after each batch.
+"""
+import bisect
+import copy
+import csv
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.text import slugify
+from accounts.models import User
+from courses.batches import replace_parsed_batches
+from courses.documents import course_documents
+from courses.durations import parse_duration_days
+from courses.models import Course, CourseBatch
+from eduhyd_backend.images import get_executor, process_image
+from search.signals import refresh_institutes
+from .documents import institute_detail_documents, invalidate_institute_documents
+from .models import CatalogImport, Category, Institute, InstitutePhoto
+from .ranking import update_ranking_scores
+
+logger = logging.getLogger(__name__)
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+# Conditions per slug lookup query (SQLite limits expression depth)
+SLUG_QUERY_CHUNK = 100
+
+# Institute slug -> id entries remembered between course/photo batches
+INSTITUTE_ID_CACHE_SIZE = 50000
+
+# Slug bases whose highest number is remembered between batches
+SLUG_CACHE_SIZE = 100000
+
+ERROR_REPORT_COLUMNS = ['row', 'error', 'data']
+
+
+class RowError(Exception):
+    """A row that cannot be imported; the message goes to the error report"""
+
+
+def detect_format(name):
+    """'csv' or 'jsonl' from a file name"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    raise ValueError(f'Unsupported file type "{extension}", use .csv or .jsonl')
+
+
+# ========================================
+# Reading records
+# ========================================
+class LineReader:
+    """Lines of a binary file from a byte offset, tracking where the next one starts"""
+
+    def __init__(self, binary, position=0):
+        binary.seek(position)
+        self.binary = binary
+        self.position = position
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.binary.readline()
+        if not line:
+            raise StopIteration
+        start = self.position
+        self.position += len(line)
+        try:
+            text = line.decode('utf-8')
+        except UnicodeDecodeError:
+            raise ValueError(f'Line at byte {start} is not valid UTF-8')
+        return text.lstrip('﻿') if start == 0 else text
+
+
+class RecordReader:
+    """
+    Dict records of a CSV or JSONL file, starting at a byte position.
+
+    After each record, position is the offset just past it (csv.reader
+    only pulls the lines a record needs, so this holds for multi-line
+    CSV values too). Unreadable records are yielded as RowError instances.
+    """
+
+    def __init__(self, binary, file_format, position=0, header=None):
+        self.lines = LineReader(binary, position)
+        self.file_format = file_format
+        self.header = header
+
+    @property
+    def position(self):
+        return self.lines.position
+
+    def __iter__(self):
+        if self.file_format == 'csv':
+            return self._csv_records()
+        return self._jsonl_records()
+
+    def _csv_records(self):
+        reader = csv.reader(self.lines)
+        if self.header is None:
+            self.header = [column.strip().lower() for column in next(reader, [])]
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            if len(values) > len(self.header):
+                yield RowError(f'{len(values)} values but only {len(self.header)} columns')
+                continue
+            yield _clean_record(zip(self.header, values))
+
+    def _jsonl_records(self):
+        for line in self.lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield RowError(f'Invalid JSON: {error}')
+                continue
+            if not isinstance(record, dict):
+                yield RowError('Expected a JSON object')
+                continue
+            yield _clean_record(record.items())
+
+
+def _clean_record(items):
+    """Lowercase keys, strip strings and drop empty values"""
+    record = {}
+    for key, value in items:
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            continue
+        record[str(key).strip().lower()] = value
+    return record
+
+
+# ========================================
+# Value conversion
+# ========================================
+def _text(value, column):
+    return str(value)
+
+
+def _decimal(value, column):
+    try:
+        return Decimal(str(value).replace(',', ''))
+    except InvalidOperation:
+        raise RowError(f'{column}: "{value}" is not a number')
+
+
+def _coordinate(value, column):
+    # Model fields keep 6 decimal places (about 10cm)
+    try:
+        return _decimal(value, column).quantize(Decimal('0.000001'))
+    except InvalidOperation:
+        raise RowError(f'{column}: "{value}" is not a coordinate')
+
+
+def _integer(value, column):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise RowError(f'{column}: "{value}" is not a whole number')
+
+
+def _boolean(value, column):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise RowError(f'{column}: "{value}" is not yes/no')
+
+
+def _validation_message(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(
+            f'{field}: {" ".join(messages)}' for field, messages in error.message_dict.items()
+        )
+    return ' '.join(error.messages)
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ========================================
+# Row handling per kind
+# ========================================
+class RowHandler:
+    """
+    How one kind of row becomes a model instance.
+
+    Subclasses list the plain columns they copy and implement prepare()
+    (batch lookups) and apply() (set relations on one instance).
+    """
+
+    model = None
+    columns = {}          # column -> converter
+    relation_fields = []  # foreign keys resolved in apply(), skipped by clean_fields
+    slug_scope = None     # field a generated slug must be unique within (None: global)
+
+    def __init__(self, job):
+        self.job = job
+        self.existing = {}
+
+    def prepare(self, records):
+        """Fetch whatever the batch refers to; called once per batch"""
+        self.existing = {}
+
+    def key(self, record):
+        """Natural key of the record an input row targets, or None for a new one"""
+        return None
+
+    def apply(self, obj, record):
+        """Set relations on obj from the row; raise RowError if one cannot be resolved"""
+
+    def build(self, record, staged):
+        """
+        Instance for a row: a copy of the staged or existing record it
+        updates, or a new one. Only the columns the row has are set.
+        Returns (key, obj, changed field names).
+        """
+        key = self.key(record)
+        target = staged.get(key) if key is not None else None
+        if target is None and key is not None:
+            target = self.existing.get(key)
+        obj = copy.copy(target) if target is not None else self.model()
+
+        changed = set()
+        for column, convert in self.columns.items():
+            if column in record:
+                setattr(obj, column, convert(record[column], column))
+                changed.add(column)
+        changed |= self.apply(obj, record) or set()
+
+        exclude = list(self.relation_fields)
+        if 'slug' in self.columns and not obj.slug:
+            exclude.append('slug')  # generated once the batch is validated
+        try:
+            obj.clean_fields(exclude=exclude)
+        except ValidationError as error:
+            raise RowError(_validation_message(error))
+        return key, obj, changed
+
+    def key_of(self, obj):
+        """Natural key of a built instance (once it has a slug)"""
+        return None
+
+    def fill_ids(self, created):
+        """Set pks after bulk_create on databases that do not return them (MySQL)"""
+
+    def after_batch(self, created, updated):
+        """Refresh caches, search and image variants for the written rows"""
+
+
+class InstituteRows(RowHandler):
+    model = Institute
+    columns = {
+        'name': _text, 'slug': _text, 'description': _text, 'email': _text,
+        'phone': _text, 'website': _text, 'address': _text, 'area': _text,
+        'city': _text, 'pincode': _text, 'latitude': _coordinate, 'longitude': _coordinate,
+        'established_year': _integer, 'status': _text, 'is_featured': _boolean,
+        'logo': _text,
+    }
+    relation_fields = ['owner', 'category']
+
+    def __init__(self, job):
+        super().__init__(job)
+        # Categories are few: match on slug or name without further queries
+        self.categories = {}
+        for pk, slug, name in Category.objects.values_list('pk', 'slug', 'name'):
+            self.categories[slug.lower()] = pk
+            self.categories.setdefault(name.strip().lower(), pk)
+
+    def prepare(self, records):
+        slugs = {str(record['slug']) for record in records if 'slug' in record}
+        self.existing = Institute.objects.in_bulk(slugs, field_name='slug') if slugs else {}
+
+        names = {str(record['owner']) for record in records if 'owner' in record}
+        self.owners = {}
+        if names:
+            users = User.objects.filter(Q(username__in=names) | Q(email__in=names))
+            for pk, username, email in users.values_list('pk', 'username', 'email'):
+                self.owners[username] = pk
+                if email:
+                    self.owners.setdefault(email, pk)
+
+    def key(self, record):
+        return str(record['slug']) if 'slug' in record else None
+
+    def key_of(self, obj):
+        return obj.slug
+
+    def apply(self, institute, record):
+        changed = set()
+        if 'owner' in record:
+            owner_id = self.owners.get(str(record['owner']))
+            if owner_id is None:
+                raise RowError(f'owner: no user "{record["owner"]}"')
+            institute.owner_id = owner_id
+            changed.add('owner')
+        elif institute.owner_id is None:
+            if self.job.default_owner_id is None:
+                raise RowError('owner: required (no default owner set for this import)')
+            institute.owner_id = self.job.default_owner_id
+            changed.add('owner')
+
+        if 'category' in record:
+            category_id = self.categories.get(str(record['category']).lower())
+            if category_id is None:
+                raise RowError(f'category: no category "{record["category"]}"')
+            institute.category_id = category_id
+            changed.add('category')
+
+        if 'logo' in record and not default_storage.exists(institute.logo.name):
+            raise RowError(f'logo: no file "{institute.logo.name}" in media storage')
+
+        # Institute.save() is skipped by bulk writes
+        if institute.pk is None or institute.LOCATION_FIELDS & record.keys():
+            institute.fill_coordinates()
+            institute.geohash = institute.compute_geohash()
+            changed |= {'latitude', 'longitude', 'coordinates_estimated', 'geohash'}
+        return changed
+
+    def fill_ids(self, created):
+        ids = dict(Institute.objects.filter(
+            slug__in=[institute.slug for institute in created]
+        ).values_list('slug', 'pk'))
+        for institute in created:
+            institute.pk = ids.get(institute.slug)
+
+    def after_batch(self, created, updated):
+        institute_ids = [institute.pk for institute in created + updated]
+        invalidate_institute_documents(institute.pk for institute in updated)
+        # Course documents show the institute name
+        course_documents.invalidate(
+            Course.objects.filter(institute__in=[institute.pk for institute in updated])
+            .values_list('pk', flat=True)
+        )
+        refresh_institutes(institute_ids)
+        update_ranking_scores([pk for pk in institute_ids if pk])
+        for institute in created + updated:
+            if institute.logo and (institute.logo_variants or {}).get('source') != institute.logo.name:
+                get_executor().submit(
+                    process_image, 'institutes.Institute', institute.pk, 'logo', 'logo_variants'
+                )
+
+
+class InstituteReferenceMixin:
+    """Resolves an 'institute' column (slug) to an id, remembering recent lookups"""
+
+    institute_field = 'institute'
+
+    def lookup_institutes(self, records):
+        if not hasattr(self, 'institute_ids'):
+            self.institute_ids = {}
+        slugs = {str(record['institute']) for record in records if 'institute' in record}
+        missing = slugs - self.institute_ids.keys()
+        if len(self.institute_ids) + len(missing) > INSTITUTE_ID_CACHE_SIZE:
+            self.institute_ids = {}
+            missing = slugs
+        if missing:
+            self.institute_ids.update(
+                Institute.objects.filter(slug__in=missing).values_list('slug', 'pk')
+            )
+
+    def resolve_institute(self, obj, record):
+        field = f'{self.institute_field}_id'
+        if 'institute' in record:
+            institute_id = self.institute_ids.get(str(record['institute']))
+            if institute_id is None:
+                raise RowError(f'institute: no institute with slug "{record["institute"]}"')
+            setattr(obj, field, institute_id)
+            return {self.institute_field}
+        if getattr(obj, field) is None:
+            raise RowError('institute: required')
+        return set()
+
+
+class CourseRows(InstituteReferenceMixin, RowHandler):
+    model = Course
+    columns = {
+        'name': _text, 'slug': _text, 'description': _text, 'category': _text,
+        'duration': _text, 'fees': _decimal, 'mode': _text, 'batch_timings': _text,
+        'syllabus': _text, 'is_active': _boolean,
+    }
+    relation_fields = ['institute']
+    slug_scope = 'institute_id'
+
+    def prepare(self, records):
+        self.lookup_institutes(records)
+        self.existing = {}
+        keys = {self.key(record) for record in records}
+        keys.discard(None)
+        if keys:
+            courses = Course.objects.filter(
+                institute_id__in={institute_id for institute_id, _ in keys},
+                slug__in={slug for _, slug in keys},
+            )
+            for course in courses:
+                self.existing[(course.institute_id, course.slug)] = course
+
+    def key(self, record):
+        if 'slug' not in record or 'institute' not in record:
+            return None
+        institute_id = self.institute_ids.get(str(record['institute']))
+        return (institute_id, str(record['slug'])) if institute_id else None
+
+    def key_of(self, course):
+        return (course.institute_id, course.slug)
+
+    def apply(self, course, record):
+        changed = self.resolve_institute(course, record)
+        if 'duration' in record:
+            # Course.save() is skipped by bulk writes
+            course.duration_days = parse_duration_days(course.duration)
+            changed.add('duration_days')
+        return changed
+
+    def fill_ids(self, created):
+        ids = {}
+        rows = Course.objects.filter(
+            institute_id__in={course.institute_id for course in created},
+            slug__in={course.slug for course in created},
+        ).values_list('institute_id', 'slug', 'pk')
+        for institute_id, slug, pk in rows:
+            ids[(institute_id, slug)] = pk
+        for course in created:
+            course.pk = ids.get((course.institute_id, course.slug))
+
+    def after_batch(self, created, updated):
+        # Post-save signals do not run for bulk writes, so parse batches here
+        reparse = [course for course in created if course.pk]
+        reparse += [course for course in updated if course.batch_timings_changed()]
+        replace_parsed_batches(CourseBatch, [(course.pk, course.batch_timings) for course in reparse])
+        course_documents.invalidate(course.pk for course in updated)
+        # Institute search documents list the modes their courses run in
+        refresh_institutes({course.institute_id for course in created + updated})
+
+
+class PhotoRows(InstituteReferenceMixin, RowHandler):
+    model = InstitutePhoto
+    columns = {'photo': _text, 'caption': _text}
+    relation_fields = ['Institute']
+    institute_field = 'Institute'
+
+    def prepare(self, records):
+        self.lookup_institutes(records)
+
+    def apply(self, photo, record):
+        changed = self.resolve_institute(photo, record)
+        if not photo.photo:
+            raise RowError('photo: required')
+        if not default_storage.exists(photo.photo.name):
+            raise RowError(f'photo: no file "{photo.photo.name}" in media storage')
+        return changed
+
+    def fill_ids(self, created):
+        # No natural key: take the newest row for each (institute, file)
+        ids = {}
+        rows = InstitutePhoto.objects.filter(
+            Institute_id__in={photo.Institute_id for photo in created},
+            photo__in={photo.photo.name for photo in created},
+        ).order_by('pk').values_list('Institute_id', 'photo', 'pk')
+        for institute_id, name, pk in rows:
+            ids[(institute_id, name)] = pk
+        for photo in created:
+            photo.pk = ids.get((photo.Institute_id, photo.photo.name))
+
+    def after_batch(self, created, updated):
+        institute_detail_documents.invalidate({photo.Institute_id for photo in created})
+        for photo in created:
+            get_executor().submit(
+                process_image, 'institutes.InstitutePhoto', photo.pk, 'photo', 'photo_variants'
+            )
+
+
+ROW_HANDLERS = {
+    'institutes': InstituteRows,
+    'courses': CourseRows,
+    'photos': PhotoRows,
+}
+
+
+# ========================================
+# Unique slugs
+# ========================================
+def assign_slugs(objs, model, scope_field, reserved, known=None):
+    """
+    Give each instance without a slug a unique one made from its name:
+    "abc-academy", then "abc-academy-2", "abc-academy-3", ...
+
+    reserved holds (scope, slug) pairs already claimed by this batch.
+    known maps (scope, base) to the highest number handed out for that
+    base so far (1 for the bare base); it is updated here, and bases in it
+    are not looked up in the database again.
+    """
+    known = {} if known is None else known
+    max_length = model._meta.get_field('slug').max_length
+    groups = defaultdict(list)
+    for obj in objs:
+        # Room for a "-<number>" suffix
+        base = slugify(obj.name)[:max_length - 7].strip('-') or model._meta.model_name
+        scope = getattr(obj, scope_field) if scope_field else None
+        groups[(scope, base)].append(obj)
+
+    taken = _taken_slugs(model, scope_field, [key for key in groups if key not in known])
+    for scope, slug in reserved:
+        taken[scope].add(slug)
+    taken = {scope: sorted(slugs) for scope, slugs in taken.items()}
+
+    for (scope, base), group in groups.items():
+        highest = known.get((scope, base), 0)
+        slugs = taken.get(scope, [])
+        start = bisect.bisect_left(slugs, base)
+        for slug in slugs[start:bisect.bisect_left(slugs, base + '.')]:
+            if slug == base:
+                highest = max(highest, 1)
+            else:
+                suffix = slug[len(base) + 1:]
+                if suffix.isdigit():
+                    highest = max(highest, int(suffix))
+        for obj in group:
+            highest += 1
+            obj.slug = base if highest == 1 else f'{base}-{highest}'
+        known[(scope, base)] = highest
+
+
+def _taken_slugs(model, scope_field, keys):
+    """{scope: slugs in the database equal to a base or starting with "<base>-"}"""
+    taken = defaultdict(set)
+    columns = [scope_field, 'slug'] if scope_field else ['slug']
+
+    def scoped(scope, **conditions):
+        if scope_field:
+            conditions[scope_field] = scope
+        return Q(**conditions)
+
+    def fetch(condition):
+        for row in model.objects.filter(condition).values_list(*columns):
+            scope, slug = row if scope_field else (None, row[0])
+            taken[scope].add(slug)
+
+    # Step 1: Which bases exist at all (usually few)
+    for chunk in _chunks(keys, SLUG_QUERY_CHUNK):
+        condition = Q()
+        for scope, base in chunk:
+            condition |= scoped(scope, slug=base)
+        fetch(condition)
+
+    # Step 2: Numbered variants of those, as index range scans ('.' sorts right after '-')
+    clashing = [(scope, base) for scope, base in keys if base in taken[scope]]
+    for chunk in _chunks(clashing, SLUG_QUERY_CHUNK):
+        condition = Q()
+        for scope, base in chunk:
+            condition |= scoped(scope, slug__gte=base + '-', slug__lt=base + '.')
+        fetch(condition)
+    return taken
+
+
+# ========================================
+# Running an import
+# ========================================
+class CatalogImporter:
+    """Runs (or resumes) one CatalogImport, a batch at a time"""
+
+    def __init__(self, job, batch_size=None, on_batch=None):
+        self.job = job
+        self.batch_size = batch_size or getattr(settings, 'IMPORT_BATCH_SIZE', 1000)
+        self.on_batch = on_batch
+        self.rows = ROW_HANDLERS[job.kind](job)
+        self.slug_numbers = {}
+
+    def run(self):
+        job = self.job
+        job.status = 'running'
+        job.message = ''
+        job.save(update_fields=['status', 'message'])
+        try:
+            with self.open_source() as binary:
+                reader = RecordReader(binary, detect_format(job.file_name), job.position, job.header)
+                batch = []
+                for record in reader:
+                    batch.append(record)
+                    if len(batch) >= self.batch_size:
+                        self.import_batch(batch, reader)
+                        batch = []
+                self.import_batch(batch, reader)
+        except Exception as error:
+            job.status = 'failed'
+            job.message = str(error)
+            job.save(update_fields=['status', 'message'])
+            raise
+
+        job.status = 'done'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at'])
+        return job
+
+    def open_source(self):
+        if self.job.file:
+            return self.job.file.open('rb')
+        return open(self.job.source, 'rb')
+
+    def import_batch(self, records, reader):
+        """Validate, write and commit one batch together with the new file position"""
+        job = self.job
+        first_row = job.rows_processed + 1
+        errors = []
+
+        # Step 1: Look up everything the batch refers to
+        self.rows.prepare([record for record in records if isinstance(record, dict)])
+
+        # Step 2: Build and validate an instance per row
+        staged = {}  # natural key (or row number) -> instance
+        row_of = {}  # id(instance) -> row number
+        fields = set()
+        for number, record in enumerate(records, start=first_row):
+            if isinstance(record, RowError):
+                errors.append((number, str(record), ''))
+                continue
+            try:
+                key, obj, changed = self.rows.build(record, staged)
+            except RowError as error:
+                errors.append((number, str(error), json.dumps(record, default=str)))
+                continue
+            staged[key if key is not None else ('row', number)] = obj
+            row_of[id(obj)] = number
+            if obj.pk is not None:
+                fields |= changed
+
+        created = [obj for obj in staged.values() if obj.pk is None]
+        updated = [obj for obj in staged.values() if obj.pk is not None]
+
+        # Step 3: Unique slugs for new records
+        if 'slug' in self.rows.columns:
+            reserved = {
+                (getattr(obj, self.rows.slug_scope) if self.rows.slug_scope else None, obj.slug)
+                for obj in created if obj.slug
+            }
+            if len(self.slug_numbers) > SLUG_CACHE_SIZE:
+                self.slug_numbers = {}
+            assign_slugs(
+                [obj for obj in created if not obj.slug],
+                self.rows.model, self.rows.slug_scope, reserved, self.slug_numbers,
+            )
+
+        # Step 4: Write, together with the progress
+        now = timezone.now()
+        if updated and hasattr(self.rows.model, 'updated_at'):
+            for obj in updated:
+                obj.updated_at = now  # auto_now is not applied by bulk_update
+            fields.add('updated_at')
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    self.save(created, updated, fields)
+            except IntegrityError:
+                # Someone else took a slug meanwhile, or similar: save row by row
+                created, updated = self.save_one_by_one(created, updated, fields, row_of, errors)
+
+            if created and created[0].pk is None:
+                self.rows.fill_ids(created)
+
+            job.position = reader.position
+            job.header = reader.header
+            job.rows_processed += len(records)
+            job.created_count += len(created)
+            job.updated_count += len(updated)
+            job.error_count += len(errors)
+            CatalogImport.objects.filter(pk=job.pk).update(
+                position=job.position,
+                header=job.header,
+                rows_processed=F('rows_processed') + len(records),
+                created_count=F('created_count') + len(created),
+                updated_count=F('updated_count') + len(updated),
+                error_count=F('error_count') + len(errors),
+            )
+
+        # Only once the batch is committed: a batch that rolls back is read
+        # again on resume and would otherwise report its errors twice
+        self.write_errors(errors)
+        if created or updated:
+            self.rows.after_batch(created, updated)
+        if self.on_batch is not None:
+            self.on_batch(job)
+
+    def save(self, created, updated, fields):
+        model = self.rows.model
+        if created:
+            model.objects.bulk_create(created, batch_size=500)
+        if updated and fields:
+            model.objects.bulk_update(updated, sorted(fields), batch_size=500)
+
+    def save_one_by_one(self, created, updated, fields, row_of, errors):
+        saved_created, saved_updated = [], []
+        for obj in created:
+            obj.pk = None  # may have been set by the rolled back bulk insert
+            obj._state.adding = True
+        for obj in created + updated:
+            is_new = obj.pk is None
+            try:
+                with transaction.atomic():
+                    self.save([obj] if is_new else [], [] if is_new else [obj], fields)
+            except IntegrityError as error:
+                if is_new:
+                    obj.pk = None
+                errors.append((row_of[id(obj)], f'Could not be saved: {error}', ''))
+                continue
+            (saved_created if is_new else saved_updated).append(obj)
+        return saved_created, saved_updated
+
+    def write_errors(self, errors):
+        """Append failed rows to the import's CSV error report"""
+        if not errors:
+            return
+        job = self.job
+        if not job.error_report:
+            name = job.error_report.storage.save(
+                f'reports/import-{job.pk}-errors.csv',
+                ContentFile(','.join(ERROR_REPORT_COLUMNS) + '\r\n'),
+            )
+            job.error_report.name = name
+            CatalogImport.objects.filter(pk=job.pk).update(error_report=name)
+        with job.error_report.storage.open(job.error_report.name, 'a') as report:
+            csv.writer(report).writerows(errors)
+
+
+def run_import(job, batch_size=None, on_batch=None):
+    """Run or resume an import in the current thread; returns the finished job"""
+    return CatalogImporter(job, batch_size, on_batch).run()
+
+
+# ========================================
+# Imports started from the admin
+# ========================================
+_running = set()
+_running_lock = threading.Lock()
+
+
+def is_running(job_id):
+    """Whether this process is currently working on the import"""
+    return job_id in _running
+
+
+def start_import(job_id):
+    """Run an import on a background thread, so the upload request returns at once"""
+    with _running_lock:
+        if job_id in _running:
+            return False
+        _running.add(job_id)
+    threading.Thread(target=_run_in_background, args=(job_id,), daemon=True).start()
+    return True
+
+
+def _run_in_background(job_id):
+    try:
+        run_import(CatalogImport.objects.get(pk=job_id))
+    except Exception:
+        logger.exception('Catalog import #%s failed', job_id)
+    finally:
+        with _running_lock:
+            _running.discard(job_id)
+        close_old_connections()
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from institutes.documents import invalidate_institute_documents
+from institutes.gazetteer import get_gazetteer
+from institutes.models import Institute
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Estimate missing institute coordinates from their pincode and area (see institutes.gazetteer)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh', action='store_true',
+                            help='Also look up coordinates that were estimated before')
+
+    def handle(self, *args, **options):
+        gazetteer = get_gazetteer()
+        missing = Q(latitude__isnull=True) | Q(longitude__isnull=True)
+        if options['refresh']:
+            missing |= Q(coordinates_estimated=True)
+        rows = (
+            Institute.objects.filter(missing).order_by('pk')
+            .values_list('pk', 'pincode', 'area', 'city', 'latitude', 'longitude')
+        )
+
+        filled, saved, not_found = [], 0, 0
+        for pk, pincode, area, city, latitude, longitude in rows.iterator(chunk_size=BATCH_SIZE):
+            location = gazetteer.locate(pincode, area, city)
+            if location is None:
+                not_found += 1
+                continue
+            if location == (latitude, longitude):
+                continue
+            institute = Institute(pk=pk, latitude=location[0], longitude=location[1],
+                                  coordinates_estimated=True)
+            institute.geohash = institute.compute_geohash()
+            filled.append(institute)
+            if len(filled) >= BATCH_SIZE:
+                saved += self.save(filled)
+                filled = []
+        saved += self.save(filled)
+
+        self.stdout.write(self.style.SUCCESS(f'Filled in coordinates for {saved} institute(s).'))
+        if not_found:
+            self.stdout.write(self.style.WARNING(
+                f'{not_found} institute(s) have a pincode/area that is not in the gazetteer.'
+            ))
+
+    def save(self, institutes):
+        if not institutes:
+            return 0
+        with transaction.atomic():
+            Institute.objects.bulk_update(
+                institutes, ['latitude', 'longitude', 'coordinates_estimated', 'geohash']
+            )
+        invalidate_institute_documents(institute.pk for institute in institutes)
+        return len(institutes)
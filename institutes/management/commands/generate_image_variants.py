@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from accounts.models import User
+from eduhyd_backend.images import process_image
+from institutes.models import Institute, InstitutePhoto
+
+# (model, image field, variants field)
+TARGETS = [
+    (Institute, 'logo', 'logo_variants'),
+    (InstitutePhoto, 'photo', 'photo_variants'),
+    (User, 'profile_picture', 'profile_picture_variants'),
+]
+
+
+class Command(BaseCommand):
+    help = "Generate the pre-sized WebP/JPEG variants of existing logos, photos and profile pictures"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate variants that already exist')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Images processed in parallel (default: 4)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = 0
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            for model, field_name, variants_field in TARGETS:
+                pks = self.pending(model, field_name, variants_field, options['force'])
+                label = model._meta.label
+                results = executor.map(
+                    lambda pk: process_image(label, pk, field_name, variants_field), pks
+                )
+                done = sum(1 for result in results if result)
+                total += done
+                self.stdout.write(f'{label}.{field_name}: {done}/{len(pks)} image(s) processed')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {total} image(s) in {elapsed:.1f}s.'
+        ))
+
+    def pending(self, model, field_name, variants_field, force):
+        """pks of rows with an image whose variants are missing or out of date"""
+        rows = (
+            model.objects.exclude(**{field_name: ''})
+            .exclude(**{f'{field_name}__isnull': True})
+            .values_list('pk', field_name, variants_field)
+        )
+        return [
+            pk for pk, name, variants in rows.iterator()
+            if force or (variants or {}).get('source') != name
+        ]
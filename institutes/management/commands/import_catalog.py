@@ -0,0 +1,80 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import User
+from institutes.importer import detect_format, run_import
+from institutes.models import CatalogImport
+
+
+class Command(BaseCommand):
+    help = (
+        "Import institutes, courses or photos from a CSV or JSONL file "
+        "(see institutes/importer.py for the columns). Progress is saved after "
+        "every batch; resume an interrupted import with --resume <id>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help='CSV or JSONL file to import')
+        parser.add_argument('--kind', choices=[kind for kind, _ in CatalogImport.KIND_CHOICES],
+                            help='What the file contains')
+        parser.add_argument('--owner', help='Username or email of the owner for institutes without an owner column')
+        parser.add_argument('--resume', type=int, metavar='ID', help='Continue an earlier import from where it stopped')
+        parser.add_argument('--batch-size', type=int, help='Rows per transaction (default: IMPORT_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        job = self.get_job(options)
+        self.stdout.write(f'{job}: reading {job.file_name} from row {job.rows_processed + 1}')
+        started = time.monotonic()
+        first_row = job.rows_processed
+
+        def on_batch(job):
+            elapsed = time.monotonic() - started
+            rate = (job.rows_processed - first_row) / elapsed if elapsed else 0
+            self.stdout.write(
+                f'  {job.rows_processed} rows: {job.created_count} created, '
+                f'{job.updated_count} updated, {job.error_count} errors ({rate:.0f} rows/s)'
+            )
+
+        try:
+            run_import(job, options['batch_size'], on_batch)
+        except Exception as error:
+            raise CommandError(f'{job} stopped: {error}. Fix the problem and rerun with --resume {job.pk}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{job} finished in {time.monotonic() - started:.1f}s: {job.created_count} created, '
+            f'{job.updated_count} updated, {job.error_count} errors.'
+        ))
+        if job.error_count:
+            self.stdout.write(self.style.WARNING(f'Error report: {job.error_report.path}'))
+
+    def get_job(self, options):
+        if options['resume']:
+            try:
+                job = CatalogImport.objects.get(pk=options['resume'])
+            except CatalogImport.DoesNotExist:
+                raise CommandError(f'No import with id {options["resume"]}')
+            if job.status == 'done':
+                raise CommandError(f'{job} has already finished')
+            return job
+
+        path, kind = options['path'], options['kind']
+        if not path or not kind:
+            raise CommandError('Give a file and --kind, or --resume <id>')
+        if not os.path.isfile(path):
+            raise CommandError(f'No such file: {path}')
+        try:
+            detect_format(path)
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        default_owner = None
+        if options['owner']:
+            default_owner = User.objects.filter(username=options['owner']).first() or \
+                User.objects.filter(email=options['owner']).first()
+            if default_owner is None:
+                raise CommandError(f'No user "{options["owner"]}"')
+
+        return CatalogImport.objects.create(
+            kind=kind, source=os.path.abspath(path), default_owner=default_owner,
+        )
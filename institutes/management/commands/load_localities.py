@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from institutes.gazetteer import DATA_FILE, load_localities
+from institutes.models import Locality
+
+
+class Command(BaseCommand):
+    help = "Load locality centroids (pincode, area, city, latitude, longitude) into the gazetteer table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DATA_FILE),
+            help='CSV file to load (default: the bundled institutes/data/localities.csv)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            created, updated = load_localities(Locality, options['path'])
+        except (OSError, KeyError, ArithmeticError) as error:
+            raise CommandError(f'Could not load {options["path"]}: {error!r}')
+        self.stdout.write(self.style.SUCCESS(f'{created} locality(ies) added, {updated} updated.'))
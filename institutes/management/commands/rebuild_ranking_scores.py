@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+from institutes.ranking import update_ranking_scores
+
+
+class Command(BaseCommand):
+    help = "Recompute the top rated ranking_score of institutes (see institutes/ranking.py); run daily"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'institute_ids', nargs='*', type=int,
+            help='Only rescore these institutes (default: all, which also refreshes the site-wide mean)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        changed = update_ranking_scores(options['institute_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the ranking score of {changed} institute(s) in {time.monotonic() - started:.1f}s.'
+        ))
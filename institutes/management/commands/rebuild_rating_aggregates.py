@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from institutes.models import Institute
+
+
+class Command(BaseCommand):
+    help = "Rebuild the stored rating aggregates and star counts of institutes from their reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'institute_ids', nargs='*', type=int,
+            help='Only rebuild these institutes (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        institute_ids = options['institute_ids'] or None
+        refreshed = Institute.refresh_rating_aggregates(institute_ids)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {refreshed} institute(s).'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:55
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    Institute = apps.get_model('institutes', 'Institute')
+    approved = Q(reviews__is_approved=True)
+    totals = Institute.objects.order_by().annotate(
+        approved_sum=Sum('reviews__rating', filter=approved),
+        approved_count=Count('reviews', filter=approved),
+    ).filter(approved_count__gt=0)
+    for institute in totals.iterator():
+        rating_sum = institute.approved_sum or 0
+        Institute.objects.filter(pk=institute.pk).update(
+            rating_sum=rating_sum,
+            rating_count=institute.approved_count,
+            rating_avg=rating_sum / institute.approved_count,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0001_initial'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='institute',
+            name='rating_avg',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='institute',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='institute',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
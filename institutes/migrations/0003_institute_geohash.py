@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+from institutes import geo
+
+
+def populate_geohash(apps, schema_editor):
+    Institute = apps.get_model('institutes', 'Institute')
+    located = Institute.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for pk, latitude, longitude in located.values_list('pk', 'latitude', 'longitude').iterator():
+        Institute.objects.filter(pk=pk).update(
+            geohash=geo.encode(float(latitude), float(longitude))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0002_institute_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='institute',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(populate_geohash, migrations.RunPython.noop),
+    ]
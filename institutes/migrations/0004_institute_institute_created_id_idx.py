@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0003_institute_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='institute',
+            index=models.Index(fields=['created_at', 'id'], name='institute_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:12
+
+import django.db.models.deletion
+import institutes.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0005_institute_logo_variants_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('institutes', 'Institutes'), ('courses', 'Courses'), ('photos', 'Institute Photos')], max_length=20)),
+                ('file', models.FileField(blank=True, help_text='CSV (with a header row) or JSONL (one object per line)', storage=institutes.models.import_storage, upload_to='uploads/')),
+                ('source', models.CharField(blank=True, help_text='Local path, for imports started from the command line', max_length=500)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('header', models.JSONField(blank=True, editable=False, null=True)),
+                ('position', models.PositiveBigIntegerField(default=0, editable=False)),
+                ('rows_processed', models.PositiveIntegerField(default=0, editable=False)),
+                ('created_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('updated_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('error_count', models.PositiveIntegerField(default=0, editable=False)),
+                ('error_report', models.FileField(blank=True, editable=False, storage=institutes.models.import_storage, upload_to='reports/')),
+                ('message', models.TextField(blank=True, editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('default_owner', models.ForeignKey(blank=True, help_text='Owner of imported institutes without an owner column', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
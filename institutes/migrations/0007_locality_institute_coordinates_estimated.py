@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+from django.db import migrations, models
+
+from institutes import gazetteer
+
+
+def load_bundled_localities(apps, schema_editor):
+    gazetteer.load_localities(apps.get_model('institutes', 'Locality'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0006_catalogimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='institute',
+            name='coordinates_estimated',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='Locality',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pincode', models.CharField(db_index=True, max_length=6)),
+                ('area', models.CharField(blank=True, help_text='Leave empty for the centre of the whole pincode', max_length=100)),
+                ('city', models.CharField(default='Hyderabad', max_length=100)),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+            ],
+            options={
+                'verbose_name_plural': 'Localities',
+                'ordering': ['city', 'area'],
+                'unique_together': {('pincode', 'area', 'city')},
+            },
+        ),
+        migrations.RunPython(load_bundled_localities, migrations.RunPython.noop),
+    ]
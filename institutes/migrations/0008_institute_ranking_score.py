@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+from institutes.ranking import compute_ranking_scores
+
+
+def populate_ranking_scores(apps, schema_editor):
+    compute_ranking_scores(
+        apps.get_model('institutes', 'Institute'),
+        apps.get_model('reviews', 'Review'),
+        apps.get_model('enquiries', 'Enquiry'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enquiries', '0002_enquiry_enquiry_created_id_idx'),
+        ('institutes', '0007_locality_institute_coordinates_estimated'),
+        ('reviews', '0003_review_moderation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='institute',
+            name='ranking_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='institute',
+            index=models.Index(fields=['status', '-ranking_score'], name='institute_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='institute',
+            index=models.Index(fields=['category', 'status', '-ranking_score'], name='institute_category_rank_idx'),
+        ),
+        migrations.RunPython(populate_ranking_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:55
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_star_counts(apps, schema_editor):
+    Institute = apps.get_model('institutes', 'Institute')
+    approved = Q(reviews__is_approved=True)
+    counts = Institute.objects.order_by().annotate(**{
+        f'approved_{stars}': Count('reviews', filter=approved & Q(reviews__rating=stars))
+        for stars in range(1, 6)
+    }).filter(rating_count__gt=0)
+    fields = [f'rating_{stars}_count' for stars in range(1, 6)]
+    changed = []
+    for institute in counts.iterator(chunk_size=1000):
+        for stars in range(1, 6):
+            setattr(institute, f'rating_{stars}_count', getattr(institute, f'approved_{stars}'))
+        changed.append(institute)
+    Institute.objects.bulk_update(changed, fields, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0008_institute_ranking_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='institute',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='institute',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='institute',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='institute',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='institute',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_star_counts, migrations.RunPython.noop),
+    ]
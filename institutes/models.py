@@ -1,5 +1,11 @@
-from django.db import models
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.utils.functional import cached_property
 from accounts.models import User
+from . import gazetteer, geo
 # Create your models here.
 
 class Category(models.Model):
@@ -15,6 +21,22 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class Locality(models.Model):
+    """Centroid of a locality, used to estimate institute coordinates (see institutes.gazetteer)"""
+    pincode = models.CharField(max_length=6, db_index=True)
+    area = models.CharField(max_length=100, blank=True, help_text='Leave empty for the centre of the whole pincode')
+    city = models.CharField(max_length=100, default='Hyderabad')
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+
+    class Meta:
+        verbose_name_plural = "Localities"
+        ordering = ['city', 'area']
+        unique_together = ['pincode', 'area', 'city']
+
+    def __str__(self):
+        return f"{self.area or 'All areas'}, {self.city} - {self.pincode}"
+
 class Institute(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending Approval'),
@@ -27,6 +49,7 @@ class Institute(models.Model):
     slug = models.SlugField(unique=True)
     description = models.TextField()
     logo = models.ImageField(upload_to='institute_logos/', null=True, blank=True)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)  # see eduhyd_backend.images
 
     #Contact Information..
     email = models.EmailField()
@@ -40,6 +63,9 @@ class Institute(models.Model):
     pincode = models.CharField(max_length=6)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+    # True when latitude/longitude were estimated from the pincode/area gazetteer
+    coordinates_estimated = models.BooleanField(default=False, editable=False)
 
     # Other Info
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
@@ -47,32 +73,287 @@ class Institute(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     is_featured = models.BooleanField(default=False)
 
+    # Rating aggregates (approved reviews only, kept in sync by reviews.signals)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_avg = models.FloatField(default=0, editable=False)
+    # Approved reviews per star rating (the rating histogram)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    # "Top rated" order: smoothed rating, recency, enquiries, featured (see institutes.ranking)
+    ranking_score = models.FloatField(default=0, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination (see eduhyd_backend.pagination)
+            models.Index(fields=['created_at', 'id'], name='institute_created_id_idx'),
+            # Top rated, overall and per category (see institutes.ranking)
+            models.Index(fields=['status', '-ranking_score'], name='institute_rank_idx'),
+            models.Index(fields=['category', 'status', '-ranking_score'], name='institute_category_rank_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    LOCATION_FIELDS = {'pincode', 'area', 'city', 'latitude', 'longitude'}
+    RATING_FIELDS = [
+        'rating_sum', 'rating_count', 'rating_avg',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_coordinates()
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.LOCATION_FIELDS & set(update_fields):
+            self.fill_coordinates()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'latitude', 'longitude', 'coordinates_estimated', 'geohash'
+                }
+        self.geohash = self.compute_geohash()
+        super().save(*args, **kwargs)
+        self._remember_coordinates()
+
+    def _remember_coordinates(self):
+        # Coordinates as last loaded/saved, to tell hand-entered ones from estimates
+        if 'latitude' in self.__dict__ and 'longitude' in self.__dict__:
+            self._saved_coordinates = (self.latitude, self.longitude)
+
+    def fill_coordinates(self):
+        """
+        Estimate missing coordinates from the pincode/area gazetteer.
+
+        Coordinates entered by hand are always kept. Estimated ones are
+        looked up again on every save, so they follow address changes.
+        """
+        has_coordinates = self.latitude is not None and self.longitude is not None
+        if has_coordinates and self.coordinates_estimated:
+            saved = getattr(self, '_saved_coordinates', None)
+            if saved is not None and saved != (self.latitude, self.longitude):
+                self.coordinates_estimated = False  # edited by hand since
+        if has_coordinates and not self.coordinates_estimated:
+            return
+
+        location = gazetteer.locate(self.pincode, self.area, self.city)
+        if location is not None:
+            self.latitude, self.longitude = location
+            self.coordinates_estimated = True
+        elif self.coordinates_estimated:
+            # The new address is unknown; an estimate for the old one would be wrong
+            self.latitude = self.longitude = None
+            self.coordinates_estimated = False
+
+    def compute_geohash(self):
+        if self.latitude is None or self.longitude is None:
+            return ''
+        return geo.encode(float(self.latitude), float(self.longitude))
     
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum([r.rating for r in reviews]) / len(reviews)
-        return 0
+        return self.rating_avg
     
     def total_reviews(self):
-        return self.reviews.count()
+        return self.rating_count
+
+    @classmethod
+    def apply_rating_change(cls, institute_id, rating, count_delta):
+        """
+        Add (count_delta=1) or remove (-1) one approved review of `rating`
+        stars from the stored rating aggregates of an institute.
+
+        All updates run in SQL against the current row values, so concurrent
+        review writes never overwrite each other's changes.
+        """
+        cls.apply_rating_changes({institute_id: {rating: count_delta}})
+
+    @classmethod
+    def apply_rating_changes(cls, changes):
+        """
+        apply_rating_change for many institutes at once.
+
+        changes maps institute id -> {stars: reviews added (or removed when
+        negative)}. Every institute is shifted by the same two UPDATE
+        statements, however many there are.
+        """
+        changes = {
+            pk: {stars: delta for stars, delta in counts.items() if delta}
+            for pk, counts in changes.items()
+        }
+        changes = {pk: counts for pk, counts in changes.items() if counts}
+        if not changes:
+            return
+        from .documents import invalidate_institute_documents
+        from .ranking import update_ranking_scores
+
+        def shift(field, delta_of):
+            deltas = {pk: delta_of(counts) for pk, counts in changes.items()}
+            whens = [When(pk=pk, then=Value(delta)) for pk, delta in deltas.items() if delta]
+            return F(field) + Case(*whens, default=Value(0)) if whens else None
+
+        columns = {
+            'rating_sum': shift('rating_sum', lambda counts: sum(stars * delta for stars, delta in counts.items())),
+            'rating_count': shift('rating_count', lambda counts: sum(counts.values())),
+        }
+        for stars in range(1, 6):
+            columns[f'rating_{stars}_count'] = shift(f'rating_{stars}_count', lambda counts: counts.get(stars, 0))
+
+        with transaction.atomic():
+            institutes = cls.objects.filter(pk__in=changes)
+            institutes.update(**{field: value for field, value in columns.items() if value is not None})
+            institutes.update(rating_avg=cls._rating_avg_expression())
+            update_ranking_scores(changes)
+        invalidate_institute_documents(changes)
+
+    @classmethod
+    def refresh_rating_aggregates(cls, institute_ids=None):
+        """
+        Recompute rating aggregates from the reviews table.
+
+        Used after bulk review updates (which skip signals) and by the
+        rebuild_rating_aggregates management command. Pass None to rebuild
+        every institute. Returns the number of institutes refreshed.
+        """
+        from .documents import invalidate_institute_documents
+        from .ranking import update_ranking_scores
+
+        institutes = cls.objects.all()
+        if institute_ids is not None:
+            institute_ids = list(institute_ids)
+            if not institute_ids:
+                return 0
+            institutes = institutes.filter(pk__in=institute_ids)
+
+        approved = Q(reviews__is_approved=True)
+        totals = institutes.order_by().annotate(
+            approved_sum=Sum('reviews__rating', filter=approved),
+            approved_count=Count('reviews', filter=approved),
+            **{
+                f'approved_{stars}': Count('reviews', filter=approved & Q(reviews__rating=stars))
+                for stars in range(1, 6)
+            },
+        ).values_list('pk', 'approved_sum', 'approved_count', *(f'approved_{stars}' for stars in range(1, 6)))
+
+        refreshed = []
+        for pk, rating_sum, rating_count, *star_counts in totals:
+            rating_sum = rating_sum or 0
+            institute = cls(
+                pk=pk,
+                rating_sum=rating_sum,
+                rating_count=rating_count,
+                rating_avg=rating_sum / rating_count if rating_count else 0,
+            )
+            for stars, count in enumerate(star_counts, start=1):
+                setattr(institute, f'rating_{stars}_count', count)
+            refreshed.append(institute)
+        with transaction.atomic():
+            cls.objects.bulk_update(refreshed, cls.RATING_FIELDS, batch_size=500)
+            update_ranking_scores(institute_ids)
+        invalidate_institute_documents(institute.pk for institute in refreshed)
+        return len(refreshed)
+
+    @staticmethod
+    def _rating_avg_expression():
+        return Case(
+            When(rating_count__gt=0, then=Cast('rating_sum', FloatField()) / Cast('rating_count', FloatField())),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
     
 
 class InstitutePhoto(models.Model):
     Institute = models.ForeignKey(Institute, on_delete=models.CASCADE, related_name='photos')
     photo = models.ImageField(upload_to="institute_photos/")
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False)  # see eduhyd_backend.images
     caption = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add = True)
 
     def __str__(self):
         return f"Photo for {self.Institute.name}"
-    
\ No newline at end of file
+    
+
+class ImportStorage(FileSystemStorage):
+    """
+    File storage under settings.IMPORT_ROOT, read when first used (and
+    again after the setting changes, e.g. override_settings in tests)
+    rather than when the model is loaded
+    """
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.IMPORT_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'IMPORT_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+
+def import_storage():
+    """Uploaded import files and error reports live outside MEDIA_ROOT, so they are never public"""
+    return ImportStorage()
+
+
+class CatalogImport(models.Model):
+    """
+    One bulk import of institutes, courses or photos (see institutes.importer).
+
+    position is the byte offset just after the last committed row; it is
+    saved in the same transaction as each batch, so an interrupted import
+    resumes exactly where it stopped.
+    """
+    KIND_CHOICES = (
+        ('institutes', 'Institutes'),
+        ('courses', 'Courses'),
+        ('photos', 'Institute Photos'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    file = models.FileField(upload_to='uploads/', storage=import_storage, blank=True,
+                            help_text='CSV (with a header row) or JSONL (one object per line)')
+    source = models.CharField(max_length=500, blank=True, help_text='Local path, for imports started from the command line')
+    default_owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='+', help_text='Owner of imported institutes without an owner column')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    # Progress
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    header = models.JSONField(null=True, blank=True, editable=False)  # CSV column names
+    position = models.PositiveBigIntegerField(default=0, editable=False)
+    rows_processed = models.PositiveIntegerField(default=0, editable=False)
+    created_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_count = models.PositiveIntegerField(default=0, editable=False)
+    error_count = models.PositiveIntegerField(default=0, editable=False)
+    error_report = models.FileField(upload_to='reports/', storage=import_storage, blank=True, editable=False)
+    message = models.TextField(blank=True, editable=False)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import #{self.pk}"
+
+    @property
+    def file_name(self):
+        return self.file.name if self.file else self.source
@@ -0,0 +1,160 @@
+"""
+Stored "top rated" ranking score for institutes.
+
+Sorting by average rating puts a single 5★ review above 400 reviews
+averaging 4.6. Institute.ranking_score blends, on a 0..1 scale:
+
+    rating     Bayesian average: the institute's approved reviews plus
+               PRIOR_WEIGHT imaginary reviews at the site-wide mean, so a
+               few reviews barely move it and many reviews dominate it
+    recency    how recent the newest approved review is (halves every
+               RECENCY_HALF_LIFE_DAYS)
+    enquiries  enquiries in the last ENQUIRY_WINDOW_DAYS, on a log scale
+               that saturates at ENQUIRY_SATURATION
+    featured   1 for featured institutes
+
+weighted by RANKING_WEIGHTS. The score is stored and indexed with the
+category and status, so "top rated in category X" reads the first rows of
+one index range instead of aggregating reviews per request.
+
+Scores are recomputed for the affected institutes whenever their rating
+aggregates change (new, edited, moderated or deleted reviews) or they are
+saved. Recency and enquiry volume drift with time alone, so the
+rebuild_ranking_scores command should also run daily; it scores every
+institute in one vectorized pass and refreshes the site-wide mean.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, Max, Sum, Value, When
+from django.utils import timezone
+
+# Imaginary reviews at the site-wide mean added to every institute
+PRIOR_WEIGHT = 10
+# Site-wide mean used until there are reviews
+DEFAULT_PRIOR_MEAN = 3.5
+
+RECENCY_HALF_LIFE_DAYS = 180
+ENQUIRY_WINDOW_DAYS = 90
+ENQUIRY_SATURATION = 200
+
+RANKING_WEIGHTS = {'rating': 0.7, 'recency': 0.1, 'enquiries': 0.1, 'featured': 0.1}
+
+PRIOR_MEAN_KEY = 'ranking:prior-mean'
+PRIOR_MEAN_TIMEOUT = 2 * 24 * 60 * 60
+
+# Stored scores closer than this to the new ones are left alone
+SCORE_TOLERANCE = 1e-9
+
+
+def ranking_scores(rating_sum, rating_count, review_age_days, enquiries, featured, prior_mean):
+    """
+    Ranking scores for arrays (or single values) of institute figures.
+
+    review_age_days is the age of the newest approved review, NaN for
+    institutes without one.
+
+        >>> few, many = ranking_scores([5, 1840], [1, 400], [1, 1], [0, 0], [False, False], 4.0)
+        >>> bool(many > few)
+        True
+    """
+    rating_sum = np.asarray(rating_sum, dtype=float)
+    rating_count = np.asarray(rating_count, dtype=float)
+    review_age_days = np.asarray(review_age_days, dtype=float)
+    enquiries = np.asarray(enquiries, dtype=float)
+    featured = np.asarray(featured, dtype=float)
+
+    bayesian = (rating_sum + PRIOR_WEIGHT * prior_mean) / (rating_count + PRIOR_WEIGHT)
+    rating = (bayesian - 1) / 4
+    recency = np.where(np.isnan(review_age_days), 0.0, 0.5 ** (np.nan_to_num(review_age_days) / RECENCY_HALF_LIFE_DAYS))
+    enquiry_volume = np.minimum(1.0, np.log1p(enquiries) / np.log1p(ENQUIRY_SATURATION))
+
+    return (
+        RANKING_WEIGHTS['rating'] * rating
+        + RANKING_WEIGHTS['recency'] * recency
+        + RANKING_WEIGHTS['enquiries'] * enquiry_volume
+        + RANKING_WEIGHTS['featured'] * featured
+    )
+
+
+def get_prior_mean(Institute):
+    """Site-wide mean rating, as of the last full rebuild"""
+    prior_mean = cache.get(PRIOR_MEAN_KEY)
+    if prior_mean is None:
+        totals = Institute.objects.aggregate(rating_sum=Sum('rating_sum'), rating_count=Sum('rating_count'))
+        prior_mean = _mean(totals['rating_sum'], totals['rating_count'])
+        cache.set(PRIOR_MEAN_KEY, prior_mean, PRIOR_MEAN_TIMEOUT)
+    return prior_mean
+
+
+def _mean(rating_sum, rating_count):
+    return rating_sum / rating_count if rating_count else DEFAULT_PRIOR_MEAN
+
+
+def compute_ranking_scores(Institute, Review, Enquiry, institute_ids=None):
+    """
+    Recompute and store ranking scores; returns the number that changed.
+
+    institute_ids=None scores every institute and refreshes the site-wide
+    mean. Takes the models as arguments so data migrations can pass their
+    historical versions.
+    """
+    institutes = Institute.objects.order_by()
+    reviews = Review.objects.filter(is_approved=True)
+    enquiries = Enquiry.objects.filter(created_at__gte=timezone.now() - timedelta(days=ENQUIRY_WINDOW_DAYS))
+    if institute_ids is not None:
+        institute_ids = list(institute_ids)
+        if not institute_ids:
+            return 0
+        institutes = institutes.filter(pk__in=institute_ids)
+        reviews = reviews.filter(institute_id__in=institute_ids)
+        enquiries = enquiries.filter(institute_id__in=institute_ids)
+
+    rows = list(institutes.values_list('pk', 'rating_sum', 'rating_count', 'is_featured', 'ranking_score'))
+    if not rows:
+        return 0
+    newest_review = dict(
+        reviews.order_by().values('institute_id').annotate(newest=Max('created_at'))
+        .values_list('institute_id', 'newest')
+    )
+    enquiry_counts = dict(
+        enquiries.order_by().values('institute_id').annotate(total=Count('id'))
+        .values_list('institute_id', 'total')
+    )
+
+    pks, rating_sum, rating_count, featured, stored = (np.array(column) for column in zip(*rows))
+    if institute_ids is None:
+        prior_mean = _mean(int(rating_sum.sum()), int(rating_count.sum()))
+        cache.set(PRIOR_MEAN_KEY, prior_mean, PRIOR_MEAN_TIMEOUT)
+    else:
+        prior_mean = get_prior_mean(Institute)
+
+    now = timezone.now()
+    review_age_days = np.array([
+        (now - newest_review[pk]).total_seconds() / 86400 if pk in newest_review else np.nan
+        for pk in pks.tolist()
+    ])
+    enquiry_totals = np.array([enquiry_counts.get(pk, 0) for pk in pks.tolist()])
+
+    scores = ranking_scores(rating_sum, rating_count, review_age_days, enquiry_totals, featured, prior_mean)
+    changed = np.abs(scores - stored.astype(float)) > SCORE_TOLERANCE
+    updates = list(zip(pks[changed].tolist(), scores[changed].tolist()))
+
+    with transaction.atomic():
+        for start in range(0, len(updates), 500):
+            chunk = updates[start:start + 500]
+            Institute.objects.filter(pk__in=[pk for pk, _ in chunk]).update(
+                ranking_score=Case(*[When(pk=pk, then=Value(score)) for pk, score in chunk])
+            )
+    return len(updates)
+
+
+def update_ranking_scores(institute_ids=None):
+    """compute_ranking_scores with the current models"""
+    from enquiries.models import Enquiry
+    from reviews.models import Review
+    from .models import Institute
+
+    return compute_ranking_scores(Institute, Review, Enquiry, institute_ids)
@@ -1,4 +1,8 @@
 from rest_framework import serializers
+from courses.serializers import CourseSerializer
+from eduhyd_backend.images import ImageVariantsMixin
+from eduhyd_backend.permissions import StaffOnlyFieldsMixin
+from reviews.serializers import ReviewSerializer
 from .models import Category, Institute, InstitutePhoto
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -7,14 +11,17 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name', 'slug', 'icon', 'description']
 
-class InstitutePhotoSerializer(serializers.ModelSerializer):
+class InstitutePhotoSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """Institute Photo Serializer"""
+    image_variants = {'photo': ('photo_variants', 'medium')}
+
     class Meta:
         model = InstitutePhoto
         fields = ['id', 'photo', 'caption', 'uploaded_at']
 
-class InstituteListSerializer(serializers.ModelSerializer):
+class InstituteListSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     """Institute List Serializer (for listing page)"""
+    image_variants = {'logo': ('logo_variants', 'small')}
     category_name = serializers.CharField(source='category.name', read_only=True)
     owner_name = serializers.CharField(source='owner.username', read_only=True)
     average_rating = serializers.SerializerMethodField()
@@ -30,13 +37,15 @@ class InstituteListSerializer(serializers.ModelSerializer):
         ]
     
     def get_average_rating(self, obj):
-        return round(obj.average_rating(), 1)
+        return round(obj.rating_avg, 1)
     
     def get_total_reviews(self, obj):
-        return obj.total_reviews()
+        return obj.rating_count
 
-class InstituteDetailSerializer(serializers.ModelSerializer):
+class InstituteDetailSerializer(StaffOnlyFieldsMixin, ImageVariantsMixin, serializers.ModelSerializer):
     """Institute Detail Serializer (for single institute page)"""
+    image_variants = {'logo': ('logo_variants', 'medium')}
+    staff_only_fields = ('status', 'is_featured')
     category = CategorySerializer(read_only=True)
     photos = InstitutePhotoSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
@@ -49,7 +58,7 @@ class InstituteDetailSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'description', 'logo',
             'email', 'phone', 'website',
             'address', 'area', 'city', 'pincode',
-            'latitude', 'longitude',
+            'latitude', 'longitude', 'coordinates_estimated',
             'category', 'established_year', 'status',
             'is_featured', 'owner_name',
             'photos', 'average_rating', 'total_reviews',
@@ -57,7 +66,37 @@ class InstituteDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_average_rating(self, obj):
-        return round(obj.average_rating(), 1)
+        return round(obj.rating_avg, 1)
     
     def get_total_reviews(self, obj):
-        return obj.total_reviews()
\ No newline at end of file
+        return obj.rating_count
+
+class InstituteNearbySerializer(InstituteListSerializer):
+    """Institute List Serializer with the distance from the searched location"""
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta(InstituteListSerializer.Meta):
+        fields = InstituteListSerializer.Meta.fields + ['latitude', 'longitude', 'distance_km']
+
+    def get_distance_km(self, obj):
+        return round(obj.distance_km, 2)
+
+
+class InstituteProfileSerializer(InstituteDetailSerializer):
+    """
+    Institute page: details plus active courses, rating histogram and latest reviews
+
+    Expects the queryset built by InstituteViewSet.get_profile_queryset(),
+    which prefetches active_courses and latest_reviews; the histogram comes
+    from the stored rating_<n>_count columns, so serializing adds no queries.
+    """
+    courses = CourseSerializer(source='active_courses', many=True, read_only=True)
+    latest_reviews = ReviewSerializer(many=True, read_only=True)
+    rating_histogram = serializers.SerializerMethodField()
+
+    class Meta(InstituteDetailSerializer.Meta):
+        fields = InstituteDetailSerializer.Meta.fields + ['courses', 'rating_histogram', 'latest_reviews']
+
+    def get_rating_histogram(self, obj):
+        """Approved reviews per star rating, e.g. {"5": 12, "4": 3, ...}"""
+        return {str(stars): getattr(obj, f'rating_{stars}_count') for stars in range(5, 0, -1)}
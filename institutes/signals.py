@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from accounts.models import User
+from eduhyd_backend.images import schedule_variants, variants_ready
+from .documents import institute_detail_documents, invalidate_institute_documents
+from .gazetteer import reset_gazetteer
+from .models import Category, Institute, InstitutePhoto, Locality
+from .ranking import update_ranking_scores
+
+
+# ========================================
+# Cached document invalidation
+# ========================================
+@receiver(post_save, sender=Institute)
+@receiver(post_delete, sender=Institute)
+def institute_changed(sender, instance, **kwargs):
+    invalidate_institute_documents([instance.pk])
+
+
+@receiver(post_save, sender=Institute)
+def rerank_institute(sender, instance, raw=False, **kwargs):
+    # The ranking score counts is_featured
+    if not raw:
+        update_ranking_scores([instance.pk])
+
+
+@receiver(post_save, sender=InstitutePhoto)
+@receiver(post_delete, sender=InstitutePhoto)
+def institute_photo_changed(sender, instance, **kwargs):
+    # Only the detail document lists photos
+    institute_detail_documents.invalidate([instance.Institute_id])
+
+
+@receiver(post_save, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    invalidate_institute_documents(
+        Institute.objects.filter(category=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_institutes(sender, instance, **kwargs):
+    # Their category is set to NULL with queryset.update(), which sends no signals
+    instance._institute_ids = list(
+        Institute.objects.filter(category=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    invalidate_institute_documents(getattr(instance, '_institute_ids', []))
+
+
+@receiver(post_save, sender=User)
+def owner_changed(sender, instance, created=False, **kwargs):
+    # Documents show the owner's username
+    if not created:
+        invalidate_institute_documents(instance.institues.values_list('pk', flat=True))
+
+
+# ========================================
+# Image variants
+# ========================================
+@receiver(post_save, sender=Institute)
+def process_institute_logo(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, 'logo', 'logo_variants')
+
+
+@receiver(post_save, sender=InstitutePhoto)
+def process_institute_photo(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_variants(instance, 'photo', 'photo_variants')
+
+
+@receiver(variants_ready, sender=Institute)
+def institute_logo_ready(sender, pk, **kwargs):
+    invalidate_institute_documents([pk])
+
+
+@receiver(variants_ready, sender=InstitutePhoto)
+def institute_photo_ready(sender, pk, **kwargs):
+    institute_ids = InstitutePhoto.objects.filter(pk=pk).values_list('Institute_id', flat=True)
+    institute_detail_documents.invalidate(list(institute_ids))
+
+
+# ========================================
+# Gazetteer
+# ========================================
+@receiver(post_save, sender=Locality)
+@receiver(post_delete, sender=Locality)
+def locality_changed(sender, **kwargs):
+    reset_gazetteer()
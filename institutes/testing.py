@@ -0,0 +1,49 @@
+"""
+Test fixtures shared by the apps' tests.py files.
+
+Most tests need an active institute (with an owner and a category) but
+care about only one or two of its fields, so create_institute fills in
+the rest and each test passes just what it changes.
+
+Example:
+    institute = create_institute()                          # "Academy", slug "academy"
+    institute = create_institute('Academy 1', area='Madhapur', owner=owner)
+    institute = create_institute('Uncategorized', category=None)
+"""
+from django.utils.text import slugify
+from accounts.models import User
+from .models import Category, Institute
+
+# Fields every test institute gets unless the test overrides them
+INSTITUTE_DEFAULTS = {
+    'description': '-',
+    'email': 'academy@example.com',
+    'phone': '9999999999',
+    'address': 'Road 1',
+    'area': 'Ameerpet',
+    'pincode': '500016',
+    'status': 'active',
+}
+
+
+def get_category(slug='engineering'):
+    """The category with this slug, created on first use"""
+    category, _ = Category.objects.get_or_create(slug=slug, defaults={'name': slug.title(), 'icon': 'gear'})
+    return category
+
+
+def create_institute(name='Academy', owner=None, category='engineering', **fields):
+    """
+    Create an institute named name (slug from the name unless given).
+
+    Without an owner, a new institute user "owner-<slug>" owns it.
+    category is a Category, a category slug, or None for no category.
+    """
+    fields.setdefault('slug', slugify(name))
+    if owner is None:
+        owner = User.objects.create(username=f'owner-{fields["slug"]}', user_type='institute')
+    if isinstance(category, str):
+        category = get_category(category)
+    return Institute.objects.create(
+        owner=owner, name=name, category=category, **{**INSTITUTE_DEFAULTS, **fields},
+    )
@@ -1,3 +1,720 @@
-from django.test import TestCase
+import csv
+import doctest
+import io
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+from accounts.models import User
+from courses.documents import course_documents
+from courses.models import Course
+from enquiries.models import Enquiry
+from eduhyd_backend import images
+from reviews.models import Review
+from . import gazetteer, geo, importer, ranking
+from .documents import institute_list_documents
+from .importer import run_import
+from .models import CatalogImport, Category, Institute, InstitutePhoto
+from .serializers import InstituteDetailSerializer
+from .testing import create_institute
 
-# Create your tests here.
+
+class InstituteProfileQueryTests(TestCase):
+    """GET /api/institutes/{slug}/profile/ must not grow with the institute's size"""
+
+    # institute (+ category, owner, histogram), photos, active courses,
+    # their batches, latest reviews
+    EXPECTED_QUERIES = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'secret', user_type='institute')
+        cls.institute = create_institute('ABC Academy', owner=cls.owner)
+        cls.add_content(cls.institute, count=3)
+
+    @classmethod
+    def add_content(cls, institute, count, start=0):
+        """count photos, active and inactive courses, and approved and hidden reviews"""
+        for number in range(start, start + count):
+            InstitutePhoto.objects.create(Institute=institute, photo=f'institute_photos/{number}.jpg')
+            Course.objects.create(
+                institute=institute, name=f'Course {number}', slug=f'course-{number}',
+                description='-', category='IT', duration='3 months', fees=1000, mode='online',
+            )
+            Course.objects.create(
+                institute=institute, name=f'Old course {number}', slug=f'old-course-{number}',
+                description='-', category='IT', duration='3 months', fees=1000, mode='online',
+                is_active=False,
+            )
+            for approved in (True, False):
+                user = User.objects.create(username=f'student-{number}-{approved}')
+                Review.objects.create(
+                    user=user, institute=institute, rating=number % 5 + 1,
+                    review_text='Good', is_approved=approved,
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f'/api/institutes/{self.institute.slug}/profile/'
+
+    def get_profile(self):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_is_fixed(self):
+        self.get_profile()
+
+    def test_query_count_does_not_grow_with_content(self):
+        self.add_content(self.institute, count=20, start=3)
+        data = self.get_profile()
+        self.assertEqual(len(data['photos']), 23)
+        self.assertEqual(len(data['courses']), 23)
+
+    def test_profile_content(self):
+        data = self.get_profile()
+        self.assertEqual(data['category']['slug'], 'engineering')
+        self.assertEqual(data['owner_name'], 'owner')
+        self.assertEqual(len(data['photos']), 3)
+        self.assertEqual(
+            sorted(course['slug'] for course in data['courses']),
+            ['course-0', 'course-1', 'course-2'],
+        )
+        self.assertEqual(data['rating_histogram'], {'5': 0, '4': 0, '3': 1, '2': 1, '1': 1})
+        self.assertEqual(data['total_reviews'], 3)
+
+    def test_latest_reviews_are_approved_and_newest_first(self):
+        self.add_content(self.institute, count=10, start=3)
+        data = self.get_profile()
+        reviews = data['latest_reviews']
+        self.assertEqual(len(reviews), 5)
+        self.assertTrue(all(review['is_approved'] for review in reviews))
+        expected = list(
+            Review.objects.filter(institute=self.institute, is_approved=True)
+            .order_by('-created_at', '-id').values_list('id', flat=True)[:5]
+        )
+        self.assertEqual([review['id'] for review in reviews], expected)
+
+    def test_unknown_institute(self):
+        response = self.client.get('/api/institutes/missing/profile/')
+        self.assertEqual(response.status_code, 404)
+
+
+class TopRatedTests(TestCase):
+    """Stored ranking scores and GET /api/institutes/top-rated/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.engineering = Category.objects.create(name='Engineering', slug='engineering', icon='gear')
+        cls.medical = Category.objects.create(name='Medical', slug='medical', icon='plus')
+        cls.one_review = cls.institute('one-review', cls.engineering, [5])
+        cls.many_reviews = cls.institute('many-reviews', cls.engineering, [5, 5, 5, 4, 5, 4, 5, 5, 4, 5, 5, 4, 5, 5, 5])
+        cls.unrated = cls.institute('unrated', cls.engineering, [])
+        cls.medical_college = cls.institute('medical', cls.medical, [4, 4])
+
+    @classmethod
+    def institute(cls, slug, category, ratings):
+        institute = create_institute(slug.title(), slug=slug, category=category)
+        for number, rating in enumerate(ratings):
+            user = User.objects.create(username=f'{slug}-student-{number}')
+            Review.objects.create(user=user, institute=institute, rating=rating, review_text='-')
+        return institute
+
+    def setUp(self):
+        cache.clear()
+        # Score everyone against the final site-wide mean
+        ranking.update_ranking_scores()
+        self.client = APIClient()
+
+    def top_rated(self, **params):
+        response = self.client.get('/api/institutes/top-rated/', params)
+        self.assertEqual(response.status_code, 200)
+        return [institute['slug'] for institute in response.json()['results']]
+
+    def test_doctests(self):
+        failures, _ = doctest.testmod(ranking)
+        self.assertEqual(failures, 0)
+
+    def test_many_good_reviews_beat_a_single_perfect_one(self):
+        self.assertEqual(self.top_rated(category='engineering'), ['many-reviews', 'one-review', 'unrated'])
+
+    def test_new_reviews_update_the_score(self):
+        before = Institute.objects.get(pk=self.one_review.pk).ranking_score
+        for number in range(3):
+            user = User.objects.create(username=f'late-student-{number}')
+            Review.objects.create(user=user, institute=self.one_review, rating=1, review_text='-')
+        self.assertLess(Institute.objects.get(pk=self.one_review.pk).ranking_score, before)
+
+    def test_featured_counts(self):
+        institute = Institute.objects.get(pk=self.unrated.pk)
+        before = institute.ranking_score
+        institute.is_featured = True
+        institute.save()
+        self.assertAlmostEqual(
+            Institute.objects.get(pk=self.unrated.pk).ranking_score - before,
+            ranking.RANKING_WEIGHTS['featured'],
+        )
+
+    def test_incremental_scores_match_the_batch_job(self):
+        user = User.objects.create(username='late-student')
+        Review.objects.create(user=user, institute=self.medical_college, rating=5, review_text='-')
+        changed = ranking.compute_ranking_scores(Institute, Review, Enquiry, [self.medical_college.pk])
+        self.assertEqual(changed, 0)
+
+    def test_category_limit_and_blocked(self):
+        Institute.objects.filter(pk=self.many_reviews.pk).update(status='blocked')
+        self.assertEqual(self.top_rated(category='engineering', limit=1), ['one-review'])
+        self.assertEqual(self.top_rated(category='medical'), ['medical'])
+        self.assertEqual(self.top_rated(category='missing'), [])
+        self.assertEqual(len(self.top_rated()), 3)
+
+    def test_unknown_category_is_not_no_category(self):
+        self.institute('uncategorized', None, [5, 5])
+        self.assertIn('uncategorized', self.top_rated())
+        self.assertEqual(self.top_rated(category='missing'), [])
+
+
+class ReviewFeedTests(TestCase):
+    """GET /api/institutes/{slug}/reviews/: stored histogram plus keyset pages"""
+
+    # institute row with its star counts, page of reviews joined with users
+    EXPECTED_QUERIES = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = create_institute('ABC Academy')
+        cls.reviews = []
+        for number in range(12):
+            user = User.objects.create(username=f'student-{number}')
+            cls.reviews.append(Review.objects.create(
+                user=user, institute=cls.institute, rating=number % 5 + 1,
+                review_text=f'Review {number}', is_approved=number != 11,
+            ))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = f'/api/institutes/{self.institute.slug}/reviews/'
+
+    def get(self, url, **params):
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_histogram_is_stored_and_kept_current(self):
+        data = self.get(self.url)
+        self.assertEqual(data['rating_histogram'], {'5': 2, '4': 2, '3': 2, '2': 2, '1': 3})
+        self.assertEqual(data['total_reviews'], 11)
+
+        review = Review.objects.get(pk=self.reviews[0].pk)  # 1 star
+        review.rating = 5
+        review.save()
+        self.reviews[1].delete()  # 2 stars
+        data = self.get(self.url)
+        self.assertEqual(data['rating_histogram'], {'5': 3, '4': 2, '3': 2, '2': 1, '1': 2})
+
+    def test_pages_are_approved_and_newest_first(self):
+        first = self.get(self.url, page_size=5)
+        second = self.get(first['next'])
+        third = self.get(second['next'])
+        names = [review['user_name'] for page in (first, second, third) for review in page['results']]
+        self.assertEqual(names, [f'student-{number}' for number in range(10, -1, -1)])
+        self.assertIsNone(third['next'])
+
+    def test_unknown_institute(self):
+        response = self.client.get('/api/institutes/missing/reviews/')
+        self.assertEqual(response.status_code, 404)
+
+
+class InstituteWriteTests(TestCase):
+    """Anyone logged in adds institutes; only their owner or staff change them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', user_type='institute')
+        cls.other = User.objects.create(username='other', user_type='institute')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+        cls.institute = create_institute('ABC Academy', owner=cls.owner, category=None)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.url = f'/api/institutes/{self.institute.slug}/'
+
+    def test_create_is_owned_and_pending(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.post('/api/institutes/', {
+            'name': 'New Academy', 'slug': 'new-academy', 'description': '-', 'email': 'new@example.com',
+            'phone': '9999999999', 'address': 'Road 2', 'area': 'Ameerpet', 'pincode': '500016',
+            'status': 'active', 'is_featured': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        created = Institute.objects.get(slug='new-academy')
+        self.assertEqual((created.owner, created.status, created.is_featured), (self.other, 'pending', False))
+
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post('/api/institutes/', {'name': 'X'}, format='json').status_code, 401)
+
+    def test_only_owner_or_staff_change(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.patch(self.url, {'name': 'Mine now'}, format='json').status_code, 403)
+        self.assertEqual(self.client.delete(self.url).status_code, 403)
+
+        self.client.force_authenticate(self.owner)
+        response = self.client.patch(self.url, {'name': 'ABC Academy Ameerpet', 'is_featured': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        institute = Institute.objects.get(pk=self.institute.pk)
+        self.assertEqual((institute.name, institute.is_featured), ('ABC Academy Ameerpet', False))
+
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.patch(self.url, {'is_featured': True}, format='json').status_code, 200)
+        self.assertTrue(Institute.objects.get(pk=self.institute.pk).is_featured)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+
+
+def destination(latitude, longitude, distance_km, bearing_degrees):
+    """The point distance_km from (latitude, longitude) in a compass direction"""
+    lat, lon, bearing = map(math.radians, (latitude, longitude, bearing_degrees))
+    angle = distance_km / geo.EARTH_RADIUS_KM
+    lat2 = math.asin(math.sin(lat) * math.cos(angle) + math.cos(lat) * math.sin(angle) * math.cos(bearing))
+    lon2 = lon + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat), math.cos(angle) - math.sin(lat) * math.sin(lat2)
+    )
+    return math.degrees(lat2), math.degrees(lon2)
+
+
+def cell_corner(latitude, longitude, precision):
+    """South-west corner of the geohash cell holding the point"""
+    height, width = geo.cell_size_degrees(precision)
+    return (
+        math.floor((latitude + 90) / height) * height - 90,
+        math.floor((longitude + 180) / width) * width - 180,
+    )
+
+
+class GeohashCoverTests(SimpleTestCase):
+    """covering_prefixes never leaves out a point inside the search circle"""
+
+    CENTERS = [(17.385, 78.4867), (-33.86, 151.21), (64.15, -21.94), (0.0, 179.999)]
+    RADII_KM = [0.1, 0.5, 1, 2, 5, 10, 50]
+
+    def assert_covered(self, latitude, longitude, radius_km):
+        prefixes = geo.covering_prefixes(latitude, longitude, radius_km)
+        self.assertLessEqual(len(prefixes), geo.MAX_COVERING_CELLS)
+        for bearing in range(0, 360, 15):
+            point = destination(latitude, longitude, radius_km * 0.999, bearing)
+            lon = (point[1] + 180) % 360 - 180
+            self.assertTrue(
+                geo.encode(point[0], lon).startswith(tuple(prefixes)),
+                f'{point} ({bearing} degrees, {radius_km} km) is outside the prefixes',
+            )
+
+    def test_circle_is_covered(self):
+        for latitude, longitude in self.CENTERS:
+            for radius_km in self.RADII_KM:
+                self.assert_covered(latitude, longitude, radius_km)
+
+    def test_centers_on_cell_boundaries(self):
+        # A centre right on a cell corner straddles four cells at every precision
+        for radius_km in self.RADII_KM:
+            precision = len(geo.covering_prefixes(17.385, 78.4867, radius_km)[0])
+            corner = cell_corner(17.385, 78.4867, precision)
+            for d_lat, d_lon in ((0, 0), (1e-9, 1e-9), (-1e-9, -1e-9), (1e-9, -1e-9)):
+                self.assert_covered(corner[0] + d_lat, corner[1] + d_lon, radius_km)
+
+    def test_haversine(self):
+        self.assertAlmostEqual(geo.haversine_km(17.385, 78.4867, 17.385, 78.4867), 0)
+        # One degree of latitude
+        self.assertAlmostEqual(geo.haversine_km(17, 78, 18, 78), 111.19, places=1)
+
+
+class NearbySearchTests(TestCase):
+    """within_radius and nearest agree with a brute-force distance check"""
+
+    CENTER = (17.385, 78.4867)
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', user_type='institute')
+        points = []
+        randomizer = random.Random(7)
+        for _ in range(300):
+            points.append(destination(*cls.CENTER, randomizer.uniform(0, 12), randomizer.uniform(0, 360)))
+        # Just inside and just outside 2 km, on both sides of a cell boundary
+        corner = cell_corner(*cls.CENTER, len(geo.covering_prefixes(*cls.CENTER, 2)[0]))
+        cls.boundary_center = corner
+        for bearing in (0, 90, 180, 270):
+            points.append(destination(*corner, 1.99, bearing))
+            points.append(destination(*corner, 2.01, bearing))
+        Institute.objects.bulk_create([
+            Institute(
+                owner=owner, name=f'Academy {number}', slug=f'academy-{number}', description='-',
+                email='academy@example.com', phone='9999999999', address='Road', area='Ameerpet',
+                pincode='500016', status='active', latitude=round(lat, 6), longitude=round(lon, 6),
+                geohash=geo.encode(round(lat, 6), round(lon, 6)),
+            )
+            for number, (lat, lon) in enumerate(points)
+        ])
+
+    def brute_force(self, latitude, longitude, radius_km):
+        return sorted(
+            (geo.haversine_km(latitude, longitude, float(lat), float(lon)), pk)
+            for pk, lat, lon in Institute.objects.values_list('pk', 'latitude', 'longitude')
+            if geo.haversine_km(latitude, longitude, float(lat), float(lon)) <= radius_km
+        )
+
+    def test_within_radius_matches_brute_force(self):
+        for radius_km in (0.5, 1, 2, 5, 10):
+            for center in (self.CENTER, self.boundary_center):
+                self.assertEqual(
+                    geo.within_radius(Institute.objects.all(), *center, radius_km),
+                    self.brute_force(*center, radius_km),
+                )
+
+    def test_boundary_points(self):
+        matches = geo.within_radius(Institute.objects.all(), *self.boundary_center, 2)
+        names = set(Institute.objects.filter(pk__in=[pk for _, pk in matches]).values_list('name', flat=True))
+        self.assertEqual({name for name in names if int(name.split()[1]) >= 300}, {
+            f'Academy {number}' for number in range(300, 308, 2)
+        })
+
+    def test_nearest(self):
+        self.assertEqual(
+            geo.nearest(Institute.objects.all(), *self.CENTER, 10),
+            self.brute_force(*self.CENTER, 12)[:10],
+        )
+        # Stops widening at max_radius_km, even with fewer than k rows
+        self.assertEqual(
+            geo.nearest(Institute.objects.all(), *self.CENTER, 10, max_radius_km=0.05),
+            self.brute_force(*self.CENTER, 0.05),
+        )
+
+    def test_nearby_endpoint(self):
+        response = APIClient().get('/api/institutes/nearby/', {
+            'lat': self.CENTER[0], 'lng': self.CENTER[1], 'radius_km': 1, 'limit': 100,
+        })
+        self.assertEqual(response.status_code, 200)
+        distances = [institute['distance_km'] for institute in response.json()['results']]
+        self.assertEqual(len(distances), len(self.brute_force(*self.CENTER, 1)))
+        self.assertEqual(distances, sorted(distances))
+
+
+class DocumentCacheTests(TestCase):
+    """Cached documents are dropped after commit and served with absolute media URLs"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = create_institute('ABC Academy', category=None, logo='institute_logos/abc.png')
+        InstitutePhoto.objects.create(Institute=cls.institute, photo='institute_photos/front.jpg')
+        cls.course = Course.objects.create(
+            institute=cls.institute, name='Python', slug='python', description='-',
+            category='IT', duration='3 months', fees=1000, mode='online',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_invalidated_again_after_commit(self):
+        course_documents.get(self.course.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.name = 'Django'
+            self.course.save()
+            # A concurrent request re-caches the row as it was before the commit
+            cache.set(course_documents.key(self.course.pk), {'id': self.course.pk, 'name': 'Python'})
+        self.assertEqual(course_documents.get(self.course.pk)['name'], 'Django')
+
+    def test_media_urls_are_absolute_cached_or_not(self):
+        for _ in range(2):  # rendered, then from the cache
+            listed = self.client.get('/api/institutes/').json()['results'][0]
+            self.assertEqual(listed['logo'], 'http://testserver/media/institute_logos/abc.png')
+            detail = self.client.get('/api/institutes/abc-academy/').json()
+            self.assertEqual(detail['photos'][0]['photo'], 'http://testserver/media/institute_photos/front.jpg')
+            self.assertEqual(detail['description'], '-')
+
+        # The cache itself holds paths, whichever host asked first
+        self.assertEqual(institute_list_documents.get(self.institute.pk)['logo'], '/media/institute_logos/abc.png')
+
+
+class ImageVariantTests(TestCase):
+    """Uploaded logos get a WebP and a JPEG copy at every IMAGE_VARIANT_SIZES size"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANT_SIZES={'thumb': 150, 'medium': 400})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.institute = create_institute()
+
+    def upload_logo(self, size, mode='RGBA'):
+        buffer = io.BytesIO()
+        Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, 'PNG')
+        self.institute.logo = SimpleUploadedFile('logo.png', buffer.getvalue(), content_type='image/png')
+        self.institute.save()
+
+    def process(self):
+        # Closing connections would end the test's transaction
+        with mock.patch('eduhyd_backend.images.close_old_connections'):
+            return images.process_image('institutes.Institute', self.institute.pk, 'logo', 'logo_variants')
+
+    def test_sizes_and_formats(self):
+        self.upload_logo((1000, 500))
+        self.assertTrue(self.process())
+
+        self.institute.refresh_from_db()
+        variants = self.institute.logo_variants
+        self.assertEqual(variants['source'], self.institute.logo.name)
+        for name, expected in {'thumb': (150, 75), 'medium': (400, 200)}.items():
+            variant = variants[name]
+            self.assertEqual((variant['width'], variant['height']), expected)
+            for key, image_format, mode in (('webp', 'WEBP', 'RGBA'), ('jpeg', 'JPEG', 'RGB')):
+                with default_storage.open(variant[key]) as stored, Image.open(stored) as image:
+                    self.assertEqual((image.format, image.size, image.mode), (image_format, expected, mode))
+
+        data = InstituteDetailSerializer(self.institute).data
+        self.assertTrue(data['logo'].endswith('_medium.webp'))
+        self.assertEqual(set(data['logo_images']), {'original', 'thumb', 'medium'})
+
+    def test_small_images_are_not_upscaled(self):
+        self.upload_logo((120, 90), mode='RGB')
+        self.process()
+        self.institute.refresh_from_db()
+        for name in ('thumb', 'medium'):
+            variant = self.institute.logo_variants[name]
+            self.assertEqual((variant['width'], variant['height']), (120, 90))
+
+    def test_original_served_until_processed(self):
+        self.upload_logo((300, 300))
+        self.assertEqual(
+            images.variant_url(self.institute, 'logo', 'logo_variants', 'medium'), self.institute.logo.url,
+        )
+        self.assertIsNone(InstituteDetailSerializer(self.institute).data['logo_images'])
+
+
+class CatalogImportTests(TestCase):
+    """Bulk imports: unreadable and invalid rows, the error report, resuming, repeated slugs"""
+
+    HEADER = 'name,slug,description,email,phone,address,area,pincode,category'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', user_type='institute')
+        Category.objects.create(name='Engineering', slug='engineering', icon='gear')
+
+    def setUp(self):
+        import_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, import_root, ignore_errors=True)
+        settings_override = override_settings(IMPORT_ROOT=import_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.import_root = import_root
+
+    def row(self, name, slug='', email='info@example.com'):
+        return f'{name},{slug},Coaching,{email},9999999999,Road 1,Ameerpet,500016,engineering'
+
+    def make_job(self, lines, name='institutes.csv'):
+        job = CatalogImport(kind='institutes', default_owner=self.owner)
+        job.file.save(name, ContentFile('\n'.join(lines) + '\n'), save=True)
+        return job
+
+    def report_rows(self, job):
+        job.refresh_from_db()
+        with job.error_report.open('r') as report:
+            return list(csv.reader(report))
+
+    def test_files_stay_under_import_root(self):
+        job = self.make_job([self.HEADER, self.row('Academy')])
+        self.assertTrue(job.file.path.startswith(os.path.abspath(self.import_root)))
+
+    def test_parse_and_validation_errors_are_reported(self):
+        job = self.make_job([
+            self.HEADER,
+            self.row('Good Academy'),
+            self.row('Extra Academy') + ',surplus',
+            self.row('Bad Email Academy', email='not-an-email'),
+            self.row('Unknown Category').replace('engineering', 'cooking'),
+        ])
+        run_import(job, batch_size=10)
+
+        job.refresh_from_db()
+        self.assertEqual(
+            (job.status, job.rows_processed, job.created_count, job.error_count), ('done', 4, 1, 3),
+        )
+        rows = self.report_rows(job)
+        self.assertEqual(rows[0], importer.ERROR_REPORT_COLUMNS)
+        self.assertEqual([row[0] for row in rows[1:]], ['2', '3', '4'])
+        self.assertIn('10 values but only 9 columns', rows[1][1])
+        self.assertEqual(rows[1][2], '')
+        self.assertIn('email', rows[2][1])
+        self.assertEqual(json.loads(rows[2][2])['name'], 'Bad Email Academy')
+        self.assertIn('no category "cooking"', rows[3][1])
+
+    def test_jsonl_errors(self):
+        good = json.dumps({
+            'name': 'Json Academy', 'description': 'Coaching', 'email': 'info@example.com',
+            'phone': '9999999999', 'address': 'Road 1', 'area': 'Ameerpet', 'pincode': '500016',
+        })
+        job = self.make_job([good, '{"name": ', '["a list"]'], name='institutes.jsonl')
+        run_import(job)
+        rows = self.report_rows(job)
+        self.assertEqual([row[0] for row in rows[1:]], ['2', '3'])
+        self.assertIn('Invalid JSON', rows[1][1])
+        self.assertEqual(rows[2][1], 'Expected a JSON object')
+        self.assertTrue(Institute.objects.filter(slug='json-academy').exists())
+
+    def test_resume_after_a_failed_batch(self):
+        job = self.make_job([
+            self.HEADER,
+            self.row('Academy One'), self.row('Bad One', email='x'),
+            self.row('Academy Two'), self.row('Bad Two', email='x'),
+            self.row('Academy Three'),
+        ])
+        # The second batch fails on its last write, the progress update
+        update = QuerySet.update
+        progress_updates = []
+
+        def fail_second_batch(queryset, **kwargs):
+            if 'position' in kwargs:
+                progress_updates.append(kwargs)
+                if len(progress_updates) == 2:
+                    raise DatabaseError('database went away')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', fail_second_batch):
+            with self.assertRaises(DatabaseError):
+                run_import(job, batch_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed, job.error_count), ('failed', 2, 1))
+        self.assertEqual(len(self.report_rows(job)), 2)
+
+        run_import(job, batch_size=2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_processed, job.created_count, job.error_count), ('done', 5, 3, 2))
+        self.assertEqual(
+            sorted(Institute.objects.values_list('slug', flat=True)),
+            ['academy-one', 'academy-three', 'academy-two'],
+        )
+        # Each failed row is reported once
+        self.assertEqual([row[0] for row in self.report_rows(job)[1:]], ['2', '4'])
+
+    def test_repeated_names_and_slugs(self):
+        Institute.objects.create(
+            owner=self.owner, name='Old Name', slug='abc-academy', description='Old', email='old@example.com',
+            phone='1111111111', address='Road 2', area='Kukatpally', pincode='500072',
+        )
+        job = self.make_job([
+            self.HEADER,
+            # Same name, no slug: new institutes with numbered slugs
+            self.row('ABC Academy'), self.row('ABC Academy'),
+            # Existing slug: an update of the cells given, the later row winning
+            'Renamed,abc-academy,,first@example.com,,,,,',
+            'Renamed Again,abc-academy,,,,,,,',
+        ])
+        run_import(job, batch_size=10)
+
+        job.refresh_from_db()
+        self.assertEqual((job.created_count, job.updated_count, job.error_count), (2, 1, 0))
+        self.assertEqual(
+            sorted(Institute.objects.values_list('slug', flat=True)),
+            ['abc-academy', 'abc-academy-2', 'abc-academy-3'],
+        )
+        updated = Institute.objects.get(slug='abc-academy')
+        self.assertEqual(
+            (updated.name, updated.email, updated.description, updated.area),
+            ('Renamed Again', 'first@example.com', 'Old', 'Kukatpally'),
+        )
+        self.assertFalse(job.error_report)
+
+
+class GazetteerTests(TestCase):
+    """Coordinates estimated from the pincode/area gazetteer, on save and by the backfill command"""
+
+    AMEERPET = (Decimal('17.437500'), Decimal('78.448200'))
+    BEGUMPET = (Decimal('17.444000'), Decimal('78.468000'))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username='owner', user_type='institute')
+
+    def setUp(self):
+        gazetteer.reset_gazetteer()
+
+    def create(self, slug, pincode='500016', area='Ameerpet', **fields):
+        return Institute.objects.create(
+            owner=self.owner, name=slug, slug=slug, description='-', email='academy@example.com',
+            phone='9999999999', address='Road 1', area=area, pincode=pincode, **fields,
+        )
+
+    def coordinates(self, institute):
+        institute.refresh_from_db()
+        return institute.latitude, institute.longitude, institute.coordinates_estimated
+
+    def test_lookup_order(self):
+        self.assertEqual(gazetteer.locate('500016', 'ameerpet'), self.AMEERPET)
+        self.assertEqual(gazetteer.locate('', 'S.R. Nagar!', 'Hyderabad'), gazetteer.locate('500038', 'SR Nagar'))
+        self.assertEqual(gazetteer.locate('500016', 'Unknown Colony'), (Decimal('17.440750'), Decimal('78.458100')))
+        self.assertIsNone(gazetteer.locate('999999', 'Nowhere'))
+
+    def test_estimates_follow_the_address_until_edited_by_hand(self):
+        institute = self.create('estimated')
+        self.assertEqual(self.coordinates(institute), (*self.AMEERPET, True))
+        self.assertEqual(institute.geohash, geo.encode(*map(float, self.AMEERPET)))
+
+        institute.area = 'Begumpet'
+        institute.save()
+        self.assertEqual(self.coordinates(institute), (*self.BEGUMPET, True))
+
+        institute.latitude, institute.longitude = Decimal('17.450000'), Decimal('78.470000')
+        institute.save()
+        institute.area = 'Ameerpet'
+        institute.save()
+        self.assertEqual(self.coordinates(institute), (Decimal('17.450000'), Decimal('78.470000'), False))
+
+    def test_unknown_address_clears_an_estimate(self):
+        institute = self.create('moved')
+        institute.pincode, institute.area = '999999', 'Nowhere'
+        institute.save()
+        self.assertEqual(self.coordinates(institute), (None, None, False))
+        self.assertEqual(institute.geohash, '')
+
+    def test_backfill_command(self):
+        missing = self.create('missing')
+        unknown = self.create('unknown', pincode='999999', area='Nowhere')
+        by_hand = self.create('by-hand', latitude=Decimal('17.400000'), longitude=Decimal('78.400000'))
+        stale = self.create('stale')
+        # Rows from before the gazetteer, or written without save()
+        Institute.objects.filter(pk=missing.pk).update(latitude=None, longitude=None, coordinates_estimated=False, geohash='')
+        Institute.objects.filter(pk=stale.pk).update(area='Begumpet')
+
+        output = io.StringIO()
+        call_command('fill_institute_coordinates', stdout=output)
+        self.assertIn('Filled in coordinates for 1 institute(s)', output.getvalue())
+        self.assertIn('1 institute(s) have a pincode/area that is not in the gazetteer', output.getvalue())
+        self.assertEqual(self.coordinates(missing), (*self.AMEERPET, True))
+        self.assertEqual(missing.geohash, geo.encode(*map(float, self.AMEERPET)))
+        self.assertEqual(self.coordinates(unknown), (None, None, False))
+        self.assertEqual(self.coordinates(by_hand), (Decimal('17.400000'), Decimal('78.400000'), False))
+        self.assertEqual(self.coordinates(stale), (*self.AMEERPET, True))
+
+        # --refresh looks estimates up again; hand-entered coordinates stay
+        call_command('fill_institute_coordinates', '--refresh', stdout=io.StringIO())
+        self.assertEqual(self.coordinates(stale), (*self.BEGUMPET, True))
+        self.assertEqual(self.coordinates(by_hand), (Decimal('17.400000'), Decimal('78.400000'), False))
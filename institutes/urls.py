@@ -0,0 +1,10 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import InstituteViewSet
+
+router = DefaultRouter()
+router.register('institutes', InstituteViewSet, basename='institute')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
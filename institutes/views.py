@@ -1,3 +1,272 @@
-from django.shortcuts import render
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from courses.models import Course
+from eduhyd_backend.pagination import CreatedAtCursorPagination
+from eduhyd_backend.permissions import IsOwnerOrStaffOrReadOnly
+from reviews.models import Review
+from reviews.serializers import ReviewFeedSerializer
+from . import geo
+from .documents import institute_detail_documents, institute_list_documents
+from .models import Category, Institute
+from .serializers import (
+    InstituteListSerializer,
+    InstituteDetailSerializer,
+    InstituteNearbySerializer,
+    InstituteProfileSerializer,
+)
 
-# Create your views here.
+
+# ========================================
+# INSTITUTE VIEWSET
+# ========================================
+class InstituteViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for Institute CRUD operations
+
+    Automatic endpoints created:
+    - GET    /api/institutes/               -> List institutes
+    - POST   /api/institutes/               -> Create institute (owned by the logged-in user)
+    - GET    /api/institutes/{slug}/        -> Get single institute
+    - PUT    /api/institutes/{slug}/        -> Update institute (owner or staff)
+    - PATCH  /api/institutes/{slug}/        -> Partial update (owner or staff)
+    - DELETE /api/institutes/{slug}/        -> Delete institute (owner or staff)
+    - GET    /api/institutes/nearby/        -> Institutes near a location
+    - GET    /api/institutes/{slug}/profile/ -> Institute page with courses and reviews
+    - GET    /api/institutes/{slug}/reviews/ -> Rating histogram and approved reviews, paginated
+    - GET    /api/institutes/top-rated/     -> Best ranked institutes
+
+    New institutes wait for approval: only staff set status and is_featured.
+    """
+
+    queryset = Institute.objects.select_related('category', 'owner')
+    permission_classes = [IsOwnerOrStaffOrReadOnly]
+    owner_field = 'owner_id'
+    pagination_class = CreatedAtCursorPagination
+    lookup_field = 'slug'
+    filterset_fields = ['category__slug', 'area', 'city', 'status', 'is_featured']
+
+    # Limits for the nearby search
+    NEARBY_DEFAULT_LIMIT = 20
+    NEARBY_MAX_LIMIT = 100
+    NEARBY_MAX_RADIUS_KM = 50
+
+    # Approved reviews shown on the institute page
+    PROFILE_LATEST_REVIEWS = 5
+
+    # Limits for the top rated list
+    TOP_RATED_DEFAULT_LIMIT = 20
+    TOP_RATED_MAX_LIMIT = 100
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return InstituteListSerializer
+        return InstituteDetailSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        """
+        List institutes from cached documents
+
+        Only the ids of the page come from the database (keyset paginated on
+        created_at, id); the documents are fetched from the cache in one
+        multi-get (see institutes.documents).
+        """
+        rows = self.filter_queryset(self.get_queryset()).select_related(None).only('pk', 'created_at')
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(institute_list_documents.get_many([row.pk for row in page], request))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Single institute from its cached document"""
+        pk = get_object_or_404(
+            self.get_queryset().values_list('pk', flat=True), slug=kwargs[self.lookup_field]
+        )
+        return Response(institute_detail_documents.get(pk, request))
+
+    def get_profile_queryset(self):
+        """
+        Everything the institute page shows, in 5 queries whatever its size:
+
+        1. the institute with its category and owner (the rating histogram
+           is stored on the institute row)
+        2. its photos
+        3. its active courses
+        4. their batches
+        5. its latest approved reviews with their authors
+        """
+        latest_reviews = (
+            Review.objects.filter(is_approved=True)
+            .select_related('user')
+            .order_by('-created_at', '-id')[:self.PROFILE_LATEST_REVIEWS]
+        )
+        return (
+            Institute.objects.select_related('category', 'owner')
+            .prefetch_related(
+                'photos',
+                Prefetch(
+                    'courses', queryset=Course.objects.filter(is_active=True).prefetch_related('batches'),
+                    to_attr='active_courses',
+                ),
+                Prefetch('reviews', queryset=latest_reviews, to_attr='latest_reviews'),
+            )
+        )
+
+    @action(detail=True, methods=['get'])
+    def profile(self, request, slug=None):
+        """
+        Institute page in one request
+
+        Example URL:
+        - /api/institutes/abc-academy/profile/
+              -> Details, photos, active courses, rating histogram and
+                 the latest approved reviews
+
+        Runs a fixed number of queries (see get_profile_queryset); the
+        tests in institutes/tests.py fail if that number changes.
+        """
+        institute = get_object_or_404(self.get_profile_queryset(), slug=slug)
+        serializer = InstituteProfileSerializer(institute, context={'request': request})
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def reviews(self, request, slug=None):
+        """
+        Approved reviews of one institute, newest first, with its rating histogram
+
+        Example URLs:
+        - /api/institutes/abc-academy/reviews/               -> First page
+        - /api/institutes/abc-academy/reviews/?cursor=...    -> Next page (see "next")
+        - /api/institutes/abc-academy/reviews/?page_size=50  -> Bigger pages
+
+        Two queries per page: the institute row, which stores the star
+        counts, and the page of reviews with their authors' usernames,
+        keyset paginated on the (institute, is_approved, created_at, id)
+        index.
+        """
+        institute = get_object_or_404(
+            Institute.objects.only('pk', *Institute.RATING_FIELDS), slug=slug
+        )
+        reviews = (
+            Review.objects.filter(institute=institute, is_approved=True)
+            .select_related('user')
+            .only('id', 'rating', 'review_text', 'created_at', 'user__username')
+        )
+        paginator = CreatedAtCursorPagination()
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        response = paginator.get_paginated_response(ReviewFeedSerializer(page, many=True).data)
+        response.data['average_rating'] = round(institute.rating_avg, 1)
+        response.data['total_reviews'] = institute.rating_count
+        response.data['rating_histogram'] = {
+            str(stars): getattr(institute, f'rating_{stars}_count') for stars in range(5, 0, -1)
+        }
+        return response
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Institutes near a location, closest first
+
+        Example URLs:
+        - /api/institutes/nearby/?lat=17.43&lng=78.44&radius_km=5
+              -> All institutes within 5 km
+        - /api/institutes/nearby/?lat=17.43&lng=78.44&limit=10
+              -> The 10 closest institutes
+        - /api/institutes/nearby/?lat=17.43&lng=78.44&radius_km=3&category=engineering
+              -> Engineering institutes within 3 km
+
+        Only active institutes are returned unless ?status= says otherwise.
+        """
+        # Step 1: Read and validate the location
+        try:
+            latitude = float(request.query_params['lat'])
+            longitude = float(request.query_params['lng'])
+            radius_km = request.query_params.get('radius_km')
+            radius_km = float(radius_km) if radius_km else None
+            limit = int(request.query_params.get('limit', self.NEARBY_DEFAULT_LIMIT))
+        except (KeyError, ValueError):
+            return Response({
+                'error': 'lat and lng are required; radius_km and limit must be numbers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return Response({
+                'error': 'lat/lng out of range'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if radius_km is not None and not 0 < radius_km <= self.NEARBY_MAX_RADIUS_KM:
+            return Response({
+                'error': f'radius_km must be between 0 and {self.NEARBY_MAX_RADIUS_KM}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.NEARBY_MAX_LIMIT))
+
+        # Step 2: Apply category/status filters before the spatial search
+        queryset = Institute.objects.exclude(geohash='')
+        category = request.query_params.get('category')
+        if category:
+            queryset = queryset.filter(category__slug=category)
+        queryset = queryset.filter(status=request.query_params.get('status', 'active'))
+
+        # Step 3: Geohash prefilter + exact haversine distance
+        if radius_km is not None:
+            matches = geo.within_radius(queryset, latitude, longitude, radius_km)[:limit]
+        else:
+            matches = geo.nearest(queryset, latitude, longitude, limit)
+
+        # Step 4: Load the matched institutes and keep the distance order
+        institutes = self.get_queryset().in_bulk([pk for _, pk in matches])
+        results = []
+        for distance, pk in matches:
+            institute = institutes[pk]
+            institute.distance_km = distance
+            results.append(institute)
+
+        serializer = InstituteNearbySerializer(results, many=True, context={'request': request})
+        return Response({
+            'count': len(results),
+            'results': serializer.data,
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='top-rated')
+    def top_rated(self, request):
+        """
+        Active institutes by their stored ranking score, best first
+
+        Example URLs:
+        - /api/institutes/top-rated/                          -> Top 20 overall
+        - /api/institutes/top-rated/?category=engineering&limit=10
+              -> Top 10 engineering institutes
+
+        The score smooths ratings with few reviews towards the site-wide
+        mean and adds review recency, enquiries and featured status (see
+        institutes.ranking). Each list is the first rows of one index range.
+        """
+        try:
+            limit = int(request.query_params.get('limit', self.TOP_RATED_DEFAULT_LIMIT))
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.TOP_RATED_MAX_LIMIT))
+
+        queryset = Institute.objects.filter(status='active')
+        category = request.query_params.get('category')
+        if category:
+            # Look the category up first so the ranking query stays on the
+            # (category, status, -ranking_score) index
+            category_id = Category.objects.filter(slug=category).values_list('pk', flat=True).first()
+            if category_id is None:
+                # filter(category_id=None) would list the uncategorized institutes
+                return Response({'count': 0, 'results': []}, status=status.HTTP_200_OK)
+            queryset = queryset.filter(category_id=category_id)
+        ranked = list(queryset.order_by('-ranking_score').values_list('pk', 'ranking_score')[:limit])
+
+        scores = dict(ranked)
+        results = [
+            {**document, 'ranking_score': round(scores[document['id']], 4)}
+            for document in institute_list_documents.get_many([pk for pk, _ in ranked], request)
+        ]
+        return Response({
+            'count': len(results),
+            'results': results,
+        }, status=status.HTTP_200_OK)
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Review
+from django.utils import timezone
+from .exports import export_reviews
+from .moderation import moderate_reviews
+from .models import PendingReview, Review
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
@@ -21,7 +24,10 @@ class ReviewAdmin(admin.ModelAdmin):
     
     list_editable = ['is_approved']
     
-    readonly_fields = ['created_at', 'updated_at']
+    # One joined query for the page instead of two lookups per row
+    list_select_related = ['user', 'institute']
+    
+    readonly_fields = ['moderated_at', 'created_at', 'updated_at']
     
     list_per_page = 50
     
@@ -32,7 +38,7 @@ class ReviewAdmin(admin.ModelAdmin):
             'fields': ('user', 'institute', 'rating', 'review_text')
         }),
         ('Moderation', {
-            'fields': ('is_approved',)
+            'fields': ('is_approved', 'moderated_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -40,7 +46,7 @@ class ReviewAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['approve_reviews', 'disapprove_reviews']
+    actions = ['approve_reviews', 'disapprove_reviews', 'export_csv', 'export_xlsx']
     
     def get_user_name(self, obj):
         return obj.user.username
@@ -52,12 +58,64 @@ class ReviewAdmin(admin.ModelAdmin):
     get_institute_name.short_description = 'Institute'
     get_institute_name.admin_order_field = 'institute__name'
     
+    def save_model(self, request, obj, form, change):
+        if 'is_approved' in form.changed_data:
+            obj.moderated_at = timezone.now()
+        super().save_model(request, obj, form, change)
+    
     def approve_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=True)
-        self.message_user(request, f'{updated} review(s) approved.', 'success')
+        # Chunked, and only the affected institutes' aggregates are updated
+        moderated, changed = moderate_reviews(queryset, approve=True)
+        self.message_user(request, f'{moderated} review(s) approved ({changed} newly visible).', 'success')
     approve_reviews.short_description = "✅ Approve selected reviews"
     
     def disapprove_reviews(self, request, queryset):
-        updated = queryset.update(is_approved=False)
-        self.message_user(request, f'{updated} review(s) hidden.', 'warning')
-    disapprove_reviews.short_description = "❌ Hide selected reviews"
\ No newline at end of file
+        moderated, changed = moderate_reviews(queryset, approve=False)
+        self.message_user(request, f'{moderated} review(s) hidden ({changed} newly hidden).', 'warning')
+    disapprove_reviews.short_description = "❌ Hide selected reviews"
+    
+    # Exports stream in chunks (see eduhyd_backend.exports)
+    def export_csv(self, request, queryset):
+        return export_reviews(queryset, 'csv')
+    export_csv.short_description = "⬇️ Export selected as CSV"
+    
+    def export_xlsx(self, request, queryset):
+        return export_reviews(queryset, 'xlsx')
+    export_xlsx.short_description = "⬇️ Export selected as Excel"
+
+
+@admin.register(PendingReview)
+class PendingReviewAdmin(ReviewAdmin):
+    """
+    Moderation queue: reviews nobody has approved or hidden yet, oldest first.
+
+    Select reviews (or "select all" across pages) and approve or hide them;
+    decided reviews leave the queue.
+    """
+    
+    list_display = [
+        'get_user_name', 'get_institute_name', 'rating', 'get_excerpt',
+        'is_approved', 'created_at'
+    ]
+    
+    list_filter = ['rating', 'is_approved']
+    
+    list_editable = []
+    
+    list_per_page = 100
+    
+    # Skip the second COUNT(*) of the whole table on every page
+    show_full_result_count = False
+    
+    ordering = ['created_at', 'id']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(moderated_at__isnull=True)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_excerpt(self, obj):
+        text = obj.review_text
+        return text if len(text) <= 120 else f'{text[:117]}...'
+    get_excerpt.short_description = 'Review'
@@ -0,0 +1,140 @@
+"""
+Near-duplicate review clustering over the whole review table.
+
+All review signatures (see reviews.minhash) are loaded into one NumPy
+array, oldest review first. For each of the BANDS bands the rows are
+sorted by that band, so reviews sharing the band end up next to each
+other. Each one is compared with the first (oldest) review of its run,
+and pairs whose signatures agree on at least DUPLICATE_SIMILARITY of
+their positions are joined with union-find. The cost is a sort per band,
+roughly linear in the number of reviews, instead of one comparison per
+pair. Memory is NUM_HASHES * 4 bytes per review.
+
+In each cluster the oldest review is taken as the original. The others are
+hidden and put back in the moderation queue (reviews.moderation), unless a
+moderator already approved them by hand.
+"""
+import time
+
+import numpy as np
+from .minhash import BANDS, NUM_HASHES, ROWS, review_signature
+from .moderation import moderate_reviews
+from .models import NO_SIGNATURE, Review
+
+# Estimated Jaccard similarity from which two reviews count as copies
+DUPLICATE_SIMILARITY = 0.7
+
+
+class DuplicateScan:
+    """Result of find_duplicate_clusters"""
+
+    def __init__(self):
+        self.reviews = 0        # reviews scanned
+        self.signed = 0         # signatures computed for reviews saved without one
+        self.comparisons = 0    # candidate pairs checked
+        self.clusters = []      # lists of review ids, oldest first, biggest cluster first
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        """Reviews scanned per second"""
+        return self.reviews / self.seconds if self.seconds else 0.0
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        root = item
+        while self.parent.setdefault(root, root) != root:
+            root = self.parent[root]
+        while item != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first, second):
+        """Join two sets; the lower position stays the root"""
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def _fill_missing_signatures(scan, batch_size):
+    """Sign reviews saved before signatures existed (or written with .update())"""
+    missing = Review.objects.filter(text_signature__isnull=True).order_by('pk').values_list('pk', 'review_text')
+    changed = []
+    for pk, text in missing.iterator(chunk_size=batch_size):
+        changed.append(Review(pk=pk, text_signature=review_signature(text) or NO_SIGNATURE))
+        scan.signed += 1
+        if len(changed) >= batch_size:
+            Review.objects.bulk_update(changed, ['text_signature'])
+            changed = []
+    Review.objects.bulk_update(changed, ['text_signature'])
+
+
+def _candidate_pairs(signatures, band):
+    """(first of run, member) row pairs of reviews sharing a band"""
+    columns = signatures[:, band * ROWS:(band + 1) * ROWS]
+    # lexsort is stable, so each run keeps the oldest review first
+    order = np.lexsort(columns.T[::-1])
+    ordered = columns[order]
+    starts_run = np.ones(len(order), dtype=bool)
+    starts_run[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    run_first = order[np.flatnonzero(starts_run)[np.cumsum(starts_run) - 1]]
+    paired = run_first != order
+    return run_first[paired], order[paired]
+
+
+def find_duplicate_clusters(batch_size=2000):
+    """Cluster near-duplicate reviews; returns a DuplicateScan"""
+    scan = DuplicateScan()
+    started = time.monotonic()
+    _fill_missing_signatures(scan, batch_size)
+
+    pks, data = [], bytearray()
+    rows = (
+        Review.objects.filter(text_signature__isnull=False).exclude(text_signature=NO_SIGNATURE)
+        .order_by('created_at', 'pk').values_list('pk', 'text_signature')
+    )
+    for pk, signature in rows.iterator(chunk_size=batch_size):
+        pks.append(pk)
+        data += signature
+    scan.reviews = len(pks)
+    if not pks:
+        scan.seconds = time.monotonic() - started
+        return scan
+    signatures = np.frombuffer(bytes(data), dtype=np.uint32).reshape(len(pks), NUM_HASHES)
+
+    # Rows are positions in pks, i.e. in age order
+    clusters = _UnionFind()
+    for band in range(BANDS):
+        firsts, members = _candidate_pairs(signatures, band)
+        scan.comparisons += len(members)
+        agreement = np.mean(signatures[firsts] == signatures[members], axis=1)
+        similar = agreement >= DUPLICATE_SIMILARITY
+        for first, member in zip(firsts[similar].tolist(), members[similar].tolist()):
+            clusters.union(first, member)
+
+    grouped = {}
+    for row in list(clusters.parent):
+        grouped.setdefault(clusters.find(row), []).append(row)
+    scan.clusters = sorted(
+        ([pks[row] for row in sorted(rows)] for rows in grouped.values() if len(rows) > 1),
+        key=len, reverse=True,
+    )
+    scan.seconds = time.monotonic() - started
+    return scan
+
+
+def flag_duplicate_reviews(scan=None):
+    """
+    Hide every review but the oldest in each duplicate cluster and queue
+    them for moderation. Returns (scan, number of reviews flagged).
+    """
+    scan = scan or find_duplicate_clusters()
+    copies = [pk for cluster in scan.clusters for pk in cluster[1:]]
+    # A moderator's approval overrides the detector
+    to_flag = Review.objects.filter(pk__in=copies, is_approved=True, moderated_at__isnull=True)
+    flagged, _ = moderate_reviews(to_flag, approve=False, queue=True)
+    return scan, flagged
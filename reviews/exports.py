@@ -0,0 +1,24 @@
+"""Review exports for owners and staff (see eduhyd_backend.exports)"""
+from eduhyd_backend.exports import export_response
+
+REVIEW_EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Written at', 'created_at'),
+    ('Institute', 'institute__name'),
+    ('User', 'user__username'),
+    ('Rating', 'rating'),
+    ('Approved', 'is_approved'),
+    ('Moderated at', 'moderated_at'),
+    ('Review', 'review_text'),
+]
+
+# ?status= of the review export
+REVIEW_STATUS_FILTERS = {
+    'approved': {'is_approved': True},
+    'hidden': {'is_approved': False},
+    'pending': {'moderated_at__isnull': True},
+}
+
+
+def export_reviews(queryset, file_format='csv'):
+    return export_response(queryset, REVIEW_EXPORT_COLUMNS, 'reviews', file_format)
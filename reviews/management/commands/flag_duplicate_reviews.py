@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from reviews.duplicates import flag_duplicate_reviews
+
+
+class Command(BaseCommand):
+    help = "Hide near-duplicate reviews and queue them for moderation (see reviews/duplicates.py); run nightly"
+
+    def handle(self, *args, **options):
+        scan, flagged = flag_duplicate_reviews()
+        copies = sum(len(cluster) - 1 for cluster in scan.clusters)
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {scan.reviews} review(s) in {scan.seconds:.1f}s: {len(scan.clusters)} cluster(s), '
+            f'{copies} copies, {flagged} newly hidden and queued for moderation.'
+        ))
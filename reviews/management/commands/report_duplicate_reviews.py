@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from reviews.duplicates import DUPLICATE_SIMILARITY, find_duplicate_clusters
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = "Show near-duplicate review clusters and how fast they were found, without changing reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clusters', type=int, default=20, help='How many of the biggest clusters to show')
+
+    def handle(self, *args, **options):
+        scan = find_duplicate_clusters()
+        copies = sum(len(cluster) - 1 for cluster in scan.clusters)
+        self.stdout.write(
+            f'Scanned {scan.reviews} review(s) in {scan.seconds:.2f}s ({scan.throughput:,.0f} reviews/s), '
+            f'signed {scan.signed} unsigned review(s), checked {scan.comparisons} candidate pair(s).'
+        )
+        self.stdout.write(
+            f'{len(scan.clusters)} cluster(s) at similarity >= {DUPLICATE_SIMILARITY}, holding {copies} copies.'
+        )
+
+        shown = scan.clusters[:options['clusters']]
+        reviews = Review.objects.select_related('user', 'institute').in_bulk(
+            [pk for cluster in shown for pk in cluster]
+        )
+        for number, cluster in enumerate(shown, start=1):
+            original = reviews[cluster[0]]
+            members = [reviews[pk] for pk in cluster]
+            users = len({review.user_id for review in members})
+            institutes = len({review.institute_id for review in members})
+            hidden = sum(not review.is_approved for review in members)
+            self.stdout.write('')
+            self.stdout.write(self.style.WARNING(
+                f'#{number}: {len(cluster)} reviews by {users} user(s) on {institutes} institute(s), {hidden} hidden'
+            ))
+            self.stdout.write(f'  original #{original.pk} by {original.user.username}: {original.review_text[:100]!r}')
+            for review in members[1:6]:
+                self.stdout.write(f'  copy #{review.pk} by {review.user.username} on {review.institute.name}')
+            if len(members) > 6:
+                self.stdout.write(f'  ... and {len(members) - 6} more')
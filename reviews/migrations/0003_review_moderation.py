@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0007_locality_institute_coordinates_estimated'),
+        ('reviews', '0002_review_review_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingReview',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'pending review',
+                'verbose_name_plural': 'moderation queue',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('reviews.review',),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='moderated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['moderated_at', 'created_at', 'id'], name='review_moderation_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0009_institute_rating_star_counts'),
+        ('reviews', '0003_review_moderation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['institute', 'is_approved', 'created_at', 'id'], name='review_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_review_review_feed_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='text_signature',
+            field=models.BinaryField(null=True),
+        ),
+    ]
@@ -0,0 +1,68 @@
+"""
+MinHash signatures of review texts.
+
+Two reviews are near-duplicates when most of their 3-word shingles are
+shared (Jaccard similarity). Comparing every pair is quadratic, so each
+review stores a MinHash signature instead: NUM_HASHES minimum hash values
+over its shingles. The fraction of positions where two signatures agree
+estimates their Jaccard similarity, and splitting signatures into BANDS
+bands lets likely duplicates be found by sorting (see reviews.duplicates).
+
+    >>> a = review_signature('The faculty explain every topic clearly and the lab sessions are very useful')
+    >>> b = review_signature('The faculty explain every topic clearly and the lab sessions are really useful')
+    >>> c = review_signature('Fees are too high for what they teach and the classrooms are always crowded')
+    >>> similarity(a, b) > 0.5 > similarity(a, c)
+    True
+    >>> review_signature('Good institute') is None     # too short to tell copies from coincidence
+    True
+"""
+import re
+import zlib
+
+import numpy as np
+
+NUM_HASHES = 64
+# 16 bands of 4 rows: pairs above ~0.5 similarity usually share a band
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+
+SHINGLE_WORDS = 3
+# Short reviews ("Very good institute") repeat by coincidence
+MIN_WORDS = 8
+
+# Universal hashing (a * x + b) mod PRIME, with a fixed seed so signatures
+# stay comparable across processes and releases
+PRIME = (1 << 31) - 1
+_random = np.random.RandomState(20261018)
+_A = _random.randint(1, PRIME, size=NUM_HASHES).astype(np.uint64)
+_B = _random.randint(0, PRIME, size=NUM_HASHES).astype(np.uint64)
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def shingles(text):
+    """The set of 3-word shingles of a text, ignoring case and punctuation"""
+    words = WORD_RE.findall((text or '').lower())
+    if len(words) < MIN_WORDS:
+        return set()
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def review_signature(text):
+    """MinHash signature of a review text as bytes, or None if it is too short"""
+    parts = shingles(text)
+    if not parts:
+        return None
+    hashes = np.fromiter((zlib.crc32(part.encode()) % PRIME for part in parts), dtype=np.uint64)
+    values = (_A[:, None] * hashes[None, :] + _B[:, None]) % PRIME
+    return values.min(axis=1).astype(np.uint32).tobytes()
+
+
+def signature_array(signature):
+    return np.frombuffer(bytes(signature), dtype=np.uint32)
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(signature_array(first) == signature_array(second)))
+
@@ -2,6 +2,10 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from accounts.models import User
 from institutes.models import Institute
+from .minhash import review_signature
+
+# text_signature of reviews too short to be checked for copies
+NO_SIGNATURE = b''
 
 class Review(models.Model):
     """Review and rating model"""
@@ -15,6 +19,11 @@ class Review(models.Model):
     
     # Moderation
     is_approved = models.BooleanField(default=True)
+    # Set once a moderator approved or hid the review; until then it waits
+    # in the moderation queue (see reviews.moderation)
+    moderated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # MinHash of review_text for near-duplicate detection (see reviews.duplicates)
+    text_signature = models.BinaryField(null=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -23,6 +32,30 @@ class Review(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['user', 'institute']  # One review per user per institute
+        indexes = [
+            # Keyset pagination (see eduhyd_backend.pagination)
+            models.Index(fields=['created_at', 'id'], name='review_created_id_idx'),
+            # An institute's approved reviews, newest first, keyset paginated
+            models.Index(fields=['institute', 'is_approved', 'created_at', 'id'], name='review_feed_idx'),
+            # Moderation queue: unmoderated reviews, oldest first
+            models.Index(fields=['moderated_at', 'created_at', 'id'], name='review_moderation_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.institute.name} ({self.rating}★)"
\ No newline at end of file
+        return f"{self.user.username} - {self.institute.name} ({self.rating}★)"
+
+    def save(self, *args, **kwargs):
+        self.text_signature = review_signature(self.review_text) or NO_SIGNATURE
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'review_text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'text_signature'}
+        super().save(*args, **kwargs)
+
+
+class PendingReview(Review):
+    """Reviews no moderator has looked at yet; the admin moderation queue"""
+
+    class Meta:
+        proxy = True
+        verbose_name = 'pending review'
+        verbose_name_plural = 'moderation queue'
@@ -0,0 +1,54 @@
+"""
+Bulk review moderation.
+
+Approving or hiding reviews one save() at a time costs a few queries per
+review for the rating aggregate signals. moderate_reviews() decides them
+in chunks instead: per chunk it locks and reads the reviews, updates them
+with one statement and shifts the rating aggregates of just the institutes
+whose reviews changed (Institute.apply_rating_changes), which also drops
+those institutes' cached documents. Each chunk is its own transaction, so
+a long run never holds locks on thousands of rows and a failure keeps the
+chunks already done.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from institutes.models import Institute
+from .models import Review
+
+
+def moderate_reviews(reviews, approve, chunk_size=None, queue=False):
+    """
+    Approve (approve=True) or hide a queryset of reviews.
+
+    Every review is marked as moderated, which takes it off the moderation
+    queue; with queue=True they are put (back) on it instead, for a person
+    to confirm an automatic decision. Returns (reviews moderated, reviews
+    whose visibility changed).
+    """
+    chunk_size = chunk_size or getattr(settings, 'REVIEW_MODERATION_CHUNK_SIZE', 500)
+    ids = list(reviews.order_by('pk').values_list('pk', flat=True))
+    moderated = changed = 0
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        with transaction.atomic():
+            rows = list(
+                Review.objects.select_for_update().filter(pk__in=chunk).order_by()
+                .values_list('institute_id', 'rating', 'is_approved')
+            )
+            now = timezone.now()
+            Review.objects.filter(pk__in=chunk).update(
+                is_approved=approve, moderated_at=None if queue else now, updated_at=now,
+            )
+
+            sign = 1 if approve else -1
+            star_changes = defaultdict(Counter)
+            for institute_id, rating, was_approved in rows:
+                if was_approved != approve:
+                    star_changes[institute_id][rating] += sign
+                    changed += 1
+            Institute.apply_rating_changes(star_changes)
+        moderated += len(rows)
+    return moderated, changed
@@ -1,10 +1,13 @@
 from rest_framework import serializers
+from eduhyd_backend.permissions import StaffOnlyFieldsMixin
 from .models import Review
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(StaffOnlyFieldsMixin, serializers.ModelSerializer):
     """Review Serializer"""
     user_name = serializers.CharField(source='user.username', read_only=True)
     institute_name = serializers.CharField(source='institute.name', read_only=True)
+    # Approving is moderation (see reviews.moderation), not the author's call
+    staff_only_fields = ('is_approved',)
     
     class Meta:
         model = Review
@@ -12,7 +15,15 @@ class ReviewSerializer(serializers.ModelSerializer):
             'id', 'user', 'user_name', 'institute', 'institute_name',
             'rating', 'review_text', 'is_approved', 'created_at'
         ]
-        read_only_fields = ['user', 'created_at']
+        read_only_fields = ['user', 'institute', 'created_at']
+
+class ReviewFeedSerializer(serializers.ModelSerializer):
+    """A review in an institute's review feed"""
+    user_name = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'user_name', 'rating', 'review_text', 'created_at']
 
 class ReviewCreateSerializer(serializers.ModelSerializer):
     """Review Create Serializer"""
@@ -24,4 +35,11 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
         """Validate rating is between 1-5"""
         if value < 1 or value > 5:
             raise serializers.ValidationError("Rating must be between 1 and 5")
-        return value
\ No newline at end of file
+        return value
+    
+    def validate(self, attrs):
+        """One review per user per institute (the user comes from the request)"""
+        user = self.context['request'].user
+        if Review.objects.filter(user=user, institute=attrs['institute']).exists():
+            raise serializers.ValidationError({"institute": "You have already reviewed this institute"})
+        return attrs
\ No newline at end of file
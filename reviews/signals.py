@@ -0,0 +1,66 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from institutes.models import Institute
+from .models import Review
+
+# Fields a review's contribution to the institute rating aggregates depends on
+AGGREGATE_FIELDS = {'institute_id', 'rating', 'is_approved'}
+
+# Marker for instances loaded with some of those fields deferred
+UNKNOWN = object()
+
+
+def _counted_rating(instance):
+    """(institute_id, rating) if the review counts towards the aggregates, else None"""
+    if instance.institute_id is None or not instance.is_approved:
+        return None
+    return instance.institute_id, instance.rating
+
+
+def _apply(counted, sign):
+    if counted is not None:
+        institute_id, rating = counted
+        Institute.apply_rating_change(institute_id, rating, sign)
+
+
+@receiver(post_init, sender=Review)
+def remember_review_state(sender, instance, **kwargs):
+    """Snapshot what this review currently contributes, so saves can apply a delta"""
+    if not instance.pk:
+        instance._counted_rating = None
+    elif AGGREGATE_FIELDS & instance.get_deferred_fields():
+        # Reading deferred fields here would cost a query per row
+        instance._counted_rating = UNKNOWN
+    else:
+        instance._counted_rating = _counted_rating(instance)
+
+
+@receiver(pre_save, sender=Review)
+@receiver(pre_delete, sender=Review)
+def load_deferred_review_state(sender, instance, **kwargs):
+    """Read the stored contribution of partially loaded reviews before it changes"""
+    if instance._counted_rating is UNKNOWN:
+        stored = Review.objects.filter(pk=instance.pk).values_list(
+            'institute_id', 'rating', 'is_approved'
+        ).first()
+        instance._counted_rating = (
+            stored[:2] if stored and stored[2] and stored[0] is not None else None
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_rating_aggregates_on_save(sender, instance, raw=False, **kwargs):
+    """Move the review's old contribution out of the aggregates and the new one in"""
+    if raw:
+        return
+    before = instance._counted_rating
+    after = _counted_rating(instance)
+    if before != after:
+        _apply(before, -1)
+        _apply(after, +1)
+    instance._counted_rating = after
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_aggregates_on_delete(sender, instance, **kwargs):
+    _apply(instance._counted_rating, -1)
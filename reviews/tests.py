@@ -1,3 +1,394 @@
-from django.test import TestCase
+import base64
+import csv
+import doctest
+import io
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from institutes.models import Institute
+from institutes.testing import create_institute
+from . import minhash
+from .duplicates import find_duplicate_clusters, flag_duplicate_reviews
+from .moderation import moderate_reviews
+from .models import PendingReview, Review
+
+
+def load_tests(loader, tests, ignore):
+    """Run the examples in reviews/minhash.py as tests too"""
+    tests.addTests(doctest.DocTestSuite(minhash))
+    return tests
+
+
+class RatingAggregateTests(TestCase):
+    """Review saves and deletes keep the stored rating aggregates equal to a full recount"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institutes = [create_institute(f'Academy {number}') for number in range(2)]
+        cls.students = [User.objects.create(username=f'student-{number}') for number in range(6)]
+
+    def stored(self, institute):
+        return Institute.objects.filter(pk=institute.pk).values(*Institute.RATING_FIELDS).get()
+
+    def assert_aggregates_match_reviews(self):
+        stored = list(Institute.objects.order_by('pk').values_list('pk', *Institute.RATING_FIELDS))
+        Institute.refresh_rating_aggregates()
+        recomputed = list(Institute.objects.order_by('pk').values_list('pk', *Institute.RATING_FIELDS))
+        self.assertEqual(stored, recomputed)
+
+    def review(self, student, institute, rating, is_approved=True):
+        return Review.objects.create(
+            user=self.students[student], institute=self.institutes[institute], rating=rating,
+            review_text='-', is_approved=is_approved,
+        )
+
+    def test_create_edit_and_delete(self):
+        first = self.review(0, 0, 5)
+        self.review(1, 0, 2)
+        self.review(2, 0, 4, is_approved=False)
+        self.assertEqual(self.stored(self.institutes[0]), {
+            'rating_sum': 7, 'rating_count': 2, 'rating_avg': 3.5,
+            'rating_1_count': 0, 'rating_2_count': 1, 'rating_3_count': 0, 'rating_4_count': 0, 'rating_5_count': 1,
+        })
+
+        first.rating = 1
+        first.save()
+        first.review_text = 'Changed my mind'
+        first.save()  # no rating change: nothing to move
+        self.assertEqual(self.stored(self.institutes[0])['rating_sum'], 3)
+        self.assertEqual(self.stored(self.institutes[0])['rating_1_count'], 1)
+
+        first.institute = self.institutes[1]
+        first.save()
+        first.delete()
+        self.assertEqual(self.stored(self.institutes[1])['rating_count'], 0)
+        self.assertEqual(self.stored(self.institutes[0])['rating_count'], 1)
+        self.assert_aggregates_match_reviews()
+
+    def test_approve_and_unapprove(self):
+        hidden = self.review(0, 0, 3, is_approved=False)
+        shown = self.review(1, 0, 4)
+        self.assertEqual(self.stored(self.institutes[0])['rating_count'], 1)
+
+        hidden.is_approved = True
+        hidden.save()
+        shown.is_approved = False
+        shown.rating = 1  # changes while hidden don't count
+        shown.save()
+        self.assertEqual(self.stored(self.institutes[0])['rating_count'], 1)
+        self.assertEqual(self.stored(self.institutes[0])['rating_3_count'], 1)
+        self.assertEqual(self.stored(self.institutes[0])['rating_4_count'], 0)
+
+        # Deleting a hidden review leaves the aggregates alone
+        shown.delete()
+        self.assertEqual(self.stored(self.institutes[0])['rating_sum'], 3)
+        self.assert_aggregates_match_reviews()
+
+    def test_partially_loaded_reviews(self):
+        review = self.review(0, 0, 5)
+        partial = Review.objects.only('pk', 'review_text').get(pk=review.pk)
+        partial.is_approved = False
+        partial.save()
+        self.assertEqual(self.stored(self.institutes[0])['rating_count'], 0)
+
+        Review.objects.only('pk').get(pk=review.pk).delete()
+        self.assert_aggregates_match_reviews()
+
+    def test_bulk_changes_match_a_recount(self):
+        for student in range(6):
+            self.review(student, student % 2, student % 5 + 1)
+        # Mixed adds and removals for both institutes in one call, as a bulk
+        # update that skips the signals would apply them
+        Review.objects.filter(institute=self.institutes[0], rating=1).update(is_approved=False)
+        Review.objects.filter(institute=self.institutes[1], rating=2).update(rating=4)
+        Institute.apply_rating_changes({
+            self.institutes[0].pk: {1: -1},
+            self.institutes[1].pk: {2: -1, 4: +1},
+        })
+        self.assert_aggregates_match_reviews()
+        self.assertEqual(self.stored(self.institutes[1])['rating_avg'], (4 + 4 + 1) / 3)
+
+
+class ReviewModerationTests(TestCase):
+    """Bulk moderation keeps the institute rating aggregates exact"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institutes = [create_institute(f'Academy {number}') for number in range(3)]
+        cls.staff = User.objects.create_superuser('moderator', 'moderator@example.com', 'secret')
+        for number in range(12):
+            user = User.objects.create(username=f'student-{number}')
+            Review.objects.create(
+                user=user, institute=cls.institutes[number % 3], rating=number % 5 + 1,
+                review_text=f'Review {number}', is_approved=number % 4 != 0,
+            )
+
+    def assert_aggregates_match_reviews(self):
+        stored = list(Institute.objects.order_by('pk').values_list('pk', *Institute.RATING_FIELDS))
+        Institute.refresh_rating_aggregates()
+        recomputed = list(Institute.objects.order_by('pk').values_list('pk', *Institute.RATING_FIELDS))
+        self.assertEqual(stored, recomputed)
+
+    def test_approve_and_hide_in_chunks(self):
+        moderated, changed = moderate_reviews(Review.objects.all(), approve=True, chunk_size=5)
+        self.assertEqual((moderated, changed), (12, 3))
+        self.assertFalse(Review.objects.filter(is_approved=False).exists())
+        self.assert_aggregates_match_reviews()
+
+        moderated, changed = moderate_reviews(Review.objects.filter(rating__gte=4), approve=False, chunk_size=2)
+        self.assertEqual((moderated, changed), (4, 4))
+        self.assert_aggregates_match_reviews()
+
+    def test_queries_do_not_grow_with_chunk_contents(self):
+        # the ids, then for the one chunk: lock + read, update, both aggregate
+        # updates and the ranking score refresh (three reads, one update) for
+        # all three institutes, and three savepoints with releases
+        with self.assertNumQueries(15):
+            moderate_reviews(Review.objects.all(), approve=False)
+
+    def test_moderated_reviews_leave_the_queue(self):
+        self.assertEqual(PendingReview.objects.filter(moderated_at__isnull=True).count(), 12)
+        moderate_reviews(Review.objects.filter(institute=self.institutes[0]), approve=True)
+        self.assertEqual(PendingReview.objects.filter(moderated_at__isnull=True).count(), 8)
+
+    @override_settings(REVIEW_MODERATION_CHUNK_SIZE=4)
+    def test_queue_page_and_actions(self):
+        self.client.force_login(self.staff)
+        url = '/admin/reviews/pendingreview/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Review 0')
+
+        response = self.client.post(url, {
+            'action': 'disapprove_reviews', 'select_across': '1', 'index': '0',
+            '_selected_action': [review.pk for review in Review.objects.all()],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Review.objects.filter(moderated_at__isnull=True).exists())
+        self.assertEqual(Institute.objects.filter(rating_count__gt=0).count(), 0)
+        self.assert_aggregates_match_reviews()
+
+
+class ReviewWriteTests(TestCase):
+    """Authors change their own reviews, only staff approve, duplicates are a 400"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institute = create_institute()
+        cls.author = User.objects.create(username='author')
+        cls.other = User.objects.create(username='other')
+        cls.staff = User.objects.create(username='staff', is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.review = Review.objects.create(
+            user=self.author, institute=self.institute, rating=4, review_text='Good teachers', is_approved=True,
+        )
+        self.url = f'/api/reviews/{self.review.pk}/'
+
+    def test_only_author_or_staff_change_a_review(self):
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.patch(self.url, {'rating': 1}, format='json').status_code, 403)
+        self.assertEqual(self.client.delete(self.url).status_code, 403)
+
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.patch(self.url, {'rating': 5}, format='json').status_code, 200)
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.patch(self.url, {'review_text': 'Edited'}, format='json').status_code, 200)
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.rating, self.review.review_text), (5, 'Edited'))
+
+        self.client.logout()
+        self.assertEqual(self.client.delete(self.url).status_code, 401)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+
+    def test_only_staff_approve(self):
+        Review.objects.filter(pk=self.review.pk).update(is_approved=False)
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.patch(self.url, {'is_approved': True}, format='json').status_code, 200)
+        self.review.refresh_from_db()
+        self.assertFalse(self.review.is_approved)
+
+        self.client.force_authenticate(self.staff)
+        self.client.patch(self.url, {'is_approved': True}, format='json')
+        self.review.refresh_from_db()
+        self.assertTrue(self.review.is_approved)
+
+    def test_second_review_of_an_institute_is_rejected(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.post('/api/reviews/', {
+            'institute': self.institute.pk, 'rating': 3, 'review_text': 'Again',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('institute', response.data)
+
+        self.client.force_authenticate(self.other)
+        response = self.client.post('/api/reviews/', {
+            'institute': self.institute.pk, 'rating': 3, 'review_text': 'Fine',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['user'], self.other.pk)
+
+
+class ReviewPaginationTests(TestCase):
+    """GET /api/reviews/ pages newest first by (created_at, id) cursors"""
+
+    @classmethod
+    def setUpTestData(cls):
+        institute = create_institute()
+        start = timezone.now() - timedelta(days=1)
+        # Reviews 2-5 share a timestamp, so only the id tells them apart
+        minutes = [0, 1, 2, 2, 2, 2, 3]
+        for number, minute in enumerate(minutes):
+            review = Review.objects.create(
+                user=User.objects.create(username=f'student-{number}'), institute=institute,
+                rating=4, review_text='Fine', is_approved=True,
+            )
+            Review.objects.filter(pk=review.pk).update(created_at=start + timedelta(minutes=minute))
+        cls.expected = list(Review.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def ids(self, response):
+        return [row['id'] for row in response.data['results']]
+
+    def test_next_and_previous_links_cover_every_row_once(self):
+        response = self.client.get('/api/reviews/?page_size=2')
+        self.assertIsNone(response.data['previous'])
+        pages = [self.ids(response)]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            pages.append(self.ids(response))
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+        # Walking back from the last page gives the same pages
+        back = []
+        while response.data['previous']:
+            response = self.client.get(response.data['previous'])
+            back.append(self.ids(response))
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_exact_last_page(self):
+        response = self.client.get('/api/reviews/?page_size=7&include_count=1')
+        self.assertEqual(self.ids(response), self.expected)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual((response.data['count'], response.data['count_is_exact']), (7, True))
+
+    def test_invalid_cursors_are_404(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        valid = self.client.get('/api/reviews/?page_size=2').data['next']
+        cursor = parse_qs(urlparse(valid).query)['cursor'][0]
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        field, value, pk, _ = raw.split('|')
+        cursors = [
+            'not-base64!',
+            encode('garbage'),
+            encode(f'rating|{value}|{pk}|n'),        # made for another ordering
+            encode(f'{field}|{value}|{pk}|x'),       # unknown direction
+            encode(f'{field}|yesterday|{pk}|n'),     # not a datetime
+            encode(f'{field}|{value}|abc|n'),        # not an id
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/reviews/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class DuplicateReviewTests(TestCase):
+    """Near-duplicate clustering and flagging"""
+
+    SPAM = 'Best institute in Hyderabad with one hundred percent placement guarantee, join today and get a free laptop'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.institutes = [create_institute(f'Academy {number}') for number in range(4)]
+        texts = [
+            cls.SPAM,
+            cls.SPAM.replace('Hyderabad', 'Hyderabad!!').upper(),
+            cls.SPAM.replace('free laptop', 'free laptop bag'),
+            'Teachers are patient and the weekend batch suits working people, though the lab machines are old',
+            'Good',
+            'Good',
+        ]
+        cls.reviews = []
+        for number, text in enumerate(texts):
+            user = User.objects.create(username=f'student-{number}')
+            cls.reviews.append(Review.objects.create(
+                user=user, institute=cls.institutes[number % 4], rating=5, review_text=text,
+            ))
+
+    def test_signature_computed_on_save(self):
+        review = Review.objects.get(pk=self.reviews[3].pk)
+        self.assertEqual(len(bytes(review.text_signature)), minhash.NUM_HASHES * 4)
+        self.assertEqual(bytes(Review.objects.get(pk=self.reviews[4].pk).text_signature), b'')
+
+    def test_clusters_near_duplicates_only(self):
+        scan = find_duplicate_clusters()
+        self.assertEqual(scan.clusters, [[review.pk for review in self.reviews[:3]]])
+        self.assertEqual(scan.reviews, 4)  # the two "Good" reviews are too short to judge
+
+    def test_flagging_hides_copies_and_queues_them(self):
+        moderate_reviews(Review.objects.filter(pk=self.reviews[2].pk), approve=True)
+        _, flagged = flag_duplicate_reviews()
+        self.assertEqual(flagged, 1)
+
+        original, copy, approved_by_hand = (Review.objects.get(pk=review.pk) for review in self.reviews[:3])
+        self.assertTrue(original.is_approved)
+        self.assertFalse(copy.is_approved)
+        self.assertIsNone(copy.moderated_at)
+        self.assertTrue(approved_by_hand.is_approved)
+        # Academy 1 keeps only the approved "Good" review
+        self.assertEqual(Institute.objects.get(pk=self.institutes[1].pk).rating_count, 1)
+
+    def test_unsigned_reviews_are_signed_by_the_scan(self):
+        Review.objects.update(text_signature=None)
+        scan = find_duplicate_clusters()
+        self.assertEqual(scan.signed, 6)
+        self.assertEqual(len(scan.clusters), 1)
+
+
+class ReviewExportTests(TestCase):
+    """Owners export the reviews of their institutes, staff every review"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owners = []
+        for number in range(2):
+            institute = create_institute(f'Academy {number}')
+            cls.owners.append(institute.owner)
+            for rating in range(1, 4):
+                Review.objects.create(
+                    user=User.objects.create(username=f'student-{number}-{rating}'), institute=institute,
+                    rating=rating, review_text=f'Rated {rating}', is_approved=rating > 1,
+                )
+        cls.staff = User.objects.create_superuser('staff', 'staff@example.com', 'secret')
+
+    def export(self, user, **params):
+        client = APIClient()
+        if user:
+            client.force_authenticate(user)
+        response = client.get('/api/reviews/export/', params)
+        if response.status_code != 200:
+            return response.status_code
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        return [row[2:6] for row in csv.reader(io.StringIO(content))][1:]
+
+    def test_owner_sees_their_institutes(self):
+        self.assertEqual(self.export(self.owners[0]), [
+            ['Academy 0', 'student-0-1', '1', 'No'],
+            ['Academy 0', 'student-0-2', '2', 'Yes'],
+            ['Academy 0', 'student-0-3', '3', 'Yes'],
+        ])
+        self.assertEqual(len(self.export(self.owners[0], status='hidden')), 1)
+        self.assertEqual(len(self.export(self.staff, rating=3)), 2)
+        self.assertEqual(self.export(None), 401)
+        self.assertEqual(self.export(self.staff, status='lost'), 400)
 
-# Create your tests here.
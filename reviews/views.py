@@ -1,3 +1,99 @@
-from django.shortcuts import render
+from django.db import IntegrityError, transaction
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from eduhyd_backend.exports import filter_created_between, get_export_format
+from eduhyd_backend.pagination import CreatedAtCursorPagination
+from eduhyd_backend.permissions import IsOwnerOrStaffOrReadOnly
+from .exports import REVIEW_STATUS_FILTERS, export_reviews
+from .models import Review
+from .serializers import ReviewSerializer, ReviewCreateSerializer
 
-# Create your views here.
+
+# ========================================
+# REVIEW VIEWSET
+# ========================================
+class ReviewViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for Review CRUD operations
+
+    Automatic endpoints created:
+    - GET    /api/reviews/          -> List reviews (newest first, cursor paginated)
+    - POST   /api/reviews/          -> Write a review (logged-in users)
+    - GET    /api/reviews/{id}/     -> Get single review
+    - PUT    /api/reviews/{id}/     -> Update review (author or staff)
+    - PATCH  /api/reviews/{id}/     -> Partial update (author or staff)
+    - DELETE /api/reviews/{id}/     -> Delete review (author or staff)
+    - GET    /api/reviews/export/   -> Download reviews as CSV/XLSX (owners, staff)
+
+    Example URLs:
+    - /api/reviews/?institute=5          -> Reviews of one institute
+    - /api/reviews/?include_count=1      -> Also return an approximate total
+
+    Only staff set is_approved; authors edit their rating and text.
+    """
+
+    serializer_class = ReviewSerializer
+    permission_classes = [IsOwnerOrStaffOrReadOnly]
+    owner_field = 'user_id'
+    pagination_class = CreatedAtCursorPagination
+    filterset_fields = ['institute', 'rating']
+
+    def get_queryset(self):
+        """Staff see every review; everyone else only approved ones and their own"""
+        queryset = Review.objects.select_related('user', 'institute')
+        user = self.request.user
+        if user.is_staff:
+            return queryset
+        if user.is_authenticated:
+            return queryset.filter(is_approved=True) | queryset.filter(user=user)
+        return queryset.filter(is_approved=True)
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ReviewCreateSerializer
+        return ReviewSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = ReviewCreateSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                review = serializer.save(user=request.user)
+        except IntegrityError:
+            # Another request from the same user saved one first
+            raise ValidationError({'institute': 'You have already reviewed this institute'})
+        return Response(ReviewSerializer(review).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """
+        Download reviews, oldest first: every review for staff, reviews of
+        their institutes for owners
+
+        Example URLs:
+        - /api/reviews/export/?as=xlsx
+        - /api/reviews/export/?status=pending       -> Waiting for moderation
+        - /api/reviews/export/?institute=12&rating=1&from=2026-01-01
+
+        Streamed in chunks straight from the database (see
+        eduhyd_backend.exports), however many rows there are.
+        """
+        queryset = Review.objects.all()
+        if not request.user.is_staff:
+            queryset = queryset.filter(institute__owner=request.user)
+        review_status = request.query_params.get('status')
+        if review_status:
+            if review_status not in REVIEW_STATUS_FILTERS:
+                return Response({
+                    'error': f'status must be one of: {", ".join(REVIEW_STATUS_FILTERS)}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(**REVIEW_STATUS_FILTERS[review_status])
+        try:
+            file_format = get_export_format(request.query_params)
+            queryset = filter_created_between(self.filter_queryset(queryset), request.query_params)
+        except ValueError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return export_reviews(queryset, file_format)
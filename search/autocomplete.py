@@ -0,0 +1,598 @@
+"""
+In-memory typeahead suggestions for the hero search box.
+
+Suggestions are active institutes, active courses, and the categories and
+areas they belong to. Every suggestion's text is normalized ("IIT-JEE
+Coaching" -> "iit jee coaching") and kept in two sorted arrays: whole, and
+from each later word on ("jee coaching", "coaching"), so typing "jee" or
+"coach" also finds it. Matches are ranked by
+
+  1. whether the text starts with the prefix (not just a later word),
+  2. popularity: review count for institutes and their courses (featured
+     institutes get a boost), the number of active institutes/courses for
+     categories and areas,
+  3. older suggestions first.
+
+The arrays are split into blocks that also keep their entries in rank
+order, so a prefix is two bisects plus a merge of the best entries of the
+blocks it covers: a one-letter prefix over the whole catalog costs about
+as much as a rare one. When a prefix matches nothing, character trigrams
+catch typos and infixes ("devlopment", "olog").
+
+Each process keeps its own index. It starts from a compact gzip snapshot
+(AUTOCOMPLETE_SNAPSHOT) so a new worker answers at once, is rebuilt from
+the database in the background, and is patched by search.signals as
+institutes, courses and categories change (patches made during a rebuild
+are replayed onto the new index, see search.index.IndexPatches). Rating
+changes do not send signals, so popularity catches up with the periodic
+rebuild (SEARCH_INDEX_REFRESH_SECONDS).
+"""
+import gzip
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+
+from .index import IndexPatches
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+# Suggestions a single request may ask for
+MAX_SUGGESTIONS = 20
+
+# Entries per block of the sorted arrays (blocks split at twice this)
+BLOCK_SIZE = 512
+
+# Trigram fallback: share of the query's trigrams a text must contain, and
+# how many candidate texts it looks at before settling for what it has
+MIN_NGRAM_SIMILARITY = 0.5
+MIN_NGRAM_QUERY_LENGTH = 4
+MAX_NGRAM_CANDIDATES = 2000
+
+FEATURED_BOOST = 25
+
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+# Sorts after every character normalize() leaves in a text
+PREFIX_END = '\x7f'
+
+
+def normalize(text):
+    """"IIT-JEE (Advanced)" -> "iit jee advanced" """
+    return NON_WORD_RE.sub(' ', (text or '').lower()).strip()
+
+
+def trigrams(text, typing=False):
+    """
+    Character trigrams of each word, padded so word starts and ends count.
+
+    typing leaves the last word unpadded at the end, as it may not be
+    finished yet.
+    """
+    grams = set()
+    words = text.split()
+    for position, word in enumerate(words):
+        padded = f' {word}' if typing and position == len(words) - 1 else f' {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def institute_popularity(rating_count, is_featured):
+    return rating_count + (FEATURED_BOOST if is_featured else 0)
+
+
+class RankedBlocks:
+    """
+    Sorted (text, entry id) pairs that can list the best-ranked pairs
+    whose text starts with a prefix.
+
+    The pairs live in blocks of BLOCK_SIZE to 2 * BLOCK_SIZE. Next to each
+    block is the same pairs' rank keys (lowest = best) in sorted order, so
+    the blocks lying wholly inside a prefix range are merged by rank, and
+    only the two blocks at its edges are scanned.
+    """
+
+    def __init__(self):
+        self.blocks = []   # [[(text, entry id), ...] sorted]
+        self.ranked = []   # [[(rank key, entry id), ...] sorted] per block
+        self.firsts = []   # first pair of each block
+
+    def __len__(self):
+        return sum(len(block) for block in self.blocks)
+
+    def build(self, pairs, rank):
+        """Replace the contents with sorted pairs; rank(entry id) gives the rank key"""
+        self.blocks = [pairs[i:i + BLOCK_SIZE] for i in range(0, len(pairs), BLOCK_SIZE)]
+        self.ranked = [sorted((rank(entry_id), entry_id) for _, entry_id in block) for block in self.blocks]
+        self.firsts = [block[0] for block in self.blocks]
+
+    def _find(self, pair):
+        """Index of the block that holds (or would hold) pair"""
+        position = bisect_left(self.firsts, pair)
+        if position < len(self.firsts) and self.firsts[position] == pair:
+            return position
+        return max(position - 1, 0)
+
+    def insert(self, pair, rank_key):
+        if not self.blocks:
+            self.blocks, self.ranked, self.firsts = [[pair]], [[(rank_key, pair[1])]], [pair]
+            return
+        position = self._find(pair)
+        block = self.blocks[position]
+        insort(block, pair)
+        insort(self.ranked[position], (rank_key, pair[1]))
+        self.firsts[position] = block[0]
+        if len(block) > 2 * BLOCK_SIZE:
+            ranks = dict((entry_id, key) for key, entry_id in self.ranked[position])
+            halves = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+            self.blocks[position:position + 1] = halves
+            self.ranked[position:position + 1] = [
+                sorted((ranks[entry_id], entry_id) for _, entry_id in half) for half in halves
+            ]
+            self.firsts[position:position + 1] = [half[0] for half in halves]
+
+    def delete(self, pair, rank_key):
+        if not self.blocks:
+            return
+        position = self._find(pair)
+        block = self.blocks[position]
+        index = bisect_left(block, pair)
+        if index == len(block) or block[index] != pair:
+            return
+        del block[index]
+        ranked = self.ranked[position]
+        index = bisect_left(ranked, (rank_key, pair[1]))
+        if index < len(ranked) and ranked[index] == (rank_key, pair[1]):
+            del ranked[index]
+        if block:
+            self.firsts[position] = block[0]
+        else:
+            del self.blocks[position], self.ranked[position], self.firsts[position]
+
+    def rerank(self, pair, old_key, new_key):
+        position = self._find(pair)
+        ranked = self.ranked[position]
+        index = bisect_left(ranked, (old_key, pair[1]))
+        if index < len(ranked) and ranked[index] == (old_key, pair[1]):
+            del ranked[index]
+            insort(ranked, (new_key, pair[1]))
+
+    def best(self, prefix, limit, rank, exclude=()):
+        """Up to limit entry ids with a text starting with prefix, best rank first"""
+        if not self.blocks:
+            return []
+        low, high = (prefix,), (prefix + PREFIX_END,)
+        first = self._find(low)
+        last = max(bisect_left(self.firsts, high) - 1, 0)
+
+        # Edge blocks may hold texts outside the range: scan them
+        edge = []
+        inner = []
+        for position in range(first, last + 1):
+            block = self.blocks[position]
+            if block[0] >= low and block[-1] < high:
+                inner.append(self.ranked[position])
+            else:
+                edge.extend(
+                    (rank(entry_id), entry_id)
+                    for _, entry_id in block[bisect_left(block, low):bisect_left(block, high)]
+                )
+        merged = heapq.merge(sorted(edge), *inner)
+
+        found, seen = [], set(exclude)
+        for _, entry_id in merged:
+            if entry_id not in seen:   # "web web" is in later words twice
+                seen.add(entry_id)
+                found.append(entry_id)
+                if len(found) == limit:
+                    break
+        return found
+
+
+class AutocompleteIndex:
+    """
+    Prefix index over suggestion texts.
+
+    Items (institutes and courses) are added with set_item(); the category
+    and area suggestions are derived from the groups the items belong to,
+    and are as popular as they have members.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries = {}                   # entry id -> suggestion dict
+        self.entry_ids = {}                 # (kind, ref) -> entry id
+        self.next_id = 0
+        self.texts = RankedBlocks()         # (whole normalized text, entry id)
+        self.later_words = RankedBlocks()   # (text from its 2nd, 3rd, ... word on, entry id)
+        self.grams = defaultdict(set)       # trigram -> entry ids
+        self.items = {}                     # item key -> (text, subtitle, popularity, groups)
+        self.group_members = defaultdict(set)  # group key -> item keys
+        self.group_names = {}               # group key -> display name
+        self.bulk_loading = False
+        self.built_at = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    # ----------------------------------------
+    # Writing
+    # ----------------------------------------
+    def set_item(self, kind, ref, text, subtitle='', popularity=0, groups=()):
+        """
+        Add or replace an institute/course suggestion.
+
+        groups lists (kind, name) pairs such as ('area', 'Ameerpet'); each
+        becomes a suggestion of its own.
+        """
+        key = (kind, ref)
+        groups = [(group_kind, name) for group_kind, name in groups if normalize(name)]
+        with self.lock:
+            previous = self.items.get(key)
+            kept = set(previous[3]) & set(groups) if previous else set()
+            self._remove_item(key, keep_groups=kept)
+            self.items[key] = (text, subtitle, popularity, groups)
+            self._set_entry(key, {'type': kind, 'id': ref, 'text': text,
+                                  'subtitle': subtitle, 'popularity': popularity})
+            for group_kind, name in groups:
+                if (group_kind, name) in kept:
+                    continue
+                group = (group_kind, normalize(name))
+                self.group_members[group].add(key)
+                self.group_names.setdefault(group, name.strip())
+                self._set_entry(group, {'type': group_kind, 'id': None, 'text': self.group_names[group],
+                                        'subtitle': '', 'popularity': len(self.group_members[group])})
+
+    def remove_item(self, kind, ref):
+        with self.lock:
+            self._remove_item((kind, ref))
+
+    def members(self, group_kind, name):
+        """Item keys belonging to a category or area"""
+        with self.lock:
+            return set(self.group_members.get((group_kind, normalize(name)), ()))
+
+    def _remove_item(self, key, keep_groups=()):
+        item = self.items.pop(key, None)
+        if item is None:
+            return
+        self._remove_entry(key)
+        for group_kind, name in item[3]:
+            if (group_kind, name) in keep_groups:
+                continue
+            group = (group_kind, normalize(name))
+            members = self.group_members[group]
+            members.discard(key)
+            if members:
+                self._set_popularity(self.entry_ids[group], len(members))
+            else:
+                del self.group_members[group]
+                del self.group_names[group]
+                self._remove_entry(group)
+
+    def _set_entry(self, key, suggestion):
+        suggestion['normalized'] = normalize(suggestion['text'])
+        entry_id = self.entry_ids.get(key)
+        if entry_id is not None:
+            if self.entries[entry_id]['normalized'] == suggestion['normalized']:
+                popularity = suggestion['popularity']
+                suggestion['popularity'] = self.entries[entry_id]['popularity']
+                self.entries[entry_id] = suggestion
+                self._set_popularity(entry_id, popularity)
+                return
+            self._remove_entry(key)
+
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entry_ids[key] = entry_id
+        self.entries[entry_id] = suggestion
+        for gram in trigrams(suggestion['normalized']):
+            self.grams[gram].add(entry_id)
+        if not self.bulk_loading:  # load() builds the arrays in one go
+            rank_key = self._rank_key(entry_id)
+            for blocks, pair in self._pairs(entry_id):
+                blocks.insert(pair, rank_key)
+
+    def _remove_entry(self, key):
+        entry_id = self.entry_ids.pop(key, None)
+        if entry_id is None:
+            return
+        rank_key = self._rank_key(entry_id)
+        for blocks, pair in self._pairs(entry_id):
+            blocks.delete(pair, rank_key)
+        suggestion = self.entries.pop(entry_id)
+        for gram in trigrams(suggestion['normalized']):
+            entries = self.grams[gram]
+            entries.discard(entry_id)
+            if not entries:
+                del self.grams[gram]
+
+    def _set_popularity(self, entry_id, popularity):
+        old_key = self._rank_key(entry_id)
+        self.entries[entry_id]['popularity'] = popularity
+        if not self.bulk_loading and old_key != self._rank_key(entry_id):
+            for blocks, pair in self._pairs(entry_id):
+                blocks.rerank(pair, old_key, self._rank_key(entry_id))
+
+    def _rank_key(self, entry_id):
+        """Most popular first, then older entries"""
+        return (-self.entries[entry_id]['popularity'], entry_id)
+
+    def _pairs(self, entry_id):
+        """(blocks, (text, entry id)) for every array position of an entry"""
+        words = self.entries[entry_id]['normalized'].split()
+        yield self.texts, (' '.join(words), entry_id)
+        for i in range(1, len(words)):
+            yield self.later_words, (' '.join(words[i:]), entry_id)
+
+    def load(self, items):
+        """
+        Fill an empty index with [(kind, ref, text, subtitle, popularity, groups)].
+
+        The sorted arrays are built once at the end instead of inserted
+        into one by one.
+        """
+        with self.lock:
+            self.bulk_loading = True
+            try:
+                for kind, ref, text, subtitle, popularity, groups in items:
+                    self.set_item(kind, ref, text, subtitle, popularity, [tuple(group) for group in groups])
+            finally:
+                self.bulk_loading = False
+            texts, later_words = [], []
+            for entry_id in self.entries:
+                for blocks, pair in self._pairs(entry_id):
+                    (texts if blocks is self.texts else later_words).append(pair)
+            self.texts.build(sorted(texts), self._rank_key)
+            self.later_words.build(sorted(later_words), self._rank_key)
+
+    # ----------------------------------------
+    # Reading
+    # ----------------------------------------
+    def suggest(self, query, limit=8):
+        """Ranked suggestion dicts for what has been typed so far"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+
+        with self.lock:
+            ranked = self.texts.best(prefix, limit, self._rank_key)
+            if len(ranked) < limit:
+                ranked += self.later_words.best(prefix, limit - len(ranked), self._rank_key, exclude=ranked)
+            if not ranked and len(prefix) >= MIN_NGRAM_QUERY_LENGTH:
+                ranked = self._ngram_matches(prefix, limit)
+            return [
+                {name: value for name, value in self.entries[entry_id].items() if name != 'normalized'}
+                for entry_id in ranked
+            ]
+
+    def _ngram_matches(self, query, limit):
+        """Entry ids sharing most of the query's trigrams, best first"""
+        grams = trigrams(query, typing=True)
+        total = len(grams)
+        query_grams = [gram for gram in grams if gram in self.grams]
+        needed = math.ceil(total * MIN_NGRAM_SIMILARITY)
+        if len(query_grams) < needed:
+            return []
+
+        # A text sharing `needed` grams must share one of the rarest
+        # len - needed + 1 of them, so only those postings are scanned
+        query_grams.sort(key=lambda gram: len(self.grams[gram]))
+        candidates = set()
+        for gram in query_grams[:len(query_grams) - needed + 1]:
+            candidates.update(self.grams[gram])
+            if len(candidates) >= MAX_NGRAM_CANDIDATES:
+                candidates = set(islice(candidates, MAX_NGRAM_CANDIDATES))
+                break
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(candidates.intersection(self.grams[gram]))
+        scored = (
+            (count / total, self.entries[entry_id]['popularity'], -entry_id)
+            for entry_id, count in shared.items() if count >= needed
+        )
+        return [-entry_id for _, _, entry_id in heapq.nlargest(limit, scored)]
+
+    # ----------------------------------------
+    # Snapshots
+    # ----------------------------------------
+    def snapshot_items(self):
+        with self.lock:
+            return [[kind, ref, text, subtitle, popularity, groups]
+                    for (kind, ref), (text, subtitle, popularity, groups) in self.items.items()]
+
+
+# ========================================
+# Catalog suggestions
+# ========================================
+def institute_items(queryset):
+    """[(kind, ref, text, subtitle, popularity, groups)] and hidden refs for institutes"""
+    items, hidden = [], []
+    rows = queryset.values_list('id', 'name', 'area', 'status', 'category__name', 'rating_count', 'is_featured')
+    for pk, name, area, status, category, rating_count, is_featured in rows.iterator():
+        if status != 'active':
+            hidden.append(pk)
+            continue
+        items.append(('institute', pk, name, area, institute_popularity(rating_count, is_featured),
+                      [('area', area), ('category', category or '')]))
+    return items, hidden
+
+
+def course_items(queryset):
+    """[(kind, ref, text, subtitle, popularity, groups)] and hidden refs for courses"""
+    items, hidden = [], []
+    rows = queryset.values_list(
+        'id', 'name', 'category', 'is_active', 'institute__name', 'institute__status',
+        'institute__rating_count', 'institute__is_featured',
+    )
+    for pk, name, category, is_active, institute_name, status, rating_count, is_featured in rows.iterator():
+        if not is_active or status != 'active':
+            hidden.append(pk)
+            continue
+        items.append(('course', pk, name, institute_name, institute_popularity(rating_count, is_featured),
+                      [('category', category)]))
+    return items, hidden
+
+
+def index_institute_suggestions(index, queryset):
+    items, hidden = institute_items(queryset)
+    for item in items:
+        index.set_item(*item)
+    for pk in hidden:
+        index.remove_item('institute', pk)
+
+
+def index_course_suggestions(index, queryset):
+    items, hidden = course_items(queryset)
+    for item in items:
+        index.set_item(*item)
+    for pk in hidden:
+        index.remove_item('course', pk)
+
+
+def build_autocomplete_index():
+    from courses.models import Course
+    from institutes.models import Institute
+
+    index = AutocompleteIndex()
+    index.load(institute_items(Institute.objects.order_by('pk'))[0]
+               + course_items(Course.objects.order_by('pk'))[0])
+    index.built_at = time.monotonic()
+    return index
+
+
+# ========================================
+# Snapshot file
+# ========================================
+def snapshot_path():
+    return getattr(settings, 'AUTOCOMPLETE_SNAPSHOT', None)
+
+
+def save_snapshot(index, path=None):
+    """Write the index's items to a gzip JSON file (replaced atomically)"""
+    path = path or snapshot_path()
+    if not path:
+        return None
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with gzip.open(temporary, 'wt', encoding='utf-8') as snapshot:
+        json.dump({'format': SNAPSHOT_FORMAT, 'created': time.time(),
+                   'items': index.snapshot_items()}, snapshot, separators=(',', ':'))
+    os.replace(temporary, path)
+    return path
+
+
+def load_snapshot(path=None):
+    """An index read from the snapshot file, or None if there is no usable one"""
+    path = path or snapshot_path()
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as snapshot:
+            data = json.load(snapshot)
+    except (OSError, ValueError):
+        logger.warning('Ignoring unreadable autocomplete snapshot %s', path, exc_info=True)
+        return None
+    if data.get('format') != SNAPSHOT_FORMAT:
+        return None
+    index = AutocompleteIndex()
+    index.load(data['items'])
+    index.built_at = None  # refreshed from the database on first use
+    return index
+
+
+# ========================================
+# Process-wide index
+# ========================================
+_autocomplete_index = None
+_build_lock = threading.Lock()
+_refreshing = threading.Event()
+autocomplete_patches = IndexPatches(lambda: _autocomplete_index)
+
+
+def get_autocomplete_index():
+    """
+    The process-wide autocomplete index.
+
+    The first call loads the snapshot if there is one (and rebuilds from
+    the database in the background), otherwise builds it synchronously.
+    Like the search index, it is rebuilt in the background once older
+    than SEARCH_INDEX_REFRESH_SECONDS.
+    """
+    global _autocomplete_index
+    index = _autocomplete_index
+    if index is None:
+        with _build_lock:
+            if _autocomplete_index is None:
+                index = load_snapshot()
+                if index is None:
+                    index = build_autocomplete_index()
+                    _save_snapshot_quietly(index)
+                _autocomplete_index = index
+            index = _autocomplete_index
+
+    max_age = getattr(settings, 'SEARCH_INDEX_REFRESH_SECONDS', 300)
+    stale = index.built_at is None or time.monotonic() - index.built_at >= max_age
+    if stale and not _refreshing.is_set():
+        _refreshing.set()
+        threading.Thread(target=_refresh_autocomplete_index, daemon=True).start()
+    return index
+
+
+def _refresh_autocomplete_index():
+    from django.db import connection
+    autocomplete_patches.start_rebuild()
+    try:
+        index = build_autocomplete_index()
+        autocomplete_patches.finish_rebuild(index, _swap_autocomplete_index)
+        _save_snapshot_quietly(index)
+    finally:
+        autocomplete_patches.abandon_rebuild()
+        connection.close()
+        _refreshing.clear()
+
+
+def _swap_autocomplete_index(index):
+    global _autocomplete_index
+    _autocomplete_index = index
+
+
+def _save_snapshot_quietly(index):
+    try:
+        save_snapshot(index)
+    except OSError:
+        logger.warning('Could not write the autocomplete snapshot', exc_info=True)
+
+
+def reset_autocomplete_index():
+    """Forget the loaded index, so the next lookup loads it again"""
+    global _autocomplete_index
+    _autocomplete_index = None
+
+
+def peek_autocomplete_index():
+    """The current index if one has been loaded, without loading it"""
+    return _autocomplete_index
+
+
+def patch_autocomplete_index(patch):
+    """Run patch(index) on the live index, now and across rebuilds (see IndexPatches)"""
+    autocomplete_patches.apply(patch)
+
+
+def warm_autocomplete():
+    """Load the index in the background so the first keystroke does not wait"""
+    threading.Thread(target=get_autocomplete_index, daemon=True).start()
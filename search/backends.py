@@ -0,0 +1,116 @@
+"""
+Catalog search backends.
+
+Both backends take the same query and filters and return ranked
+[(score, kind, id)] hits:
+
+- 'mysql'  : MATCH ... AGAINST over the FULLTEXT indexes created by
+             search/migrations/0001_fulltext_indexes.py
+- 'memory' : the in-process inverted index in search.index, which also
+             tolerates typos
+
+SEARCH_BACKEND = 'auto' uses MySQL FULLTEXT when the database is MySQL and
+the in-process index everywhere else (e.g. SQLite in tests).
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from courses.models import Course
+from institutes.models import Institute
+from .index import get_catalog_index, tokenize
+
+KINDS = ('institute', 'course')
+
+
+def get_backend_name():
+    backend = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if backend == 'auto':
+        return 'mysql' if connection.vendor == 'mysql' else 'memory'
+    return backend
+
+
+def search_catalog(query, area=None, mode=None, category=None, kind=None, limit=20):
+    """
+    Ranked [(score, kind, id)] of active institutes and courses for a query
+
+    area, mode and category are matched case-insensitively; kind limits the
+    results to 'institute' or 'course'.
+    """
+    filters = {'visible': True}
+    if area:
+        filters['area'] = area.strip().lower()
+    if mode:
+        filters['modes'] = mode.strip().lower()
+    if category:
+        filters['categories'] = category.strip().lower()
+    if kind:
+        filters['kind'] = kind
+
+    if get_backend_name() == 'mysql':
+        return _search_mysql(query, filters, limit)
+    return _search_memory(query, filters, limit)
+
+
+def _search_memory(query, filters, limit):
+    hits = get_catalog_index().search(query, filters, limit)
+    return [(score, kind, pk) for score, (kind, pk) in hits]
+
+
+def _search_mysql(query, filters, limit):
+    terms = tokenize(query)
+    if not terms:
+        return []
+    # Boolean mode with a trailing wildcard, so partial words still match
+    against = ' '.join(f'{term}*' for term in terms)
+
+    hits = []
+    if filters.get('kind') in (None, 'institute'):
+        institutes = _filter_institutes(Institute.objects.filter(status='active'), filters)
+        hits += _ranked(institutes, 'institute', ['name', 'description', 'area'], against, limit)
+    if filters.get('kind') in (None, 'course'):
+        courses = _filter_courses(
+            Course.objects.filter(is_active=True, institute__status='active'), filters
+        )
+        hits += _ranked(courses, 'course', ['name', 'category', 'description', 'syllabus'], against, limit)
+
+    hits.sort(reverse=True)
+    return hits[:limit]
+
+
+def _ranked(queryset, kind, columns, against, limit):
+    table = queryset.model._meta.db_table
+    match = 'MATCH({}) AGAINST (%s IN BOOLEAN MODE)'.format(
+        ', '.join(f'{table}.{column}' for column in columns)
+    )
+    rows = (
+        queryset.annotate(score=RawSQL(match, [against]))
+        .filter(score__gt=0)
+        .order_by('-score')
+        .values_list('score', 'pk')[:limit]
+    )
+    return [(score, kind, pk) for score, pk in rows]
+
+
+def _filter_institutes(queryset, filters):
+    if 'area' in filters:
+        queryset = queryset.filter(area__iexact=filters['area'])
+    if 'categories' in filters:
+        queryset = queryset.filter(category__name__iexact=filters['categories'])
+    if 'modes' in filters:
+        queryset = queryset.filter(
+            pk__in=Course.objects.filter(is_active=True, mode=filters['modes']).values('institute_id')
+        )
+    return queryset
+
+
+def _filter_courses(queryset, filters):
+    if 'area' in filters:
+        queryset = queryset.filter(institute__area__iexact=filters['area'])
+    if 'categories' in filters:
+        category = filters['categories']
+        queryset = queryset.filter(category__iexact=category) | queryset.filter(
+            institute__category__name__iexact=category
+        )
+    if 'modes' in filters:
+        queryset = queryset.filter(mode=filters['modes'])
+    return queryset
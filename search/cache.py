@@ -0,0 +1,45 @@
+"""
+Catalog version counter for cached search data.
+
+Anything cached from the institute/course catalog (facet counts, course
+comparisons, ...) puts the current version in its cache key. Saving or
+deleting an institute, course or category bumps the version, which makes
+every such entry unreachable at once; stale entries simply expire. The
+bump is repeated when the transaction commits, so entries cached from the
+old rows while it was open are dropped too.
+
+If the version itself is evicted (or the cache cleared), it starts again
+from the current time in milliseconds rather than from 1, so entries
+cached under an earlier version never become reachable again.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'catalog:version'
+
+
+def new_version():
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        seed = new_version()
+        cache.add(VERSION_KEY, seed, timeout=None)
+        version = cache.get(VERSION_KEY, seed)
+    return version
+
+
+def bump_catalog_version():
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, new_version(), timeout=None)
@@ -0,0 +1,112 @@
+"""
+Facet counts for the hero search form.
+
+All counts come from one grouped query over active courses, keyed by
+(institute category, institute area, course mode, fee bucket). That small
+table is cached per catalog version, and the counts for any filter
+combination are then summed from it in a single pass in Python.
+
+Counts are disjunctive: each facet is counted with every *other* selected
+filter applied, so the options of a facet still show what selecting them
+instead would return.
+"""
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Q, Value, When
+from courses.models import Course
+from .cache import get_catalog_version
+
+# (value, label, min fees inclusive, max fees exclusive)
+FEE_BUCKETS = [
+    ('under-10k', 'Under ₹10,000', None, 10000),
+    ('10k-25k', '₹10,000 - ₹25,000', 10000, 25000),
+    ('25k-50k', '₹25,000 - ₹50,000', 25000, 50000),
+    ('50k-1l', '₹50,000 - ₹1,00,000', 50000, 100000),
+    ('above-1l', 'Above ₹1,00,000', 100000, None),
+]
+
+FACETS = ('category', 'area', 'mode', 'fee_range')
+
+GROUPS_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def _fee_bucket_expression():
+    whens = []
+    for value, label, low, high in FEE_BUCKETS:
+        condition = Q()
+        if low is not None:
+            condition &= Q(fees__gte=low)
+        if high is not None:
+            condition &= Q(fees__lt=high)
+        whens.append(When(condition, then=Value(value)))
+    return Case(*whens, output_field=CharField())
+
+
+def load_facet_groups():
+    """[(category, area, mode, fee_range, count)] over active courses, from the database"""
+    rows = (
+        Course.objects.filter(is_active=True, institute__status='active')
+        .annotate(fee_range=_fee_bucket_expression())
+        .values_list('institute__category__name', 'institute__area', 'mode', 'fee_range')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    return [tuple(row) for row in rows]
+
+
+def get_facet_groups():
+    """The grouped course counts, cached until the catalog changes"""
+    key = f'facets:groups:{get_catalog_version()}'
+    groups = cache.get(key)
+    if groups is None:
+        groups = load_facet_groups()
+        cache.set(key, groups, GROUPS_CACHE_TIMEOUT)
+    return groups
+
+
+def facet_counts(filters):
+    """
+    Counts per option of every facet for a filter combination
+
+    filters maps facet names ('category', 'area', 'mode', 'fee_range') to
+    a selected value, compared case-insensitively.
+    """
+    selected = {
+        FACETS.index(name): str(value).strip().lower()
+        for name, value in filters.items() if value
+    }
+    counts = [{} for _ in FACETS]
+    labels = [{} for _ in FACETS]
+    total = 0
+
+    for *values, count in get_facet_groups():
+        keys = [str(value).lower() if value is not None else None for value in values]
+        mismatches = [i for i, wanted in selected.items() if keys[i] != wanted]
+        if not mismatches:
+            total += count
+        if len(mismatches) > 1:
+            continue
+        for i, value in enumerate(values):
+            # A row failing one filter still counts towards that filter's facet
+            if value is None or (mismatches and mismatches[0] != i):
+                continue
+            counts[i][keys[i]] = counts[i].get(keys[i], 0) + count
+            labels[i].setdefault(keys[i], value)
+
+    fee_labels = {value: label for value, label, _, _ in FEE_BUCKETS}
+    result = {'total': total}
+    for i, name in enumerate(FACETS):
+        options = [
+            {
+                'value': labels[i][key],
+                'label': fee_labels.get(key, labels[i][key]),
+                'count': count,
+            }
+            for key, count in counts[i].items()
+        ]
+        if name == 'fee_range':
+            order = [value for value, _, _, _ in FEE_BUCKETS]
+            options.sort(key=lambda option: order.index(option['value']))
+        else:
+            options.sort(key=lambda option: (-option['count'], option['label']))
+        result[name] = options
+    return result
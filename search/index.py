@@ -0,0 +1,443 @@
+"""
+In-process inverted index over institutes and courses.
+
+Each document is a (kind, id) pair, e.g. ('course', 42), with weighted text
+fields and a few filter attributes. Queries are ranked with BM25, and query
+terms missing from the vocabulary are matched against close spellings
+(edit distance 1-2) using a deletion neighbourhood, so "pyhton" still finds
+"python".
+
+The index is built from the database on first use and kept current by the
+model signals in search.signals. Because every worker process holds its own
+copy, it is also rebuilt in the background every SEARCH_INDEX_REFRESH_SECONDS
+so that changes made in other processes show up. Signal patches made while
+a rebuild runs are replayed onto the new index before it is swapped in
+(see IndexPatches), so they are not lost with the old one.
+"""
+import heapq
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'to', 'with',
+})
+
+# Field weights: a hit in a name counts more than one in a description
+INSTITUTE_FIELDS = {'name': 3.0, 'area': 2.0, 'category': 2.0, 'description': 1.0}
+COURSE_FIELDS = {'name': 3.0, 'category': 2.0, 'description': 1.0, 'syllabus': 1.0}
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Terms in more documents than this are scored from their champion list:
+# the documents where the term weighs the most, kept sorted by that weight
+CHAMPION_LIST_SIZE = 2000
+
+# Filter combinations remembered between writes
+FILTER_CACHE_SIZE = 64
+
+# Score multiplier for documents matched through a corrected spelling
+TYPO_PENALTY = 0.6
+MIN_TYPO_TERM_LENGTH = 4
+
+
+def tokenize(text):
+    """Lowercase word tokens of a text, without stop words"""
+    return [
+        token for token in TOKEN_RE.findall((text or '').lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def _deletes(term):
+    """Every variant of term with one character removed"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class SearchIndex:
+    """Inverted index with BM25 ranking and typo-tolerant term lookup"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.postings = defaultdict(dict)   # term -> {doc key: weighted tf}
+        self.doc_terms = {}                 # doc key -> {term: weighted tf}
+        self.doc_lengths = {}               # doc key -> weighted length
+        self.doc_attrs = {}                 # doc key -> filter attributes
+        self.total_length = 0.0
+        self.typo_variants = defaultdict(set)  # one-deletion variant -> terms
+        self.filter_cache = {}              # frozen filters -> set of matching keys
+        self.champions = {}                 # term -> top keys by term weight
+        self.built_at = None
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    # ----------------------------------------
+    # Writing
+    # ----------------------------------------
+    def add(self, key, fields, weights, attrs):
+        """Add or replace a document"""
+        terms = defaultdict(float)
+        for field, weight in weights.items():
+            for token in tokenize(fields.get(field)):
+                terms[token] += weight
+
+        with self.lock:
+            self._remove(key)
+            self.filter_cache.clear()
+            for term, frequency in terms.items():
+                if term not in self.postings:
+                    self._add_typo_variants(term)
+                self.postings[term][key] = frequency
+                self.champions.pop(term, None)
+            length = sum(terms.values())
+            self.doc_terms[key] = dict(terms)
+            self.doc_lengths[key] = length
+            self.doc_attrs[key] = attrs
+            self.total_length += length
+
+    def remove(self, key):
+        with self.lock:
+            self._remove(key)
+            self.filter_cache.clear()
+
+    def _remove(self, key):
+        terms = self.doc_terms.pop(key, None)
+        if terms is None:
+            return
+        for term in terms:
+            documents = self.postings[term]
+            documents.pop(key, None)
+            self.champions.pop(term, None)
+            if not documents:
+                del self.postings[term]
+                self._remove_typo_variants(term)
+        self.total_length -= self.doc_lengths.pop(key)
+        self.doc_attrs.pop(key, None)
+
+    def _add_typo_variants(self, term):
+        if len(term) >= MIN_TYPO_TERM_LENGTH:
+            for variant in _deletes(term):
+                self.typo_variants[variant].add(term)
+
+    def _remove_typo_variants(self, term):
+        if len(term) >= MIN_TYPO_TERM_LENGTH:
+            for variant in _deletes(term):
+                terms = self.typo_variants.get(variant)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.typo_variants[variant]
+
+    # ----------------------------------------
+    # Reading
+    # ----------------------------------------
+    def expand(self, token):
+        """
+        [(term, multiplier)] that a query token should match.
+
+        Exact vocabulary hits win; otherwise terms one insertion, deletion or
+        substitution away (or two deletions for the pair) are used instead.
+        """
+        if token in self.postings:
+            return [(token, 1.0)]
+        if len(token) < MIN_TYPO_TERM_LENGTH:
+            return []
+
+        candidates = set(self.typo_variants.get(token, ()))  # token lost a letter
+        for variant in _deletes(token):
+            if variant in self.postings:                      # token gained a letter
+                candidates.add(variant)
+            candidates.update(self.typo_variants.get(variant, ()))  # substitution
+        return [(term, TYPO_PENALTY) for term in candidates]
+
+    def search(self, query, filters=None, limit=20):
+        """
+        Ranked [(score, key)] of documents matching the query and filters.
+
+        filters maps attribute names to required values; a document whose
+        attribute is a set matches when the value is in it.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self.lock:
+            if not self.doc_terms:
+                return []
+            scores = self._score(tokens, filters, exhaustive=False)
+            if len(scores) < limit:
+                # Champion lists ran dry under the filters; score everything
+                scores = self._score(tokens, filters, exhaustive=True)
+
+        return heapq.nlargest(limit, ((score, key) for key, score in scores.items()))
+
+    def _score(self, tokens, filters, exhaustive):
+        total_docs = len(self.doc_terms)
+        allowed = self._allowed_keys(filters) if filters else None
+        lengths = self.doc_lengths
+
+        # BM25 denominator is tf + K1 * (1 - B + B * length / average),
+        # split into a constant and a per-length part
+        average_length = self.total_length / total_docs or 1.0
+        constant = K1 * (1 - B)
+        per_length = K1 * B / average_length
+
+        scores = defaultdict(float)
+        for token in dict.fromkeys(tokens):
+            for term, multiplier in self.expand(token):
+                documents = self.postings[term]
+                idf = math.log(1 + (total_docs - len(documents) + 0.5) / (len(documents) + 0.5))
+                weight = multiplier * idf * (K1 + 1)
+                keys = documents
+                if not exhaustive and len(documents) > CHAMPION_LIST_SIZE:
+                    keys = self._champion_list(term, constant, per_length)
+                for key in keys:
+                    if allowed is not None and key not in allowed:
+                        continue
+                    frequency = documents[key]
+                    scores[key] += weight * frequency / (frequency + constant + per_length * lengths[key])
+        return scores
+
+    def _champion_list(self, term, constant, per_length):
+        champions = self.champions.get(term)
+        if champions is None:
+            documents = self.postings[term]
+            lengths = self.doc_lengths
+            champions = heapq.nlargest(
+                CHAMPION_LIST_SIZE, documents,
+                key=lambda key: documents[key] / (documents[key] + constant + per_length * lengths[key]),
+            )
+            self.champions[term] = champions
+        return champions
+
+    def _allowed_keys(self, filters):
+        """Keys of the documents matching filters, cached until the next write"""
+        cache_key = frozenset(filters.items())
+        allowed = self.filter_cache.get(cache_key)
+        if allowed is None:
+            if len(self.filter_cache) >= FILTER_CACHE_SIZE:
+                self.filter_cache.clear()
+            allowed = {key for key in self.doc_attrs if self._matches(key, filters)}
+            self.filter_cache[cache_key] = allowed
+        return allowed
+
+    def _matches(self, key, filters):
+        attrs = self.doc_attrs[key]
+        for name, value in filters.items():
+            actual = attrs.get(name)
+            if isinstance(actual, (set, frozenset)):
+                if value not in actual:
+                    return False
+            elif actual != value:
+                return False
+        return True
+
+
+# ========================================
+# Catalog documents
+# ========================================
+def _clean(value):
+    return (value or '').strip().lower()
+
+
+def institute_document(row, modes=()):
+    """(key, fields, weights, attrs) for a values() row of an Institute"""
+    return (
+        ('institute', row['id']),
+        {
+            'name': row['name'],
+            'area': row['area'],
+            'category': row['category__name'],
+            'description': row['description'],
+        },
+        INSTITUTE_FIELDS,
+        {
+            'kind': 'institute',
+            'visible': row['status'] == 'active',
+            'area': _clean(row['area']),
+            'categories': frozenset(filter(None, [_clean(row['category__name'])])),
+            'modes': frozenset(modes),
+        },
+    )
+
+
+def course_document(row):
+    """(key, fields, weights, attrs) for a values() row of a Course"""
+    return (
+        ('course', row['id']),
+        {
+            'name': row['name'],
+            'category': row['category'],
+            'description': row['description'],
+            'syllabus': row['syllabus'],
+        },
+        COURSE_FIELDS,
+        {
+            'kind': 'course',
+            'visible': row['is_active'] and row['institute__status'] == 'active',
+            'area': _clean(row['institute__area']),
+            'categories': frozenset(filter(None, [
+                _clean(row['category']), _clean(row['institute__category__name']),
+            ])),
+            'modes': frozenset([row['mode']]),
+        },
+    )
+
+
+INSTITUTE_VALUES = ['id', 'name', 'area', 'description', 'status', 'category__name']
+COURSE_VALUES = [
+    'id', 'name', 'category', 'description', 'syllabus', 'mode', 'is_active',
+    'institute__area', 'institute__status', 'institute__category__name',
+]
+
+
+def index_institutes(index, queryset):
+    from courses.models import Course
+
+    # Institutes can be filtered by the modes their active courses run in
+    modes = defaultdict(set)
+    offered = Course.objects.filter(is_active=True, institute__in=queryset.values('pk'))
+    for institute_id, mode in offered.order_by().values_list('institute_id', 'mode').distinct():
+        modes[institute_id].add(mode)
+
+    for row in queryset.values(*INSTITUTE_VALUES).iterator():
+        index.add(*institute_document(row, modes.get(row['id'], ())))
+
+
+def index_courses(index, queryset):
+    for row in queryset.values(*COURSE_VALUES).iterator():
+        index.add(*course_document(row))
+
+
+class IndexPatches:
+    """
+    Keeps signal patches from being lost when a rebuilt index is swapped in.
+
+    A rebuild reads the database while the live index keeps serving and
+    being patched; a change committed after the rebuild read its row would
+    vanish with the old index. So every patch (a function of the index,
+    which re-reads its rows) is applied to the live index at once and,
+    when its transaction commits:
+
+    - recorded, if a rebuild is running, and replayed onto the new index
+      just before the swap
+    - applied again, if the live index was replaced since (a swap between
+      the patch and the commit)
+
+    Patches re-read the committed rows, so replaying one is harmless.
+    """
+
+    def __init__(self, get_live):
+        self.get_live = get_live
+        self.lock = threading.Lock()
+        self.pending = None  # patches committed during a rebuild
+
+    def apply(self, patch):
+        patched = self.get_live()
+        if patched is not None:
+            patch(patched)
+        transaction.on_commit(lambda: self._committed(patch, patched))
+
+    def _committed(self, patch, patched):
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(patch)
+                return
+            live = self.get_live()
+        if live is not None and live is not patched:
+            patch(live)
+
+    def start_rebuild(self):
+        with self.lock:
+            self.pending = []
+
+    def finish_rebuild(self, index, swap):
+        """Replay the patches recorded since start_rebuild onto index, then swap(index)"""
+        with self.lock:
+            try:
+                for patch in self.pending or ():
+                    patch(index)
+                swap(index)
+            finally:
+                self.pending = None
+
+    def abandon_rebuild(self):
+        with self.lock:
+            self.pending = None
+
+
+_catalog_index = None
+_build_lock = threading.Lock()
+_refreshing = threading.Event()
+catalog_patches = IndexPatches(lambda: _catalog_index)
+
+
+def get_catalog_index():
+    """
+    The process-wide catalog index.
+
+    The first call builds it synchronously. Once it is older than
+    SEARCH_INDEX_REFRESH_SECONDS a fresh copy is built in a background
+    thread, and the old one keeps serving queries until the swap.
+    """
+    global _catalog_index
+    index = _catalog_index
+    if index is None:
+        with _build_lock:
+            if _catalog_index is None:
+                _catalog_index = build_catalog_index()
+            return _catalog_index
+
+    max_age = getattr(settings, 'SEARCH_INDEX_REFRESH_SECONDS', 300)
+    if time.monotonic() - index.built_at >= max_age and not _refreshing.is_set():
+        _refreshing.set()
+        threading.Thread(target=_refresh_catalog_index, daemon=True).start()
+    return index
+
+
+def _refresh_catalog_index():
+    from django.db import connection
+    catalog_patches.start_rebuild()
+    try:
+        catalog_patches.finish_rebuild(build_catalog_index(), _swap_catalog_index)
+    finally:
+        catalog_patches.abandon_rebuild()
+        connection.close()
+        _refreshing.clear()
+
+
+def _swap_catalog_index(index):
+    global _catalog_index
+    _catalog_index = index
+
+
+def peek_catalog_index():
+    """The current index if one has been built, without building it"""
+    return _catalog_index
+
+
+def patch_catalog_index(patch):
+    """Run patch(index) on the live index, now and across rebuilds (see IndexPatches)"""
+    catalog_patches.apply(patch)
+
+
+def build_catalog_index():
+    from courses.models import Course
+    from institutes.models import Institute
+
+    index = SearchIndex()
+    index_institutes(index, Institute.objects.all())
+    index_courses(index, Course.objects.all())
+    index.built_at = time.monotonic()
+    return index
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from search.autocomplete import build_autocomplete_index, save_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = "Build the search box autocomplete index from the database and write its startup snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Where to write the snapshot (default: settings.AUTOCOMPLETE_SNAPSHOT)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        index = build_autocomplete_index()
+        path = save_snapshot(index, options['output'] or snapshot_path())
+        if path is None:
+            self.stderr.write('No snapshot path: set AUTOCOMPLETE_SNAPSHOT or pass --output.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {len(index)} suggestion(s) to {path} in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# (index name, table, columns) of the FULLTEXT indexes used by search.backends
+FULLTEXT_INDEXES = [
+    ('institutes_institute_search_ft', 'institutes_institute', ['name', 'description', 'area']),
+    ('courses_course_search_ft', 'courses_course', ['name', 'category', 'description', 'syllabus']),
+]
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    # FULLTEXT is MySQL specific; other databases use the in-process index
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for name, table, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX {} ON {} ({})'.format(name, table, ', '.join(columns))
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for name, table, columns in FULLTEXT_INDEXES:
+        schema_editor.execute('DROP INDEX {} ON {}'.format(name, table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('institutes', '0003_institute_geohash'),
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
@@ -0,0 +1,160 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from courses.models import Course
+from institutes.models import Category, Institute
+from .autocomplete import index_course_suggestions, index_institute_suggestions, patch_autocomplete_index
+from .cache import bump_catalog_version
+from .index import index_courses, index_institutes, patch_catalog_index
+
+
+# Signals only patch an index that already exists; building one is left to
+# the first search (or keystroke) so that saves never pay for a full build.
+# Patches go through patch_catalog_index / patch_autocomplete_index, which
+# also replay them onto an index being rebuilt in the background.
+
+
+def refresh_institutes(institute_ids):
+    """
+    Catalog upkeep after institutes changed through queryset.update(),
+    which sends no signals (e.g. the status/featured admin actions)
+    """
+    bump_catalog_version()
+    institute_ids = list(institute_ids)
+
+    def patch(index):
+        index_institutes(index, Institute.objects.filter(pk__in=institute_ids))
+        index_courses(index, Course.objects.filter(institute_id__in=institute_ids))
+
+    def patch_suggestions(index):
+        index_institute_suggestions(index, Institute.objects.filter(pk__in=institute_ids))
+        index_course_suggestions(index, Course.objects.filter(institute_id__in=institute_ids))
+
+    patch_catalog_index(patch)
+    patch_autocomplete_index(patch_suggestions)
+
+
+@receiver(post_save, sender=Institute)
+@receiver(post_delete, sender=Institute)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def catalog_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_catalog_version()
+
+@receiver(post_save, sender=Institute)
+def reindex_institute(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pk = instance.pk
+
+    def patch(index):
+        index_institutes(index, Institute.objects.filter(pk=pk))
+        # Course documents carry the institute's area, status and category
+        index_courses(index, Course.objects.filter(institute_id=pk))
+
+    patch_catalog_index(patch)
+
+
+@receiver(post_delete, sender=Institute)
+def unindex_institute(sender, instance, **kwargs):
+    key = ('institute', instance.pk)
+    patch_catalog_index(lambda index: index.remove(key))
+
+
+@receiver(post_save, sender=Course)
+def reindex_course(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pk, institute_id = instance.pk, instance.institute_id
+
+    def patch(index):
+        index_courses(index, Course.objects.filter(pk=pk))
+        # The institute document lists the modes its courses run in
+        index_institutes(index, Institute.objects.filter(pk=institute_id))
+
+    patch_catalog_index(patch)
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course(sender, instance, **kwargs):
+    pk, institute_id = instance.pk, instance.institute_id
+
+    def patch(index):
+        index.remove(('course', pk))
+        index_institutes(index, Institute.objects.filter(pk=institute_id))
+
+    patch_catalog_index(patch)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pk = instance.pk
+
+    def patch(index):
+        index_institutes(index, Institute.objects.filter(category_id=pk))
+        index_courses(index, Course.objects.filter(institute__category_id=pk))
+
+    patch_catalog_index(patch)
+
+
+# ========================================
+# Autocomplete suggestions
+# ========================================
+@receiver(post_save, sender=Institute)
+def refresh_institute_suggestions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pk = instance.pk
+
+    def patch(index):
+        index_institute_suggestions(index, Institute.objects.filter(pk=pk))
+        # Course suggestions show the institute's name and follow its status
+        index_course_suggestions(index, Course.objects.filter(institute_id=pk))
+
+    patch_autocomplete_index(patch)
+
+
+@receiver(post_delete, sender=Institute)
+def remove_institute_suggestion(sender, instance, **kwargs):
+    pk = instance.pk
+    patch_autocomplete_index(lambda index: index.remove_item('institute', pk))
+
+
+@receiver(post_save, sender=Course)
+def refresh_course_suggestion(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pk = instance.pk
+    patch_autocomplete_index(lambda index: index_course_suggestions(index, Course.objects.filter(pk=pk)))
+
+
+@receiver(post_delete, sender=Course)
+def remove_course_suggestion(sender, instance, **kwargs):
+    pk = instance.pk
+    patch_autocomplete_index(lambda index: index.remove_item('course', pk))
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_suggestions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pk = instance.pk
+    patch_autocomplete_index(
+        lambda index: index_institute_suggestions(index, Institute.objects.filter(category_id=pk))
+    )
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_suggestions(sender, instance, **kwargs):
+    name = instance.name
+
+    def patch(index):
+        # The institutes were moved to no category without signals
+        institute_ids = [ref for kind, ref in index.members('category', name) if kind == 'institute']
+        index_institute_suggestions(index, Institute.objects.filter(pk__in=institute_ids))
+
+    patch_autocomplete_index(patch)
@@ -0,0 +1,529 @@
+import random
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from accounts.models import User
+from courses.models import Course
+from institutes.models import Category, Institute
+from . import autocomplete
+from . import cache as search_cache
+from . import index as search_index
+from .autocomplete import AutocompleteIndex, load_snapshot, normalize, reset_autocomplete_index, save_snapshot
+from .facets import FEE_BUCKETS, facet_counts
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = AutocompleteIndex()
+        self.index.load([
+            ('institute', 1, 'ABC Academy', 'Ameerpet', 3, [('area', 'Ameerpet'), ('category', 'Engineering')]),
+            ('institute', 2, 'Ace Coaching', 'Ameerpet', 40, [('area', 'Ameerpet'), ('category', 'Medical')]),
+            ('course', 10, 'Web Development', 'ABC Academy', 3, [('category', 'IT')]),
+            ('course', 11, 'Full Stack Web Development', 'Ace Coaching', 40, [('category', 'IT')]),
+            ('course', 12, 'IIT-JEE Crash Course', 'Ace Coaching', 40, [('category', 'Engineering')]),
+        ])
+
+    def texts(self, query, limit=8):
+        return [suggestion['text'] for suggestion in self.index.suggest(query, limit)]
+
+    def test_whole_text_matches_rank_before_later_words(self):
+        self.assertEqual(self.texts('web'), ['Web Development', 'Full Stack Web Development'])
+
+    def test_popularity_orders_matches(self):
+        # Ace Coaching and ABC Academy have 40 and 3 reviews, Ameerpet two institutes
+        self.assertEqual(self.texts('a'), ['Ace Coaching', 'ABC Academy', 'Ameerpet'])
+
+    def test_categories_and_areas_are_suggested_once(self):
+        suggestions = self.index.suggest('engin')
+        self.assertEqual(suggestions, [
+            {'type': 'category', 'id': None, 'text': 'Engineering', 'subtitle': '', 'popularity': 2},
+        ])
+
+    def test_punctuation_is_ignored(self):
+        self.assertEqual(self.texts('iit jee'), ['IIT-JEE Crash Course'])
+        self.assertEqual(self.texts('jee'), ['IIT-JEE Crash Course'])
+
+    def test_typos_fall_back_to_trigrams(self):
+        self.assertEqual(self.texts('devlopment', limit=1), ['Full Stack Web Development'])
+        self.assertEqual(self.texts('xyzzy'), [])
+
+    def test_updates_and_removals(self):
+        self.index.set_item('course', 10, 'Web Design', 'ABC Academy', 3, [('category', 'Design')])
+        self.assertEqual(self.texts('web d'), ['Web Design', 'Full Stack Web Development'])
+        self.assertEqual(self.index.suggest('it', 1)[0]['popularity'], 1)
+
+        self.index.remove_item('institute', 2)
+        self.assertEqual(self.texts('ameer'), ['Ameerpet'])
+        self.assertEqual(self.index.suggest('ameer')[0]['popularity'], 1)
+        self.index.remove_item('institute', 1)
+        self.assertEqual(self.texts('ameer'), [])
+
+    def test_snapshot_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = save_snapshot(self.index, Path(directory) / 'autocomplete.json.gz')
+            loaded = load_snapshot(path)
+        for query in ('a', 'web', 'engin', 'devlopment'):
+            self.assertEqual(loaded.suggest(query), self.index.suggest(query))
+
+    @mock.patch('search.autocomplete.BLOCK_SIZE', 4)
+    def test_matches_a_full_scan_across_blocks(self):
+        words = ['python', 'java', 'data', 'science', 'web', 'design', 'neet', 'jee', 'maths']
+        rng = random.Random(7)
+        index, items = AutocompleteIndex(), {}
+
+        def add(ref):
+            text = ' '.join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+            items[ref] = (text, rng.randint(0, 5))
+            index.set_item('course', ref, text, '', items[ref][1])
+
+        for ref in range(60):
+            add(ref)
+        for _ in range(150):
+            ref = rng.randrange(80)
+            if ref in items and rng.random() < 0.3:
+                index.remove_item('course', ref)
+                del items[ref]
+            else:
+                add(ref)
+
+        for prefix in ['p', 'ja', 'd', 'de', 'web d', 'sci', 'm', 'jee ']:
+            prefix = normalize(prefix)
+            leading = sorted(
+                (ref for ref, (text, _) in items.items() if normalize(text).startswith(prefix)),
+                key=lambda ref: -items[ref][1],
+            )
+            later = sorted(
+                (ref for ref, (text, _) in items.items()
+                 if f' {prefix}' in normalize(text) and not normalize(text).startswith(prefix)),
+                key=lambda ref: -items[ref][1],
+            )
+            expected = [items[ref][1] for ref in (leading + later)[:8]]
+            suggestions = index.suggest(prefix, 8)
+            self.assertEqual([suggestion['popularity'] for suggestion in suggestions], expected, prefix)
+            for suggestion in suggestions:
+                self.assertIn(f' {prefix}', ' ' + normalize(suggestion['text']))
+
+
+@override_settings(AUTOCOMPLETE_SNAPSHOT=None)
+class AutocompleteEndpointTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', user_type='institute')
+        category = Category.objects.create(name='Engineering', slug='engineering', icon='gear')
+        cls.institute = Institute.objects.create(
+            owner=owner, name='ABC Academy', slug='abc-academy', description='-',
+            email='abc@example.com', phone='9999999999', address='Road 1', area='Ameerpet',
+            pincode='500016', category=category, status='active',
+        )
+        cls.course = Course.objects.create(
+            institute=cls.institute, name='Python Programming', slug='python', description='-',
+            category='IT', duration='3 months', fees=1000, mode='online',
+        )
+
+    def setUp(self):
+        reset_autocomplete_index()
+        self.addCleanup(reset_autocomplete_index)
+        self.client = APIClient()
+
+    def suggest(self, query):
+        response = self.client.get('/api/search/autocomplete/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [(suggestion['type'], suggestion['text']) for suggestion in response.json()['suggestions']]
+
+    def test_suggestions(self):
+        self.assertEqual(self.suggest('pyt'), [('course', 'Python Programming')])
+        self.assertEqual(self.suggest('ameer'), [('area', 'Ameerpet')])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_saves_update_the_loaded_index(self):
+        self.suggest('pyt')  # load the index
+        self.course.name = 'Django Programming'
+        self.course.save()
+        self.assertEqual(self.suggest('pyt'), [])
+        self.assertEqual(self.suggest('djan'), [('course', 'Django Programming')])
+
+        self.institute.status = 'blocked'
+        self.institute.save()
+        self.assertEqual(self.suggest('abc'), [])
+        self.assertEqual(self.suggest('djan'), [])
+
+
+class SearchIndexTests(SimpleTestCase):
+    """BM25 ranking, typo expansion and filters of the in-process index"""
+
+    def setUp(self):
+        self.index = search_index.SearchIndex()
+        weights = {'name': 3.0, 'description': 1.0}
+        documents = [
+            (1, 'Python Programming', 'Learn to code', 'ameerpet', {'online'}),
+            (2, 'Web Design', 'HTML and a little python scripting', 'ameerpet', {'offline'}),
+            (3, 'Python for Data Science', 'Python, pandas and python notebooks', 'kukatpally', {'online', 'hybrid'}),
+            (4, 'Django', 'Web apps with Python and Django', 'kukatpally', {'offline'}),
+            (5, 'Spoken English', 'Grammar and conversation', 'ameerpet', {'offline'}),
+        ]
+        for pk, name, description, area, modes in documents:
+            self.index.add(
+                ('course', pk), {'name': name, 'description': description}, weights,
+                {'area': area, 'modes': frozenset(modes)},
+            )
+
+    def keys(self, query, filters=None):
+        return [pk for _, (_, pk) in self.index.search(query, filters)]
+
+    def test_bm25_ordering(self):
+        # Name hits outweigh description hits; more hits score higher
+        self.assertEqual(self.keys('python'), [3, 1, 4, 2])
+        # A document matching both terms beats ones matching one
+        self.assertEqual(self.keys('python django')[0], 4)
+        # Rare terms weigh more than common ones
+        self.assertEqual(self.keys('web python')[:2], [2, 4])
+        self.assertEqual(self.keys('the and'), [])
+        self.assertEqual(self.keys('cobol'), [])
+
+    def test_typo_expansion(self):
+        for typo in ('pyhton', 'pythn', 'pythonn', 'pithon'):
+            with self.subTest(typo=typo):
+                self.assertEqual(self.index.expand(typo), [('python', search_index.TYPO_PENALTY)])
+                self.assertEqual(self.keys(typo), self.keys('python'))
+        # Typo matches score below exact ones
+        exact, typo = self.index.search('python')[0][0], self.index.search('pyhton')[0][0]
+        self.assertAlmostEqual(typo, exact * search_index.TYPO_PENALTY)
+        # Known words and short words are not expanded
+        self.assertEqual(self.index.expand('django'), [('django', 1.0)])
+        self.assertEqual(self.index.expand('wbe'), [])
+
+    def test_filters(self):
+        self.assertEqual(self.keys('python', {'area': 'kukatpally'}), [3, 4])
+        self.assertEqual(self.keys('python', {'modes': 'online'}), [3, 1])
+        self.assertEqual(self.keys('python', {'area': 'ameerpet', 'modes': 'offline'}), [2])
+        self.assertEqual(self.keys('python', {'area': 'madhapur'}), [])
+
+        # Writes clear the cached filter results
+        self.index.add(
+            ('course', 6), {'name': 'Python Basics'}, {'name': 3.0}, {'area': 'madhapur', 'modes': frozenset()},
+        )
+        self.assertEqual(self.keys('python', {'area': 'madhapur'}), [6])
+        self.index.remove(('course', 6))
+        self.assertEqual(self.keys('python', {'area': 'madhapur'}), [])
+
+    def test_removed_words_leave_the_vocabulary(self):
+        self.index.remove(('course', 5))
+        self.assertEqual(self.keys('english'), [])
+        self.assertEqual(self.index.expand('englsh'), [])
+
+
+@override_settings(SEARCH_BACKEND='memory')
+@mock.patch('search.index._catalog_index', None)
+class SearchEndpointTests(TestCase):
+    """GET /api/search/ over a small catalog"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', user_type='institute')
+        engineering = Category.objects.create(name='Engineering', slug='engineering', icon='-')
+        medical = Category.objects.create(name='Medical', slug='medical', icon='-')
+
+        def institute(slug, area, category, status='active'):
+            return Institute.objects.create(
+                owner=owner, name=slug.replace('-', ' ').title(), slug=slug, description='Coaching centre',
+                email='abc@example.com', phone='9999999999', address='Road 1', area=area,
+                pincode='500016', category=category, status=status,
+            )
+
+        def course(institute, name, mode, category='IT', is_active=True):
+            return Course.objects.create(
+                institute=institute, name=name, slug=name.lower().replace(' ', '-'), description=name,
+                category=category, duration='3 months', fees=10000, mode=mode, is_active=is_active,
+            )
+
+        cls.code_academy = institute('code-academy', 'Ameerpet', engineering)
+        cls.health_point = institute('health-point', 'Kukatpally', medical)
+        cls.blocked = institute('python-blocked', 'Ameerpet', engineering, status='blocked')
+        cls.python = course(cls.code_academy, 'Python Programming', 'online')
+        cls.python_offline = course(cls.code_academy, 'Python Weekend', 'offline')
+        cls.biology = course(cls.health_point, 'Python for Biology', 'hybrid', category='Biology')
+        cls.inactive = course(cls.code_academy, 'Python Archive', 'online', is_active=False)
+        course(cls.blocked, 'Python Hidden', 'online')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(result['type'], result['id']) for result in response.data['results']]
+
+    def courses(self, *courses):
+        return {('course', course.pk) for course in courses}
+
+    def test_results(self):
+        response = self.client.get('/api/search/', {'q': 'python programming'})
+        self.assertEqual(response.data['count'], 3)
+        first = response.data['results'][0]
+        self.assertEqual(
+            (first['type'], first['id'], first['name'], first['institute_name']),
+            ('course', self.python.pk, 'Python Programming', 'Code Academy'),
+        )
+        scores = [result['score'] for result in response.data['results']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        # Inactive courses and blocked institutes (and their courses) never show
+        self.assertEqual(
+            set(self.search(q='python')), self.courses(self.python, self.python_offline, self.biology),
+        )
+        self.assertEqual(self.search(q='pyhton programing')[0], ('course', self.python.pk))
+
+    def test_filters(self):
+        self.assertEqual(set(self.search(q='python', location='kukatpally')), self.courses(self.biology))
+        self.assertEqual(set(self.search(q='python', mode='Online')), self.courses(self.python))
+        # A course's own category or its institute's
+        self.assertEqual(set(self.search(q='python', category='biology')), self.courses(self.biology))
+        self.assertEqual(
+            set(self.search(q='python', category='Engineering')), self.courses(self.python, self.python_offline),
+        )
+        # The form's "any" options filter nothing
+        self.assertEqual(len(self.search(q='python', location='All Hyderabad', mode='all', category='All Courses')), 3)
+
+        self.assertEqual(
+            self.search(q='coaching', type='institute', location='Ameerpet'), [('institute', self.code_academy.pk)],
+        )
+        self.assertEqual(self.search(q='python programming', limit=1), [('course', self.python.pk)])
+
+    def test_errors(self):
+        for params in ({}, {'q': '  '}, {'q': 'python', 'type': 'teacher'}, {'q': 'python', 'limit': 'ten'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/search/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+        self.assertEqual(self.search(q='the'), [])
+
+
+@mock.patch('search.index._catalog_index', None)
+class CatalogIndexRebuildTests(TestCase):
+    """Changes saved while the index is rebuilt are not lost when it is swapped in"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', user_type='institute')
+        institute = Institute.objects.create(
+            owner=owner, name='ABC Academy', slug='abc-academy', description='-',
+            email='abc@example.com', phone='9999999999', address='Road 1', area='Ameerpet',
+            pincode='500016', status='active',
+        )
+        cls.course = Course.objects.create(
+            institute=institute, name='Python Programming', slug='python', description='-',
+            category='IT', duration='3 months', fees=1000, mode='online',
+        )
+
+    def found(self, index, query):
+        return [key for _, key in index.search(query)]
+
+    def rename_course(self, name):
+        self.course.name = name
+        self.course.save()
+
+    def test_changes_during_a_rebuild_are_replayed(self):
+        live = search_index.get_catalog_index()
+        search_index.catalog_patches.start_rebuild()
+        rebuilt = search_index.build_catalog_index()  # read before the rename
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rename_course('Django Programming')
+        self.assertEqual(self.found(live, 'django'), [('course', self.course.pk)])
+
+        search_index.catalog_patches.finish_rebuild(rebuilt, search_index._swap_catalog_index)
+        self.assertIs(search_index.peek_catalog_index(), rebuilt)
+        self.assertEqual(self.found(rebuilt, 'django'), [('course', self.course.pk)])
+        self.assertEqual(self.found(rebuilt, 'python'), [])
+
+    def test_swap_before_commit(self):
+        search_index.get_catalog_index()
+        rebuilt = search_index.build_catalog_index()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.rename_course('Django Programming')
+        search_index._swap_catalog_index(rebuilt)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.found(rebuilt, 'django'), [('course', self.course.pk)])
+
+
+@override_settings(AUTOCOMPLETE_SNAPSHOT=None)
+@mock.patch('search.autocomplete._autocomplete_index', None)
+class AutocompleteRebuildTests(TestCase):
+    """Like the catalog index, a rebuilt autocomplete index keeps changes saved meanwhile"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', user_type='institute')
+        cls.institute = Institute.objects.create(
+            owner=owner, name='ABC Academy', slug='abc-academy', description='-',
+            email='abc@example.com', phone='9999999999', address='Road 1', area='Ameerpet',
+            pincode='500016', status='active',
+        )
+
+    def texts(self, index, query):
+        return [suggestion['text'] for suggestion in index.suggest(query)]
+
+    def test_changes_during_a_rebuild_are_replayed(self):
+        live = autocomplete.get_autocomplete_index()
+        autocomplete.autocomplete_patches.start_rebuild()
+        rebuilt = autocomplete.build_autocomplete_index()  # read before the rename
+        with self.captureOnCommitCallbacks(execute=True):
+            self.institute.name = 'Zenith Academy'
+            self.institute.save()
+        self.assertEqual(self.texts(live, 'zen'), ['Zenith Academy'])
+
+        autocomplete.autocomplete_patches.finish_rebuild(rebuilt, autocomplete._swap_autocomplete_index)
+        self.assertIs(autocomplete.peek_autocomplete_index(), rebuilt)
+        self.assertEqual(self.texts(rebuilt, 'zen'), ['Zenith Academy'])
+        self.assertEqual(self.texts(rebuilt, 'abc'), [])
+
+    def test_delete_after_the_rebuild_read(self):
+        autocomplete.get_autocomplete_index()
+        autocomplete.autocomplete_patches.start_rebuild()
+        rebuilt = autocomplete.build_autocomplete_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.institute.delete()
+        autocomplete.autocomplete_patches.finish_rebuild(rebuilt, autocomplete._swap_autocomplete_index)
+        self.assertEqual(self.texts(rebuilt, 'abc'), [])
+
+
+class CatalogVersionTests(SimpleTestCase):
+    """An evicted catalog version restarts from the clock, never from a value used before"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_seed_is_the_time_in_milliseconds(self):
+        before = int(time.time() * 1000)
+        self.assertTrue(before <= search_cache.get_catalog_version() <= int(time.time() * 1000))
+
+    @mock.patch('search.cache.new_version', side_effect=[1000000, 1000500, 1001000])
+    def test_versions_never_repeat(self, _):
+        seen = [search_cache.get_catalog_version()]
+        search_cache._bump()
+        seen.append(search_cache.get_catalog_version())
+        self.assertEqual(seen, [1000000, 1000001])
+
+        # Evicted: get starts from the clock again
+        cache.delete(search_cache.VERSION_KEY)
+        seen.append(search_cache.get_catalog_version())
+        # Evicted: so does a bump
+        cache.delete(search_cache.VERSION_KEY)
+        search_cache._bump()
+        seen.append(search_cache.get_catalog_version())
+        self.assertEqual(seen[2:], [1000500, 1001000])
+
+
+class FacetCountTests(TestCase):
+    """Each facet is counted with every other selected filter applied"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', user_type='institute')
+        categories = [
+            Category.objects.create(name=name, slug=name.lower(), icon='-') for name in ('Engineering', 'Medical')
+        ]
+        rng = random.Random(3)
+        institutes = []
+        for number in range(8):
+            institutes.append(Institute.objects.create(
+                owner=owner, name=f'Academy {number}', slug=f'academy-{number}', description='-',
+                email='abc@example.com', phone='9999999999', address='Road 1',
+                area=['Ameerpet', 'Kukatpally', 'Dilsukhnagar'][number % 3], pincode='500016',
+                category=categories[number % 2] if number != 7 else None,
+                status='blocked' if number == 6 else 'active',
+            ))
+        for number in range(80):
+            Course.objects.create(
+                institute=rng.choice(institutes), name=f'Course {number}', slug=f'course-{number}',
+                description='-', category='IT', duration='3 months',
+                fees=rng.choice([5000, 10000, 24999, 25000, 60000, 150000]),
+                mode=rng.choice(['online', 'offline', 'hybrid']), is_active=number % 9 != 0,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self, filters):
+        """Counts by brute force over the active courses"""
+        def bucket(fees):
+            for value, _, low, high in FEE_BUCKETS:
+                if (low is None or fees >= low) and (high is None or fees < high):
+                    return value
+
+        rows = [
+            {
+                'category': course.institute.category.name if course.institute.category else None,
+                'area': course.institute.area, 'mode': course.mode, 'fee_range': bucket(course.fees),
+            }
+            for course in Course.objects.filter(is_active=True, institute__status='active')
+            .select_related('institute__category')
+        ]
+
+        def matches(row, skip=None):
+            return all(
+                str(row[name]).lower() == str(value).lower()
+                for name, value in filters.items() if value and name != skip
+            )
+
+        result = {'total': sum(1 for row in rows if matches(row))}
+        for name in ('category', 'area', 'mode', 'fee_range'):
+            counts = {}
+            for row in rows:
+                if row[name] is not None and matches(row, skip=name):
+                    counts[row[name]] = counts.get(row[name], 0) + 1
+            result[name] = counts
+        return result
+
+    def assert_counts(self, filters):
+        counts = facet_counts(filters)
+        expected = self.expected(filters)
+        self.assertEqual(counts['total'], expected['total'], filters)
+        for name in ('category', 'area', 'mode', 'fee_range'):
+            self.assertEqual(
+                {option['value']: option['count'] for option in counts[name]}, expected[name], (name, filters),
+            )
+
+    def test_counts_with_other_filters_applied(self):
+        for filters in [
+            {},
+            {'area': 'ameerpet'},
+            {'area': 'Ameerpet', 'mode': 'online'},
+            {'category': 'Engineering', 'fee_range': '10k-25k'},
+            {'category': 'medical', 'area': 'Kukatpally', 'mode': 'hybrid', 'fee_range': 'above-1l'},
+            {'area': 'Nowhere'},
+        ]:
+            self.assert_counts(filters)
+
+    def test_selected_option_keeps_its_alternatives(self):
+        counts = facet_counts({'mode': 'online'})
+        self.assertEqual(len(counts['mode']), 3)
+        online = next(option['count'] for option in counts['mode'] if option['value'] == 'online')
+        self.assertEqual(counts['total'], online)
+
+    def test_fee_buckets_in_order_with_labels(self):
+        options = facet_counts({})['fee_range']
+        order = [value for value, _, _, _ in FEE_BUCKETS]
+        self.assertEqual([option['value'] for option in options], sorted(
+            (option['value'] for option in options), key=order.index,
+        ))
+        self.assertTrue(all(option['label'] != option['value'] for option in options))
+
+    def test_catalog_changes_show_up(self):
+        before = facet_counts({'area': 'Ameerpet'})['total']
+        Course.objects.create(
+            institute=Institute.objects.get(slug='academy-0'), name='New', slug='new', description='-',
+            category='IT', duration='1 month', fees=1000, mode='online',
+        )
+        self.assertEqual(facet_counts({'area': 'Ameerpet'})['total'], before + 1)
+
+    def test_endpoint_ignores_any_values(self):
+        response = APIClient().get('/api/search/facets/', {'location': 'All Hyderabad', 'mode': 'Online'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], facet_counts({'mode': 'online'})['total'])
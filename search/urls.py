@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('search/', views.search, name='search'),
+    path('search/facets/', views.facets, name='search-facets'),
+    path('search/autocomplete/', views.autocomplete, name='search-autocomplete'),
+]
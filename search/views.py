@@ -0,0 +1,145 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from courses.documents import course_documents
+from institutes.documents import institute_list_documents
+from .autocomplete import MAX_SUGGESTIONS, get_autocomplete_index
+from .backends import KINDS, search_catalog
+from .facets import facet_counts
+
+# Dropdown values in the hero search form that mean "no filter"
+ANY_LOCATION = {'', 'all hyderabad'}
+ANY_MODE = {'', 'all'}
+ANY_CATEGORY = {'', 'all courses'}
+
+MAX_LIMIT = 50
+
+
+# ========================================
+# CATALOG SEARCH API
+# ========================================
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search(request):
+    """
+    Ranked search over institutes and courses (backs the hero search form)
+
+    Example URLs:
+    - /api/search/?q=web development                  -> Everything matching
+    - /api/search/?q=neet&location=Ameerpet           -> Only in Ameerpet
+    - /api/search/?q=python&mode=online&type=course   -> Only online courses
+    - /api/search/?q=jee&category=Engineering         -> Engineering tab
+
+    Results are ordered by relevance. Misspelled words (e.g. "pyhton")
+    still match their closest indexed spelling.
+    """
+    params = request.query_params
+    query = params.get('q', '').strip()
+    kind = params.get('type') or None
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if kind is not None and kind not in KINDS:
+        return Response({'error': f'type must be one of {", ".join(KINDS)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(params.get('limit', 20)), MAX_LIMIT))
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Step 1: Rank matching documents
+    hits = search_catalog(
+        query,
+        area=_filter_value(params.get('location'), ANY_LOCATION),
+        mode=_filter_value(params.get('mode'), ANY_MODE),
+        category=_filter_value(params.get('category'), ANY_CATEGORY),
+        kind=kind,
+        limit=limit,
+    )
+
+    # Step 2: Fetch the cached documents of the hits, one multi-get per kind
+    institutes = {
+        document['id']: document for document in institute_list_documents.get_many(
+            [pk for _, hit_kind, pk in hits if hit_kind == 'institute'], request,
+        )
+    }
+    courses = {
+        document['id']: document for document in course_documents.get_many(
+            [pk for _, hit_kind, pk in hits if hit_kind == 'course'], request,
+        )
+    }
+
+    # Step 3: Keep relevance order
+    results = []
+    for score, hit_kind, pk in hits:
+        document = (institutes if hit_kind == 'institute' else courses).get(pk)
+        if document is None:
+            continue  # deleted since it was indexed
+        results.append({'type': hit_kind, 'score': round(score, 3), **document})
+
+    return Response({
+        'count': len(results),
+        'results': results,
+    }, status=status.HTTP_200_OK)
+
+
+def _filter_value(value, any_values):
+    value = (value or '').strip()
+    return None if value.lower() in any_values else value
+
+
+# ========================================
+# FACET COUNTS API
+# ========================================
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def facets(request):
+    """
+    Course counts for each option of the search form filters
+
+    Example URLs:
+    - /api/search/facets/                              -> Counts over everything
+    - /api/search/facets/?location=Ameerpet&mode=Online
+          -> Category/fee counts for online courses in Ameerpet, plus what
+             every other location and mode would give
+
+    Response:
+    {"total": 120, "category": [{"value": "Engineering", "label": "Engineering", "count": 40}, ...],
+     "area": [...], "mode": [...], "fee_range": [...]}
+    """
+    params = request.query_params
+    filters = {
+        'category': _filter_value(params.get('category'), ANY_CATEGORY),
+        'area': _filter_value(params.get('location'), ANY_LOCATION),
+        'mode': _filter_value(params.get('mode'), ANY_MODE),
+        'fee_range': params.get('fee_range'),
+    }
+    return Response(facet_counts(filters), status=status.HTTP_200_OK)
+
+
+# ========================================
+# AUTOCOMPLETE API
+# ========================================
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def autocomplete(request):
+    """
+    Suggestions for the search box while the user types
+
+    Example URLs:
+    - /api/search/autocomplete/?q=web          -> "Web Development", ...
+    - /api/search/autocomplete/?q=ame&limit=5  -> "Ameerpet" and institutes there
+
+    Served from an in-memory index (see search.autocomplete), never from
+    the database. Each suggestion has a type (institute, course, category
+    or area), the text to show, a subtitle (the area of an institute, the
+    institute of a course) and, for institutes and courses, an id.
+    """
+    query = request.query_params.get('q', '')
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 8)), MAX_SUGGESTIONS))
+    except ValueError:
+        return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+    suggestions = get_autocomplete_index().suggest(query, limit=limit)
+    return Response({'query': query, 'suggestions': suggestions}, status=status.HTTP_200_OK)